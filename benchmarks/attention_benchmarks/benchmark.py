@@ -0,0 +1,110 @@
+# Copyright 2022 Synnada, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Time and peak memory of causal scaled dot product attention in NumPy backend,
+# dense attention is compared with blockwise attention over sequence lengths.
+# Run from the repository root with:
+# python -m benchmarks.attention_benchmarks.benchmark [block size]
+
+import math
+import sys
+import tracemalloc
+from collections.abc import Callable
+from time import perf_counter
+from typing import Any
+
+import numpy as np
+
+from mithril.cores.python.numpy import utils
+from mithril.cores.python.numpy.ops import softmax
+from mithril.framework.common import Table
+
+sequence_lengths = [512, 1024, 2048, 4096, 8192]
+num_heads = 4
+head_dim = 64
+# Dense attention is skipped if its attention weights exceed this size.
+dense_budget = 4 * 1024**3
+
+
+def dense_attention(
+    query: np.ndarray[Any, Any],
+    key: np.ndarray[Any, Any],
+    value: np.ndarray[Any, Any],
+) -> np.ndarray[Any, Any]:
+    # Attention with a dense causal mask and full attention weights.
+    length = query.shape[-2]
+    mask = np.tril(np.ones((length, length), dtype=bool))
+    weights = query @ np.swapaxes(key, -2, -1) / math.sqrt(query.shape[-1])
+    weights = np.where(mask, weights, -np.inf)
+    return softmax(weights, axis=-1) @ value
+
+
+def blockwise_attention(
+    query: np.ndarray[Any, Any],
+    key: np.ndarray[Any, Any],
+    value: np.ndarray[Any, Any],
+) -> np.ndarray[Any, Any]:
+    scale_factor = 1 / math.sqrt(query.shape[-1])
+    output, _ = utils.blockwise_attention(query, key, value, None, True, scale_factor)
+    return output
+
+
+def measure(
+    fn: Callable[..., np.ndarray[Any, Any]], *args: np.ndarray[Any, Any]
+) -> tuple[float, float]:
+    tracemalloc.start()
+    start = perf_counter()
+    fn(*args)
+    elapsed = perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 1024**2
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        utils.ATTENTION_BLOCK_SIZE = int(sys.argv[1])
+
+    table = Table()
+    table.add_header(
+        [
+            "Sequence Length",
+            "Dense Time (s)",
+            "Blockwise Time (s)",
+            "Dense Peak (MB)",
+            "Blockwise Peak (MB)",
+        ]
+    )
+    rng = np.random.default_rng(0)
+    for length in sequence_lengths:
+        query, key, value = (
+            rng.standard_normal((num_heads, length, head_dim), dtype=np.float32)
+            for _ in range(3)
+        )
+        block_time, block_peak = measure(blockwise_attention, query, key, value)
+        dense_time = dense_peak = "-"
+        if num_heads * length**2 * query.itemsize <= dense_budget:
+            elapsed, peak = measure(dense_attention, query, key, value)
+            dense_time, dense_peak = f"{elapsed:.3f}", f"{peak:.0f}"
+        table.add_row(
+            [
+                str(length),
+                dense_time,
+                f"{block_time:.3f}",
+                dense_peak,
+                f"{block_peak:.0f}",
+            ]
+        )
+    table.compile()
+    table.display()
@@ -0,0 +1,75 @@
+# Copyright 2022 Synnada, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Evaluation time of raw C kernels, models compiled with "debug" and "release"
+# build profiles of CBackend are compared with NumPy backend over sizes. Build
+# the kernels with mithril/cores/c/raw_c/compile.sh first, then run from the
+# repository root with:
+# python -m benchmarks.c_benchmarks.benchmark [train]
+
+import sys
+from time import perf_counter
+
+import numpy as np
+
+import mithril as ml
+from mithril.framework.common import Table, Tensor
+from mithril.models import Add, IOKey, MatrixMultiply, Model, Relu
+
+sizes = [64, 128, 256, 512, 1024]
+repeats = 10
+
+
+def dense_model() -> Model:
+    # Matmul -> Add -> Relu, gradient of broadcasted bias also runs reduce_sum.
+    model = Model()
+    model |= MatrixMultiply().connect(left="left", right="right", output="mult")
+    model |= Add().connect(left="mult", right="bias", output="add")
+    model |= Relu().connect(input="add", output=IOKey("output"))
+    model.set_types(left=Tensor, right=Tensor, bias=Tensor)
+    model.set_differentiability(left=True, right=True, bias=True)
+    return model
+
+
+def measure(backend: ml.Backend, size: int, inference: bool) -> float:
+    shapes = {"left": [size, size], "right": [size, size], "bias": [size]}
+    pm = ml.compile(
+        dense_model(), backend, shapes=shapes, inference=inference, jit=False
+    )
+    params = {
+        key: backend.array(np.random.randn(*shape).astype(np.float32))
+        for key, shape in shapes.items()
+    }
+    output_gradients = False if inference else {"output": backend.ones(size, size)}
+    pm.evaluate(params, {}, output_gradients=output_gradients)
+    start = perf_counter()
+    for _ in range(repeats):
+        pm.evaluate(params, {}, output_gradients=output_gradients)
+    return (perf_counter() - start) / repeats
+
+
+if __name__ == "__main__":
+    inference = "train" not in sys.argv[1:]
+
+    table = Table()
+    table.add_header(["Size", "NumPy (ms)", "C Debug (ms)", "C Release (ms)"])
+    for size in sizes:
+        elapsed = [
+            measure(ml.NumpyBackend(), size, inference),
+            measure(ml.CBackend(build="debug"), size, inference),
+            measure(ml.CBackend(build="release"), size, inference),
+        ]
+        table.add_row([str(size)] + [f"{value * 1000:.2f}" for value in elapsed])
+    table.compile()
+    table.display()
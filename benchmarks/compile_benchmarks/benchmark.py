@@ -0,0 +1,131 @@
+# Copyright 2022 Synnada, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Compile time and peak memory benchmarks of large example models. Run from
+# the repository root with: python -m benchmarks.compile_benchmarks.benchmark
+
+import multiprocessing
+import resource
+import sys
+from collections.abc import Callable
+from time import perf_counter
+from typing import Any
+
+import mithril as ml
+from examples.clip.model import clip
+from examples.gpt.model import create_gpt
+from mithril.framework.common import Table
+from mithril.models import Add, Linear, Model, Multiply, Relu
+
+
+def gpt() -> tuple[Model, dict[str, Any]]:
+    model = create_gpt(
+        bias=True,
+        block_size=100,
+        vocab_size=50304,
+        num_layers=12,
+        num_heads=12,
+        dims=768,
+    )
+    return model, {"data_keys": {"input"}}
+
+
+def clip_vit_l14() -> tuple[Model, dict[str, Any]]:
+    model = clip(
+        embed_dim=768,
+        image_resolution=224,
+        vision_layers=24,
+        vision_width=1024,
+        vision_patch_size=14,
+        context_length=77,
+        vocab_size=49408,
+        transformer_width=768,
+        transformer_heads=12,
+        transformer_layers=12,
+    )
+    kwargs = {
+        "shapes": {"image": (2, 3, 224, 224), "text": (6, 77)},
+        "data_keys": {"image", "text"},
+    }
+    return model, kwargs
+
+
+def residual_chain(num_blocks: int = 1667) -> tuple[Model, dict[str, Any]]:
+    # Each block has 3 operators, default one has ~5k operators in total.
+    model = Model()
+    model |= Linear(16).connect(input="input", output="x0")
+    for idx in range(num_blocks):
+        model |= Relu().connect(input=f"x{idx}", output=f"relu{idx}")
+        model |= Multiply().connect(
+            left=f"relu{idx}", right=f"x{idx}", output=f"mult{idx}"
+        )
+        model |= Add().connect(
+            left=f"mult{idx}", right=f"relu{idx}", output=f"x{idx + 1}"
+        )
+    model.expose_keys(f"x{num_blocks}")
+    return model, {"shapes": {"input": [8, 16]}}
+
+
+models: dict[str, Callable[[], tuple[Model, dict[str, Any]]]] = {
+    "GPT-2 (12 layers)": gpt,
+    "CLIP ViT-L/14": clip_vit_l14,
+    "Residual Chain (5k ops)": residual_chain,
+}
+
+
+def compile_model(name: str) -> tuple[float, float, dict[str, float]]:
+    # Deep models need a higher recursion limit for compilation.
+    sys.setrecursionlimit(10000)
+    model, kwargs = models[name]()
+    start = perf_counter()
+    with ml.compile_profiler(trace_memory=False) as profiler:
+        ml.compile(model, ml.TorchBackend(), jit=False, **kwargs)
+    elapsed = perf_counter() - start
+    # ru_maxrss is in kilobytes on Linux.
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    phases = {phase: stats.self_time for phase, stats in profiler.phases.items()}
+    return elapsed, peak_rss, phases
+
+
+if __name__ == "__main__":
+    table = Table()
+    table.add_header(
+        [
+            "Model",
+            "Compile Time (s)",
+            "Peak RSS (MB)",
+            "Graph Init (s)",
+            "Data Clone (s)",
+            "Constraint Solver (s)",
+            "Code Generation (s)",
+        ]
+    )
+    # Each model is compiled in a fresh process to measure its own peak memory.
+    context = multiprocessing.get_context("spawn")
+    for name in models:
+        with context.Pool(1) as pool:
+            elapsed, peak_rss, phases = pool.apply(compile_model, (name,))
+        table.add_row(
+            [
+                name,
+                f"{elapsed:.2f}",
+                f"{peak_rss:.0f}",
+                f"{phases.get('flat_graph_init', 0.0):.3f}",
+                f"{phases.get('clone_data', 0.0):.3f}",
+                f"{phases.get('constraint_solver', 0.0):.3f}",
+                f"{phases.get('generate_code', 0.0):.3f}",
+            ]
+        )
+    table.compile()
+    table.display()
@@ -0,0 +1,69 @@
+# Copyright 2022 Synnada, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Import time benchmark of mithril. Run from the repository root with:
+# python -m benchmarks.import_benchmarks.benchmark [budget in seconds]
+
+import json
+import subprocess
+import sys
+from statistics import median
+
+from mithril.framework.common import Table
+
+# Frameworks which should not be imported unless their backends are used.
+optional_frameworks = ["torch", "jax", "mlx", "numpy"]
+repeats = 5
+default_budget = 2.0
+
+measure_code = f"""
+import json, sys, time
+start = time.perf_counter()
+import mithril
+elapsed = time.perf_counter() - start
+imported = [name for name in {optional_frameworks!r} if name in sys.modules]
+print(json.dumps([elapsed, imported]))
+"""
+
+
+def measure_import() -> tuple[float, list[str]]:
+    # Each import is measured in a fresh interpreter.
+    result = subprocess.run(
+        [sys.executable, "-c", measure_code],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    elapsed, imported = json.loads(result.stdout)
+    return elapsed, imported
+
+
+if __name__ == "__main__":
+    budget = float(sys.argv[1]) if len(sys.argv) > 1 else default_budget
+    # First run compiles bytecode of mithril, so it is excluded.
+    measure_import()
+    results = [measure_import() for _ in range(repeats)]
+    elapsed = median(result[0] for result in results)
+    imported = sorted(set().union(*(result[1] for result in results)))
+
+    table = Table()
+    table.add_header(["Import Time (s)", "Budget (s)", "Imported Frameworks"])
+    table.add_row([f"{elapsed:.3f}", f"{budget:.3f}", ", ".join(imported) or "-"])
+    table.compile()
+    table.display()
+
+    assert not imported, f"Importing mithril imports {imported}!"
+    assert (
+        elapsed < budget
+    ), f"Importing mithril takes {elapsed:.3f}s, exceeding {budget:.3f}s budget!"
@@ -0,0 +1,70 @@
+# Copyright 2022 Synnada, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Step time of mithril.optimizers.Adam compared with the Adam of examples, which
+# updates each parameter with separate expressions. Run from the repository root:
+# python -m benchmarks.optimizer_benchmarks.benchmark
+
+from time import perf_counter
+from typing import Any
+
+import numpy as np
+
+import mithril as ml
+from examples.model_api.utils.optimizers import Adam as ExampleAdam
+from mithril.framework.common import Table
+from mithril.optimizers import Adam
+
+backends = {"numpy": ml.NumpyBackend, "torch": ml.TorchBackend, "jax": ml.JaxBackend}
+# (number of parameters, size of each parameter)
+param_configs = [(16, 256 * 256), (128, 64 * 64), (512, 256)]
+repeats = 50
+
+
+def measure(optimizer: Any, backend: ml.Backend[Any], num: int, size: int) -> float:
+    params = {f"p{idx}": backend.randn(size) for idx in range(num)}
+    gradients = {key: backend.randn(size) for key in params}
+    state = optimizer.init(backend, params)
+    # Warm up (e.g. bucketing and jit compilation).
+    for _ in range(3):
+        params, state = optimizer.update_params(params, gradients, state)
+    start = perf_counter()
+    for _ in range(repeats):
+        params, state = optimizer.update_params(params, gradients, state)
+    # Wait for asynchronously dispatched computations.
+    np.asarray(params["p0"])
+    return (perf_counter() - start) / repeats
+
+
+if __name__ == "__main__":
+    table = Table()
+    table.add_header(
+        ["Backend", "Parameters", "Example Adam (ms)", "Adam (ms)", "Speedup"]
+    )
+    for name, backend_type in backends.items():
+        backend = backend_type()
+        for num, size in param_configs:
+            example = measure(ExampleAdam(lr=1e-3), backend, num, size)
+            fused = measure(Adam(lr=1e-3), backend, num, size)
+            table.add_row(
+                [
+                    name,
+                    f"{num} x {size}",
+                    f"{example * 1000:.3f}",
+                    f"{fused * 1000:.3f}",
+                    f"{example / fused:.2f}x",
+                ]
+            )
+    table.compile()
+    table.display()
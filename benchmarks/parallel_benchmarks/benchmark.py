@@ -0,0 +1,93 @@
+# Copyright 2022 Synnada, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Evaluation time of models with independent MLP branches in NumPy backend,
+# serial execution is compared with "threads" executor over numbers of workers.
+# BLAS threads compete with the executor, so run from the repository root with
+# single threaded BLAS to measure inter-operator parallelism alone:
+# OMP_NUM_THREADS=1 python -m benchmarks.parallel_benchmarks.benchmark [train]
+
+import sys
+from time import perf_counter
+from typing import Any
+
+import mithril as ml
+from mithril.framework.common import Table
+from mithril.models import Add, IOKey, Linear, Mean, Model, Relu
+
+num_branches = [2, 4, 8]
+num_workers = [1, 2, 4, 8]
+batch_size = 256
+width = 1024
+repeats = 10
+
+
+def branch_model(branches: int) -> Model:
+    # Linear -> Relu -> Linear branches of the same input which are summed.
+    model = Model()
+    for idx in range(branches):
+        model |= Linear(width).connect(input="input", output=f"h{idx}")
+        model |= Relu().connect(input=f"h{idx}", output=f"r{idx}")
+        model |= Linear(width).connect(input=f"r{idx}", output=f"b{idx}")
+    total = "b0"
+    for idx in range(1, branches):
+        model |= Add().connect(left=total, right=f"b{idx}", output=f"s{idx}")
+        total = f"s{idx}"
+    model |= Mean().connect(input=total, output=IOKey("output"))
+    return model
+
+
+def measure(branches: int, inference: bool, **kwargs: Any) -> float:
+    backend = ml.NumpyBackend()
+    pm = ml.compile(
+        branch_model(branches),
+        backend,
+        data_keys={"input"},
+        shapes={"input": [batch_size, width]},
+        inference=inference,
+        jit=False,
+        **kwargs,
+    )
+    params = pm.randomize_params()
+    data = {"input": backend.randn(batch_size, width)}
+    output_gradients = not inference
+    pm.evaluate(params, data, output_gradients=output_gradients)
+    start = perf_counter()
+    for _ in range(repeats):
+        pm.evaluate(params, data, output_gradients=output_gradients)
+    return (perf_counter() - start) / repeats
+
+
+if __name__ == "__main__":
+    inference = "train" not in sys.argv[1:]
+
+    table = Table()
+    table.add_header(
+        ["Branches", "Serial (ms)"]
+        + [f"{workers} Workers (ms)" for workers in num_workers]
+        + ["Best Speedup"]
+    )
+    for branches in num_branches:
+        serial = measure(branches, inference)
+        threaded = [
+            measure(branches, inference, executor="threads", num_workers=workers)
+            for workers in num_workers
+        ]
+        table.add_row(
+            [str(branches), f"{serial * 1000:.2f}"]
+            + [f"{elapsed * 1000:.2f}" for elapsed in threaded]
+            + [f"{serial / min(threaded):.2f}x"]
+        )
+    table.compile()
+    table.display()
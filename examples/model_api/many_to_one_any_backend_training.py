@@ -66,10 +66,12 @@ def compile_and_train(
     optimizer = Adam(lr=0.0003, beta1=0.9, beta2=0.999)
     opt_state = optimizer.init(backend, params)
 
+    # Gradient computation and parameter update are compiled into a single step.
+    train_step = pm.compile_train_step(optimizer)
+
     num_epochs = 5000
     for i in range(num_epochs):
-        outputs, gradients = pm.evaluate(params, constant_keys, output_gradients=True)
-        params, opt_state = optimizer.update_params(params, gradients, opt_state)
+        outputs, params, opt_state = train_step(params, constant_keys, opt_state)
         if (i % 1000) == 0:
             # Print the cost every 1000 epochs.
             print(f"Epoch: {i} / {num_epochs} -> ", outputs["final_cost"])
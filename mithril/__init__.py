@@ -13,14 +13,23 @@
 # limitations under the License.
 
 import builtins
+import importlib
 import platform
-from collections.abc import Iterable
+from collections.abc import Iterable, Mapping
+from functools import partial
+from typing import TYPE_CHECKING, Any
 
 from .backends.backend import Backend, UnavailableBackend
 from .framework.codegen import code_gen_map
+from .framework.codegen.py_style_codegen.python_gen import PythonCodeGen
+from .framework.codegen.py_style_codegen.scheduler import EXECUTORS
 from .framework.common import TBD, Tensor
 from .framework.logical import Connection, IOKey
+from .framework.logical.base import BaseModel
+from .framework.physical.jit import JitOptions, enable_compilation_cache
 from .framework.physical.model import PhysicalConstantType, PhysicalShapeType
+from .framework.physical.specialization import DEFAULT_MAX_SPECIALIZATIONS
+from .framework.profiler import compile_profiler, get_active_profiler, profile_phase
 from .models import Model, PhysicalModel
 from .models.train_model import TrainModel
 from .types import (
@@ -40,6 +49,7 @@ from .types import (
     int64,
     short,
 )
+from .utils.compile_cache import CompileCache, get_compile_cache
 
 __all__ = [
     "JaxBackend",
@@ -68,40 +78,52 @@ __all__ = [
     "Constant",
     "epsilon_table",
     "Tensor",
+    "CompileCache",
+    "compile_profiler",
+    "JitOptions",
 ]
 
-# Load backends
-try:
+if TYPE_CHECKING:
     from .backends.with_autograd.jax_backend.backend import JaxBackend
-except ImportError:
-    JaxBackend = UnavailableBackend  # type: ignore
-
-try:
-    if platform.system() != "Darwin":
-        raise ImportError
     from .backends.with_autograd.mlx_backend.backend import MlxBackend
-except ImportError:
-    MlxBackend = UnavailableBackend  # type: ignore
-
-try:
     from .backends.with_autograd.torch_backend.backend import TorchBackend
-except ImportError:
-    TorchBackend = UnavailableBackend  # type: ignore
-
-try:
     from .backends.with_manualgrad.c_backend.backend import CBackend
-except Exception:
-    CBackend = UnavailableBackend  # type: ignore
-
-try:
     from .backends.with_manualgrad.ggml_backend.backend import GGMLBackend
-except ImportError:
-    GGMLBackend = UnavailableBackend  # type: ignore
-
-try:
     from .backends.with_manualgrad.numpy_backend.backend import NumpyBackend
-except ImportError:
-    NumpyBackend = UnavailableBackend  # type: ignore
+
+# Backends are imported lazily on first access (e.g. ml.TorchBackend), so that
+# importing mithril does not import frameworks which are not used.
+_backend_modules = {
+    "JaxBackend": ".backends.with_autograd.jax_backend.backend",
+    "MlxBackend": ".backends.with_autograd.mlx_backend.backend",
+    "TorchBackend": ".backends.with_autograd.torch_backend.backend",
+    "CBackend": ".backends.with_manualgrad.c_backend.backend",
+    "GGMLBackend": ".backends.with_manualgrad.ggml_backend.backend",
+    "NumpyBackend": ".backends.with_manualgrad.numpy_backend.backend",
+}
+
+
+def _load_backend(name: str) -> Any:
+    try:
+        if name == "MlxBackend" and platform.system() != "Darwin":
+            raise ImportError
+        module = importlib.import_module(_backend_modules[name], __name__)
+        return getattr(module, name)
+    except ImportError:
+        return UnavailableBackend
+    except Exception:
+        # C based backends could also fail while loading their shared libraries.
+        if name in ("CBackend", "GGMLBackend"):
+            return UnavailableBackend
+        raise
+
+
+def __getattr__(name: str) -> Any:
+    if name in _backend_modules:
+        backend = _load_backend(name)
+        globals()[name] = backend
+        return backend
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def compile(
@@ -119,6 +141,16 @@ def compile(
     safe_shapes: builtins.bool = True,
     safe_names: builtins.bool = True,
     use_short_namings: builtins.bool = True,
+    compile_cache: str | CompileCache | None = None,
+    profile: builtins.bool = False,
+    max_specializations: builtins.int = DEFAULT_MAX_SPECIALIZATIONS,
+    memory_planning: builtins.bool = False,
+    fuse_elementwise: builtins.bool = False,
+    checkpoint: Iterable[BaseModel] | None = None,
+    checkpoint_budget: builtins.int | None = None,
+    executor: str = "serial",
+    num_workers: builtins.int | None = None,
+    jit_options: JitOptions | Mapping[str, Any] | None = None,
 ) -> PhysicalModel[DataType]:
     """Compilation of Logical Model.
 
@@ -130,7 +162,92 @@ def compile(
         _description_, by default None
     discard_keys : set[str] | None, optional
         _description_, by default None
+    compile_cache : str | CompileCache | None, optional
+        Directory (or CompileCache object) used to store compiled models. If the
+        same model is compiled again with the same arguments, flattening, inference
+        and code generation are skipped. Shared objects built by C backends are
+        also cached by the digest of their generated source, so identical
+        sources are not compiled again, by default None
+    profile : bool, optional
+        If True, compile time statistics of each compilation phase are collected
+        and stored in `compile_profile` attribute of the returned PhysicalModel,
+        by default False
+    max_specializations : int, optional
+        If some dimensions of given shapes are named (e.g. {"input": ["B", 128]}),
+        these dimensions are kept symbolic and code is generated lazily for each
+        concrete shape seen in evaluate. This is the maximum number of shape
+        specialized models kept in memory, by default 16
+    memory_planning : bool, optional
+        If True, intermediate tensors of the generated NumPy functions are assigned
+        to reusable buffers by a liveness analysis and computed into these buffers
+        instead of allocating new arrays in each call. C backend places intermediate
+        tensors and their gradients into a static arena of the generated code, so
+        arrays returned by evaluate are overwritten by the next call. Planned and
+        naive memory usages are reported in the summary of the compiled model, by
+        default False
+    fuse_elementwise : bool, optional
+        If True, chains of elementwise operations (e.g. add, multiplication and
+        activations) whose intermediate results are not used elsewhere are
+        evaluated in a single generated function. NumPy backend evaluates these
+        functions block by block in inference to keep temporaries in cache. Fused
+        operators are reported in the summary of the compiled model, by default
+        False
+    checkpoint : Iterable[BaseModel] | None, optional
+        Submodels whose intermediate results are not kept for gradient
+        computation but recomputed in backward (activation checkpointing).
+        Autograd backends wrap these submodels with their checkpoint
+        transformations while NumPy backend drops caches of these intermediates
+        after forward and recomputes them segment by segment, by default None
+    checkpoint_budget : int | None, optional
+        Memory budget in bytes of the intermediate results kept for gradient
+        computation. If given instead of checkpoint, the model is split into
+        segments with the least recomputation whose estimated peak memory fits
+        in the budget. Chosen segments and their recompute cost are reported in
+        the summary of the compiled model, by default None
+    executor : str, optional
+        Strategy for evaluating operations of the generated functions. With
+        "threads", operations are grouped into levels of independent operations
+        (e.g. parallel branches of the model) and large ones of each level are
+        evaluated at the same time in a thread pool. Only supported by NumPy
+        backend, gradients are still computed serially, by default "serial"
+    num_workers : int | None, optional
+        Number of threads used with "threads" executor, by default None (i.e.
+        number of CPUs)
+    jit_options : JitOptions | Mapping[str, Any] | None, optional
+        Options of jitted functions (i.e. donation of state buffers, static
+        data keys and persistent compilation cache directory), only supported
+        by JAX backend. Traces of jitted functions are recorded in `trace_log`
+        attribute of the returned PhysicalModel regardless of these options,
+        by default None
     """
+    if profile and get_active_profiler() is None:
+        with compile_profiler() as profiler:
+            profiled_pm = compile(
+                model,
+                backend,
+                constant_keys=constant_keys,
+                data_keys=data_keys,
+                discard_keys=discard_keys,
+                trainable_keys=trainable_keys,
+                shapes=shapes,
+                inference=inference,
+                jit=jit,
+                file_path=file_path,
+                safe_shapes=safe_shapes,
+                safe_names=safe_names,
+                use_short_namings=use_short_namings,
+                compile_cache=compile_cache,
+                max_specializations=max_specializations,
+                memory_planning=memory_planning,
+                fuse_elementwise=fuse_elementwise,
+                checkpoint=checkpoint,
+                checkpoint_budget=checkpoint_budget,
+                executor=executor,
+                num_workers=num_workers,
+                jit_options=jit_options,
+            )
+        profiled_pm.compile_profile = profiler
+        return profiled_pm
 
     # TrainModel model requires to be finalized before compilation.
     if isinstance(model, TrainModel):
@@ -145,22 +262,94 @@ def compile(
     discard_keys = set(discard_keys) if discard_keys is not None else set()
     shapes = shapes if shapes is not None else dict()
     trainable_keys = set(trainable_keys) if trainable_keys is not None else set()
+    checkpoint_models = list(checkpoint) if checkpoint is not None else []
+    if checkpoint_models and checkpoint_budget is not None:
+        raise ValueError(
+            "Checkpointed submodels and checkpoint budget can not be given together!"
+        )
+    if executor not in EXECUTORS:
+        raise ValueError(
+            f"Unknown executor '{executor}', expected one of {list(EXECUTORS)}!"
+        )
+    if num_workers is not None and (executor == "serial" or num_workers < 1):
+        raise ValueError(
+            "num_workers requires 'threads' executor and must be a positive integer!"
+        )
+    if isinstance(jit_options, Mapping):
+        jit_options = JitOptions(**jit_options)
+    if jit_options is not None:
+        if not jit or backend.backend_type != "jax":
+            raise ValueError("jit_options are only supported by JAX backend with jit!")
+        if jit_options.compilation_cache_dir is not None:
+            enable_compilation_cache(jit_options.compilation_cache_dir)
+    # Checkpointed submodels are identified with their positions in the model.
+    checkpoint_paths = [_submodel_path(model, m) for m in checkpoint_models]
 
-    # Initialize Physical Model.
-    pm = PhysicalModel[DataType](
-        model=model,
-        backend=backend,
-        data_keys=data_keys,
-        constant_keys=constant_keys,
-        trainable_keys=trainable_keys,
-        discard_keys=discard_keys,
-        shapes=shapes,
-        inference=inference,
-        safe_shapes=safe_shapes,
-        safe_names=safe_names,
-        use_short_namings=use_short_namings,
-        jit=jit,
-    )
+    cache: CompileCache | None = None
+    cache_key: str | None = None
+    cached_code: str | None = None
+    pm: PhysicalModel[DataType] | None = None
+    if compile_cache is not None:
+        cache = get_compile_cache(compile_cache)
+        cache_key = cache.fingerprint(
+            model,
+            backend,
+            constant_keys=constant_keys,
+            data_keys=data_keys,
+            discard_keys=discard_keys,
+            trainable_keys=trainable_keys,
+            shapes=shapes,
+            inference=inference,
+            jit=jit,
+            safe_shapes=safe_shapes,
+            safe_names=safe_names,
+            use_short_namings=use_short_namings,
+            memory_planning=memory_planning,
+            fuse_elementwise=fuse_elementwise,
+            checkpoint=checkpoint_paths,
+            checkpoint_budget=checkpoint_budget,
+            executor=executor,
+        )
+        with profile_phase("compile_cache_load"):
+            entry = cache.load(cache_key, backend) if cache_key is not None else None
+        if entry is not None:
+            pm, cached_code = entry
+
+    is_cache_hit = pm is not None
+    if pm is None:
+        # Initialize Physical Model.
+        pm = PhysicalModel[DataType](
+            model=model,
+            backend=backend,
+            data_keys=data_keys,
+            constant_keys=constant_keys,
+            trainable_keys=trainable_keys,
+            discard_keys=discard_keys,
+            shapes=shapes,
+            inference=inference,
+            safe_shapes=safe_shapes,
+            safe_names=safe_names,
+            use_short_namings=use_short_namings,
+            jit=jit,
+            checkpoint_models=checkpoint_models,
+        )
+    pm.memory_planning = memory_planning
+    pm.elementwise_fusion = fuse_elementwise
+    pm.checkpoint_budget = checkpoint_budget
+    pm.executor = executor
+    pm.num_workers = num_workers
+    if isinstance(model, TrainModel):
+        pm.sample_reduction = model.sample_reduction
+    static_keys = jit_options.static_keys if jit_options else frozenset()
+    if unknown_keys := static_keys - pm.flat_graph.runtime_static_keys:
+        raise KeyError(
+            "Static keys of jit_options must be data keys of the model. "
+            f"Unknown keys: {', '.join(sorted(unknown_keys))}."
+        )
+    # jit_options are not a part of the cache fingerprint, so options of a
+    # cached model are always replaced by the given ones.
+    pm.jit_options = jit_options
+    pm.trace_log.max_traces = jit_options.max_traces if jit_options else None
 
     if jit and file_path is not None:
         # TODO Fix warning
@@ -169,11 +358,65 @@ def compile(
             "'jit' flag to 'False'"
         )
 
+    if pm.dynamic_keys:
+        # Code is generated lazily for each concrete shape of dynamic keys.
+        if file_path is not None:
+            raise ValueError(
+                "Generated code can not be written to a file for models with "
+                "named (dynamic) dimensions!"
+            )
+        if cache is not None and cache_key is not None and not is_cache_hit:
+            with profile_phase("compile_cache_store"):
+                cache.store(cache_key, pm, None)
+        pm.enable_specialization(
+            partial(_generate_functions, jit=jit), max_specializations
+        )
+        pm.compile_profile = get_active_profiler()
+        return pm
+
     # Pick code generator based on backend and generate code.
     CodeGen_Cls = code_gen_map[backend.__class__]
     codegen = CodeGen_Cls(pm)
-    codegen.generate_code(file_path=file_path)
-    evaluate, evaluate_all = codegen.compile_code(jit=jit)
+    if cache is not None and hasattr(codegen, "shared_object_cache"):
+        # C code generators reuse shared objects built from identical sources.
+        codegen.shared_object_cache = cache.shared_objects
+    with profile_phase("generate_code"):
+        if cached_code is not None and isinstance(codegen, PythonCodeGen):
+            codegen.load_code(cached_code, file_path=file_path)
+        else:
+            codegen.generate_code(file_path=file_path)
+
+    if cache is not None and cache_key is not None and not is_cache_hit:
+        with profile_phase("compile_cache_store"):
+            cache.store(cache_key, pm, codegen.code)
+
+    with profile_phase("compile_code"):
+        evaluate, evaluate_all = codegen.compile_code(jit=jit)
 
     pm.generate_functions(evaluate, evaluate_all)
+    pm.compile_profile = get_active_profiler()
     return pm
+
+
+def _submodel_path(model: BaseModel, submodel: BaseModel) -> list[builtins.int]:
+    # Indices of the submodel and its parents in the dags of their parents.
+    path: list[builtins.int] = []
+    current = submodel
+    while current is not model:
+        if current.parent is None:
+            name = submodel.name or submodel.__class__.__name__
+            raise ValueError(
+                f"Checkpointed model {name} is not a submodel of the compiled model!"
+            )
+        path.append(list(current.parent.dag).index(current))
+        current = current.parent
+    return path[::-1]
+
+
+def _generate_functions(pm: PhysicalModel[DataType], jit: builtins.bool) -> None:
+    codegen = code_gen_map[pm.backend.__class__](pm)
+    with profile_phase("generate_code"):
+        codegen.generate_code()
+    with profile_phase("compile_code"):
+        evaluate, evaluate_all = codegen.compile_code(jit=jit)
+    pm.generate_functions(evaluate, evaluate_all)
@@ -1064,12 +1064,17 @@ class Backend(ABC, Generic[DataType]):
         """
         raise NotImplementedError("vjp is not implemented!")
 
-    def vmap[T: Callable[..., Any]](self, fn: T) -> T:
+    def vmap[T: Callable[..., Any]](
+        self, fn: T, in_axes: Any = 0, out_axes: Any = 0
+    ) -> T:
         """
         Vectorize the given function.
 
         Parameters:
         fn (Callable): The function to vectorize.
+        in_axes (Any): Mapped axes of the arguments, None for the arguments
+            which are not mapped. Could be a pytree matching the arguments.
+        out_axes (Any): Axes of the outputs which mapped axes are placed at.
 
         Returns:
         Callable: A vectorized version of the input function.
@@ -1124,6 +1129,27 @@ class Backend(ABC, Generic[DataType]):
         """
         raise NotImplementedError("jacobian is not implemented!")
 
+    def scan(
+        self, fn: Callable[[Any, Any], tuple[Any, Any]], init: Any, xs: Any
+    ) -> tuple[Any, Any]:
+        """
+        Loop fn over the leading axis of xs while carrying a state, the loop is
+        compiled as a single operation if it is traced.
+
+        Parameters:
+        fn (Callable): The loop body, maps (carry, x) to (carry, y).
+        init (Any): Initial value of the carry.
+        xs (Any): Pytree of arrays to be looped over their leading axes.
+
+        Returns:
+        tuple[Any, Any]: The final carry and ys stacked along a new leading
+        axis.
+
+        Raises:
+        NotImplementedError: If the method is not implemented.
+        """
+        raise NotImplementedError("scan is not implemented!")
+
     def convert_to_logical(self, input: Any, force: bool = False) -> Any:
         """
         Convert the input to a logical type.
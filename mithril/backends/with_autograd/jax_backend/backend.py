@@ -656,9 +656,12 @@ class JaxBackend(ParallelBackend[jax.numpy.ndarray]):
         return output, vjp, aux
 
     def vmap(  # type: ignore # mypy bug
-        self, fn: Callable[..., dict[str, jax.Array]]
+        self,
+        fn: Callable[..., dict[str, jax.Array]],
+        in_axes: Any = 0,
+        out_axes: Any = 0,
     ) -> Callable[..., dict[str, jax.Array]]:
-        return jax.vmap(fn)
+        return jax.vmap(fn, in_axes=in_axes, out_axes=out_axes)
 
     def jacrev(self, fn: Callable[..., Any]) -> Callable[..., Any]:
         return jax.jacrev(fn)
@@ -666,6 +669,11 @@ class JaxBackend(ParallelBackend[jax.numpy.ndarray]):
     def jacfwd(self, fn: Callable[..., Any]) -> Callable[..., Any]:
         return jax.jacfwd(fn)
 
+    def scan(
+        self, fn: Callable[[Any, Any], tuple[Any, Any]], init: Any, xs: Any
+    ) -> tuple[Any, Any]:
+        return jax.lax.scan(fn, init, xs)
+
     def convert_to_logical(self, input: Any, force: bool = False) -> Any:
         # Try dtype:
         if input.__hash__ and input in core_utils.dtype_map.inverse:
@@ -614,9 +614,12 @@ class MlxBackend(Backend[mx.array]):
         return output, vjp, aux
 
     def vmap(  # type: ignore  #mypy bug
-        self, fn: Callable[[mx.array], mx.array]
+        self,
+        fn: Callable[[mx.array], mx.array],
+        in_axes: Any = 0,
+        out_axes: Any = 0,
     ) -> Callable[[mx.array], mx.array]:
-        return mx.vmap(fn)
+        return mx.vmap(fn, in_axes=in_axes, out_axes=out_axes)
 
     def convert_to_logical(self, input: Any, force: bool = False) -> Any:
         # Try dtype:
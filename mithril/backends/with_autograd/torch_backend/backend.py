@@ -685,9 +685,12 @@ class TorchBackend(ParallelBackend[torch.Tensor]):
         return output, vjp, aux
 
     def vmap(  # type: ignore  # mypy bug
-        self, fn: Callable[..., dict[str, torch.Tensor]]
+        self,
+        fn: Callable[..., dict[str, torch.Tensor]],
+        in_axes: Any = 0,
+        out_axes: Any = 0,
     ) -> Callable[..., dict[str, torch.Tensor]]:
-        return torch_vmap(fn)
+        return torch_vmap(fn, in_dims=in_axes, out_dims=out_axes)
 
     def jacrev(self, fn: Callable[..., torch.Tensor]) -> Callable[..., torch.Tensor]:
         return torch_jacrev(fn)
@@ -36,9 +36,24 @@ class CBackend(Backend[PyArray]):
         os.path.dirname(__file__), "..", "..", "..", "cores", "c", "raw_c"
     )
     CODEGEN_CONFIG = utils.CODEGEN_CONFIG
-
-    def __init__(self) -> None:
+    # Compiler flags of generated code for each build profile. Kernels are
+    # built by compile.sh with the same profiles (release by default). Native
+    # builds are tuned for the host CPU, so they are not portable.
+    BUILD_PROFILES: dict[str, list[str]] = {
+        "debug": ["-g"],
+        "release": ["-O3"],
+        "native": ["-O3", "-march=native"],
+    }
+
+    def __init__(self, build: str = "debug") -> None:
+        if build not in self.BUILD_PROFILES:
+            raise ValueError(
+                f"Unknown build profile: '{build}'! Available profiles: "
+                f"{list(self.BUILD_PROFILES)}"
+            )
+        self.build = build
         self._device = "cpu"
+        self._dtype = types.float32
         self.op_function_dict = ops.primitive_func_dict
         self.dtype_map = dtype_map
         self.registered_primitives = {}
@@ -48,6 +63,13 @@ class CBackend(Backend[PyArray]):
     def is_manualgrad(self) -> bool:
         return True
 
+    @property
+    def compile_flags(self) -> list[str]:
+        flags = list(self.BUILD_PROFILES[self.build])
+        if self.build != "debug" and utils.supports_openmp():
+            flags.append("-fopenmp")
+        return flags
+
     @property
     def precision(self) -> int:
         return 32
@@ -88,17 +110,23 @@ class CBackend(Backend[PyArray]):
         self, input: PyArray, *, dtype: types.Dtype | None = None
     ) -> PyArray:
         assert dtype is None, "dtype is not supported in CBackend"
-        return self.array(np.zeros(input.shape, dtype=np.float32))
+        return array.zeros(input.shape)
 
     def to_numpy(self, array: PyArray) -> np.ndarray[Any, Any]:
         return utils.to_numpy(array)
 
     def array(
-        self, input: np.ndarray[Any, Any], *, dtype: types.Dtype | None = None
+        self,
+        input: np.ndarray[Any, Any],
+        *,
+        dtype: types.Dtype | None = None,
+        copy: bool = True,
     ) -> PyArray:
+        """Returns a C array by copying `input`. If copy is False, returned array
+        shares memory of `input`, which must be a C-contiguous float32 array.
+        """
         assert dtype is None, "dtype is not supported in CBackend"
-        input = input.astype(np.float32)
-        return utils.from_numpy(input)
+        return utils.from_numpy(input, copy=copy)
 
     def get_struct_cls(self) -> type[ctypes.Structure]:
         return Array
@@ -12,6 +12,10 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import ctypes
+import subprocess
+import tempfile
+from functools import cache
 from typing import Any
 
 import numpy as np
@@ -41,14 +45,53 @@ CODEGEN_CONFIG.ALLOCATE_INTERNALS = True
 
 
 def to_numpy(array: PyArray) -> np.ndarray[Any, Any]:
-    return np.ctypeslib.as_array(array.arr.data, shape=(array.shape))
+    # Zero-copy view of the array, see PyArray.__array_interface__.
+    return np.asarray(array)
 
 
-def from_numpy(array: np.ndarray[Any, Any]) -> PyArray:
+def from_numpy(array: np.ndarray[Any, Any], copy: bool = True) -> PyArray:
+    if not copy:
+        return alias_numpy(array)
+    array = np.ascontiguousarray(array, dtype=np.float32)
     shape = array.shape
     ndim = len(shape)
 
     c_shape = to_c_int_array(shape)
     c_data = to_c_float_array(array)  # type: ignore
     arr: Array = lib.create_struct(c_data, ndim, c_shape)
-    return PyArray(arr.contents, shape)
+    return PyArray(arr.contents, shape, owned=True)
+
+
+def alias_numpy(array: np.ndarray[Any, Any]) -> PyArray:
+    # Array struct shares memory of the given array, which is kept alive by the
+    # returned PyArray.
+    if array.dtype != np.float32 or not array.flags.c_contiguous:
+        raise ValueError(
+            "Only C-contiguous float32 arrays could be used without copying!"
+        )
+    c_shape = to_c_int_array(array.shape)
+    c_strides = to_c_int_array([stride // array.itemsize for stride in array.strides])
+    arr = Array(
+        data=array.ctypes.data_as(ctypes.POINTER(ctypes.c_float)),
+        shape=ctypes.cast(c_shape, ctypes.POINTER(ctypes.c_int)),
+        strides=ctypes.cast(c_strides, ctypes.POINTER(ctypes.c_int)),
+        ndim=array.ndim,
+        size=array.size,
+    )
+    return PyArray(arr, array.shape, base=(array, c_shape, c_strides))
+
+
+@cache
+def supports_openmp(compiler: str = "cc") -> bool:
+    # Apple clang (i.e. default compiler of macOS) does not support -fopenmp.
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        try:
+            subprocess.run(
+                [compiler, "-fopenmp", "-x", "c", "-", "-o", f"{tmp_dir}/a.out"],
+                input=b"int main(void) { return 0; }",
+                capture_output=True,
+                check=True,
+            )
+        except (OSError, subprocess.CalledProcessError):
+            return False
+    return True
@@ -41,6 +41,7 @@ class GGMLBackend(Backend[PyArray]):
 
     def __init__(self) -> None:
         self._device = "cpu"
+        self._dtype = types.float32
         self.op_function_dict = ops.primitive_func_dict
         self.dtype_map = dtype_map
         self.registered_primitives = {}
@@ -64,18 +65,15 @@ class GGMLBackend(Backend[PyArray]):
         return ggml_struct
 
     def to_numpy(self, array: PyArray) -> np.ndarray[Any, Any]:
-        return np.ctypeslib.as_array(
-            ctypes.cast(array.arr.data, ctypes.POINTER(ctypes.c_float)),
-            shape=(array.shape),
-        )
+        return np.asarray(array)
 
     def array(
         self, input: np.ndarray[Any, Any], *, dtype: types.Dtype | None = None
     ) -> PyArray:
         assert dtype is None, "dtype is not supported in CBackend"
-        input = input.astype(np.float32)
-        data_ptr = ctypes.cast(from_numpy(input).arr.data, ctypes.c_void_p)
-        return PyArray(ggml_struct(data=data_ptr), input.shape)
+        owner = from_numpy(input)
+        data_ptr = ctypes.cast(owner.arr.data, ctypes.c_void_p)
+        return PyArray(ggml_struct(data=data_ptr), owner.shape, base=owner)
 
     def ones(
         self,
@@ -84,8 +82,9 @@ class GGMLBackend(Backend[PyArray]):
     ) -> PyArray:
         assert dtype is None, "dtype is not supported in GGML Backend"
         _shape = process_shape(shape)
-        data_ptr = ctypes.cast(array.ones(_shape).arr.data, ctypes.c_void_p)
-        return PyArray(ggml_struct(data=data_ptr), _shape)
+        owner = array.ones(_shape)
+        data_ptr = ctypes.cast(owner.arr.data, ctypes.c_void_p)
+        return PyArray(ggml_struct(data=data_ptr), _shape, base=owner)
 
     def zeros(
         self,
@@ -94,8 +93,9 @@ class GGMLBackend(Backend[PyArray]):
     ) -> PyArray:
         assert dtype is None, "dtype is not supported in GGML Backend"
         _shape = process_shape(shape)
-        data_ptr = ctypes.cast(array.zeros(_shape).arr.data, ctypes.c_void_p)
-        return PyArray(ggml_struct(data=data_ptr), _shape)
+        owner = array.zeros(_shape)
+        data_ptr = ctypes.cast(owner.arr.data, ctypes.c_void_p)
+        return PyArray(ggml_struct(data=data_ptr), _shape, base=owner)
 
     def empty(
         self,
@@ -104,5 +104,6 @@ class GGMLBackend(Backend[PyArray]):
     ) -> PyArray:
         assert dtype is None, "dtype is not supported in GGML Backend"
         _shape = process_shape(shape)
-        data_ptr = ctypes.cast(array.empty(_shape).arr.data, ctypes.c_void_p)
-        return PyArray(ggml_struct(data=data_ptr), _shape)
+        owner = array.empty(_shape)
+        data_ptr = ctypes.cast(owner.arr.data, ctypes.c_void_p)
+        return PyArray(ggml_struct(data=data_ptr), _shape, base=owner)
@@ -14,15 +14,22 @@
 
 import ctypes
 import math
-from collections.abc import Sequence
+import weakref
 from numbers import Real
+from typing import Any
 
 from .ggml.ggml_core import ggml_struct
 from .raw_c.definitions import Array, lib
 
 
 class PyArray:
-    def __init__(self, arr: ctypes.Structure, shape: tuple[int, ...] | list[int]):
+    def __init__(
+        self,
+        arr: ctypes.Structure,
+        shape: tuple[int, ...] | list[int],
+        base: Any = None,
+        owned: bool = False,
+    ):
         # TODO: PyArray need to store strides
 
         self.arr = arr
@@ -31,32 +38,49 @@ class PyArray:
         self.shape = shape
         self.ndim = len(shape)
         self.name = self.arr.__class__.__name__
-
-    # TODO: Implement __del__ method for deleting the struct
-    # def __del__(self):
-    #     self.lib.delete_struct(self.arr)
+        # Memory of the array belongs to base (e.g. another PyArray or a NumPy
+        # array) if given, which is kept alive as long as this array.
+        self.base = base
+        # Owned structs are allocated by the C library and freed once the array
+        # is garbage collected, views of the array reference it as their base.
+        if owned:
+            weakref.finalize(self, lib.delete_struct, ctypes.pointer(arr))
 
     @property
     def dtype(self) -> type:
         return ctypes.c_float
 
     @property
-    def data(self) -> Sequence[int | Sequence[int | Sequence[int]]]:
-        total_elements = math.prod(self.shape)
-        # Convert the array into a Python list
-        data_ptr = ctypes.cast(self.arr.data, ctypes.POINTER(ctypes.c_float))
-        data_list = [data_ptr[i] for i in range(total_elements)]
-
-        def reshape(data: list[float], shape: tuple[int, ...]) -> list:
-            if len(shape) == 1:
-                return data
-            slice_size = math.prod(shape[1:])
-            return [
-                reshape(data[i * slice_size : (i + 1) * slice_size], shape[1:])
-                for i in range(shape[0])
-            ]
-
-        return reshape(data_list, self.shape)
+    def data(self) -> list[Any]:
+        import numpy as np
+
+        return np.asarray(self).tolist()
+
+    @property
+    def __array_interface__(self) -> dict[str, Any]:
+        # np.asarray(array) is a zero-copy view which keeps the array alive.
+        strides = None
+        if (
+            isinstance(self.arr, Array)
+            and self.arr.strides
+            and self.arr.ndim == self.ndim
+        ):
+            itemsize = ctypes.sizeof(ctypes.c_float)
+            strides = tuple(
+                self.arr.strides[idx] * itemsize for idx in range(self.ndim)
+            )
+        return {
+            "version": 3,
+            "shape": self.shape,
+            "typestr": "<f4",
+            "data": (ctypes.cast(self.arr.data, ctypes.c_void_p).value, False),
+            "strides": strides,
+        }
+
+    def __buffer__(self, flags: int) -> memoryview:
+        import numpy as np
+
+        return memoryview(np.asarray(self))
 
     def __repr__(self):
         return f"array({self.data})"
@@ -132,8 +156,9 @@ def _get_array_ptr(arr):
 
 
 def _create_result(result_struct, shape, name):
+    result = PyArray(result_struct.contents, shape, owned=True)
     if name == "Array":
-        return PyArray(result_struct.contents, shape)
+        return result
     else:
-        data_ptr = ctypes.cast(result_struct.contents.data, ctypes.c_void_p)
-        return PyArray(ggml_struct(data=data_ptr), shape)
+        data_ptr = ctypes.cast(result.arr.data, ctypes.c_void_p)
+        return PyArray(ggml_struct(data=data_ptr), shape, base=result)
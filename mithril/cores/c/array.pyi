@@ -31,10 +31,19 @@ class PyArray:
     arr: ctypes.Structure
     shape: tuple[int, ...]
     ndim: int
+    base: Any
 
+    @property
     def data(self) -> NestedList: ...
+    @property
+    def __array_interface__(self) -> dict[str, Any]: ...
+    def __buffer__(self, flags: int) -> memoryview: ...
     def __init__(
-        self, arr: ctypes.Structure, shape: tuple[int, ...] | list[int]
+        self,
+        arr: ctypes.Structure,
+        shape: tuple[int, ...] | list[int],
+        base: Any = None,
+        owned: bool = False,
     ) -> None: ...
     def __gt__(self, other: PyArray) -> PyArray: ...
     def __ge__(self, other: PyArray) -> PyArray: ...
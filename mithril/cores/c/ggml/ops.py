@@ -47,7 +47,7 @@ def binary_op(
     op(ctypes.byref(output.arr), ctypes.byref(left_c.arr), ctypes.byref(right_c.arr))
     _shape = output.shape
     data_ptr = ctypes.cast(output.arr.data, ctypes.c_void_p)
-    return PyArray(ggml_struct(data=data_ptr), _shape)
+    return PyArray(ggml_struct(data=data_ptr), _shape, base=output)
 
 
 primitive_func_dict = {key: fn for key, fn in globals().items() if callable(fn)}
@@ -34,16 +34,16 @@ def to_c_float_array(
 def empty(shape: tuple[int, ...] | list[int]):
     c_shape = to_c_int_array(shape)
     arr = lib.create_empty_struct(len(shape), c_shape).contents
-    return PyArray(arr, shape)
+    return PyArray(arr, shape, owned=True)
 
 
 def ones(shape: tuple[int, ...] | list[int]):
     c_shape = to_c_int_array(shape)
     arr = lib.create_full_struct(1.0, len(shape), c_shape).contents
-    return PyArray(arr, shape)
+    return PyArray(arr, shape, owned=True)
 
 
 def zeros(shape: tuple[int, ...] | list[int]):
     c_shape = to_c_int_array(shape)
     arr = lib.create_full_struct(0.0, len(shape), c_shape).contents
-    return PyArray(arr, shape)
+    return PyArray(arr, shape, owned=True)
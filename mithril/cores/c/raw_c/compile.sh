@@ -1,2 +1,39 @@
 #!/bin/bash
-cc ops.c array.c utils.c -shared -fPIC -g -o libmithrilc.so
+# Build the kernels of C backend with the given profile:
+# ./compile.sh [release|native|debug] (release by default)
+# native tunes the kernels for the CPU of the build host, so the library could
+# crash with illegal instructions on other CPUs.
+
+set -e  # Exit on any error
+
+CC=${CC:-cc}
+PROFILE=${1:-release}
+
+case "$PROFILE" in
+    release) CFLAGS="-O3" ;;
+    native) CFLAGS="-O3 -march=native" ;;
+    debug) CFLAGS="-O0 -g" ;;
+    *) echo "Unknown build profile: $PROFILE (expected release, native or debug)"; exit 1 ;;
+esac
+LIBS=""
+
+# OpenMP is enabled if the compiler supports it (e.g. Apple clang does not).
+if echo 'int main(void) { return 0; }' | ${CC} -fopenmp -x c - -o /dev/null 2>/dev/null; then
+    CFLAGS="$CFLAGS -fopenmp"
+fi
+
+# Matrix multiplication is dispatched to CBLAS if it is available, unless
+# MITHRIL_NO_CBLAS is set.
+if [ -z "$MITHRIL_NO_CBLAS" ]; then
+    for LIB in openblas cblas blas; do
+        if printf '#include <cblas.h>\nint main(void) { cblas_sgemm(0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0); return 0; }\n' \
+            | ${CC} -x c - -l${LIB} -o /dev/null 2>/dev/null; then
+            CFLAGS="$CFLAGS -DMITHRIL_USE_CBLAS"
+            LIBS="-l${LIB}"
+            break
+        fi
+    done
+fi
+
+echo "Building libmithrilc.so ($PROFILE): ${CFLAGS} ${LIBS}"
+${CC} ops.c array.c utils.c -shared -fPIC ${CFLAGS} ${LIBS} -o libmithrilc.so
@@ -14,9 +14,28 @@
 
 #include "ops.h"
 
+#include <string.h>
+
 #include "stdio.h"
 
+#ifdef MITHRIL_USE_CBLAS
+#include <cblas.h>
+#endif
+
 #define MAX(a, b) ((a) > (b) ? (a) : (b))
+#define MIN(a, b) ((a) < (b) ? (a) : (b))
+
+// Kernels over fewer elements (or multiply-adds for matrix multiplication)
+// run in a single thread, starting threads costs more than they save.
+#define OMP_MIN_SIZE 32768
+
+// Block sizes of matrix multiplication for rows of left, the inner dimension
+// and columns of right, chosen so that a block of right fits in L2 cache.
+#define BLOCK_M 64
+#define BLOCK_K 128
+#define BLOCK_N 512
+
+typedef enum { OP_ADD, OP_MULTIPLY, OP_SUBTRACT } BinaryOp;
 
 float add_lambda(float x, float y) { return x + y; }
 
@@ -29,16 +48,100 @@ static float squared_diff(float x, float y) {
   return diff * diff;
 }
 
+/* Returns true if the data of the array is laid out in row-major order */
+static bool is_contiguous(const Array *arr) {
+  int stride = 1;
+  for (int i = arr->ndim - 1; i >= 0; i--) {
+    if (arr->shape[i] != 1 && arr->strides[i] != stride) return false;
+    stride *= arr->shape[i];
+  }
+  return true;
+}
+
+static bool same_shape(const Array *a, const Array *b) {
+  if (a->ndim != b->ndim) return false;
+  for (int i = 0; i < a->ndim; i++) {
+    if (a->shape[i] != b->shape[i]) return false;
+  }
+  return true;
+}
+
+/* Returns true if right is only broadcast along leading axes of output, i.e.
+ * its elements repeat with a period of its size in output. */
+static bool is_trailing_broadcast(const Array *right, const Array *output) {
+  int offset = output->ndim - right->ndim;
+  if (offset < 0) return false;
+  bool leading = true;
+  for (int i = 0; i < right->ndim; i++) {
+    if (leading && right->shape[i] == 1) continue;
+    leading = false;
+    if (right->shape[i] != output->shape[offset + i]) return false;
+  }
+  return true;
+}
+
+#define BINARY_LOOPS(OPERATOR)                                       \
+  do {                                                               \
+    if (period == size) {                                            \
+      _Pragma("omp parallel for simd if (size >= OMP_MIN_SIZE)")     \
+      for (size_t i = 0; i < size; i++) out[i] = l[i] OPERATOR r[i]; \
+    } else if (period == 1) {                                        \
+      const float value = r[0];                                      \
+      _Pragma("omp parallel for simd if (size >= OMP_MIN_SIZE)")     \
+      for (size_t i = 0; i < size; i++)                              \
+        out[i] = l[i] OPERATOR value;                                \
+    } else {                                                         \
+      const size_t rows = size / period;                             \
+      _Pragma("omp parallel for if (size >= OMP_MIN_SIZE)")          \
+      for (size_t row = 0; row < rows; row++) {                      \
+        const float *l_row = l + row * period;                       \
+        float *out_row = out + row * period;                         \
+        _Pragma("omp simd")                                          \
+        for (size_t j = 0; j < period; j++)                          \
+          out_row[j] = l_row[j] OPERATOR r[j];                       \
+      }                                                              \
+    }                                                                \
+  } while (0)
+
+/* Evaluates a binary operation with loops the compiler could vectorize if
+ * left has the shape of output and right is broadcast along leading axes
+ * only (e.g. bias addition), otherwise falls back to the generic iterator. */
+static void binary_op(Array *output, const Array *left, const Array *right,
+                      BinaryOp op, float (*fallback)(float, float)) {
+  if (!(same_shape(left, output) && is_trailing_broadcast(right, output) &&
+        is_contiguous(left) && is_contiguous(right) &&
+        is_contiguous(output))) {
+    binary_array_iterator(left, right, output, fallback);
+    return;
+  }
+  const size_t size = output->size;
+  const size_t period = right->size;
+  const float *l = left->data;
+  const float *r = right->data;
+  float *out = output->data;
+  switch (op) {
+    case OP_ADD:
+      BINARY_LOOPS(+);
+      break;
+    case OP_MULTIPLY:
+      BINARY_LOOPS(*);
+      break;
+    case OP_SUBTRACT:
+      BINARY_LOOPS(-);
+      break;
+  }
+}
+
 void add(Array *output, Array *left, Array *right) {
-  binary_array_iterator(left, right, output, add_lambda);
+  binary_op(output, left, right, OP_ADD, add_lambda);
 }
 
 void multiplication(Array *output, Array *left, Array *right) {
-  binary_array_iterator(left, right, output, multiply_lambda);
+  binary_op(output, left, right, OP_MULTIPLY, multiply_lambda);
 }
 
 void subtract(Array *output, Array *left, Array *right) {
-  binary_array_iterator(left, right, output, subtract_lambda);
+  binary_op(output, left, right, OP_SUBTRACT, subtract_lambda);
 }
 
 void transpose(Array *output, const Array *input, const c_tuple *axes) {
@@ -59,7 +162,9 @@ void transpose(Array *output, const Array *input, const c_tuple *axes) {
     invert_permutation(axes->data, inv_axes, input->ndim);
 
     // Recompute output strides based on transposed axes
-    output->strides = compute_strides(output->shape, output->ndim);
+    int *out_strides = compute_strides(output->shape, output->ndim);
+    memcpy(output->strides, out_strides, output->ndim * sizeof(int));
+    free(out_strides);
 
     // Copy data using inverse axes
     for (size_t i = 0; i < input->size; i++) {
@@ -76,6 +181,33 @@ void transpose(Array *output, const Array *input, const c_tuple *axes) {
   }
 }
 
+#ifndef MITHRIL_USE_CBLAS
+/* Computes C = A @ B for row-major contiguous A (M x K), B (K x N) and C
+ * (M x N). Loops are blocked over K and N so that the block of B stays in
+ * cache while it is reused by all rows, and the innermost loop runs over
+ * contiguous columns of B and C so that it is vectorized. */
+static void gemm_block(const float *A, const float *B, float *C, int M, int N,
+                       int K) {
+  memset(C, 0, (size_t)M * N * sizeof(float));
+  for (int k0 = 0; k0 < K; k0 += BLOCK_K) {
+    const int k1 = MIN(k0 + BLOCK_K, K);
+    for (int j0 = 0; j0 < N; j0 += BLOCK_N) {
+      const int j1 = MIN(j0 + BLOCK_N, N);
+      for (int i = 0; i < M; i++) {
+        float *c = C + (size_t)i * N;
+        const float *a = A + (size_t)i * K;
+        for (int k = k0; k < k1; k++) {
+          const float a_ik = a[k];
+          const float *b = B + (size_t)k * N;
+#pragma omp simd
+          for (int j = j0; j < j1; j++) c[j] += a_ik * b[j];
+        }
+      }
+    }
+  }
+}
+#endif
+
 void matrix_multiplication(Array *output, const Array *left,
                            const Array *right) {
   int max_ndim = MAX(left->ndim, right->ndim);
@@ -91,7 +223,10 @@ void matrix_multiplication(Array *output, const Array *left,
   const int N = out_shape[max_ndim - 1];
   const int K = lshape[max_ndim - 1];  // Inner dimension
 
-  output->strides = compute_strides(out_shape, max_ndim);
+  // Output strides are updated in place, they are owned by the output.
+  int *out_strides = compute_strides(out_shape, max_ndim);
+  memcpy(output->strides, out_strides, max_ndim * sizeof(int));
+  free(out_strides);
   int *lstrides = compute_strides(lshape, max_ndim);
   int *rstrides = compute_strides(rshape, max_ndim);
 
@@ -104,25 +239,32 @@ void matrix_multiplication(Array *output, const Array *left,
   for (int i = 0; i < max_ndim - 2; i++)
     batch_size *= MAX(lshape[i], rshape[i]);
 
-#pragma omp parallel for
+#ifdef MITHRIL_USE_CBLAS
+  // BLAS parallelizes each multiplication itself.
   for (size_t b = 0; b < batch_size; b++) {
     size_t l_offset = loc(b, lshape, lstrides, max_ndim - 2);
     size_t r_offset = loc(b, rshape, rstrides, max_ndim - 2);
-
-    for (int i = 0; i < M; i++) {
-      for (int j = 0; j < N; j++) {
-        float sum = 0.0f;
-        for (int k = 0; k < K; k++) {
-          size_t left_idx = l_offset + i * lstrides[max_ndim - 2] +
-                            k * lstrides[max_ndim - 1];
-          size_t right_idx = r_offset + k * rstrides[max_ndim - 2] +
-                             j * rstrides[max_ndim - 1];
-          sum += left->data[left_idx] * right->data[right_idx];
-        }
-        output->data[b * M * N + i * N + j] = sum;
-      }
+    cblas_sgemm(CblasRowMajor, CblasNoTrans, CblasNoTrans, M, N, K, 1.0f,
+                left->data + l_offset, K, right->data + r_offset, N, 0.0f,
+                output->data + b * M * N, N);
+  }
+#else
+  // Row blocks of all batches are computed in parallel.
+  const long row_blocks = (M + BLOCK_M - 1) / BLOCK_M;
+  const double flops = (double)batch_size * M * N * K;
+#pragma omp parallel for collapse(2) if (flops >= OMP_MIN_SIZE * 64.0)
+  for (long b = 0; b < (long)batch_size; b++) {
+    for (long block = 0; block < row_blocks; block++) {
+      const int row = block * BLOCK_M;
+      const int rows = MIN(BLOCK_M, M - row);
+      size_t l_offset = loc(b, lshape, lstrides, max_ndim - 2);
+      size_t r_offset = loc(b, rshape, rstrides, max_ndim - 2);
+      gemm_block(left->data + l_offset + (size_t)row * K,
+                 right->data + r_offset,
+                 output->data + b * M * N + (size_t)row * N, rows, N, K);
     }
   }
+#endif
   free(lshape);
   free(rshape);
   free(out_shape);
@@ -130,11 +272,47 @@ void matrix_multiplication(Array *output, const Array *left,
   free(rstrides);
 }
 
-void reduce_sum(const Array *input, Array *output, const c_tuple *axes) {
-  // Initialize output to zero
-  for (size_t i = 0; i < output->size; i++) {
-    output->data[i] = 0.0f;
+/* Sums input over (outer, reduced, inner) blocks of its row-major data. */
+static void reduce_sum_range(const float *input, float *output, size_t outer,
+                             size_t reduced, size_t inner) {
+  const size_t size = outer * reduced * inner;
+  if (inner == 1 && outer == 1) {
+    float sum = 0.0f;
+#pragma omp parallel for simd reduction(+ : sum) if (size >= OMP_MIN_SIZE)
+    for (size_t r = 0; r < reduced; r++) sum += input[r];
+    output[0] = sum;
+  } else if (inner == 1) {
+#pragma omp parallel for if (size >= OMP_MIN_SIZE)
+    for (size_t o = 0; o < outer; o++) {
+      const float *src = input + o * reduced;
+      float sum = 0.0f;
+#pragma omp simd reduction(+ : sum)
+      for (size_t r = 0; r < reduced; r++) sum += src[r];
+      output[o] = sum;
+    }
+  } else {
+    // Kept trailing axes are split into chunks, so that reductions over the
+    // leading axes (e.g. gradients of biases) are parallel as well.
+    const size_t chunk = 256;
+    const size_t chunks = (inner + chunk - 1) / chunk;
+#pragma omp parallel for collapse(2) if (size >= OMP_MIN_SIZE)
+    for (size_t o = 0; o < outer; o++) {
+      for (size_t c = 0; c < chunks; c++) {
+        const size_t start = c * chunk;
+        const size_t end = MIN(start + chunk, inner);
+        float *dst = output + o * inner;
+        for (size_t i = start; i < end; i++) dst[i] = 0.0f;
+        for (size_t r = 0; r < reduced; r++) {
+          const float *src = input + (o * reduced + r) * inner;
+#pragma omp simd
+          for (size_t i = start; i < end; i++) dst[i] += src[i];
+        }
+      }
+    }
   }
+}
+
+void reduce_sum(const Array *input, Array *output, const c_tuple *axes) {
   // Create reduction mask (1=reduce, 0=keep)
   int *reduce_mask = (int *)calloc(input->ndim, sizeof(int));
   if (axes == NULL) {
@@ -145,12 +323,42 @@ void reduce_sum(const Array *input, Array *output, const c_tuple *axes) {
   } else {
     // Mark specified axes for reduction
     for (int i = 0; i < axes->size; i++) {
-      if (axes->data[i] >= 0 && axes->data[i] < input->ndim) {
-        reduce_mask[axes->data[i]] = 1;
+      int axis = axes->data[i] < 0 ? axes->data[i] + input->ndim : axes->data[i];
+      if (axis >= 0 && axis < input->ndim) {
+        reduce_mask[axis] = 1;
       }
     }
   }
 
+  // Reduced axes forming a single range are summed block by block.
+  int first = -1, last = -1;
+  bool is_range = true;
+  for (int d = 0; d < input->ndim; d++) {
+    if (!reduce_mask[d]) continue;
+    if (first >= 0 && d != last + 1) is_range = false;
+    if (first < 0) first = d;
+    last = d;
+  }
+  if (is_range && is_contiguous(input)) {
+    size_t outer = 1, reduced = 1, inner = 1;
+    for (int d = 0; d < input->ndim; d++) {
+      if (first >= 0 && d < first)
+        outer *= input->shape[d];
+      else if (first >= 0 && d <= last)
+        reduced *= input->shape[d];
+      else
+        inner *= input->shape[d];
+    }
+    reduce_sum_range(input->data, output->data, outer, reduced, inner);
+    free(reduce_mask);
+    return;
+  }
+
+  // Initialize output to zero
+  for (size_t i = 0; i < output->size; i++) {
+    output->data[i] = 0.0f;
+  }
+
   // Iterate through input and accumulate sums
   for (size_t i = 0; i < input->size; i++) {
     // Compute output index
@@ -176,8 +384,10 @@ void reduce_sum(const Array *input, Array *output, const c_tuple *axes) {
 void relu(Array *output, const Array *input) {
   const float *input_data = input->data;
   float *output_data = output->data;
+  const size_t size = output->size;
 
-  for (size_t i = 0; i < output->size; i++) {
+#pragma omp parallel for simd if (size >= OMP_MIN_SIZE)
+  for (size_t i = 0; i < size; i++) {
     output_data[i] = MAX(0.0f, input_data[i]);
   }
 }
@@ -410,6 +620,48 @@ void reduce_mean_grad(Array *outputGradient, int idx, Array *output,
   free(bcast_strides);
 }
 
+/* Accumulates gradient of C = A @ B for row-major contiguous A (M x K), B
+ * (K x N) and dC (M x N) into dA += dC @ B^T if idx is 0, otherwise into
+ * dB += A^T @ dC. Innermost loops run over contiguous rows so that they are
+ * vectorized. */
+static void gemm_grad_block(const float *dC, const float *A, const float *B,
+                            float *grad, int idx, int M, int N, int K) {
+#ifdef MITHRIL_USE_CBLAS
+  if (idx == 0)
+    cblas_sgemm(CblasRowMajor, CblasNoTrans, CblasTrans, M, K, N, 1.0f, dC, N,
+                B, N, 1.0f, grad, K);
+  else
+    cblas_sgemm(CblasRowMajor, CblasTrans, CblasNoTrans, K, N, M, 1.0f, A, K,
+                dC, N, 1.0f, grad, N);
+#else
+  const double flops = (double)M * N * K;
+  if (idx == 0) {
+#pragma omp parallel for if (flops >= OMP_MIN_SIZE * 64.0)
+    for (int i = 0; i < M; i++) {
+      const float *dc = dC + (size_t)i * N;
+      for (int k = 0; k < K; k++) {
+        const float *b = B + (size_t)k * N;
+        float sum = 0.0f;
+#pragma omp simd reduction(+ : sum)
+        for (int j = 0; j < N; j++) sum += dc[j] * b[j];
+        grad[(size_t)i * K + k] += sum;
+      }
+    }
+  } else {
+#pragma omp parallel for if (flops >= OMP_MIN_SIZE * 64.0)
+    for (int k = 0; k < K; k++) {
+      float *g = grad + (size_t)k * N;
+      for (int i = 0; i < M; i++) {
+        const float a_ik = A[(size_t)i * K + k];
+        const float *dc = dC + (size_t)i * N;
+#pragma omp simd
+        for (int j = 0; j < N; j++) g[j] += a_ik * dc[j];
+      }
+    }
+  }
+#endif
+}
+
 void matrix_multiplication_grad(const Array *gradient, int idx, Array *output,
                                 const Array *left, const Array *right,
                                 Array *leftGradient, Array *rightGradient) {
@@ -444,9 +696,18 @@ void matrix_multiplication_grad(const Array *gradient, int idx, Array *output,
 
   // Total number of broadcasted batches in gradient.
   int batch_size = prod(gradient->shape, gradient_batch_ndim);
+  // Batches are accumulated into the same gradient if the input is broadcast,
+  // so they are only evaluated in parallel without broadcasting.
+  int input_batch_size = (idx == 0) ? prod(left->shape, left_batch_ndim)
+                                    : prod(right->shape, right_batch_ndim);
+
+  const Array *input_gradient = (idx == 0) ? leftGradient : rightGradient;
+  const bool contiguous = is_contiguous(left) && is_contiguous(right) &&
+                          is_contiguous(gradient) &&
+                          is_contiguous(input_gradient);
 
-#pragma omp parallel for
   // Iterate over each broadcasted batch.
+#pragma omp parallel for if (input_batch_size == batch_size && batch_size > 1)
   for (int b = 0; b < batch_size; b++) {
     size_t left_base_offset =
         loc(b, left->shape, left->strides, left_batch_ndim);
@@ -455,6 +716,18 @@ void matrix_multiplication_grad(const Array *gradient, int idx, Array *output,
     size_t gradient_base_offset =
         loc(b, gradient->shape, gradient->strides, gradient_batch_ndim);
 
+    if (contiguous) {
+      if (idx == 0)
+        gemm_grad_block(gradient->data + gradient_base_offset, NULL,
+                        right->data + right_base_offset,
+                        leftGradient->data + left_base_offset, idx, M, N, K);
+      else
+        gemm_grad_block(gradient->data + gradient_base_offset,
+                        left->data + left_base_offset, NULL,
+                        rightGradient->data + right_base_offset, idx, M, N, K);
+      continue;
+    }
+
     if (idx == 0) {
       // --- Compute gradient for Left ---
       // leftGradient[i, k] += sum_j gradient[i, j] * right[k, j]
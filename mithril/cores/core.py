@@ -13,44 +13,37 @@
 # limitations under the License.
 
 
-from typing import Any, Generic, TypeGuard, TypeVar
+import sys
+from typing import TYPE_CHECKING, Any, Generic, TypeGuard, TypeVar
 
-data_types: list[type] = []
-
-try:
-    from numpy import ndarray
-
-    data_types.append(ndarray)
-except ImportError:
-    pass
-
-try:
+if TYPE_CHECKING:
     from jax import Array
-
-    data_types.append(Array)
-except ImportError:
-    pass
-
-try:
+    from mlx.core import array
+    from numpy import ndarray
     from torch import Tensor
 
-    data_types.append(Tensor)
-except ImportError:
-    pass
-
-try:
-    from mlx.core import array
+    from mithril.cores.c.array import PyArray
 
-    data_types.append(array)
-except ImportError:
-    pass
+# Tensor types of the supported frameworks as (module, attribute) pairs. Types
+# are resolved from already imported modules only, since an instance of a tensor
+# type could not exist before its framework is imported. This keeps importing
+# mithril free of optional framework imports.
+_data_type_paths: list[tuple[str, str]] = [
+    ("numpy", "ndarray"),
+    ("jax", "Array"),
+    ("torch", "Tensor"),
+    ("mlx.core", "array"),
+    ("mithril.cores.c.array", "PyArray"),
+]
 
-try:
-    from mithril.cores.c.array import PyArray
 
-    data_types.append(PyArray)
-except ImportError:
-    pass
+def get_data_types() -> tuple[type, ...]:
+    data_types: list[type] = []
+    for module_name, type_name in _data_type_paths:
+        module = sys.modules.get(module_name)
+        if (data_type := getattr(module, type_name, None)) is not None:
+            data_types.append(data_type)
+    return tuple(data_types)
 
 
 DataType = TypeVar(
@@ -61,4 +54,4 @@ DataType = TypeVar(
 class GenericDataType(Generic[DataType]):
     @staticmethod
     def is_tensor_type(t: Any) -> TypeGuard[DataType]:
-        return isinstance(t, tuple(data_types))
+        return isinstance(t, get_data_types())
@@ -226,6 +226,8 @@ __all__ = [
     "ones",
     "floor",
     "clamp",
+    "scan",
+    "checkpoint",
 ]
 
 
@@ -1195,6 +1197,39 @@ def clamp(input: jax.Array, min_val: float | int, max_val: float | int) -> jax.A
     return jnp.clip(input, min_val, max_val)
 
 
+def scan(
+    body: Any,
+    init: dict[str, jax.Array],
+    sequences: dict[str, jax.Array],
+    params: dict[str, jax.Array],
+    carries: dict[str, str],
+    output: str,
+) -> jax.Array:
+    # body is the compiled PhysicalModel of the scan body.
+    def step(
+        carry: dict[str, jax.Array], sequence: dict[str, jax.Array]
+    ) -> tuple[dict[str, jax.Array], jax.Array]:
+        step_outputs = body.evaluate(params | carry | sequence)
+        carry = {in_key: step_outputs[out_key] for in_key, out_key in carries.items()}
+        return carry, step_outputs[output]
+
+    _, outputs = lax.scan(step, init, sequences)
+    return outputs
+
+
+def checkpoint(fn: Callable[..., Any], *args: Any) -> Any:
+    # Arrays are the inputs of the transformation, other arguments are static.
+    indices = [idx for idx, arg in enumerate(args) if isinstance(arg, jax.Array)]
+
+    def segment(*arrays: jax.Array) -> Any:
+        _args = list(args)
+        for idx, array in zip(indices, arrays, strict=True):
+            _args[idx] = array
+        return fn(*_args)
+
+    return jax.checkpoint(segment)(*(args[idx] for idx in indices))
+
+
 array_creation_funcs = [
     "arange",
     "randn",
@@ -17,6 +17,7 @@ import re
 from collections.abc import Callable, Iterator, Sequence
 from functools import partial
 from itertools import combinations_with_replacement
+from typing import Any
 
 import mlx.core as mx
 import mlx.nn as nn
@@ -200,6 +201,8 @@ __all__ = [
     "ones",
     "floor",
     "clamp",
+    "scan",
+    "checkpoint",
 ]
 
 
@@ -1068,6 +1071,38 @@ def clamp(input: mx.array, min_val: float, max_val: float) -> mx.array:
     return mx.clip(input, min_val, max_val)
 
 
+def scan(
+    body: Any,
+    init: dict[str, mx.array],
+    sequences: dict[str, mx.array],
+    params: dict[str, mx.array],
+    carries: dict[str, str],
+    output: str,
+) -> mx.array:
+    # body is the compiled PhysicalModel of the scan body.
+    carry = init
+    outputs = []
+    for idx in range(len(next(iter(sequences.values())))):
+        inputs = params | carry | {key: value[idx] for key, value in sequences.items()}
+        step_outputs = body.evaluate(inputs)
+        carry = {in_key: step_outputs[out_key] for in_key, out_key in carries.items()}
+        outputs.append(step_outputs[output])
+    return mx.stack(outputs)
+
+
+def checkpoint(fn: Callable[..., Any], *args: Any) -> Any:
+    # Arrays are the inputs of the transformation, other arguments are static.
+    indices = [idx for idx, arg in enumerate(args) if isinstance(arg, mx.array)]
+
+    def segment(*arrays: mx.array) -> Any:
+        _args = list(args)
+        for idx, array in zip(indices, arrays, strict=True):
+            _args[idx] = array
+        return fn(*_args)
+
+    return mx.checkpoint(segment)(*(args[idx] for idx in indices))
+
+
 array_creation_funcs = [
     "arange",
     "randn",
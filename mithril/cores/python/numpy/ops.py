@@ -30,9 +30,11 @@ from ....common import PaddingType, find_dominant_type
 from ...utils import NestedFloatOrIntOrBoolList, is_tuple_int
 from .utils import (
     CacheType,
+    blockwise_attention,
     calc_prob_matrix,
     calculate_binary_class_weight,
     calculate_cross_entropy_class_weights,
+    convolve,
     determine_dtype,
     dtype_map,
     find_optimal_sigmas,
@@ -172,6 +174,9 @@ __all__ = [
     "ones",
     "floor",
     "clamp",
+    "scan",
+    "compute_into",
+    "fused_chunks",
 ]
 
 
@@ -469,16 +474,7 @@ def conv1d(
     dilation: int = 1,
     cache: CacheType | None = None,
 ) -> np.ndarray[Any, Any]:
-    if dilation != 1:
-        raise NotImplementedError(
-            f"Dilation of {dilation} is not supported. "
-            f"Currently, the Numpy backend for conv2d only supports a dilation of 1."
-        )
-    n, c, w = input.shape
-    *_, w_k = weight.shape
-    out_w = (w - w_k + sum(padding)) // stride + 1
-    submatrices = get_submatrices1d(input, (n, c, out_w), w_k, padding, stride)
-    return np.einsum("niwl,oil->now", submatrices, weight)
+    return convolve(input, weight, (stride,), (padding,), (dilation,), cache)
 
 
 def conv1d_bias(
@@ -513,26 +509,13 @@ def conv2d(
     dilation: tuple[int, int] = (1, 1),
     cache: CacheType | None = None,
 ) -> np.ndarray[Any, Any]:
-    if dilation != (1, 1):
-        raise NotImplementedError(
-            f"Dilation of {dilation} is not supported. "
-            f"Numpy backend for conv2d only supports a dilation of (1, 1)."
-        )
-
     _padding: tuple[tuple[int, int], tuple[int, int]]
     if is_tuple_int(padding):
         _padding = ((padding[0], padding[0]), (padding[1], padding[1]))
     else:
         _padding = padding  # type: ignore
 
-    *b, h, w = input.shape
-    _, _, h_k, w_k = weight.shape
-    out_h = (h - h_k + sum(_padding[0])) // stride[0] + 1
-    out_w = (w - w_k + sum(_padding[1])) // stride[1] + 1
-    submatrices = get_submatrices2d(
-        input, (*b, out_h, out_w), h_k, w_k, _padding, stride[0]
-    )
-    return np.einsum("nihwkl,oikl->nohw", submatrices, weight)
+    return convolve(input, weight, stride, _padding, dilation, cache)
 
 
 def conv2d_bias(
@@ -669,27 +652,19 @@ def scaled_dot_product_attention(
             "Currently Numpy scaled_dot_product_attention only support dropout_p 0"
         )
 
-    L, S = query.shape[-2], key.shape[-2]
     scale_factor = 1 / math.sqrt(query.shape[-1]) if scale is None else scale
     write_into_cache(cache, "scale_factor", scale_factor)
-    attn_bias = np.zeros((L, S), dtype=query.dtype)
     if is_causal:
         assert attn_mask is None
-        temp_mask = np.tril(np.ones((L, S), dtype=bool))
-        attn_bias = np.where(temp_mask, attn_bias, float("-inf"))
-        attn_bias.astype(query.dtype)
-
-    if attn_mask is not None:
-        if attn_mask.dtype == bool:
-            attn_bias = np.where(attn_mask, attn_bias, float("-inf"))
-        else:
-            attn_bias += attn_mask
-    attn_weight = query @ np.swapaxes(key, -2, -1) * scale_factor
-    write_into_cache(cache, "attn_weight_soft_out", attn_weight)
-    attn_weight += attn_bias
-    attn_weight = softmax(attn_weight, axis=-1)
-    write_into_cache(cache, "attn_weight_soft_out", attn_weight)
-    return attn_weight @ value
+    output, logsumexp = blockwise_attention(
+        query, key, value, attn_mask, is_causal, scale_factor
+    )
+    # Attention weights are recomputed tile by tile in backward, only their
+    # row-wise log-sum-exp is kept.
+    write_into_cache(cache, "logsumexp", logsumexp)
+    if cache is not None:
+        cache.pop("grads", None)
+    return output
 
 
 # Loss funcs
@@ -1730,6 +1705,108 @@ def clamp(
     return np.clip(input, min_val, max_val)
 
 
+def scan(
+    body: Any,
+    init: dict[str, np.ndarray[Any, Any]],
+    sequences: dict[str, np.ndarray[Any, Any]],
+    params: dict[str, np.ndarray[Any, Any]],
+    carries: dict[str, str],
+    output: str,
+    cache: CacheType | None = None,
+) -> np.ndarray[Any, Any]:
+    # body is the compiled PhysicalModel of the scan body. Carries of each
+    # step are stored into the cache for backpropagation through time.
+    carry = init
+    step_carries = []
+    outputs = []
+    for idx in range(len(next(iter(sequences.values())))):
+        inputs = params | carry | {key: value[idx] for key, value in sequences.items()}
+        step_outputs = body.evaluate(inputs)
+        step_carries.append(carry)
+        carry = {in_key: step_outputs[out_key] for in_key, out_key in carries.items()}
+        outputs.append(step_outputs[output])
+    if cache is not None:
+        cache["carries"] = step_carries
+    return np.stack(outputs)
+
+
+def _relu_into(input: np.ndarray[Any, Any], **kwargs: Any) -> np.ndarray[Any, Any]:
+    return np.maximum(input, 0.0, **kwargs)
+
+
+# Numpy functions of the primitives which could write their results into
+# preallocated buffers. Note that none of them returns a view of its inputs.
+out_functions: dict[str, Callable[..., np.ndarray[Any, Any]]] = {
+    "add": np.add,
+    "subtract": np.subtract,
+    "multiplication": np.multiply,
+    "divide": np.true_divide,
+    "power": np.power,
+    "square": np.square,
+    "exp": np.exp,
+    "sqrt": np.sqrt,
+    "log": np.log,
+    "sin": np.sin,
+    "cos": np.cos,
+    "abs": np.absolute,
+    "tanh": np.tanh,
+    "relu": _relu_into,
+    "matrix_multiplication": np.matmul,
+}
+
+
+def compute_into(
+    formula_key: str, out: np.ndarray[Any, Any], *args: Any
+) -> np.ndarray[Any, Any]:
+    """Computes the primitive of formula_key by writing its result into out.
+    If dtype or shape of the result is different than out (e.g. inputs are
+    given with another precision), result is allocated as usual.
+    """
+    fn = out_functions[formula_key]
+    try:
+        return fn(*args, out=out, casting="no")
+    except (TypeError, ValueError):
+        return fn(*args)
+
+
+# Size of the blocks which fused elementwise functions are evaluated on. It is
+# chosen to keep temporaries of a block in L2 cache.
+FUSED_CHUNK_BYTES = 256 * 1024
+
+
+def fused_chunks(fn: Callable[..., Any], *args: Any) -> Any:
+    """Evaluates the fused elementwise function fn block by block along the
+    leading axis of its (broadcasted) output, so that intermediate results of
+    the fused operations are never materialized in full size.
+    """
+    arrays = [arg for arg in args if isinstance(arg, np.ndarray)]
+    if not arrays:
+        return fn(*args)
+    shape = np.broadcast_shapes(*(array.shape for array in arrays))
+    row_bytes = math.prod(shape[1:]) * max(array.itemsize for array in arrays)
+    if len(shape) == 0 or shape[0] == 1 or shape[0] * row_bytes <= FUSED_CHUNK_BYTES:
+        return fn(*args)
+
+    step = max(1, FUSED_CHUNK_BYTES // row_bytes)
+    # Inputs broadcasted along the leading axis are passed as a whole.
+    is_sliced = [
+        isinstance(arg, np.ndarray) and arg.ndim == len(shape) and arg.shape[0] > 1
+        for arg in args
+    ]
+    output: np.ndarray[Any, Any] | None = None
+    for start in range(0, shape[0], step):
+        chunk = fn(
+            *(
+                arg[start : start + step] if sliced else arg
+                for arg, sliced in zip(args, is_sliced, strict=True)
+            )
+        )
+        if output is None:
+            output = np.empty(shape, dtype=chunk.dtype)
+        output[start : start + step] = chunk
+    return output
+
+
 array_creation_funcs = [
     "arange",
     "randn",
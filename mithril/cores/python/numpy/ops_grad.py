@@ -27,10 +27,10 @@ from .ops import hinge_loss, sigmoid, softmax
 from .utils import (
     CacheType,
     accumulate_grads,
+    blockwise_attention_grad,
     calc_input_slices,
+    convolve_grad,
     fill_zeros_like,
-    get_submatrices1d,
-    get_submatrices2d,
     verify_shapes,
     write_into_cache,
 )
@@ -117,6 +117,7 @@ __all__ = [
     "atleast_1d_grad",
     "cast_grad",
     "avg_pool2d_grad",
+    "scan_grad",
 ]
 
 
@@ -947,45 +948,12 @@ def conv1d_grad(
     dilation: int = 1,
 ) -> np.ndarray[Any, Any]:
     verify_shapes(inputs, idx, non_differentiables=[2, 3, 4])
-    input1, input2 = inputs
-    n, c, w = input1.shape
-    _, _, w_k = input2.shape
-    out_w = (w - w_k + sum(padding)) // stride + 1
-    if idx == 0:
-        _output_gradient: np.ndarray[Any, Any] = np.zeros(
-            (
-                output_gradient.shape[0],
-                output_gradient.shape[1],
-                (output_gradient.shape[2] - 1) * stride + 1,
-            ),
-            dtype=output_gradient.dtype,
-        )
-        _output_gradient[:, :, ::stride] = output_gradient
-        _output_gradient = np.pad(
-            _output_gradient,
-            pad_width=((0,), (0,), (w_k - 1,)),
-            mode="constant",
-            constant_values=(0.0,),
-        )
-        submatrices_in1 = get_submatrices1d(
-            _output_gradient,
-            (n, c, _output_gradient.shape[2] - (w_k // 2) * 2),
-            w_k,
-            (0, 0),
-            1,
-        )
-        rot_kernel = np.flip(input2, 2)
-        grad = np.einsum("nowl,oil->niw", submatrices_in1, rot_kernel)
-        input_grad = np.zeros_like(input1)
-        grad = grad[:, :, padding[0] : padding[0] + w]
-        input_grad[:, :, : grad.shape[2]] = grad
-        return input_grad
-    elif idx == 1:
-        submatrices_in2 = get_submatrices1d(input1, (n, c, out_w), w_k, padding, stride)
-        return np.einsum("niwl,now->oil", submatrices_in2, output_gradient)
-
-    else:
+    if idx not in (0, 1):
         raise ValueError("Invalid index for conv1d gradient.")
+    input1, input2 = inputs
+    return convolve_grad(
+        output_gradient, cache, idx, input1, input2, (stride,), (padding,), (dilation,)
+    )
 
 
 def conv1d_bias_grad(
@@ -1024,6 +992,8 @@ def conv2d_grad(
     dilation: tuple[int, int] = (1, 1),
 ) -> np.ndarray[Any, Any]:
     verify_shapes(inputs, idx, non_differentiables=[2, 3, 4])
+    if idx not in (0, 1):
+        raise ValueError("Invalid index for conv2d gradient.")
     input1, input2 = inputs
 
     _padding: tuple[tuple[int, int], tuple[int, int]]
@@ -1032,60 +1002,9 @@ def conv2d_grad(
     else:
         _padding = padding  # type: ignore
 
-    n, c, h, w = input1.shape
-    _, _, h_k, w_k = input2.shape
-    out_h = (h - h_k + sum(_padding[0])) // stride[0] + 1
-    out_w = (w - w_k + sum(_padding[1])) // stride[1] + 1
-
-    if idx == 0:
-        _output_gradient = np.zeros(
-            (
-                output_gradient.shape[0],
-                output_gradient.shape[1],
-                (output_gradient.shape[2] - 1) * stride[0] + 1,
-                (output_gradient.shape[3] - 1) * stride[1] + 1,
-            ),
-            dtype=output_gradient.dtype,
-        )
-        _output_gradient[:, :, :: stride[0], :: stride[1]] = output_gradient
-        _output_gradient = np.pad(
-            _output_gradient,
-            pad_width=((0,), (0,), (h_k - 1,), (w_k - 1,)),
-            mode="constant",
-            constant_values=(0.0,),
-        )
-        submatrices_in1 = get_submatrices2d(
-            _output_gradient,
-            (
-                n,
-                c,
-                _output_gradient.shape[2] - (h_k // 2) * 2,
-                _output_gradient.shape[3] - (w_k // 2) * 2,
-            ),
-            h_k,
-            w_k,
-            ((0, 0), (0, 0)),
-            1,
-        )
-        rot_kernel = np.rot90(input2, 2, axes=(2, 3))
-        grad = np.einsum("nohwkl,oikl->nihw", submatrices_in1, rot_kernel)
-        input_grad = np.zeros_like(input1)
-        grad = grad[
-            :,
-            :,
-            _padding[0][0] : _padding[0][0] + h,
-            _padding[1][0] : _padding[1][0] + w,
-        ]
-        input_grad[:, :, : grad.shape[2], : grad.shape[3]] = grad
-        return input_grad
-    elif idx == 1:
-        submatrices_in2 = get_submatrices2d(
-            input1, (n, c, out_h, out_w), h_k, w_k, _padding, stride[0]
-        )
-        return np.einsum("nihwkl,nohw->oikl", submatrices_in2, output_gradient)
-
-    else:
-        raise ValueError("Invalid index for conv2d gradient.")
+    return convolve_grad(
+        output_gradient, cache, idx, input1, input2, stride, _padding, dilation
+    )
 
 
 def conv2d_bias_grad(
@@ -1650,47 +1569,25 @@ def scaled_dot_product_attention_grad(
     scale: float | int | None = None,
 ) -> np.ndarray[Any, Any]:
     verify_shapes(inputs, idx, non_differentiables=[3, 4, 5, 6])
-    if idx == 2:
-        return matrix_multiplication_grad(
-            output_gradient, None, 1, cache["attn_weight_soft_out"], inputs[2]
-        )
-    elif idx == 1:
-        query, key, value, *_ = inputs
-        attn_grad_1 = matrix_multiplication_grad(
-            output_gradient, None, 0, cache["attn_weight_soft_out"], value
-        )
-        attn_grad_soft = softmax_grad(
-            attn_grad_1,
-            {"output": cache["attn_weight_soft_out"], "axis": -1},
-            0,
-            cache["attn_weight_soft_out"],
-        )
-        key_grad = matrix_multiplication_grad(
-            attn_grad_soft, None, 1, query, np.swapaxes(key, -2, -1)
-        )
-        key_grad = np.swapaxes(key_grad, -2, -1) * cache["scale_factor"]
-        return key_grad
-    elif idx == 0:
-        query, key, value, *_ = inputs
-        attn_grad_1 = matrix_multiplication_grad(
-            output_gradient, None, 0, cache["attn_weight_soft_out"], value
-        )
-        attn_grad_soft = softmax_grad(
-            attn_grad_1,
-            {"output": cache["attn_weight_soft_out"], "axis": -1},
-            0,
-            cache["attn_weight_soft_out"],
-        )
-        query_grad = matrix_multiplication_grad(
-            attn_grad_soft,
-            None,
-            0,
+    if idx not in (0, 1, 2):
+        raise RuntimeError("Something went wrong!")
+    # Gradients of all inputs are computed in a single pass over attention tiles
+    # and kept in cache until the next forward call.
+    if (grads := cache.get("grads")) is None:
+        query, key, value, *rest = inputs
+        attn_mask = rest[0] if rest else None
+        grads = cache["grads"] = blockwise_attention_grad(
+            output_gradient,
+            cache["output"],
+            cache["logsumexp"],
             query,
-            (np.swapaxes(key, -2, -1) * cache["scale_factor"]),
+            key,
+            value,
+            attn_mask,
+            is_causal,
+            cache["scale_factor"],
         )
-        return query_grad
-    else:
-        raise RuntimeError("Something went wrong!")
+    return grads[idx]
 
 
 def isnan_grad(
@@ -1790,4 +1687,41 @@ def atleast_1d_grad(
     return output_gradient.reshape(input.shape)
 
 
+def scan_grad(
+    output_gradient: np.ndarray[Any, Any],
+    cache: CacheType,
+    body: Any,
+    sequences: dict[str, np.ndarray[Any, Any]],
+    params: dict[str, np.ndarray[Any, Any]],
+    carries: dict[str, str],
+    output: str,
+) -> dict[str, np.ndarray[Any, Any]]:
+    # Backpropagation through time. Each step is recomputed from its stored
+    # carries, so only carries are kept in memory for the backward pass.
+    # Returns gradients of all inputs of scan.
+    param_grads = {key: np.zeros_like(value) for key, value in params.items()}
+    sequence_grads = {key: np.zeros_like(value) for key, value in sequences.items()}
+    carry_grads: dict[str, np.ndarray[Any, Any]] = {}
+    step_carries = cache["carries"]
+    for idx in reversed(range(len(step_carries))):
+        inputs = (
+            params
+            | step_carries[idx]
+            | {key: value[idx] for key, value in sequences.items()}
+        )
+        output_grads = {output: output_gradient[idx]}
+        for in_key, out_key in carries.items():
+            if in_key in carry_grads:
+                output_grads[out_key] = (
+                    output_grads.get(out_key, 0.0) + carry_grads[in_key]
+                )
+        _, step_grads = body.evaluate(inputs, output_gradients=output_grads)
+        for key in param_grads:
+            param_grads[key] += step_grads[key]
+        for key in sequence_grads:
+            sequence_grads[key][idx] = step_grads[key]
+        carry_grads = {key: step_grads[key] for key in carries}
+    return param_grads | sequence_grads | carry_grads
+
+
 primitive_grad_func_dict = {key: fn for key, fn in globals().items() if callable(fn)}
@@ -13,8 +13,10 @@
 # limitations under the License.
 
 
-from collections.abc import Callable, Iterable, Sequence
-from functools import partial
+import math
+from collections.abc import Callable, Iterable, Iterator, Sequence
+from functools import lru_cache, partial
+from itertools import product
 from typing import Any
 
 import numpy as np
@@ -119,6 +121,332 @@ def get_submatrices2d(
     )
 
 
+@lru_cache(maxsize=128)
+def get_im2col_plan(
+    input_shape: tuple[int, ...],
+    kernel_size: tuple[int, ...],
+    stride: tuple[int, ...],
+    padding: tuple[tuple[int, int], ...],
+    dilation: tuple[int, ...],
+) -> tuple[np.ndarray[Any, Any], tuple[int, ...], tuple[int, ...]]:
+    """Creates the gather plan of im2col lowering for given channel and spatial
+    input shape (i.e. (c, *spatial)). Plans are cached since they only depend on
+    shapes and convolution parameters.
+
+    Returns flat indices of padded input with shape (c * prod(kernel_size),
+    prod(output_size)), padded spatial shape and output spatial shape.
+    """
+    c, *spatial = input_shape
+    padded_shape = tuple(
+        size + sum(pad) for size, pad in zip(spatial, padding, strict=True)
+    )
+    output_size = tuple(
+        (size - dil * (k - 1) - 1) // s + 1
+        for size, k, s, dil in zip(
+            padded_shape, kernel_size, stride, dilation, strict=True
+        )
+    )
+    if any(size <= 0 for size in output_size):
+        raise ValueError(
+            f"Kernel size {kernel_size} with dilation {dilation} is larger than "
+            f"padded input size {padded_shape}."
+        )
+    # Strides (in elements) of flattened padded input of shape (c, *padded_shape).
+    elem_strides = np.cumprod((1, *padded_shape[::-1]))[::-1]
+    n_dims = len(spatial)
+    # Offsets of kernel elements with shape (c, *kernel_size, 1, ..., 1).
+    kernel_offsets = np.arange(c).reshape((c,) + (1,) * 2 * n_dims) * elem_strides[0]
+    # Offsets of output positions with shape (1, 1, ..., 1, *output_size).
+    output_offsets: np.ndarray[Any, Any] = np.zeros((), dtype=np.intp)
+    for dim in range(n_dims):
+        shape = [1] * (1 + 2 * n_dims)
+        shape[1 + dim] = kernel_size[dim]
+        kernel_offsets = kernel_offsets + (
+            np.arange(kernel_size[dim]) * dilation[dim] * elem_strides[dim + 1]
+        ).reshape(shape)
+        shape = [1] * (1 + 2 * n_dims)
+        shape[1 + n_dims + dim] = output_size[dim]
+        output_offsets = output_offsets + (
+            np.arange(output_size[dim]) * stride[dim] * elem_strides[dim + 1]
+        ).reshape(shape)
+    indices = (kernel_offsets + output_offsets).astype(np.intp)
+    indices = indices.reshape(c * math.prod(kernel_size), math.prod(output_size))
+    indices.setflags(write=False)
+    return indices, padded_shape, output_size
+
+
+def im2col(
+    input: np.ndarray[Any, Any],
+    kernel_size: tuple[int, ...],
+    stride: tuple[int, ...],
+    padding: tuple[tuple[int, int], ...],
+    dilation: tuple[int, ...],
+    out: np.ndarray[Any, Any] | None = None,
+) -> tuple[np.ndarray[Any, Any], tuple[int, ...]]:
+    """Lowers input of shape (n, c, *spatial) into a contiguous column buffer of
+    shape (n, c * prod(kernel_size), prod(output_size)). If out is given with the
+    same shape and dtype, it is reused as the column buffer.
+    """
+    n, *input_shape = input.shape
+    indices, _, output_size = get_im2col_plan(
+        tuple(input_shape), kernel_size, stride, padding, dilation
+    )
+    if any(pad != (0, 0) for pad in padding):
+        input = np.pad(input, ((0, 0), (0, 0), *padding), mode="constant")
+    flat_input = input.reshape(n, -1)
+    if out is None or out.shape != (n, *indices.shape) or out.dtype != flat_input.dtype:
+        out = np.empty((n, *indices.shape), dtype=flat_input.dtype)
+    # Indices are always valid, "clip" mode avoids buffering of out.
+    np.take(flat_input, indices, axis=1, out=out, mode="clip")
+    return out, output_size
+
+
+def col2im(
+    cols: np.ndarray[Any, Any],
+    input_shape: tuple[int, ...],
+    kernel_size: tuple[int, ...],
+    stride: tuple[int, ...],
+    padding: tuple[tuple[int, int], ...],
+    dilation: tuple[int, ...],
+) -> np.ndarray[Any, Any]:
+    """Adjoint of im2col, accumulates columns of shape
+    (n, c * prod(kernel_size), prod(output_size)) into an array of input_shape.
+    """
+    n, c, *spatial = input_shape
+    _, padded_shape, output_size = get_im2col_plan(
+        (c, *spatial), kernel_size, stride, padding, dilation
+    )
+    cols = cols.reshape(n, c, *kernel_size, *output_size)
+    result = np.zeros((n, c, *padded_shape), dtype=cols.dtype)
+    # Each kernel element contributes to a strided slice of the padded input.
+    for kernel_idx in product(*(range(k) for k in kernel_size)):
+        slices = tuple(
+            slice(k * dil, k * dil + s * (out - 1) + 1, s)
+            for k, s, dil, out in zip(
+                kernel_idx, stride, dilation, output_size, strict=True
+            )
+        )
+        cols_index: tuple[slice | int, ...] = (slice(None), slice(None), *kernel_idx)
+        result[(slice(None), slice(None), *slices)] += cols[cols_index]
+    crop = tuple(
+        slice(pad[0], pad[0] + size) for pad, size in zip(padding, spatial, strict=True)
+    )
+    return result[(slice(None), slice(None), *crop)]
+
+
+def _normalize_conv_args(
+    stride: Sequence[int],
+    padding: Sequence[Sequence[int]],
+    dilation: Sequence[int],
+) -> tuple[tuple[int, ...], tuple[tuple[int, int], ...], tuple[int, ...]]:
+    # Convolution parameters are used as keys of cached im2col plans.
+    return (
+        tuple(stride),
+        tuple((pad[0], pad[1]) for pad in padding),
+        tuple(dilation),
+    )
+
+
+def convolve(
+    input: np.ndarray[Any, Any],
+    weight: np.ndarray[Any, Any],
+    stride: Sequence[int],
+    padding: Sequence[Sequence[int]],
+    dilation: Sequence[int],
+    cache: CacheType | None = None,
+) -> np.ndarray[Any, Any]:
+    """N-dimensional convolution of input (n, c, *spatial) with weight
+    (o, c, *kernel_size) lowered to im2col and a single batched matmul. Column
+    buffer is kept in cache (if exists) for reuse in later calls and in
+    gradient computations.
+    """
+    stride, padding, dilation = _normalize_conv_args(stride, padding, dilation)
+    kernel_size = tuple(weight.shape[2:])
+    workspace = None if cache is None else cache.get("cols")
+    cols, output_size = im2col(
+        input, kernel_size, stride, padding, dilation, out=workspace
+    )
+    write_into_cache(cache, "cols", cols)
+    output = weight.reshape(weight.shape[0], -1) @ cols
+    return output.reshape(input.shape[0], weight.shape[0], *output_size)
+
+
+def convolve_grad(
+    output_gradient: np.ndarray[Any, Any],
+    cache: CacheType | None,
+    idx: int,
+    input: np.ndarray[Any, Any],
+    weight: np.ndarray[Any, Any],
+    stride: Sequence[int],
+    padding: Sequence[Sequence[int]],
+    dilation: Sequence[int],
+) -> np.ndarray[Any, Any]:
+    """Gradient of convolve with respect to input (idx = 0) or weight (idx = 1)."""
+    stride, padding, dilation = _normalize_conv_args(stride, padding, dilation)
+    n, o, *_ = output_gradient.shape
+    kernel_size = tuple(weight.shape[2:])
+    output_gradient = output_gradient.reshape(n, o, -1)
+    if idx == 0:
+        cols = weight.reshape(o, -1).T @ output_gradient
+        return col2im(cols, input.shape, kernel_size, stride, padding, dilation)
+    elif idx == 1:
+        # Columns of forward call are reused if they are kept in cache.
+        cols = None if cache is None else cache.get("cols")
+        cols_shape = (n, weight[0].size, output_gradient.shape[2])
+        if cols is None or cols.shape != cols_shape:
+            cols, _ = im2col(input, kernel_size, stride, padding, dilation)
+        grad = np.tensordot(output_gradient, cols, axes=([0, 2], [0, 2]))
+        return grad.reshape(weight.shape)
+    else:
+        raise ValueError("Invalid index for convolution gradient.")
+
+
+# Number of query and key positions processed at once by blockwise attention,
+# only (block_size, block_size) tiles of attention weights are materialized.
+ATTENTION_BLOCK_SIZE = 256
+
+
+def _attention_scores(
+    query: np.ndarray[Any, Any],
+    key: np.ndarray[Any, Any],
+    attn_mask: np.ndarray[Any, Any] | None,
+    is_causal: bool,
+    scale_factor: float,
+    query_slice: slice,
+    key_slice: slice,
+) -> np.ndarray[Any, Any]:
+    # Masked attention scores of a single (query block, key block) tile.
+    scores = (
+        query[..., query_slice, :] @ np.swapaxes(key[..., key_slice, :], -2, -1)
+    ) * scale_factor
+    if is_causal and key_slice.stop - 1 > query_slice.start:
+        # Only tiles crossing the diagonal are partially masked.
+        rows = np.arange(query_slice.start, query_slice.stop)[:, None]
+        cols = np.arange(key_slice.start, key_slice.stop)
+        scores = np.where(cols <= rows, scores, -np.inf)
+    if attn_mask is not None:
+        mask = attn_mask[..., query_slice, key_slice]
+        if mask.dtype == bool:
+            scores = np.where(mask, scores, -np.inf)
+        else:
+            scores = scores + mask
+    return scores
+
+
+def _attention_blocks(
+    query_length: int, key_length: int, is_causal: bool, block_size: int
+) -> Iterator[tuple[slice, list[slice]]]:
+    # Yields query blocks with the key blocks they attend to. Key blocks which
+    # are fully masked by causal masking are skipped.
+    for q_start in range(0, query_length, block_size):
+        q_stop = min(q_start + block_size, query_length)
+        k_length = min(key_length, q_stop) if is_causal else key_length
+        key_slices = [
+            slice(k_start, min(k_start + block_size, k_length))
+            for k_start in range(0, k_length, block_size)
+        ]
+        yield slice(q_start, q_stop), key_slices
+
+
+def blockwise_attention(
+    query: np.ndarray[Any, Any],
+    key: np.ndarray[Any, Any],
+    value: np.ndarray[Any, Any],
+    attn_mask: np.ndarray[Any, Any] | None,
+    is_causal: bool,
+    scale_factor: float,
+    block_size: int | None = None,
+) -> tuple[np.ndarray[Any, Any], np.ndarray[Any, Any]]:
+    """Scaled dot product attention computed tile by tile with an online softmax.
+    Returns the output and row-wise log-sum-exp of attention scores, which is
+    enough to recompute attention weights of any tile in backward.
+    """
+    block_size = ATTENTION_BLOCK_SIZE if block_size is None else block_size
+    batch_shape = np.broadcast_shapes(
+        query.shape[:-2], key.shape[:-2], value.shape[:-2]
+    )
+    dtype = np.result_type(query, key, value, 1.0)
+    query_length, key_length = query.shape[-2], key.shape[-2]
+    output = np.empty((*batch_shape, query_length, value.shape[-1]), dtype=dtype)
+    logsumexp = np.empty((*batch_shape, query_length), dtype=dtype)
+    for query_slice, key_slices in _attention_blocks(
+        query_length, key_length, is_causal, block_size
+    ):
+        rows = query_slice.stop - query_slice.start
+        row_max = np.full((*batch_shape, rows), -np.inf, dtype=dtype)
+        row_sum = np.zeros((*batch_shape, rows), dtype=dtype)
+        acc = np.zeros((*batch_shape, rows, value.shape[-1]), dtype=dtype)
+        for key_slice in key_slices:
+            scores = _attention_scores(
+                query, key, attn_mask, is_causal, scale_factor, query_slice, key_slice
+            )
+            new_max = np.maximum(row_max, scores.max(axis=-1))
+            # Rows whose scores are all masked so far are not shifted.
+            shift = np.where(np.isneginf(new_max), 0.0, new_max)
+            weights = np.exp(scores - shift[..., None])
+            correction = np.exp(row_max - shift)
+            row_sum = row_sum * correction + weights.sum(axis=-1)
+            acc = acc * correction[..., None] + weights @ value[..., key_slice, :]
+            row_max = new_max
+        shift = np.where(np.isneginf(row_max), 0.0, row_max)
+        output[..., query_slice, :] = acc / row_sum[..., None]
+        logsumexp[..., query_slice] = shift + np.log(row_sum)
+    return output, logsumexp
+
+
+def blockwise_attention_grad(
+    output_gradient: np.ndarray[Any, Any],
+    output: np.ndarray[Any, Any],
+    logsumexp: np.ndarray[Any, Any],
+    query: np.ndarray[Any, Any],
+    key: np.ndarray[Any, Any],
+    value: np.ndarray[Any, Any],
+    attn_mask: np.ndarray[Any, Any] | None,
+    is_causal: bool,
+    scale_factor: float,
+    block_size: int | None = None,
+) -> tuple[np.ndarray[Any, Any], np.ndarray[Any, Any], np.ndarray[Any, Any]]:
+    """Gradients of blockwise_attention with respect to query, key and value.
+    Attention weights of each tile are recomputed from logsumexp instead of
+    being kept from the forward pass.
+    """
+    block_size = ATTENTION_BLOCK_SIZE if block_size is None else block_size
+    batch_shape = np.broadcast_shapes(
+        query.shape[:-2], key.shape[:-2], value.shape[:-2]
+    )
+    dtype = output.dtype
+    query_grad = np.zeros((*batch_shape, *query.shape[-2:]), dtype=dtype)
+    key_grad = np.zeros((*batch_shape, *key.shape[-2:]), dtype=dtype)
+    value_grad = np.zeros((*batch_shape, *value.shape[-2:]), dtype=dtype)
+    # Row-wise dot products of output gradients and outputs, i.e. the softmax
+    # gradient term shared by all key blocks of a row.
+    delta = np.sum(output_gradient * output, axis=-1)
+    for query_slice, key_slices in _attention_blocks(
+        query.shape[-2], key.shape[-2], is_causal, block_size
+    ):
+        query_block = query[..., query_slice, :]
+        output_gradient_block = output_gradient[..., query_slice, :]
+        for key_slice in key_slices:
+            scores = _attention_scores(
+                query, key, attn_mask, is_causal, scale_factor, query_slice, key_slice
+            )
+            weights = np.exp(scores - logsumexp[..., query_slice, None])
+            value_grad[..., key_slice, :] += (
+                np.swapaxes(weights, -2, -1) @ output_gradient_block
+            )
+            weights_grad = output_gradient_block @ np.swapaxes(
+                value[..., key_slice, :], -2, -1
+            )
+            scores_grad = (
+                weights * (weights_grad - delta[..., query_slice, None]) * scale_factor
+            )
+            query_grad[..., query_slice, :] += scores_grad @ key[..., key_slice, :]
+            key_grad[..., key_slice, :] += (
+                np.swapaxes(scores_grad, -2, -1) @ query_block
+            )
+    return query_grad, key_grad, value_grad
+
+
 def tsne_softmax(
     input_tensor: np.ndarray[Any, Any],
     diag_zero: bool = False,
@@ -18,6 +18,7 @@ import re
 from collections.abc import Callable, Iterator, Sequence
 from functools import partial
 from itertools import combinations_with_replacement
+from typing import Any
 
 import torch
 import torch.nn.functional as F  # noqa: N812
@@ -66,6 +67,7 @@ from ..common_primitives import (
     union,
 )
 from .utils import (
+    CheckpointFunction,
     calc_prob_matrix,
     calculate_binary_class_weight,
     calculate_cross_entropy_class_weights,
@@ -211,6 +213,8 @@ __all__ = [
     "ones",
     "floor",
     "clamp",
+    "scan",
+    "checkpoint",
 ]
 
 
@@ -1318,6 +1322,29 @@ def clamp(
     return torch.clamp(input, min=min_val, max=max_val)
 
 
+def scan(
+    body: Any,
+    init: dict[str, torch.Tensor],
+    sequences: dict[str, torch.Tensor],
+    params: dict[str, torch.Tensor],
+    carries: dict[str, str],
+    output: str,
+) -> torch.Tensor:
+    # body is the compiled PhysicalModel of the scan body.
+    carry = init
+    outputs = []
+    for idx in range(len(next(iter(sequences.values())))):
+        inputs = params | carry | {key: value[idx] for key, value in sequences.items()}
+        step_outputs = body.evaluate(inputs)
+        carry = {in_key: step_outputs[out_key] for in_key, out_key in carries.items()}
+        outputs.append(step_outputs[output])
+    return torch.stack(outputs)
+
+
+def checkpoint(fn: Callable[..., Any], *args: Any) -> Any:
+    return CheckpointFunction.apply(fn, *args)
+
+
 array_creation_funcs = [
     "arange",
     "randn",
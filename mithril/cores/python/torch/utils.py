@@ -14,6 +14,7 @@
 
 from collections.abc import Callable
 from functools import partial
+from typing import Any
 
 import torch
 
@@ -239,3 +240,50 @@ def calculate_tpr_fpr(
     fpr = false_positives / n_negative
     tpr = true_positives / n_positive
     return tpr, fpr
+
+
+# Function is Any for mypy when torch is not typed, it is subclassed regardless.
+class CheckpointFunction(torch.autograd.Function):  # type: ignore[misc, unused-ignore]
+    """Evaluates fn without keeping its intermediate results for backward, they
+    are recomputed from the saved inputs in backward. Unlike
+    torch.utils.checkpoint, it is supported by torch.func transformations.
+    """
+
+    @staticmethod
+    def forward(fn: Callable[..., tuple[torch.Tensor, ...]], *args: Any) -> Any:
+        return fn(*args)
+
+    @staticmethod
+    def setup_context(ctx: Any, inputs: tuple[Any, ...], output: Any) -> None:
+        fn, *args = inputs
+        ctx.fn = fn
+        # Tensors are saved for backward, other arguments are kept as is.
+        ctx.tensor_indices = [
+            idx for idx, arg in enumerate(args) if isinstance(arg, torch.Tensor)
+        ]
+        ctx.args = [None if isinstance(arg, torch.Tensor) else arg for arg in args]
+        ctx.save_for_backward(*(args[idx] for idx in ctx.tensor_indices))
+
+    @staticmethod
+    def backward(ctx: Any, *output_gradients: torch.Tensor) -> tuple[Any, ...]:
+        args = list(ctx.args)
+        for idx, tensor in zip(ctx.tensor_indices, ctx.saved_tensors, strict=True):
+            args[idx] = tensor
+        diff_indices = [
+            idx
+            for idx in ctx.tensor_indices
+            if args[idx].is_floating_point() or args[idx].is_complex()
+        ]
+
+        def recompute(*diff_args: torch.Tensor) -> tuple[torch.Tensor, ...]:
+            _args = list(args)
+            for idx, arg in zip(diff_indices, diff_args, strict=True):
+                _args[idx] = arg
+            return ctx.fn(*_args)
+
+        with torch.enable_grad():
+            vjp_fn = torch.func.vjp(recompute, *(args[idx] for idx in diff_indices))[1]
+        gradients: list[Any] = [None] * (len(args) + 1)
+        for idx, gradient in zip(diff_indices, vjp_fn(output_gradients), strict=True):
+            gradients[idx + 1] = gradient
+        return tuple(gradients)
@@ -13,60 +13,120 @@
 # limitations under the License.
 
 
+import importlib
+from collections.abc import Iterator, MutableMapping
 from typing import Any
 
 from ...backends.backend import Backend
 from .code_gen import CodeGen
 from .py_style_codegen.python_gen import PythonCodeGen
 
-code_gen_map: dict[type[Backend[Any]], type[CodeGen[Any]]] = {}
+# Code generators of backends as backend path -> (codegen module, codegen name).
+_codegen_paths: dict[str, tuple[str, str]] = {
+    "mithril.backends.with_autograd.jax_backend.backend.JaxBackend": (
+        ".py_style_codegen.python_gen",
+        "PythonCodeGen",
+    ),
+    "mithril.backends.with_autograd.mlx_backend.backend.MlxBackend": (
+        ".py_style_codegen.python_gen",
+        "PythonCodeGen",
+    ),
+    "mithril.backends.with_autograd.torch_backend.backend.TorchBackend": (
+        ".py_style_codegen.torch_gen",
+        "TorchCodeGen",
+    ),
+    "mithril.backends.with_manualgrad.c_backend.backend.CBackend": (
+        ".c_style_codegen.raw_c_gen",
+        "RawCGen",
+    ),
+    "mithril.backends.with_manualgrad.ggml_backend.backend.GGMLBackend": (
+        ".c_style_codegen.ggml_gen",
+        "GGMLCodeGen",
+    ),
+    "mithril.backends.with_manualgrad.numpy_backend.backend.NumpyBackend": (
+        ".py_style_codegen.numpy_gen",
+        "NumpyCodeGen",
+    ),
+}
 
-try:
-    from ...backends.with_autograd.jax_backend import JaxBackend
 
-    code_gen_map[JaxBackend] = PythonCodeGen
-except ImportError:
-    pass
-try:
-    from ...backends.with_autograd.mlx_backend import MlxBackend
+class CodeGenMap(MutableMapping[type[Backend[Any]], type[CodeGen[Any]]]):
+    """Maps backend types to their code generators. Code generator of a backend
+    is imported on its first lookup, so that no framework is imported before
+    its backend is used.
+    """
 
-    code_gen_map[MlxBackend] = PythonCodeGen
-except ImportError:
-    pass
-try:
-    from ...backends.with_autograd.torch_backend import TorchBackend
-    from .py_style_codegen.torch_gen import TorchCodeGen
+    def __init__(self, paths: dict[str, tuple[str, str]]) -> None:
+        self._paths = paths
+        self._code_gens: dict[type[Backend[Any]], type[CodeGen[Any]]] = {}
 
-    code_gen_map[TorchBackend] = TorchCodeGen
-except ImportError:
-    pass
-try:
-    from ...backends.with_manualgrad.c_backend import CBackend
-    from .c_style_codegen.raw_c_gen import RawCGen
+    @staticmethod
+    def _backend_path(backend_type: type[Backend[Any]]) -> str:
+        return f"{backend_type.__module__}.{backend_type.__qualname__}"
 
-    code_gen_map[CBackend] = RawCGen
-except Exception:
-    pass
+    def __getitem__(self, backend_type: type[Backend[Any]]) -> type[CodeGen[Any]]:
+        if (code_gen := self._code_gens.get(backend_type)) is None:
+            if (path := self._paths.get(self._backend_path(backend_type))) is None:
+                raise KeyError(backend_type)
+            module_name, code_gen_name = path
+            module = importlib.import_module(module_name, __name__)
+            code_gen = self._code_gens[backend_type] = getattr(module, code_gen_name)
+        return code_gen
 
-try:
-    from ...backends.with_manualgrad.ggml_backend import GGMLBackend
-    from .c_style_codegen.ggml_gen import GGMLCodeGen
+    def __setitem__(
+        self, backend_type: type[Backend[Any]], code_gen: type[CodeGen[Any]]
+    ) -> None:
+        self._code_gens[backend_type] = code_gen
 
-    code_gen_map[GGMLBackend] = GGMLCodeGen
-except Exception as e:
-    raise e
-try:
-    from ...backends.with_manualgrad.numpy_backend import NumpyBackend
-    from .py_style_codegen.numpy_gen import NumpyCodeGen
+    def __delitem__(self, backend_type: type[Backend[Any]]) -> None:
+        path = self._paths.pop(self._backend_path(backend_type), None)
+        if self._code_gens.pop(backend_type, None) is None and path is None:
+            raise KeyError(backend_type)
 
-    code_gen_map[NumpyBackend] = NumpyCodeGen
-except ImportError:
-    pass
+    def __contains__(self, backend_type: object) -> bool:
+        return backend_type in self._code_gens or (
+            isinstance(backend_type, type)
+            and self._backend_path(backend_type) in self._paths
+        )
+
+    def __iter__(self) -> Iterator[type[Backend[Any]]]:
+        # Iteration requires all available backends to be imported.
+        backend_types = list(self._code_gens)
+        for path in self._paths:
+            module_name, backend_name = path.rsplit(".", 1)
+            try:
+                module = importlib.import_module(module_name)
+            except Exception:
+                continue
+            if (backend_type := getattr(module, backend_name)) not in backend_types:
+                backend_types.append(backend_type)
+        yield from backend_types
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+
+code_gen_map = CodeGenMap(dict(_codegen_paths))
+
+# Code generator modules exported by name, imported on their first access.
+_codegen_modules: dict[str, str] = {
+    code_gen_name: module_name for module_name, code_gen_name in _codegen_paths.values()
+} | {"CGen": ".c_style_codegen.c_gen"}
+
+
+def __getattr__(name: str) -> Any:
+    if name in _codegen_modules:
+        module = importlib.import_module(_codegen_modules[name], __name__)
+        code_gen = getattr(module, name)
+        globals()[name] = code_gen
+        return code_gen
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 __all__ = [
     "CodeGen",
     "code_gen_map",
+    "CodeGenMap",
     "CGen",
     "PythonCodeGen",
     "NumpyCodeGen",
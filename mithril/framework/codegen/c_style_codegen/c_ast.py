@@ -177,6 +177,14 @@ class If(Stmt):
     else_body: list[Stmt] | None = None
 
 
+@dataclass
+class For(Stmt):
+    init: Expr
+    condition: Expr
+    update: Expr
+    body: list[Stmt]
+
+
 @dataclass
 class Arrow(Expr):
     target: Expr
@@ -388,6 +396,14 @@ class CStyleCodeGenerator(NodeVisitor):
                 f" else {{\n{else_formatted}\n{self.get_indent()}}}"
             )
 
+    def visit_for(self, node: For) -> str:
+        header = (
+            f"{self.visit(node.init)}; {self.visit(node.condition)}; "
+            f"{self.visit(node.update)}"
+        )
+        body_formatted = self.format_block(node.body)  # type: ignore
+        return f"for ({header}) {{\n{body_formatted}\n{self.get_indent()}}}"
+
     def visit_arrow(self, node: Arrow) -> str:
         return f"{self.visit(node.target)}->{node.field}"
 
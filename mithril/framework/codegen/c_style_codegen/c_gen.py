@@ -13,25 +13,32 @@
 # limitations under the License.
 
 import ctypes
+import math
 import os
 import subprocess
 import tempfile
 from collections.abc import Callable, Sequence
-from functools import partial
+from functools import cached_property, partial
 
 from ....backends.with_manualgrad.c_backend import CBackend
 from ....backends.with_manualgrad.ggml_backend import GGMLBackend
 from ....common import CGenConfig
 from ....cores.c.array import PyArray
+from ....utils.shared_object_cache import SharedObjectCache, find_included_headers
 from ...common import (
     EvaluateAllType,
     EvaluateType,
     FinalCost,
+    ShapeResultType,
     Tensor,
 )
+from ...logical.model import Model
 from ...logical.operator import Operator
+from ...logical.operators import ScanOp
 from ...physical.model import PhysicalModel
+from ...profiler import profile_phase
 from ..code_gen import CodeGen
+from ..py_style_codegen.memory_planner import MemoryPlan, plan_buffers
 from ..utils import check_repr_inequality
 from . import c_ast, utils
 
@@ -40,6 +47,8 @@ ast_block_type = list[c_ast.Stmt] | list[c_ast.Expr] | list[c_ast.Stmt | c_ast.E
 
 class CGen(CodeGen[PyArray]):
     dynamic_links: list[str] = []
+    # Alignment (in bytes) of the tensors placed in the static memory arena.
+    ARENA_ALIGNMENT = 64
 
     def __init__(self, pm: PhysicalModel[PyArray]) -> None:
         super().__init__(pm)
@@ -58,6 +67,12 @@ class CGen(CodeGen[PyArray]):
         self.backend: CBackend | GGMLBackend = self.pm.backend
         self.configs: CGenConfig = self.backend.CODEGEN_CONFIG
 
+        # References of keys overriding the default ones, used for the keys
+        # of scan bodies which are emitted into the functions of the model.
+        self.key_refs: dict[str, c_ast.Expr] = {}
+        # Code generators of scan bodies by the output keys of scans.
+        self.scan_bodies: dict[str, CGen] = {}
+
         # Determine struct keys
         self.struct_keys: utils.StructKeys = self.determine_struct_keys()
 
@@ -80,6 +95,18 @@ class CGen(CodeGen[PyArray]):
             Callable[[Operator, c_ast.Expr, str], tuple[c_ast.Expr, list[c_ast.Stmt]]],
         ] = {}
 
+        # Offsets (in elements) of the keys placed in the static memory arena
+        # and gradient keys initialized before the backward of each operation.
+        self.arena_offsets: dict[str, int] = {}
+        self.arena_size = 0
+        self.initialized_grad_keys: dict[str, list[str]] = {}
+        if self.configs.ALLOCATE_INTERNALS and self.pm.memory_planning:
+            self.pm.memory_plan = self.plan_arena()
+
+        # Shared objects of previously compiled identical sources are reused
+        # from this cache if given.
+        self.shared_object_cache: SharedObjectCache | None = None
+
     def generate_code(self, file_path: str | None = None) -> None:
         self.file_path = file_path
 
@@ -120,21 +147,48 @@ class CGen(CodeGen[PyArray]):
         # For now we are only supporting .so files
         so_file_path = self.file_path.replace(".c", ".so")
 
-        default_compile_flags = ["cc", self.file_path, "-shared", "-fPIC", "-g"]
+        build_flags = (
+            self.backend.compile_flags if isinstance(self.backend, CBackend) else ["-g"]
+        )
+        default_compile_flags = [
+            "cc",
+            self.file_path,
+            "-shared",
+            "-fPIC",
+            *build_flags,
+        ]
         if compile_flags:
             default_compile_flags = compile_flags
 
-        # Compile the code and link the dynamic links
-        subprocess.check_output(
-            [
-                *default_compile_flags,
-                f"-L{self.backend.SRC_PATH}",
-                *self.dynamic_links,
-                f"-Wl,-rpath,{self.backend.SRC_PATH}",
-                "-o",
-                so_file_path,
+        link_flags = [
+            f"-L{self.backend.SRC_PATH}",
+            *self.dynamic_links,
+            f"-Wl,-rpath,{self.backend.SRC_PATH}",
+        ]
+        cache = self.shared_object_cache
+        cache_key: str | None = None
+        is_cached = False
+        if cache is not None and self.code is not None:
+            # Source and output paths differ between builds of the same code.
+            command = [
+                "<source>" if flag == self.file_path else flag
+                for flag in [*default_compile_flags, *link_flags]
             ]
-        )
+            headers = find_included_headers(
+                self.code, os.path.dirname(os.path.abspath(self.file_path))
+            )
+            cache_key = cache.fingerprint(self.code, command, headers)
+            with profile_phase("load_shared_object"):
+                is_cached = cache.load(cache_key, so_file_path)
+
+        if not is_cached:
+            # Compile the code and link the dynamic links
+            with profile_phase("build_shared_object"):
+                subprocess.check_output(
+                    [*default_compile_flags, *link_flags, "-o", so_file_path]
+                )
+            if cache is not None and cache_key is not None:
+                cache.store(cache_key, so_file_path)
 
         # If the given file path is not absolute, make it relative to the current
         # working directory
@@ -208,7 +262,7 @@ class CGen(CodeGen[PyArray]):
             if self.configs.ALLOCATE_INTERNALS:
                 # Allocate output arrays
                 for arg_key in self.struct_keys.eval_input_keys:
-                    if arg_key in inputs:
+                    if arg_key in inputs or arg_key in self.arena_offsets:
                         continue
                     if self.get_tensor_shape(arg_key) is None:
                         continue
@@ -221,7 +275,7 @@ class CGen(CodeGen[PyArray]):
                         ctypes.POINTER(struct_cls),
                     )
                     for key in self.struct_keys.eval_input_keys
-                    if key != FinalCost
+                    if key != FinalCost and key not in self.arena_offsets
                     if self.get_tensor_shape(key) is not None
                 }
             )
@@ -246,11 +300,18 @@ class CGen(CodeGen[PyArray]):
                     FinalCost in self.pm.flat_graph.output_dict
                     and key == self.pm.flat_graph.output_dict[FinalCost]
                 ):
-                    outputs[FinalCost] = PyArray(array_ptr.contents, shape=[1])
-                    outputs[key] = PyArray(array_ptr.contents, shape=[1])
+                    outputs[FinalCost] = PyArray(
+                        array_ptr.contents, shape=[1], base=inputs.get(key)
+                    )
+                    outputs[key] = PyArray(
+                        array_ptr.contents, shape=[1], base=inputs.get(key)
+                    )
                 else:
+                    # Arrays allocated above are freed with their views.
                     outputs[key] = PyArray(
-                        array_ptr.contents, shape=self.get_tensor_shape(key)
+                        array_ptr.contents,
+                        shape=self.get_tensor_shape(key),
+                        base=inputs.get(key),
                     )
 
             return outputs
@@ -288,7 +349,12 @@ class CGen(CodeGen[PyArray]):
                     self.pm.flat_graph.all_source_keys - self.pm.flat_graph.unused_keys
                 ):
                     # In CBackend we are creating all internal gradients with zeros.
-                    if self._has_grad(key) and key not in gradients:
+                    # Gradients in the arena are initialized by evaluate_gradients.
+                    if (
+                        self._has_grad(key)
+                        and key not in gradients
+                        and key + utils.BACKWARD_FN_SUFFIX not in self.arena_offsets
+                    ):
                         arr_shape = self.get_tensor_shape(key)
                         gradients[key] = self.backend.zeros(*arr_shape)
 
@@ -304,6 +370,7 @@ class CGen(CodeGen[PyArray]):
                         ctypes.POINTER(struct_cls),
                     )
                     for key in self.struct_keys.eval_grad_input_keys
+                    if key not in self.arena_offsets or key in gradients
                     if self.get_tensor_shape(key) is not None
                 }
             )
@@ -316,7 +383,9 @@ class CGen(CodeGen[PyArray]):
                 key = grad_key.replace(utils.BACKWARD_FN_SUFFIX, "")
                 array_ptr = getattr(output_struct, grad_key)
                 gradients[key] = PyArray(
-                    array_ptr.contents, shape=self.get_tensor_shape(key)
+                    array_ptr.contents,
+                    shape=self.get_tensor_shape(key),
+                    base=inputs.get(grad_key),
                 )
 
             outputs = {}
@@ -346,6 +415,10 @@ class CGen(CodeGen[PyArray]):
 
         for output_key in self.pm.flat_graph.topological_order:
             op = self.pm.flat_graph.get_op(output_key)
+            if isinstance(op, ScanOp):
+                operations.extend(self.generate_scan(op, output_key))  # type: ignore
+                continue
+
             inputs = self.pm.flat_graph.get_source_keys(output_key)
 
             # In some backends the output is used as input
@@ -392,80 +465,14 @@ class CGen(CodeGen[PyArray]):
 
             op = self.pm.flat_graph.get_op(output_key)
 
-            inputs = self.pm.flat_graph.get_source_keys(output_key)
-
-            # Assume all inputs are Array
-            for idx in range(len(inputs)):
-                if not self._has_grad(inputs[idx]):
-                    continue
-                if (
-                    FinalCost in self.pm.flat_graph.output_dict
-                    and output_key == self.pm.flat_graph.output_dict[FinalCost]
-                ):
-                    output_key = FinalCost
-
-                fn_inputs: list[str | int] = [
-                    output_key + utils.BACKWARD_FN_SUFFIX,
-                    idx,
-                    output_key,
-                    *inputs,
-                ]
-
-                if self.configs.USE_OUTPUT_AS_INPUT:
-                    fn_inputs += [
-                        input_key + utils.BACKWARD_FN_SUFFIX
-                        if self._has_grad(input_key)
-                        else "NULL"
-                        for input_key in inputs
-                        if self.pm.flat_graph.all_data[input_key].is_tensor
-                    ]
-
-                if output_key is FinalCost:
-                    out_shape = self.pm.data[
-                        self.pm.flat_graph.output_dict[FinalCost]
-                    ].shape
-                else:
-                    out_shape = self.pm.data[output_key].shape
-
-                post_process_op: (
-                    Callable[
-                        [Operator, c_ast.Expr, str], tuple[c_ast.Expr, list[c_ast.Stmt]]
-                    ]
-                    | None
-                ) = None
-
-                if (
-                    (in_shape := self.pm.data[inputs[idx]].shape) is not None
-                    and (out_shape) is not None
-                    and check_repr_inequality(in_shape, out_shape)
-                    and not self.configs.USE_OUTPUT_AS_INPUT
-                ):
-                    post_process_op = lambda op, op_call, context, input_key: (  # type: ignore #noqa: E731
-                        c_ast.Call(
-                            "accumulate_grads",
-                            [
-                                "eval_grad_static_ctx",
-                                op_call,
-                                self.create_key_ref(input_key, context="eval_grad"),
-                            ],
-                        ),
-                        [],
-                    )
-                    post_process_op = partial(  # type: ignore
-                        post_process_op,  # type: ignore
-                        input_key=inputs[idx],
-                    )
-
-                # Create primitive call
-                op_ast = self.generate_op(
-                    op,
-                    fn_inputs,
-                    inputs[idx] + utils.BACKWARD_FN_SUFFIX,
-                    context="eval_grad",
-                    post_processor=post_process_op,
-                )
+            # Gradients in the arena are initialized before their first write.
+            for grad_key in self.initialized_grad_keys.get(output_key, []):
+                operations.append(self.init_arena_grad(grad_key))  # type: ignore
 
-                operations.extend(op_ast)  # type: ignore
+            if isinstance(op, ScanOp):
+                operations.extend(self.generate_scan_grad(op, output_key))  # type: ignore
+            else:
+                operations.extend(self.generate_op_grads(op, output_key))  # type: ignore
 
         # Prepare output
         post_process.append(self.create_output_struct(context="eval_grad"))  # type: ignore
@@ -482,6 +489,414 @@ class CGen(CodeGen[PyArray]):
 
         return evaluate_grad_fn
 
+    def generate_op_grads(self, op: Operator, output_key: str) -> list[c_ast.Stmt]:
+        operations: list[c_ast.Stmt] = []
+        inputs = self.pm.flat_graph.get_source_keys(output_key)
+
+        # Assume all inputs are Array
+        for idx in range(len(inputs)):
+            if not self._has_grad(inputs[idx]):
+                continue
+            if (
+                FinalCost in self.pm.flat_graph.output_dict
+                and output_key == self.pm.flat_graph.output_dict[FinalCost]
+            ):
+                output_key = FinalCost
+
+            fn_inputs: list[str | int] = [
+                output_key + utils.BACKWARD_FN_SUFFIX,
+                idx,
+                output_key,
+                *inputs,
+            ]
+
+            if self.configs.USE_OUTPUT_AS_INPUT:
+                fn_inputs += [
+                    input_key + utils.BACKWARD_FN_SUFFIX
+                    if self._has_grad(input_key)
+                    else "NULL"
+                    for input_key in inputs
+                    if self.pm.flat_graph.all_data[input_key].is_tensor
+                ]
+
+            if output_key is FinalCost:
+                out_shape = self.pm.data[
+                    self.pm.flat_graph.output_dict[FinalCost]
+                ].shape
+            else:
+                out_shape = self.pm.data[output_key].shape
+
+            post_process_op: (
+                Callable[
+                    [Operator, c_ast.Expr, str], tuple[c_ast.Expr, list[c_ast.Stmt]]
+                ]
+                | None
+            ) = None
+
+            if (
+                (in_shape := self.pm.data[inputs[idx]].shape) is not None
+                and (out_shape) is not None
+                and check_repr_inequality(in_shape, out_shape)
+                and not self.configs.USE_OUTPUT_AS_INPUT
+            ):
+                post_process_op = lambda op, op_call, context, input_key: (  # type: ignore #noqa: E731
+                    c_ast.Call(
+                        "accumulate_grads",
+                        [
+                            "eval_grad_static_ctx",
+                            op_call,
+                            self.create_key_ref(input_key, context="eval_grad"),
+                        ],
+                    ),
+                    [],
+                )
+                post_process_op = partial(  # type: ignore
+                    post_process_op,  # type: ignore
+                    input_key=inputs[idx],
+                )
+
+            # Create primitive call
+            op_ast = self.generate_op(
+                op,
+                fn_inputs,
+                inputs[idx] + utils.BACKWARD_FN_SUFFIX,
+                context="eval_grad",
+                post_processor=post_process_op,
+            )
+
+            operations.extend(op_ast)
+
+        return operations
+
+    def scan_body(self, op: ScanOp, output_key: str) -> "CGen":
+        """Returns the code generator of the body of given scan, compiled with
+        the shapes inferred in the model. Operations of the body are emitted
+        into a loop over the sequence, where the static arrays of body keys
+        are pointed to their values at each step.
+        """
+        if (body_gen := self.scan_bodies.get(output_key)) is not None:
+            return body_gen
+
+        assert isinstance(op.body, Model)
+        body_shapes: dict[str, list[int]] = {}
+        for key, source_key in self.scan_sources(op, output_key).items():
+            shape = self.tensor_shapes.get(source_key)
+            if isinstance(shape, list):
+                body_shapes[key] = shape[1:] if key in op.sequences else shape  # type: ignore
+
+        body_pm = PhysicalModel[PyArray](
+            model=op.body,
+            backend=self.backend,
+            data_keys=set(),
+            constant_keys={},
+            # All inputs are trainable in order to get gradients of carries
+            # and sequences.
+            trainable_keys=set(op.input_keys),
+            discard_keys=set(),
+            shapes=body_shapes,
+            inference=self.pm.inference,
+            safe_shapes=True,
+            safe_names=True,
+            use_short_namings=True,
+            jit=False,
+        )
+        body_gen = type(self)(body_pm)
+        self.scan_bodies[output_key] = body_gen
+        self.globals.extend(self.generate_scan_arrays(op, output_key, body_gen))
+        return body_gen
+
+    def scan_sources(self, op: ScanOp, output_key: str) -> dict[str, str]:
+        # Maps inputs of the body to the keys connected to the scan.
+        source_keys = self.pm.flat_graph.get_source_keys(output_key)
+        return dict(zip(op.input_keys, source_keys, strict=False))
+
+    def scan_array_name(self, output_key: str, key: str) -> str:
+        return f"{output_key}_scan_{key}"
+
+    def scan_array_keys(self, op: ScanOp, body_gen: "CGen") -> list[str]:
+        # Shared inputs are used directly, all other keys of the body have
+        # a static array pointed to their values at each step.
+        flat_graph = body_gen.pm.flat_graph
+        input_keys = [
+            key
+            for key in op.input_keys
+            if key in flat_graph.all_keys and key not in op.shared_keys
+        ]
+        return input_keys + [
+            key
+            for key in flat_graph.topological_order
+            if body_gen.pm.data[key].is_tensor
+        ]
+
+    def scan_grad_keys(self, op: ScanOp, body_gen: "CGen") -> list[str]:
+        flat_graph = body_gen.pm.flat_graph
+        shared_keys = [key for key in op.shared_keys if key in flat_graph.all_keys]
+        return [
+            key
+            for key in shared_keys + self.scan_array_keys(op, body_gen)
+            if body_gen._has_grad(key)
+        ]
+
+    def scan_carry_outputs(self, op: ScanOp, body_gen: "CGen") -> dict[str, str]:
+        output_dict = body_gen.pm.flat_graph.output_dict
+        return {in_key: output_dict[out_key] for in_key, out_key in op.carries.items()}
+
+    def generate_scan_arrays(
+        self, op: ScanOp, output_key: str, body_gen: "CGen"
+    ) -> list[c_ast.Stmt]:
+        # Values of all steps are kept for the backward pass, where only
+        # carries are needed in inference.
+        length = self.get_tensor_shape(output_key)[0]
+        body_output = body_gen.pm.flat_graph.output_dict[op.body_output]
+        carry_outputs = set(self.scan_carry_outputs(op, body_gen).values())
+        arrays: list[c_ast.Stmt] = []
+        for key in self.scan_array_keys(op, body_gen):
+            name = self.scan_array_name(output_key, key)
+            shape = body_gen.get_tensor_shape(key)
+            if key in body_gen.pm.flat_graph.topological_order and key != body_output:
+                steps = length if not self.pm.inference or key in carry_outputs else 1
+                arrays.append(
+                    c_ast.StaticVariable(
+                        "float", f"{name}_data[{steps * math.prod(shape)}]"
+                    )
+                )
+            arrays.append(self.static_array(name, shape, c_ast.Constant(None)))
+
+        if not self.pm.inference:
+            # Gradients of a single step are computed into static arrays and
+            # accumulated into the gradients of scan inputs.
+            for key in self.scan_grad_keys(op, body_gen):
+                name = self.scan_array_name(output_key, key + utils.BACKWARD_FN_SUFFIX)
+                shape = body_gen.get_tensor_shape(key)
+                arrays.append(
+                    c_ast.StaticVariable("float", f"{name}_data[{math.prod(shape)}]")
+                )
+                arrays.append(
+                    self.static_array(name, shape, c_ast.Variable(f"{name}_data"))
+                )
+            for key in [*op.sequences, body_output]:
+                name = self.scan_array_name(output_key, key + "_grad_view")
+                shape = body_gen.get_tensor_shape(key)
+                arrays.append(self.static_array(name, shape, c_ast.Constant(None)))
+        return arrays
+
+    def set_scan_key_refs(
+        self, op: ScanOp, output_key: str, body_gen: "CGen", context: str
+    ) -> None:
+        sources = self.scan_sources(op, output_key)
+        key_refs: dict[str, c_ast.Expr] = {
+            key: self.create_key_ref(sources[key], context=context)
+            for key in op.shared_keys
+        }
+        for key in self.scan_array_keys(op, body_gen):
+            name = self.scan_array_name(output_key, key)
+            key_refs[key] = c_ast.AddressOf(c_ast.Variable(name))
+        if context == "eval_grad":
+            for key in self.scan_grad_keys(op, body_gen):
+                grad_key = key + utils.BACKWARD_FN_SUFFIX
+                name = self.scan_array_name(output_key, grad_key)
+                key_refs[grad_key] = c_ast.AddressOf(c_ast.Variable(name))
+        body_gen.key_refs = key_refs
+
+    def bind_scan_step(
+        self, op: ScanOp, output_key: str, body_gen: "CGen", context: str
+    ) -> list[c_ast.Stmt]:
+        # Points static arrays of the body to their values at step t.
+        flat_graph = body_gen.pm.flat_graph
+        sources = self.scan_sources(op, output_key)
+        carry_outputs = self.scan_carry_outputs(op, body_gen)
+        body_output = flat_graph.output_dict[op.body_output]
+
+        def storage(key: str) -> tuple[c_ast.Expr, bool]:
+            # Returns the start of the values of the key and whether it holds
+            # the values of all steps.
+            if key == body_output:
+                output_ref = self.create_key_ref(output_key, context=context)
+                return self.array_data(output_ref), True
+            name = self.scan_array_name(output_key, key)
+            stacked = not self.pm.inference or key in carry_outputs.values()
+            return c_ast.Variable(f"{name}_data"), stacked
+
+        stmts: list[c_ast.Stmt] = []
+        for key in self.scan_array_keys(op, body_gen):
+            name = self.scan_array_name(output_key, key)
+            size = c_ast.Constant(math.prod(body_gen.get_tensor_shape(key)))
+            offset = c_ast.BinaryOp("*", c_ast.Variable(utils.SCAN_STEP_NAME), size)
+            if key in op.sequences:
+                source_ref = self.create_key_ref(sources[key], context=context)
+                data: c_ast.Expr = c_ast.BinaryOp(
+                    "+", self.array_data(source_ref), offset
+                )
+                stmts.append(self.assign_array_data(name, data))
+            elif key in carry_outputs:
+                # Carries are initialized by the scan inputs at the first step.
+                init_ref = self.create_key_ref(sources[key], context=context)
+                prev_data, _ = storage(carry_outputs[key])
+                prev_data = c_ast.BinaryOp(
+                    "-", c_ast.BinaryOp("+", prev_data, offset), size
+                )
+                stmts.append(
+                    c_ast.If(
+                        c_ast.BinaryOp(
+                            "==",
+                            c_ast.Variable(utils.SCAN_STEP_NAME),
+                            c_ast.Constant(0),
+                        ),
+                        [self.assign_array_data(name, self.array_data(init_ref))],
+                        [self.assign_array_data(name, prev_data)],
+                    )
+                )
+            else:
+                data, stacked = storage(key)
+                if stacked:
+                    data = c_ast.BinaryOp("+", data, offset)
+                stmts.append(self.assign_array_data(name, data))
+        return stmts
+
+    def generate_scan(self, op: ScanOp, output_key: str) -> list[c_ast.Stmt]:
+        # for (int t = 0; t < length; t++) { <bind arrays> <body operations> }
+        body_gen = self.scan_body(op, output_key)
+        self.set_scan_key_refs(op, output_key, body_gen, context="eval")
+        loop_body = self.bind_scan_step(op, output_key, body_gen, context="eval")
+        flat_graph = body_gen.pm.flat_graph
+        for key in flat_graph.topological_order:
+            body_op = flat_graph.get_op(key)
+            inputs = flat_graph.get_source_keys(key)
+            if self.configs.USE_OUTPUT_AS_INPUT:
+                inputs = [key] + inputs
+            loop_body.extend(body_gen.generate_op(body_op, inputs, key, context="eval"))
+
+        length = self.get_tensor_shape(output_key)[0]
+        step = c_ast.Variable(utils.SCAN_STEP_NAME)
+        return [
+            c_ast.For(
+                c_ast.BinaryOp(
+                    "=",
+                    c_ast.Variable(f"int {utils.SCAN_STEP_NAME}"),
+                    c_ast.Constant(0),
+                ),
+                c_ast.BinaryOp("<", step, c_ast.Constant(length)),
+                c_ast.Variable(f"{utils.SCAN_STEP_NAME}++"),
+                loop_body,
+            )
+        ]
+
+    def generate_scan_grad(self, op: ScanOp, output_key: str) -> list[c_ast.Stmt]:
+        # Backpropagation through time, gradients of carries are passed from
+        # each step to the previous one.
+        #   for (int t = length - 1; t >= 0; t--) {
+        #       <bind arrays> <seed output grads> <body gradients>
+        #       <accumulate input grads>
+        #   }
+        body_gen = self.scan_body(op, output_key)
+        self.set_scan_key_refs(op, output_key, body_gen, context="eval_grad")
+        sources = self.scan_sources(op, output_key)
+        carry_outputs = self.scan_carry_outputs(op, body_gen)
+        body_output = body_gen.pm.flat_graph.output_dict[op.body_output]
+        grad_keys = self.scan_grad_keys(op, body_gen)
+        carry_keys = [key for key in carry_outputs if key in grad_keys]
+
+        def grad_ref(key: str) -> c_ast.Expr:
+            return body_gen.create_key_ref(key + utils.BACKWARD_FN_SUFFIX, "eval_grad")
+
+        def add(target: c_ast.Expr, value: c_ast.Expr) -> c_ast.Stmt:
+            return c_ast.MakeStmt(c_ast.Call("add", [target, target, value]))
+
+        def zero(key: str) -> c_ast.Stmt:
+            name = self.scan_array_name(output_key, key + utils.BACKWARD_FN_SUFFIX)
+            size = math.prod(body_gen.get_tensor_shape(key)) * ctypes.sizeof(
+                ctypes.c_float
+            )
+            return c_ast.MakeStmt(
+                c_ast.Call(
+                    "memset",
+                    [
+                        c_ast.Dot(c_ast.Variable(name), "data"),
+                        c_ast.Constant(0),
+                        c_ast.Constant(size),
+                    ],
+                )
+            )
+
+        def grad_view(key: str) -> c_ast.Expr:
+            name = self.scan_array_name(output_key, key + "_grad_view")
+            return c_ast.AddressOf(c_ast.Variable(name))
+
+        def bind_grad_view(key: str, source_key: str) -> c_ast.Stmt:
+            # Points the view to the gradient of the source at step t.
+            name = self.scan_array_name(output_key, key + "_grad_view")
+            size = c_ast.Constant(math.prod(body_gen.get_tensor_shape(key)))
+            source_ref = self.create_key_ref(
+                source_key + utils.BACKWARD_FN_SUFFIX, context="eval_grad"
+            )
+            data = c_ast.BinaryOp(
+                "+",
+                self.array_data(source_ref),
+                c_ast.BinaryOp("*", c_ast.Variable(utils.SCAN_STEP_NAME), size),
+            )
+            return self.assign_array_data(name, data)
+
+        loop_body = self.bind_scan_step(op, output_key, body_gen, context="eval_grad")
+        loop_body += [zero(key) for key in grad_keys if key not in carry_keys]
+        loop_body.append(bind_grad_view(body_output, output_key))
+        loop_body.append(add(grad_ref(body_output), grad_view(body_output)))
+        for key in carry_keys:
+            if carry_outputs[key] in grad_keys:
+                loop_body.append(add(grad_ref(carry_outputs[key]), grad_ref(key)))
+        loop_body += [zero(key) for key in carry_keys]
+
+        flat_graph = body_gen.pm.flat_graph
+        for key in reversed(list(flat_graph.topological_order)):
+            if body_gen._has_grad(key):
+                loop_body.extend(
+                    body_gen.generate_op_grads(flat_graph.get_op(key), key)
+                )
+
+        for key in grad_keys:
+            if key not in sources or not self._has_grad(sources[key]):
+                continue
+            if key in op.sequences:
+                loop_body.append(bind_grad_view(key, sources[key]))
+                loop_body.append(add(grad_view(key), grad_ref(key)))
+            elif key in op.shared_keys:
+                parent_grad = self.create_key_ref(
+                    sources[key] + utils.BACKWARD_FN_SUFFIX, context="eval_grad"
+                )
+                loop_body.append(add(parent_grad, grad_ref(key)))
+
+        length = self.get_tensor_shape(output_key)[0]
+        step = c_ast.Variable(utils.SCAN_STEP_NAME)
+        stmts: list[c_ast.Stmt] = [zero(key) for key in carry_keys]
+        stmts.append(
+            c_ast.For(
+                c_ast.BinaryOp(
+                    "=",
+                    c_ast.Variable(f"int {utils.SCAN_STEP_NAME}"),
+                    c_ast.Constant(length - 1),
+                ),
+                c_ast.BinaryOp(">=", step, c_ast.Constant(0)),
+                c_ast.Variable(f"{utils.SCAN_STEP_NAME}--"),
+                loop_body,
+            )
+        )
+        # Gradients of the initial carries are the carry gradients of the
+        # first step.
+        for key in carry_keys:
+            if self._has_grad(sources[key]):
+                parent_grad = self.create_key_ref(
+                    sources[key] + utils.BACKWARD_FN_SUFFIX, context="eval_grad"
+                )
+                stmts.append(add(parent_grad, grad_ref(key)))
+        return stmts
+
+    def array_data(self, ref: c_ast.Expr) -> c_ast.Expr:
+        if isinstance(ref, c_ast.AddressOf) and isinstance(ref.target, c_ast.Variable):
+            return c_ast.Dot(ref.target, "data")
+        return c_ast.Arrow(ref, "data")
+
+    def assign_array_data(self, name: str, data: c_ast.Expr) -> c_ast.Stmt:
+        return c_ast.Assign(c_ast.Dot(c_ast.Variable(name), "data"), data)
+
     def generate_op(
         self,
         op: Operator,
@@ -544,6 +959,12 @@ class CGen(CodeGen[PyArray]):
         )
 
     def create_key_ref(self, key: str, context: str, load: bool = True) -> c_ast.Expr:
+        if (key_ref := self.key_refs.get(key)) is not None:
+            return key_ref
+
+        if key in self.arena_offsets:
+            return c_ast.AddressOf(c_ast.Variable(self.arena_array_name(key)))
+
         # TODO: This is a bit of a hack, we should have a better way to handle this
         if key in self.struct_keys.eval_cache_keys:
             if key == FinalCost and FinalCost in self.pm.flat_graph.output_dict:
@@ -709,6 +1130,167 @@ class CGen(CodeGen[PyArray]):
             )
             self.globals.append(grad_struct)
 
+        if self.arena_offsets:
+            self.globals.extend(self.generate_arena())
+
+    def plan_arena(self) -> MemoryPlan:
+        """Places tensors allocated by the wrapper functions (i.e. outputs of the
+        operations and their gradients) into a single static arena. Offsets are
+        assigned by a liveness analysis over evaluate followed by
+        evaluate_gradients, so tensors whose last use has passed share memory.
+        Outputs of the model and gradients of its inputs are read by the caller,
+        so they are never released. Tensors with dynamic shapes are still
+        allocated in each call.
+        """
+        flat_graph = self.pm.flat_graph
+        shapes = self.tensor_shapes
+        output_keys = set(self.pm.output_keys) | set(flat_graph.output_dict.values())
+
+        def aligned_size(key: str) -> int | None:
+            shape = shapes.get(key)
+            if (
+                not self.pm.data[key].is_tensor
+                or not shape
+                or not all(isinstance(dim, int) for dim in shape)
+            ):
+                return None
+            size = math.prod(shape) * ctypes.sizeof(ctypes.c_float)  # type: ignore
+            return -(-size // self.ARENA_ALIGNMENT) * self.ARENA_ALIGNMENT
+
+        order: list[str] = []
+        inputs: dict[str, Sequence[str]] = {}
+        key_sizes: dict[str, int] = {}
+        for key in flat_graph.topological_order:
+            order.append(key)
+            inputs[key] = flat_graph.get_source_keys(key)
+            if key not in flat_graph.cached_data and (
+                (size := aligned_size(key)) is not None
+            ):
+                key_sizes[key] = size
+        pinned_keys = output_keys & key_sizes.keys()
+
+        if not self.pm.inference:
+            for key in reversed(list(flat_graph.topological_order)):
+                if not self._has_grad(key):
+                    continue
+                source_keys = flat_graph.get_source_keys(key)
+                grad_keys = [
+                    source_key + utils.BACKWARD_FN_SUFFIX
+                    for source_key in source_keys
+                    if self._has_grad(source_key)
+                ]
+                # Gradients of all inputs are passed to backward of the operation,
+                # so they are allocated together before it.
+                initialized_keys: list[str] = []
+                for source_key in source_keys:
+                    grad_key = source_key + utils.BACKWARD_FN_SUFFIX
+                    if (
+                        not self._has_grad(source_key)
+                        or grad_key in inputs
+                        or source_key in output_keys
+                        or (size := aligned_size(source_key)) is None
+                    ):
+                        continue
+                    order.append(grad_key)
+                    inputs[grad_key] = []
+                    key_sizes[grad_key] = size
+                    initialized_keys.append(grad_key)
+                    if source_key in self.pm.input_keys:
+                        pinned_keys.add(grad_key)
+                self.initialized_grad_keys[key] = initialized_keys
+                # Keys are C identifiers, so backward steps never clash with them.
+                step = f"backward:{key}"
+                order.append(step)
+                inputs[step] = [
+                    key + utils.BACKWARD_FN_SUFFIX,
+                    key,
+                    *source_keys,
+                    *grad_keys,
+                ]
+
+        plan = plan_buffers(order, inputs, key_sizes, pinned_keys)
+        offsets = [0]
+        for size in plan.buffer_sizes:
+            offsets.append(offsets[-1] + size)
+        float_size = ctypes.sizeof(ctypes.c_float)
+        self.arena_offsets = {
+            key: offsets[buffer_id] // float_size
+            for key, buffer_id in plan.buffer_ids.items()
+        }
+        self.arena_size = plan.planned_bytes // float_size
+        return plan
+
+    def arena_array_name(self, key: str) -> str:
+        return f"{utils.ARENA_NAME}_{key}"
+
+    def generate_arena(self) -> list[c_ast.Stmt]:
+        # static _Alignas(64) float arena[size];
+        # static Array arena_key = { .data = arena + offset, .shape = ... };
+        arena: list[c_ast.Stmt] = [
+            c_ast.StaticVariable(
+                f"_Alignas({self.ARENA_ALIGNMENT}) float",
+                f"{utils.ARENA_NAME}[{self.arena_size}]",
+            )
+        ]
+        for key, offset in sorted(self.arena_offsets.items()):
+            data = c_ast.BinaryOp(
+                "+", c_ast.Variable(utils.ARENA_NAME), c_ast.Constant(offset)
+            )
+            arena.append(
+                self.static_array(
+                    self.arena_array_name(key), self.get_tensor_shape(key), data
+                )
+            )
+        return arena
+
+    def static_array(
+        self, name: str, shape: Sequence[int], data: c_ast.Expr
+    ) -> c_ast.Stmt:
+        # static Array name = { .data = data, .shape = ..., ... };
+        strides = [math.prod(shape[idx + 1 :]) for idx in range(len(shape))]
+        return c_ast.StructInit(
+            name,
+            {
+                "data": data,
+                "shape": self.int_array_literal(shape),
+                "strides": self.int_array_literal(strides),
+                "ndim": c_ast.Constant(len(shape)),
+                "size": c_ast.Constant(math.prod(shape)),
+            },
+            static=True,
+            struct_type=self.configs.ARRAY_NAME,
+        )  # type: ignore
+
+    def int_array_literal(self, values: Sequence[int]) -> c_ast.CompoundLiteral:
+        return c_ast.CompoundLiteral(
+            "int", c_ast.InitializerList(tuple(c_ast.Constant(v) for v in values))
+        )
+
+    def init_arena_grad(self, key: str) -> c_ast.Stmt:
+        # Gradients could also be seeded by the caller (e.g. gradients of
+        # intermediate keys), which are copied into the arena.
+        size = math.prod(self.get_tensor_shape(key)) * ctypes.sizeof(ctypes.c_float)
+        arena_data = c_ast.Dot(c_ast.Variable(self.arena_array_name(key)), "data")
+        seed = c_ast.Arrow(c_ast.Variable("inputs"), key)
+        return c_ast.If(
+            c_ast.BinaryOp("!=", seed, c_ast.Constant(None)),
+            [
+                c_ast.MakeStmt(
+                    c_ast.Call(
+                        "memcpy",
+                        [arena_data, c_ast.Arrow(seed, "data"), c_ast.Constant(size)],
+                    )
+                )
+            ],
+            [
+                c_ast.MakeStmt(
+                    c_ast.Call(
+                        "memset", [arena_data, c_ast.Constant(0), c_ast.Constant(size)]
+                    )
+                )
+            ],
+        )
+
     def pre_process_op(
         self,
         op: Operator,
@@ -763,12 +1345,19 @@ class CGen(CodeGen[PyArray]):
 
         return op_call, post_op_stmts
 
+    @cached_property
+    def tensor_shapes(self) -> ShapeResultType:
+        # Shapes are fixed once the model is compiled, generated wrappers look
+        # them up in each call so they are computed only once.
+        return self.pm.shapes
+
     def get_tensor_shape(self, key: str) -> tuple[int, ...]:
         if key.startswith(FinalCost):
             return (1,)
-        if key in self.pm.shapes:
-            return self.pm.shapes[key]  # type: ignore
-        elif key.replace(utils.BACKWARD_FN_SUFFIX, "") in self.pm.shapes:
-            return self.pm.shapes[key.replace(utils.BACKWARD_FN_SUFFIX, "")]  # type: ignore
+        shapes = self.tensor_shapes
+        if key in shapes:
+            return shapes[key]  # type: ignore
+        elif key.replace(utils.BACKWARD_FN_SUFFIX, "") in shapes:
+            return shapes[key.replace(utils.BACKWARD_FN_SUFFIX, "")]  # type: ignore
         else:
             raise ValueError(f"Shape for key {key} not found")
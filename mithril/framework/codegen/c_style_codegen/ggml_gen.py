@@ -18,6 +18,7 @@ from typing import override
 
 from ....cores.c.array import PyArray
 from ...logical.operator import Operator
+from ...logical.operators import ScanOp
 from ...physical.model import PhysicalModel
 from . import c_ast, utils
 from .c_gen import CGen
@@ -39,6 +40,11 @@ class GGMLCodeGen(CGen):
         )
 
     def generate_code(self, file_path: str | None = None) -> None:
+        # Computation graphs of GGML are built once from the operations of the
+        # model, so loops over the sequence of a scan can not be expressed.
+        if any(isinstance(op, ScanOp) for op in self.pm.flat_graph.all_models):
+            raise NotImplementedError("Scan is not supported in GGML backend!")
+
         # Include stdlib.h for atexit
         stdlib_include = c_ast.Include("stdlib.h", system=True)
         self.imports.append(stdlib_include)
@@ -41,7 +41,11 @@ class RawCGen(CGen):
     def create_key_ref(
         self, key: str, context: str, load: bool = True
     ) -> c_ast.Variable | c_ast.Expr:
-        if key in self.struct_keys.eval_input_keys:
+        if (
+            key in self.struct_keys.eval_input_keys
+            and key not in self.arena_offsets
+            and key not in self.key_refs
+        ):
             return c_ast.Variable(f"inputs->{key}")
 
         else:
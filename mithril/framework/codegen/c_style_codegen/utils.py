@@ -22,6 +22,9 @@ EVALUATE_GRAD_OUTPUT_STRUCT_NAME = "eval_grad_outputs"
 CACHE_STRUCT_NAME = "cache_keys"
 GRAD_STRUCT_NAME = "grad_keys"
 CACHE_NAME = "cache"
+ARENA_NAME = "arena"
+# Index of the current step in the loops of scans.
+SCAN_STEP_NAME = "t"
 
 
 class StructKeys:
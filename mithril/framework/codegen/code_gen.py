@@ -25,7 +25,15 @@ from ..physical.model import PhysicalModel
 
 
 class CodeGen(ABC, Generic[DataType]):
+    # Supported strategies for evaluating operations (see PhysicalModel.executor).
+    EXECUTORS: tuple[str, ...] = ("serial",)
+
     def __init__(self, pm: PhysicalModel[DataType]) -> None:
+        if pm.executor not in self.EXECUTORS:
+            raise ValueError(
+                f"Executor '{pm.executor}' is not supported by "
+                f"{pm.backend.backend_type} backend!"
+            )
         self.pm: PhysicalModel[DataType] = pm
         self.code: str | None = None
         self.file_path: str | None = None
@@ -0,0 +1,156 @@
+# Copyright 2022 Synnada, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from collections.abc import Mapping, Sequence
+from dataclasses import dataclass
+
+# Maximum number of segments tried by the budget driven planner.
+MAX_CHECKPOINT_SEGMENTS = 128
+
+
+@dataclass
+class CheckpointPlan:
+    # Output keys of the operations of each segment in execution order.
+    segments: list[list[str]]
+    # Keys of each segment which are not kept for backward but recomputed,
+    # i.e. keys only consumed inside of their segment.
+    recomputed_keys: list[list[str]]
+    # Size of each key which could be recomputed in bytes.
+    key_sizes: dict[str, int]
+
+    @property
+    def recompute_ops(self) -> int:
+        return sum(len(keys) for keys in self.recomputed_keys)
+
+    @property
+    def recompute_bytes(self) -> int:
+        return sum(self.key_sizes[key] for keys in self.recomputed_keys for key in keys)
+
+    @property
+    def naive_bytes(self) -> int:
+        # All keys are kept for backward without checkpointing.
+        return sum(self.key_sizes.values())
+
+    @property
+    def peak_bytes(self) -> int:
+        # Recomputed keys of a single segment are alive at the same time during
+        # backward, in addition to all kept keys.
+        largest_segment = max(
+            (sum(self.key_sizes[key] for key in keys) for keys in self.recomputed_keys),
+            default=0,
+        )
+        return self.naive_bytes - self.recompute_bytes + largest_segment
+
+    def __str__(self) -> str:
+        return (
+            f"{len(self.segments)} segments, {self.recompute_ops} ops "
+            f"({self.recompute_bytes} bytes) recomputed, {self.peak_bytes} bytes "
+            f"peak, {self.naive_bytes} bytes naive"
+        )
+
+
+def plan_checkpoints(
+    order: Sequence[str],
+    consumers: Mapping[str, Sequence[str]],
+    key_sizes: Mapping[str, int],
+    segments: Sequence[Sequence[str]] | None = None,
+    budget: int | None = None,
+) -> CheckpointPlan:
+    """Plans activation checkpointing of the given segments, or chooses segments
+    for the given memory budget if no segments are given.
+
+    A key of a segment is recomputed in backward instead of being kept if it
+    could be recomputed (i.e. it is in key_sizes) and all of its consumers are
+    in the same segment. Without segments, execution order is split into
+    contiguous segments with equal recomputable bytes and the number of
+    segments with the least recomputation whose peak fits in the budget is
+    chosen. If none of them fits, the one with the lowest peak is chosen.
+
+    Parameters
+    ----------
+    order : Sequence[str]
+        Output keys of all operations in execution order.
+    consumers : Mapping[str, Sequence[str]]
+        Output keys of the operations consuming each key.
+    key_sizes : Mapping[str, int]
+        Sizes (in bytes) of the keys which could be recomputed.
+    segments : Sequence[Sequence[str]] | None, optional
+        Output keys of the operations of each segment, by default None
+    budget : int | None, optional
+        Memory budget (in bytes) of the kept and recomputed keys, by default
+        None
+
+    Returns
+    -------
+    CheckpointPlan
+        Chosen segments and their recomputed keys.
+    """
+    if segments is not None:
+        return _segment_plan(order, consumers, key_sizes, segments)
+
+    plans = [_segment_plan(order, consumers, key_sizes, [])]
+    n_keys = sum(1 for key in order if key in key_sizes)
+    for n_segments in range(2, min(n_keys, MAX_CHECKPOINT_SEGMENTS) + 1):
+        plan = _segment_plan(
+            order, consumers, key_sizes, _split(order, key_sizes, n_segments)
+        )
+        plans.append(plan)
+
+    feasible = [plan for plan in plans if budget is None or plan.peak_bytes <= budget]
+    if feasible:
+        return min(feasible, key=lambda plan: (plan.recompute_bytes, plan.peak_bytes))
+    return min(plans, key=lambda plan: (plan.peak_bytes, plan.recompute_bytes))
+
+
+def _segment_plan(
+    order: Sequence[str],
+    consumers: Mapping[str, Sequence[str]],
+    key_sizes: Mapping[str, int],
+    segments: Sequence[Sequence[str]],
+) -> CheckpointPlan:
+    positions = {key: idx for idx, key in enumerate(order)}
+    ordered_segments: list[list[str]] = []
+    recomputed_keys: list[list[str]] = []
+    for segment in segments:
+        keys = sorted(
+            (key for key in set(segment) if key in positions),
+            key=positions.__getitem__,
+        )
+        members = set(keys)
+        ordered_segments.append(keys)
+        recomputed_keys.append(
+            [
+                key
+                for key in keys
+                if key in key_sizes
+                and consumers.get(key)
+                and set(consumers[key]) <= members
+            ]
+        )
+    return CheckpointPlan(ordered_segments, recomputed_keys, dict(key_sizes))
+
+
+def _split(
+    order: Sequence[str], key_sizes: Mapping[str, int], n_segments: int
+) -> list[list[str]]:
+    # Splits order into contiguous segments with (nearly) equal sizes.
+    total = sum(key_sizes.get(key, 0) for key in order)
+    segments: list[list[str]] = [[]]
+    size = 0
+    for key in order:
+        segments[-1].append(key)
+        size += key_sizes.get(key, 0)
+        if len(segments) < n_segments and size * n_segments >= total * len(segments):
+            segments.append([])
+    return [segment for segment in segments if segment]
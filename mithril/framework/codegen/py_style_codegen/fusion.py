@@ -0,0 +1,124 @@
+# Copyright 2022 Synnada, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from dataclasses import dataclass
+from typing import Any
+
+from ...physical.flat_graph import FlatGraph
+
+# Primitives whose outputs are computed elementwise from their (broadcasted)
+# inputs, so that any chain of them could be evaluated in a single function
+# and block by block along the leading axis.
+ELEMENTWISE_FORMULAS = frozenset(
+    {
+        "add",
+        "subtract",
+        "multiplication",
+        "divide",
+        "power",
+        "square",
+        "negate",
+        "exp",
+        "sqrt",
+        "log",
+        "sin",
+        "cos",
+        "abs",
+        "sign",
+        "relu",
+        "leaky_relu",
+        "sigmoid",
+        "tanh",
+        "softplus",
+        "gelu",
+        "minimum",
+        "maximum",
+        "where",
+        "clamp",
+    }
+)
+
+
+@dataclass
+class FusionGroup:
+    # Output key of the last operation of the group, the only key of the group
+    # used outside of it.
+    output_key: str
+    # Output keys of all operations of the group in execution order.
+    keys: list[str]
+    # Formula keys of the operations in the same order with keys.
+    formula_keys: list[str]
+
+    def __str__(self) -> str:
+        return f"{self.output_key}: {' -> '.join(self.formula_keys)}"
+
+
+def find_fusion_groups(
+    flat_graph: FlatGraph[Any], fusible_keys: set[str], ignored_keys: set[str]
+) -> list[FusionGroup]:
+    """Finds maximal groups of fusible operations where all operations except
+    the last one are only consumed inside of the group.
+
+    Groups are grown from their last operation towards their inputs, an input
+    is added to a group if all of its consumers (except ignored ones) are
+    already in the group and it is not an output of the model.
+
+    Parameters
+    ----------
+    flat_graph : FlatGraph
+        Graph of the model.
+    fusible_keys : set[str]
+        Output keys of the operations which could be fused.
+    ignored_keys : set[str]
+        Keys which are not computed in generated code (e.g. cached or unused
+        keys), their consumers are not taken into account.
+
+    Returns
+    -------
+    list[FusionGroup]
+        Groups with more than one operation in execution order.
+    """
+    order = {key: idx for idx, key in enumerate(flat_graph.topological_order)}
+    output_keys = set(flat_graph.output_dict.values())
+    grouped_keys: set[str] = set()
+    groups: list[FusionGroup] = []
+    for root in reversed(order):
+        if root not in fusible_keys or root in grouped_keys:
+            continue
+        members = {root}
+        changed = True
+        while changed:
+            changed = False
+            for key in list(members):
+                for source_key in flat_graph.get_source_keys(key):
+                    if (
+                        source_key in members
+                        or source_key not in fusible_keys
+                        or source_key in grouped_keys
+                        or source_key in output_keys
+                    ):
+                        continue
+                    consumers = set(flat_graph.get_target_keys(source_key))
+                    if consumers - ignored_keys <= members:
+                        members.add(source_key)
+                        changed = True
+
+        grouped_keys |= members
+        if len(members) > 1:
+            keys = sorted(members, key=order.__getitem__)
+            formula_keys = [flat_graph.get_op(key).formula_key for key in keys]
+            groups.append(FusionGroup(root, keys, formula_keys))
+
+    groups.sort(key=lambda group: order[group.output_key])
+    return groups
@@ -0,0 +1,107 @@
+# Copyright 2022 Synnada, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from collections.abc import Mapping, Sequence
+from dataclasses import dataclass
+
+
+@dataclass
+class MemoryPlan:
+    # Index of the buffer assigned to each planned key.
+    buffer_ids: dict[str, int]
+    # Size of each buffer in bytes.
+    buffer_sizes: list[int]
+    # Size of each planned key in bytes.
+    key_sizes: dict[str, int]
+
+    @property
+    def planned_bytes(self) -> int:
+        return sum(self.buffer_sizes)
+
+    @property
+    def naive_bytes(self) -> int:
+        # Every planned key is allocated separately without a plan.
+        return sum(self.key_sizes.values())
+
+
+def plan_buffers(
+    order: Sequence[str],
+    inputs: Mapping[str, Sequence[str]],
+    key_sizes: Mapping[str, int],
+    pinned_keys: set[str] | None = None,
+) -> MemoryPlan:
+    """Assigns keys in key_sizes to reusable buffers with a liveness analysis.
+
+    Keys are visited in the given (topological) order of their producers and
+    buffer of a key is released after its last consumer. Released buffers are
+    reused by the following keys with a best-fit strategy, buffers are grown if
+    none of them is large enough. Pinned keys (e.g. keys read after evaluation)
+    are never released.
+
+    Parameters
+    ----------
+    order : Sequence[str]
+        Output keys of all operations in execution order.
+    inputs : Mapping[str, Sequence[str]]
+        Input keys of the operation of each output key.
+    key_sizes : Mapping[str, int]
+        Sizes (in bytes) of the keys to be planned.
+    pinned_keys : set[str] | None, optional
+        Planned keys whose buffers are never released, by default None
+
+    Returns
+    -------
+    MemoryPlan
+        Buffer assignments of the planned keys.
+    """
+    if pinned_keys is None:
+        pinned_keys = set()
+
+    # Find last consumer of each planned key.
+    last_uses: dict[str, int] = {}
+    for idx, key in enumerate(order):
+        if key in key_sizes:
+            last_uses.setdefault(key, idx)
+        for input_key in inputs.get(key, ()):
+            if input_key in key_sizes:
+                last_uses[input_key] = idx
+
+    releases: dict[int, list[str]] = {}
+    for key, idx in last_uses.items():
+        if key not in pinned_keys:
+            releases.setdefault(idx, []).append(key)
+
+    buffer_ids: dict[str, int] = {}
+    buffer_sizes: list[int] = []
+    free_buffers: list[int] = []
+    for idx, key in enumerate(order):
+        if (size := key_sizes.get(key)) is not None:
+            fitting = [buf for buf in free_buffers if buffer_sizes[buf] >= size]
+            if fitting:
+                buffer_id = min(fitting, key=lambda buf: buffer_sizes[buf])
+            elif free_buffers:
+                buffer_id = max(free_buffers, key=lambda buf: buffer_sizes[buf])
+            else:
+                buffer_id = len(buffer_sizes)
+                buffer_sizes.append(0)
+            if buffer_id in free_buffers:
+                free_buffers.remove(buffer_id)
+            buffer_sizes[buffer_id] = max(buffer_sizes[buffer_id], size)
+            buffer_ids[key] = buffer_id
+        # Inputs of an operation are released after its output is assigned,
+        # so that outputs never share buffers with their inputs.
+        for released_key in releases.get(idx, ()):
+            free_buffers.append(buffer_ids[released_key])
+
+    return MemoryPlan(buffer_ids, buffer_sizes, dict(key_sizes))
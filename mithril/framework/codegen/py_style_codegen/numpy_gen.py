@@ -14,15 +14,23 @@
 
 import ast
 import keyword
-from collections.abc import Callable
+import math
+import os
+import threading
+from collections.abc import Callable, Iterator, Mapping, Sequence
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from dataclasses import dataclass, field
 from functools import partial
 from typing import Any
 
 import numpy as np
 
 from ....backends.with_manualgrad.numpy_backend import NumpyBackend
-from ....cores.python.numpy.utils import fill_zeros_like
+from ....cores.python.numpy.ops import out_functions
+from ....cores.python.numpy.utils import dtype_map, fill_zeros_like
 from ....utils.func_utils import is_make_array_required, prepare_function_args
+from ....utils.type_utils import is_list_int
 from ...common import (
     DataEvalType,
     EvaluateAllType,
@@ -32,15 +40,126 @@ from ...common import (
     ParamsEvalType,
     is_type_adjustment_required,
 )
-from ...logical import Operator
+from ...logical import Operator, ScanOp
 from ...physical.model import PhysicalModel
 from ..utils import check_repr_inequality
-from .python_gen import PythonCodeGen, RawGradientType
+from .memory_planner import MemoryPlan, plan_buffers
+from .python_gen import PythonCodeGen, RawEvaluateType, RawGradientType
+from .scheduler import levelize
+
+GradSignature = tuple[tuple[str, tuple[int, ...], np.dtype[Any]] | None, ...]
+
+
+@dataclass
+class ExecutionContext:
+    # Forward caches of operators (i.e. <key>_cache entries) written in evaluate
+    # and read in evaluate_gradients.
+    caches: dict[str, dict[str, Any]]
+    # Zero gradient buffers of intermediate keys for each shape signature.
+    grad_workspaces: dict[GradSignature, dict[str, np.ndarray[Any, Any]]] = field(
+        default_factory=lambda: {}
+    )
+    # Planned buffers of intermediate keys (i.e. <key>_buffer entries).
+    buffers: dict[str, np.ndarray[Any, Any]] = field(default_factory=lambda: {})
+
+
+class ExecutionContextPool:
+    """Pool of per-call execution contexts of generated functions. Static data in
+    the shared cache is referenced by all contexts while operator caches are
+    private to each context, so that a compiled model could be evaluated from
+    multiple threads at the same time.
+    """
+
+    def __init__(
+        self,
+        cache: Mapping[str, Any],
+        max_size: int,
+        create_buffers: Callable[[], dict[str, np.ndarray[Any, Any]]] | None = None,
+    ) -> None:
+        self.cache = cache
+        self.max_size = max_size
+        self.create_buffers = create_buffers
+        self._contexts: list[ExecutionContext] = []
+        self._lock = threading.Lock()
+
+    def _create_context(self) -> ExecutionContext:
+        caches = {
+            key: dict(value)
+            for key, value in self.cache.items()
+            if key.endswith("_cache") and isinstance(value, dict)
+        }
+        context = ExecutionContext(caches)
+        if self.create_buffers is not None:
+            context.buffers = self.create_buffers()
+        return context
+
+    @contextmanager
+    def acquire(self) -> Iterator[tuple[ExecutionContext, dict[str, Any]]]:
+        with self._lock:
+            context = self._contexts.pop() if self._contexts else None
+        if context is None:
+            context = self._create_context()
+        try:
+            # Static values could be updated after compilation, so cache of each
+            # call is created from the shared one.
+            yield context, {**self.cache, **context.caches, **context.buffers}
+        finally:
+            with self._lock:
+                if len(self._contexts) < self.max_size:
+                    self._contexts.append(context)
+
+
+class ParallelExecutor:
+    """Thread pool evaluating independent operations of generated functions at
+    the same time. NumPy releases the GIL in BLAS calls and most ufuncs, so
+    these operations run in parallel. Threads are created lazily and are not a
+    part of the pickled state.
+    """
+
+    def __init__(self, num_workers: int) -> None:
+        self.num_workers = num_workers
+        self._pool: ThreadPoolExecutor | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def pool(self) -> ThreadPoolExecutor:
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(
+                        self.num_workers, thread_name_prefix="mithril"
+                    )
+        return self._pool
+
+    def run(self, fns: Sequence[Callable[[], Any]]) -> list[Any]:
+        # First function is evaluated in the calling thread, which waits for
+        # all others before returning (or raising) so that no operation
+        # outlives its level.
+        futures = [self.pool.submit(fn) for fn in fns[1:]]
+        try:
+            results = [fns[0]()]
+        finally:
+            wait(futures)
+        return results + [future.result() for future in futures]
+
+    def __getstate__(self) -> dict[str, Any]:
+        return {"num_workers": self.num_workers}
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        self.__init__(state["num_workers"])  # type: ignore[misc]
 
 
 # Numpy codegen will be updated after AUTOGRAD is added.
 class NumpyCodeGen(PythonCodeGen[np.ndarray[Any, Any]]):
     BACKWARD_FN_SUFFIX = "_grad"
+    # Maximum number of shape signatures which gradient buffers are kept for.
+    MAX_GRAD_WORKSPACES = 4
+    # Maximum number of idle execution contexts kept for reuse.
+    MAX_POOLED_CONTEXTS = 8
+    # Operations whose largest tensor has fewer elements are not worth a thread
+    # handoff and are evaluated serially with "threads" executor.
+    PARALLEL_MIN_SIZE = 2**14
+    EXECUTORS = ("serial", "threads")
 
     def __init__(self, pm: PhysicalModel[np.ndarray[Any, Any]]) -> None:
         super().__init__(pm)
@@ -49,6 +168,218 @@ class NumpyCodeGen(PythonCodeGen[np.ndarray[Any, Any]]):
         self.backend: NumpyBackend = self.pm.backend
         self._flatten_fn_imported = False
         self._numpy_imported = False
+        self.memory_plan: MemoryPlan | None = None
+        self._buffer_shapes: dict[str, tuple[int, ...]] = {}
+        self._buffer_dtype = np.dtype(dtype_map[f"float{self.backend.precision}"])
+        # Keys whose caches are cleared after forward and recomputed in backward.
+        self.recomputed_keys: set[str] = set()
+        self.parallel_executor: ParallelExecutor | None = None
+        if self.pm.executor == "threads":
+            self.parallel_executor = ParallelExecutor(
+                self.pm.num_workers or os.cpu_count() or 1
+            )
+        if self.checkpoint_plan is not None:
+            self.recomputed_keys = {
+                key for keys in self.checkpoint_plan.recomputed_keys for key in keys
+            }
+        if self.pm.memory_planning:
+            self.memory_plan = self.pm.memory_plan = self.plan_memory()
+        self.contexts = ExecutionContextPool(
+            self.pm.flat_graph.cached_data,
+            self.MAX_POOLED_CONTEXTS,
+            self.create_buffers if self.memory_plan is not None else None,
+        )
+
+    def plan_memory(self) -> MemoryPlan:
+        """Plans reusable buffers for intermediate tensors whose primitives could
+        write their results into preallocated arrays (see out_functions). Tensors
+        kept in caches for manual gradients are never released.
+        """
+        flat_graph = self.pm.flat_graph
+        levels = self.evaluation_levels()
+        order = [key for level in levels for key in level]
+        inputs = {key: flat_graph.get_source_keys(key) for key in order}
+        excluded_keys = (
+            flat_graph.cached_data.keys()
+            | flat_graph.unused_keys
+            | self.pm.discarded_keys
+            | set(flat_graph.output_dict.values())
+            | self.recomputed_keys
+        )
+        for group in self.fusion_groups:
+            # Fused operations are evaluated at once with their last operation,
+            # so inputs of the group are alive until then.
+            inputs[group.output_key] = [
+                key
+                for member in group.keys
+                for key in inputs[member]
+                if key not in group.keys
+            ]
+            for member in group.keys[:-1]:
+                inputs[member] = []
+            excluded_keys |= set(group.keys)
+        key_sizes: dict[str, int] = {}
+        for key in order:
+            if key in excluded_keys:
+                continue
+            if flat_graph.get_op(key).formula_key not in out_functions:
+                continue
+            edge = self.pm.data[key]
+            if not edge.is_tensor or edge.value_type is not float:
+                continue
+            assert edge.shape is not None
+            shape = edge.shape.get_shapes()
+            if not is_list_int(shape) or shape == []:
+                continue
+            if is_make_array_required(edge) or is_type_adjustment_required(
+                self.pm.data, inputs[key]
+            ):
+                continue
+            self._buffer_shapes[key] = tuple(shape)
+            key_sizes[key] = math.prod(shape) * self._buffer_dtype.itemsize
+
+        # Results of other primitives could be views of their inputs (e.g.
+        # reshape), so their inputs are not planned.
+        for key in order:
+            if flat_graph.get_op(key).formula_key not in out_functions:
+                for input_key in inputs[key]:
+                    key_sizes.pop(input_key, None)
+
+        live_inputs = inputs
+        if self.parallel_executor is not None:
+            # Operations of a level may run at the same time, so their inputs
+            # are released only after the whole level is evaluated.
+            live_inputs = {
+                level[-1]: [key for member in level for key in inputs[member]]
+                for level in levels
+            }
+        pinned_keys = set() if self.pm.inference else set(key_sizes)
+        return plan_buffers(order, live_inputs, key_sizes, pinned_keys)
+
+    def evaluation_levels(self) -> list[list[str]]:
+        if self.parallel_executor is None:
+            return super().evaluation_levels()
+        flat_graph = self.pm.flat_graph
+        order = list(flat_graph.topological_order)
+        return levelize(order, {key: flat_graph.get_source_keys(key) for key in order})
+
+    def schedule_calls(self, calls: list[tuple[str, ast.stmt]]) -> list[ast.stmt]:
+        if self.parallel_executor is None:
+            return super().schedule_calls(calls)
+        # First target (i.e. variable) of each call dispatched to threads.
+        parallel_calls: dict[ast.stmt, ast.Name] = {}
+        for key, call in calls:
+            if (
+                isinstance(call, ast.Assign)
+                and isinstance(target := call.targets[0], ast.Name)
+                and self.is_parallel_worthy(key)
+            ):
+                parallel_calls[call] = target
+        if len(parallel_calls) < 2:
+            return super().schedule_calls(calls)
+
+        # Cheap operations are evaluated first, then the others are dispatched
+        # to the thread pool as closures and their results are unpacked into
+        # their first targets (e.g. a = a_cache["output"] = ... becomes
+        # (a, ...) = parallel_executor.run(...) and a_cache["output"] = a).
+        statements = [call for _, call in calls if call not in parallel_calls]
+        no_args = ast.arguments(
+            posonlyargs=[], args=[], kwonlyargs=[], kw_defaults=[], defaults=[]
+        )
+        lambdas: list[ast.expr] = []
+        for call in parallel_calls:
+            assert isinstance(call, ast.Assign)
+            lambdas.append(ast.Lambda(args=no_args, body=call.value))
+        statements.append(
+            ast.Assign(
+                targets=[
+                    ast.Tuple(
+                        elts=[
+                            ast.Name(id=target.id, ctx=ast.Store())
+                            for target in parallel_calls.values()
+                        ],
+                        ctx=ast.Store(),
+                    )
+                ],
+                value=ast.Call(
+                    func=ast.Attribute(
+                        value=ast.Name(id="parallel_executor", ctx=ast.Load()),
+                        attr="run",
+                        ctx=ast.Load(),
+                    ),
+                    args=[ast.Tuple(elts=lambdas, ctx=ast.Load())],
+                    keywords=[],
+                ),
+            )
+        )
+        for call, first_target in parallel_calls.items():
+            assert isinstance(call, ast.Assign)
+            statements += [
+                ast.Assign(
+                    targets=[target],
+                    value=ast.Name(id=first_target.id, ctx=ast.Load()),
+                )
+                for target in call.targets[1:]
+            ]
+        return statements
+
+    def is_parallel_worthy(self, key: str) -> bool:
+        # Operations are dispatched to threads if their largest tensor (output
+        # or input) is large enough or has unknown shape.
+        sizes = [0]
+        for _key in [key, *self.pm.flat_graph.get_source_keys(key)]:
+            if (edge := self.pm.data.get(_key)) is None or not edge.is_tensor:
+                continue
+            assert edge.shape is not None
+            shape = edge.shape.get_shapes()
+            if not is_list_int(shape):
+                return True
+            sizes.append(math.prod(shape))
+        return max(sizes) >= self.PARALLEL_MIN_SIZE
+
+    def runtime_globals(self) -> dict[str, Any]:
+        namespace = super().runtime_globals()
+        if self.parallel_executor is not None:
+            namespace["parallel_executor"] = self.parallel_executor
+        return namespace
+
+    def find_checkpoint_segments(self) -> list[list[str]]:
+        # Recomputed keys of segments are handled in generated code, see
+        # release_statements and generate_evaluate_gradients.
+        return []
+
+    def release_statements(self, key: str) -> list[ast.stmt]:
+        if key not in self.recomputed_keys:
+            return []
+        # Cache of a recomputed key is cleared as soon as it is consumed.
+        cache_name = "_".join([key, Operator.cache_name])
+        return [
+            ast.Expr(
+                ast.Call(
+                    func=ast.Attribute(
+                        value=ast.Name(id=cache_name, ctx=ast.Load()),
+                        attr="clear",
+                        ctx=ast.Load(),
+                    ),
+                    args=[],
+                    keywords=[],
+                )
+            )
+        ]
+
+    def buffer_name(self, key: str) -> str:
+        return f"{key}_buffer"
+
+    def create_buffers(self) -> dict[str, np.ndarray[Any, Any]]:
+        assert self.memory_plan is not None
+        plan = self.memory_plan
+        storages = [np.empty(size, dtype=np.uint8) for size in plan.buffer_sizes]
+        return {
+            self.buffer_name(key): storages[buffer_id][: plan.key_sizes[key]]
+            .view(self._buffer_dtype)
+            .reshape(self._buffer_shapes[key])
+            for key, buffer_id in plan.buffer_ids.items()
+        }
 
     def generate_functions(self) -> list[ast.FunctionDef]:
         functions: list[ast.FunctionDef] = []
@@ -57,6 +388,25 @@ class NumpyCodeGen(PythonCodeGen[np.ndarray[Any, Any]]):
             functions.append(self.generate_evaluate_gradients())
         return functions
 
+    def generate_evaluate(self) -> ast.FunctionDef:
+        func_def = super().generate_evaluate()
+        if self.memory_plan is not None:
+            # Planned buffers are provided in cache by execution contexts.
+            buffer_names = sorted(map(self.buffer_name, self.memory_plan.buffer_ids))
+            func_def.body[:0] = [
+                ast.Assign(
+                    targets=[ast.Name(id=name, ctx=ast.Store())],
+                    value=ast.Subscript(
+                        value=ast.Name(id="cache", ctx=ast.Load()),
+                        slice=ast.Constant(value=name),
+                        ctx=ast.Load(),
+                    ),
+                )
+                for name in buffer_names
+            ]
+            func_def = ast.fix_missing_locations(func_def)
+        return func_def
+
     def generate_imports(self) -> list[ast.stmt]:
         # Numpy backend also imports gradient functions
         imports = super().generate_imports()
@@ -97,6 +447,25 @@ class NumpyCodeGen(PythonCodeGen[np.ndarray[Any, Any]]):
     ]:
         eval_fn, grad_fn = self.exec_generated_code()
 
+        # Gradient keys and the keys their zero gradients take shapes from if
+        # they are pruned from the graph, computed once for all calls.
+        grad_sources: list[tuple[str, str | None]] = []
+        for key in self.pm.flat_graph.all_keys - self.pm.flat_graph.unused_keys:
+            if self._has_grad(key):
+                source_keys = self.pm.flat_graph.get_source_keys(key, True)
+                grad_sources.append((key, source_keys[0] if source_keys else None))
+        # Recomputed keys are not in their caches after evaluate, gradients of
+        # them take their shapes from zero sized templates.
+        templates: dict[str, np.ndarray[Any, Any]] = {}
+        for key in self.recomputed_keys:
+            edge_shape = self.pm.data[key].shape
+            assert edge_shape is not None
+            shape = edge_shape.get_shapes()
+            assert is_list_int(shape)
+            templates[key] = np.broadcast_to(
+                np.zeros((), dtype=self._buffer_dtype), shape
+            )
+
         def evaluate_gradients_wrapper_manualgrad(
             params: ParamsEvalType[np.ndarray[Any, Any]] | None = None,
             data: DataEvalType[np.ndarray[Any, Any]] | None = None,
@@ -114,38 +483,81 @@ class NumpyCodeGen(PythonCodeGen[np.ndarray[Any, Any]]):
                 params = {}
             if data is None:
                 data = {}
+            with self.contexts.acquire() as (context, cached_data):
+                return _evaluate_gradients(
+                    params, data, output_gradients, context, cached_data, grad_fn
+                )
+
+        def _evaluate_gradients(
+            params: ParamsEvalType[np.ndarray[Any, Any]],
+            data: DataEvalType[np.ndarray[Any, Any]],
+            output_gradients: ParamsEvalType[np.ndarray[Any, Any]] | None,
+            context: ExecutionContext,
+            cached_data: DataEvalType[np.ndarray[Any, Any]],
+            grad_fn: RawGradientType[np.ndarray[Any, Any]],
+        ) -> tuple[
+            DataEvalType[np.ndarray[Any, Any]], ParamsEvalType[np.ndarray[Any, Any]]
+        ]:
             # TODO: Consider not unioning batch data (data) into self.data
             # If evaluate_gradients called directly, first call evaluate.
-            cached_data = self.pm.flat_graph.cached_data
-
             output: dict[str, np.ndarray[Any, Any]] = eval_fn(
                 params=params, data=data, cache=cached_data
             )
-            # Initialize gradients as zero with corresponding shapes.
-            gradients: dict[str, np.ndarray[Any, Any]] = {}
-            for key in self.pm.flat_graph.all_keys - self.pm.flat_graph.unused_keys:
-                if not self._has_grad(key):
+            # Find data of intermediate keys which their gradients have the same
+            # structure with.
+            intermediates: dict[str, Any] = {}
+            for key, source_key in grad_sources:
+                if key in params:
                     continue
                 key_cache = cached_data.get(key + "_cache", {})
                 assert isinstance(key_cache, dict)
-                out_data: np.ndarray[Any, Any] | None = None
-
-                if key in params:
-                    out_data = params[key]
+                if key in templates:
+                    intermediates[key] = templates[key]
                 elif "output" in key_cache:
-                    out_data = key_cache["output"]
+                    intermediates[key] = key_cache["output"]
                 else:
                     # Removed primitives, to take shape of output take input shape
-                    _key = self.pm.flat_graph.get_source_keys(key, True)[0]
-                    _key_cache = cached_data.get(_key + "_cache", {})
-                    assert isinstance(_key_cache, dict)
-                    if _key in self.pm.input_keys:
-                        out_data = params[_key]
+                    assert source_key is not None
+                    if source_key in self.pm.input_keys:
+                        intermediates[key] = params[source_key]
+                    elif source_key in templates:
+                        intermediates[key] = templates[source_key]
                     else:
-                        out_data = _key_cache["output"]
-
+                        _key_cache = cached_data.get(source_key + "_cache", {})
+                        assert isinstance(_key_cache, dict)
+                        intermediates[key] = _key_cache["output"]
+
+            # Initialize gradients as zero with corresponding shapes. Gradients
+            # of params are returned, so they are always created from scratch.
+            gradients: dict[str, np.ndarray[Any, Any]] = {
+                key: fill_zeros_like(params[key])
+                for key, _ in grad_sources
+                if key in params
+            }
+            signature = tuple(
+                (key, value.shape, value.dtype)
+                if isinstance(value, np.ndarray)
+                else None
+                for key, value in intermediates.items()
+            )
+            grad_workspaces = context.grad_workspaces
+            if (workspace := grad_workspaces.get(signature)) is None:
+                if len(grad_workspaces) >= self.MAX_GRAD_WORKSPACES:
+                    grad_workspaces.pop(next(iter(grad_workspaces)))
+                workspace = grad_workspaces[signature] = {
+                    key: np.zeros_like(value)
+                    for key, value in intermediates.items()
+                    if isinstance(value, np.ndarray)
+                }
+            else:
+                for buffer in workspace.values():
+                    buffer.fill(0)
+            for key, value in intermediates.items():
                 # Create same data structure filled with zeros.
-                gradients[key] = fill_zeros_like(out_data)
+                if (zero_grad := workspace.get(key)) is not None:
+                    gradients[key] = zero_grad
+                else:
+                    gradients[key] = fill_zeros_like(value)
 
             # TODO: This operation is duplicated in PythonCodeGen, consider refactoring
             if output_gradients is None:
@@ -180,6 +592,31 @@ class NumpyCodeGen(PythonCodeGen[np.ndarray[Any, Any]]):
 
         return self.post_process_fns(eval_fn, grad_fn, jit)  # type: ignore
 
+    def compute_evaluate(
+        self,
+        params: ParamsEvalType[np.ndarray[Any, Any]] | None = None,
+        data: DataEvalType[np.ndarray[Any, Any]] | None = None,
+        cache: DataEvalType[np.ndarray[Any, Any]] | None = None,
+        *,
+        fn: RawEvaluateType[np.ndarray[Any, Any]],
+    ) -> DataEvalType[np.ndarray[Any, Any]]:
+        if cache is None:
+            return fn(params, data, cache)
+        # Operator caches are written into a context private to this call.
+        with self.contexts.acquire() as (_, cached_data):
+            return fn(params, data, cached_data)
+
+    def fused_call(self, fn_name: str, args: list[ast.expr]) -> ast.expr:
+        if not self.pm.inference:
+            # Outputs of all fused operations are kept in their caches for
+            # manual gradients, so the group is evaluated as a whole.
+            return super().fused_call(fn_name, args)
+        return ast.Call(
+            func=ast.Name(id="fused_chunks", ctx=ast.Load()),
+            args=[ast.Name(id=fn_name, ctx=ast.Load()), *args],
+            keywords=[],
+        )
+
     def get_op_details(self, output_key: str) -> tuple[Operator, list[str], list[str]]:
         model = self.pm.flat_graph.get_op(output_key)
 
@@ -213,6 +650,27 @@ class NumpyCodeGen(PythonCodeGen[np.ndarray[Any, Any]]):
         if formula_key in self.backend.array_creation_funcs:
             self.add_partial_function(formula_key)
 
+        if self.memory_plan is not None and output_key in self.memory_plan.buffer_ids:
+            # Result is written into the planned buffer, cache of the primitive
+            # is not passed since none of these primitives use it.
+            inputs = dict(zip(l_input_keys, g_input_keys, strict=False))
+            cache_name = inputs.get("cache")
+            args = [
+                arg
+                for arg in generated_fn.args
+                if not (isinstance(arg, ast.Name) and arg.id == cache_name)
+            ]
+            generated_fn = ast.Call(
+                func=ast.Name(id="compute_into", ctx=ast.Load()),
+                args=[
+                    ast.Constant(formula_key),
+                    ast.Name(id=self.buffer_name(output_key), ctx=ast.Load()),
+                    *args,
+                ],
+                keywords=[kw for kw in generated_fn.keywords if kw.arg != "cache"],
+            )
+            return ast.Assign(targets, generated_fn), used_keys | _used_keys
+
         if is_make_array_required(self.pm.data[output_key]) or (
             self.pm.data[output_key].is_tensor
             and is_type_adjustment_required(self.pm.data, g_input_keys)
@@ -419,6 +877,117 @@ class NumpyCodeGen(PythonCodeGen[np.ndarray[Any, Any]]):
         )
         self._flatten_fn_imported = True
 
+    def call_scan_grad(
+        self,
+        op: ScanOp,
+        g_input_keys: list[str],
+        output_key: str,
+        function_body: list[ast.stmt],
+    ) -> set[str]:
+        # Gradients of all scan inputs are computed at once with backpropagation
+        # through time and then accumulated into corresponding input gradients.
+        inputs = dict(zip(list(op.input_keys) + ["cache"], g_input_keys, strict=False))
+        grad_arg = ast.Subscript(
+            value=ast.Name(id="gradients", ctx=ast.Load()),
+            slice=ast.Constant(
+                "_" + output_key
+                if keyword.iskeyword(output_key)
+                or output_key in self.backend.op_function_dict
+                else output_key
+            ),
+            ctx=ast.Load(),
+        )
+        scan_grads = ast.Name(id=output_key + "_scan_grads", ctx=ast.Store())
+        function_body.append(
+            ast.Assign(
+                targets=[scan_grads],
+                value=ast.Call(
+                    func=ast.Name(id=op.formula_key + self.BACKWARD_FN_SUFFIX),
+                    args=[
+                        grad_arg,
+                        self._var_ref_ast(inputs["cache"], ast.Load()),
+                        ast.Name(id=self.scan_body_name(output_key), ctx=ast.Load()),
+                        self._scan_inputs_ast(inputs, op.sequences),
+                        self._scan_inputs_ast(inputs, op.shared_keys),
+                        *self._scan_attributes_ast(op),
+                    ],
+                    keywords=[],
+                ),
+            )
+        )
+        for key in op.input_keys:
+            global_key = inputs[key]
+            if not self._has_grad(global_key):
+                continue
+            grad = ast.Subscript(
+                value=ast.Name(id=output_key + "_scan_grads", ctx=ast.Load()),
+                slice=ast.Constant(key),
+                ctx=ast.Load(),
+            )
+            if (
+                subkeys := self.pm.flat_graph.multi_node_keys.get(global_key)
+            ) is not None:
+                self._distribute_grads(global_key, grad, subkeys, function_body)
+            else:
+                function_body.append(
+                    ast.AugAssign(
+                        target=ast.Subscript(
+                            value=ast.Name(id="gradients", ctx=ast.Load()),
+                            slice=ast.Constant(global_key),
+                            ctx=ast.Load(),
+                        ),
+                        op=ast.Add(),
+                        value=grad,
+                    )
+                )
+        return {inputs[key] for key in op.sequences + op.shared_keys + ["cache"]}
+
+    def call_fused_grad(
+        self, output_key: str, body: list[ast.stmt], local_names: set[str]
+    ) -> ast.Expr:
+        # Variables of evaluate_gradients used in the body are passed as
+        # arguments, gradients are accumulated into the gradients dict in place.
+        # Some generated names have no ctx, they are all loaded.
+        arg_names = sorted(
+            {
+                node.id
+                for stmt in body
+                for node in ast.walk(stmt)
+                if isinstance(node, ast.Name)
+                and not isinstance(getattr(node, "ctx", None), ast.Store)
+            }
+            & local_names
+        )
+        fn_name = self.fused_fn_name(output_key) + self.BACKWARD_FN_SUFFIX
+        self.globals.append(
+            ast.FunctionDef(
+                name=fn_name,
+                args=ast.arguments(
+                    posonlyargs=[],
+                    args=[ast.arg(name) for name in arg_names],
+                    defaults=[],
+                    kwonlyargs=[],
+                    kw_defaults=[],
+                    vararg=None,
+                    kwarg=None,
+                ),
+                body=body,
+                decorator_list=[],
+                returns=None,
+                type_comment=None,
+                type_params=[],
+                lineno=1,
+                col_offset=0,
+            )
+        )
+        return ast.Expr(
+            ast.Call(
+                func=ast.Name(id=fn_name, ctx=ast.Load()),
+                args=[ast.Name(id=name, ctx=ast.Load()) for name in arg_names],
+                keywords=[],
+            )
+        )
+
     def generate_evaluate_gradients(self) -> ast.FunctionDef:
         input_body: list[ast.stmt] = []
         function_body: list[ast.stmt] = []
@@ -467,19 +1036,85 @@ class NumpyCodeGen(PythonCodeGen[np.ndarray[Any, Any]]):
                     assign = ast.AugAssign(target=target, op=ast.Add(), value=source)
                     function_body.append(assign)
 
+        # Gradient statements of fused operations are emitted into a function
+        # of their group, which is called where the first of them would be.
+        fused_groups = {
+            key: group for group in self.fusion_groups for key in group.keys
+        }
+        fused_bodies: dict[str, list[ast.stmt]] = {}
+        fused_positions: dict[str, int] = {}
+        # Recomputed keys of a checkpoint segment are evaluated again before
+        # gradients of the first operation using them, and released after
+        # gradients of the last one.
+        recomputed_segments: list[list[str]] = []
+        remaining_users: list[set[str]] = []
+        segment_ids: dict[str, int] = {}
+        if self.checkpoint_plan is not None:
+            for keys, segment in zip(
+                self.checkpoint_plan.recomputed_keys,
+                self.checkpoint_plan.segments,
+                strict=True,
+            ):
+                users = {
+                    user
+                    for key in keys
+                    for user in [key, *self.pm.flat_graph.get_target_keys(key)]
+                    if user in segment
+                    and self._has_grad(user)
+                    and user not in self.pm.flat_graph.multi_node_keys
+                }
+                if not users:
+                    continue
+                segment_ids |= dict.fromkeys(users, len(recomputed_segments))
+                recomputed_segments.append(keys)
+                remaining_users.append(users)
+        recomputed_ids: set[int] = set()
+        recomputed_names: set[str] = set()
+        release_body: list[ast.stmt] = []
         for output_key in reversed(list(self.pm.flat_graph.topological_order)):
+            function_body += release_body
+            release_body = []
             if (
                 not self._has_grad(output_key)
                 or output_key in self.pm.flat_graph.multi_node_keys
             ):
                 continue
 
+            if (segment_id := segment_ids.get(output_key)) is not None:
+                users = remaining_users[segment_id]
+                keys = recomputed_segments[segment_id]
+                if segment_id not in recomputed_ids:
+                    recomputed_ids.add(segment_id)
+                    for key in keys:
+                        primitive_call, _used_keys = self.call_op(key)
+                        function_body.append(primitive_call)
+                        used_keys |= _used_keys
+                        recomputed_names.add(self._var_ref_ast(key, ast.Store()).id)
+                        recomputed_names.add(key)
+                users.discard(output_key)
+                if not users:
+                    for key in keys:
+                        release_body.append(
+                            ast.Delete(targets=[self._var_ref_ast(key, ast.Del())])
+                        )
+                        release_body += self.release_statements(key)
+
+            body = function_body
+            if (group := fused_groups.get(output_key)) is not None:
+                if group.output_key not in fused_bodies:
+                    fused_positions[group.output_key] = len(body)
+                body = fused_bodies.setdefault(group.output_key, [])
+
             # Iterate over Primitive models in topological order to add their formula.
             model = self.pm.flat_graph.get_op(output_key)
 
             output_key = self.pm.flat_graph.connections[output_key].key
             inputs = list(self.pm.flat_graph.get_source_keys(output_key))
 
+            if isinstance(model, ScanOp):
+                used_keys |= self.call_scan_grad(model, inputs, output_key, body)
+                continue
+
             # Check if the model is disposable.
             if model.disposable:
                 raise Exception(
@@ -607,7 +1242,7 @@ class NumpyCodeGen(PythonCodeGen[np.ndarray[Any, Any]]):
                     subkeys := self.pm.flat_graph.multi_node_keys.get(global_input_key)
                 ) is not None:
                     self._distribute_grads(
-                        global_input_key, generated_fn, subkeys, function_body
+                        global_input_key, generated_fn, subkeys, body
                     )
                 else:
                     target = ast.Subscript(
@@ -617,7 +1252,7 @@ class NumpyCodeGen(PythonCodeGen[np.ndarray[Any, Any]]):
                     )
                     if self.pm.data[global_input_key].is_tensor:
                         # Accumulate gradients for tensor data.
-                        function_body.append(
+                        body.append(
                             ast.AugAssign(
                                 target=target, op=ast.Add(), value=generated_fn
                             )
@@ -627,13 +1262,12 @@ class NumpyCodeGen(PythonCodeGen[np.ndarray[Any, Any]]):
                         # trainable data like list, tuple or dict. But for testing
                         # purposes we use this feature. This part should be removed
                         # after strategy of some testings updated (i.e. JSON tests.).
-                        function_body.append(
-                            ast.Assign(targets=[target], value=generated_fn)
-                        )
+                        body.append(ast.Assign(targets=[target], value=generated_fn))
 
                 used_keys |= _used_keys - {"output_gradient", "idx"}
+        function_body += release_body
 
-        for key in sorted(used_keys):
+        for key in sorted(used_keys - recomputed_names):
             if (
                 key
                 in self.pm.flat_graph.all_target_keys
@@ -648,6 +1282,21 @@ class NumpyCodeGen(PythonCodeGen[np.ndarray[Any, Any]]):
             if not self.is_static_scalar(key):
                 self.append_inputs(input_body, key, dict_type)
 
+        local_names = {"gradients"} | {
+            target.id
+            for stmt in input_body
+            if isinstance(stmt, ast.Assign)
+            for target in stmt.targets
+            if isinstance(target, ast.Name)
+        }
+        for output_key, position in reversed(fused_positions.items()):
+            if not fused_bodies[output_key]:
+                continue
+            function_body.insert(
+                position,
+                self.call_fused_grad(output_key, fused_bodies[output_key], local_names),
+            )
+
         ast_args = [
             ast.arg("params"),
             ast.arg("gradients"),
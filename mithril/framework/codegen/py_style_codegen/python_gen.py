@@ -15,15 +15,18 @@
 import ast
 import importlib
 import keyword
+import math
+import warnings
 from collections.abc import Callable
 from functools import partial
 from posixpath import basename, splitext
 from typing import Any, Generic, Protocol
 
-from ....backends.backend import ParallelBackend
+from ....backends.backend import Backend, ParallelBackend
 from ....common import PythonGenConfig
 from ....types import DataType
 from ....utils.func_utils import prepare_function_args
+from ....utils.type_utils import is_list_int
 from ...common import (
     DataEvalType,
     EvaluateAllType,
@@ -31,7 +34,8 @@ from ...common import (
     FinalCost,
     ParamsEvalType,
 )
-from ...logical import Operator
+from ...logical import Model, Operator, ScanOp
+from ...physical.jit import JitFunction
 from ...physical.model import PhysicalModel
 from ...utils import GeneratedFunction
 from ..code_gen import CodeGen
@@ -40,6 +44,8 @@ from ..utils import (
     convert_to_ast_kwarg,
     partial_array_creation_func,
 )
+from .checkpoint import CheckpointPlan, plan_checkpoints
+from .fusion import ELEMENTWISE_FORMULAS, FusionGroup, find_fusion_groups
 
 
 class RawEvaluateType(Protocol, Generic[DataType]):
@@ -77,7 +83,7 @@ class PythonCodeGen(CodeGen[Any], Generic[DataType]):
     def __init__(self, pm: PhysicalModel[DataType]) -> None:
         super().__init__(pm)
 
-        self.module = ast.parse("")
+        self.module: ast.Module = ast.parse("")
 
         # Tracks generated partial functions (e.g., for array creation)
         # to avoid passing redundant device/dtype arguments in the generated code.
@@ -88,10 +94,149 @@ class PythonCodeGen(CodeGen[Any], Generic[DataType]):
         self.globals: list[ast.stmt] = []
         self.functions: list[ast.stmt] = []
 
-        self.backend = self.pm.backend
+        self.backend: Backend[DataType] = self.pm.backend
 
         assert isinstance(self.backend.CODEGEN_CONFIG, PythonGenConfig)
-        self.configs = self.backend.CODEGEN_CONFIG
+        self.configs: PythonGenConfig = self.backend.CODEGEN_CONFIG
+
+        self.fusion_groups: list[FusionGroup] = []
+        if self.pm.elementwise_fusion:
+            self.fusion_groups = self.pm.fusion_groups = self.find_fusion_groups()
+
+        self.checkpoint_plan: CheckpointPlan | None = None
+        self.checkpoint_segments: list[list[str]] = []
+        if not self.pm.inference and (
+            self.pm.checkpoint_keys or self.pm.checkpoint_budget is not None
+        ):
+            self.checkpoint_plan = self.pm.checkpoint_plan = self.plan_checkpoints()
+            self.checkpoint_segments = self.find_checkpoint_segments()
+
+    def find_fusion_groups(self) -> list[FusionGroup]:
+        """Finds chains of elementwise operations which are evaluated in a single
+        fused function instead of one primitive call for each operation.
+        """
+        flat_graph = self.pm.flat_graph
+        ignored_keys = (
+            flat_graph.cached_data.keys()
+            | flat_graph.unused_keys
+            | self.pm.discarded_keys
+        )
+        fusible_keys = {
+            key
+            for key in flat_graph.topological_order
+            if key not in ignored_keys
+            and (formula_key := flat_graph.get_op(key).formula_key)
+            in ELEMENTWISE_FORMULAS
+            and formula_key in self.backend.op_function_dict
+            and self.pm.data[key].is_tensor
+        }
+        return find_fusion_groups(flat_graph, fusible_keys, ignored_keys)
+
+    def plan_checkpoints(self) -> CheckpointPlan:
+        """Plans segments of operations whose intermediate results are recomputed
+        in backward instead of being kept, either for the submodels marked for
+        checkpointing or for the given memory budget.
+        """
+        flat_graph = self.pm.flat_graph
+        ignored_keys = (
+            flat_graph.cached_data.keys()
+            | flat_graph.unused_keys
+            | self.pm.discarded_keys
+        )
+        order = [key for key in flat_graph.topological_order if key not in ignored_keys]
+        consumers = {
+            key: [
+                target_key
+                for target_key in flat_graph.get_target_keys(key)
+                if target_key not in ignored_keys
+            ]
+            for key in order
+        }
+        output_keys = set(flat_graph.output_dict.values())
+        fused_keys = {key for group in self.fusion_groups for key in group.keys}
+        itemsize = self.backend.precision // 8
+        key_sizes: dict[str, int] = {}
+        for key in order:
+            # Random and array creation operations are never recomputed, fused
+            # operations are evaluated together with their groups.
+            op = flat_graph.get_op(key)
+            if (
+                key in output_keys
+                or key in fused_keys
+                or fused_keys.intersection(consumers[key])
+                or isinstance(op, ScanOp)
+                or op.formula_key in self.backend.array_creation_funcs
+            ):
+                continue
+            edge = self.pm.data[key]
+            if not edge.is_tensor or edge.value_type is not float:
+                continue
+            assert edge.shape is not None
+            shape = edge.shape.get_shapes()
+            if is_list_int(shape):
+                key_sizes[key] = math.prod(shape) * itemsize
+
+        segments = None
+        if self.pm.checkpoint_keys:
+            segments = [
+                [key for key in order if key in keys]
+                for keys in self.pm.checkpoint_keys
+            ]
+        return plan_checkpoints(
+            order, consumers, key_sizes, segments, self.pm.checkpoint_budget
+        )
+
+    def find_checkpoint_segments(self) -> list[list[str]]:
+        """Finds segments of the checkpoint plan which are evaluated in separate
+        functions wrapped with the checkpoint function of the backend.
+        """
+        assert self.checkpoint_plan is not None
+        if "checkpoint" not in self.backend.op_function_dict:
+            warnings.warn(
+                f"{self.backend.backend_type} backend does not support activation "
+                "checkpointing, all intermediate results are kept!",
+                stacklevel=2,
+            )
+            return []
+
+        flat_graph = self.pm.flat_graph
+        order = list(flat_graph.topological_order)
+        positions = {key: idx for idx, key in enumerate(order)}
+        ignored_keys = (
+            flat_graph.cached_data.keys()
+            | flat_graph.unused_keys
+            | self.pm.discarded_keys
+        )
+        segments: list[list[str]] = []
+        for keys, recomputed_keys in zip(
+            self.checkpoint_plan.segments,
+            self.checkpoint_plan.recomputed_keys,
+            strict=True,
+        ):
+            if not recomputed_keys:
+                continue
+            members = set(keys)
+            for group in self.fusion_groups:
+                # Fused groups are kept as a whole in or out of segments.
+                if not members.issuperset(group.keys):
+                    members -= set(group.keys)
+            segment = sorted(members, key=positions.__getitem__)
+            # Segment is evaluated at once in place of its last operation, so
+            # none of the operations in between could consume its results.
+            in_between = order[positions[segment[0]] : positions[segment[-1]]]
+            if any(
+                members.intersection(flat_graph.get_source_keys(key))
+                for key in in_between
+                if key not in members and key not in ignored_keys
+            ):
+                warnings.warn(
+                    f"Checkpoint segment ending with {segment[-1]} is interleaved "
+                    "with operations using its results, it is not checkpointed!",
+                    stacklevel=2,
+                )
+                continue
+            segments.append(segment)
+        return segments
 
     def generate_code(self, file_path: str | None = None) -> None:
         self.file_path = file_path
@@ -109,6 +254,15 @@ class PythonCodeGen(CodeGen[Any], Generic[DataType]):
         if file_path is not None:
             self.write_code(file_path)
 
+    def load_code(self, code: str, file_path: str | None = None) -> None:
+        # Uses previously generated code (e.g. from compile cache) instead
+        # of generating it again.
+        self.file_path = file_path
+        self.code = code
+
+        if file_path is not None:
+            self.write_code(file_path)
+
     def generate_functions(self) -> list[ast.FunctionDef]:
         return [self.generate_evaluate()]
 
@@ -144,6 +298,8 @@ class PythonCodeGen(CodeGen[Any], Generic[DataType]):
             )
             module = importlib.util.module_from_spec(module_spec)  # type: ignore
             module_spec.loader.exec_module(module)  # type: ignore
+            for name, value in self.runtime_globals().items():
+                setattr(module, name, value)
             eval_fn: EvaluateType[DataType] = module.evaluate
             eval_grad_fn = (
                 module.evaluate_gradients
@@ -156,7 +312,8 @@ class PythonCodeGen(CodeGen[Any], Generic[DataType]):
         # and execute it to define the function
 
         compiled_code = compile(self.code, "<string>", "exec")
-        result: dict[str, Any] = {}
+        namespace = self.runtime_globals()
+        result: dict[str, Any] = dict(namespace)
         exec(compiled_code, result)
         evaluate_fn = result["evaluate"]
         evaluate_grad_fn = result.get("evaluate_gradients")
@@ -172,9 +329,9 @@ class PythonCodeGen(CodeGen[Any], Generic[DataType]):
         }
 
         # Wrap the generated function in a class that can be pickled
-        eval_fn = GeneratedFunction(evaluate_fn, evaluate_metadata)
+        eval_fn = GeneratedFunction(evaluate_fn, evaluate_metadata, namespace)
         grad_fn = (
-            GeneratedFunction(evaluate_grad_fn, evaluate_grad_metadata)
+            GeneratedFunction(evaluate_grad_fn, evaluate_grad_metadata, namespace)
             if evaluate_grad_fn is not None
             else None
         )
@@ -192,7 +349,8 @@ class PythonCodeGen(CodeGen[Any], Generic[DataType]):
 
         1. If the backend is parallel, going to register the functions to the backend.
         2. If the backend is manualgrad, going to wrap the eval_grad function.
-        3. If jit is True, going to compile the functions with jit fn.
+        3. If jit is True, going to compile the functions with jit fn. On JAX,
+           jit options of the model are applied and traces are recorded.
         """
 
         eval_fn: EvaluateType[DataType] | partial[Any] = partial(
@@ -217,6 +375,30 @@ class PythonCodeGen(CodeGen[Any], Generic[DataType]):
                 ), "Evaluate all function is not defined!"
                 self.pm.backend.register_callable(evaluate_all_fn, jit)
 
+        elif jit and self.pm.backend.backend_type == "jax":
+            # Traces are recorded and jit options (e.g. donation) are applied.
+            state_keys = [item.in_key for item in self.pm.state_keys]
+            eval_fn = JitFunction(
+                self.pm.backend,
+                eval_fn,
+                "evaluate",
+                self.pm.trace_log,
+                self.pm.jit_options,
+                state_keys=state_keys,
+            )
+            if not self.pm.inference:
+                assert (
+                    evaluate_all_fn is not None
+                ), "Evaluate all function is not defined!"
+                evaluate_all_fn = JitFunction(
+                    self.pm.backend,
+                    evaluate_all_fn,
+                    "evaluate_all",
+                    self.pm.trace_log,
+                    self.pm.jit_options,
+                    state_keys=state_keys,
+                )
+
         elif jit and not self.pm.backend.is_manualgrad:
             eval_fn = self.pm.backend.jit(eval_fn)
             if not self.pm.inference:
@@ -312,6 +494,261 @@ class PythonCodeGen(CodeGen[Any], Generic[DataType]):
 
         return ast.Assign(targets, generated_fn), used_keys | _used_keys
 
+    def fused_fn_name(self, output_key: str) -> str:
+        return f"{output_key}_fused"
+
+    def call_fused(self, group: FusionGroup) -> tuple[ast.Assign, set[str]]:
+        # Operations of the group are emitted into a separate function which
+        # takes the inputs of the group and returns its output.
+        body: list[ast.stmt] = []
+        used_keys: set[str] = set()
+        target_names: set[str] = set()
+        for key in group.keys:
+            op, g_input_keys, l_input_keys = self.get_op_details(key)
+            fn = self.backend.op_function_dict[op.formula_key]
+            primitive_call, _used_keys = self.call_primitive(
+                op, fn, l_input_keys, g_input_keys, key, op.formula_key
+            )
+            body.append(primitive_call)
+            used_keys |= _used_keys
+            target_names.add(self._var_ref_ast(key, ast.Store()).id)
+        body.append(ast.Return(self._var_ref_ast(group.output_key, ast.Load())))
+
+        arg_names = sorted(
+            {
+                self._var_ref_ast(key, ast.Load()).id
+                for key in used_keys
+                if not self.is_static_scalar(key)
+            }
+            - target_names
+        )
+        fn_name = self.fused_fn_name(group.output_key)
+        self.globals.append(
+            ast.FunctionDef(
+                name=fn_name,
+                args=ast.arguments(
+                    posonlyargs=[],
+                    args=[ast.arg(name) for name in arg_names],
+                    defaults=[],
+                    kwonlyargs=[],
+                    kw_defaults=[],
+                    vararg=None,
+                    kwarg=None,
+                ),
+                body=body,
+                decorator_list=[],
+                returns=None,
+                type_comment=None,
+                type_params=[],
+                lineno=1,
+                col_offset=0,
+            )
+        )
+        args: list[ast.expr] = [ast.Name(name, ast.Load()) for name in arg_names]
+        targets: list[ast.expr] = [self._var_ref_ast(group.output_key, ast.Store())]
+        return ast.Assign(targets, self.fused_call(fn_name, args)), used_keys
+
+    def fused_call(self, fn_name: str, args: list[ast.expr]) -> ast.expr:
+        return ast.Call(func=ast.Name(fn_name, ast.Load()), args=args, keywords=[])
+
+    def checkpoint_fn_name(self, output_key: str) -> str:
+        return f"{output_key}_checkpoint"
+
+    def call_checkpointed(self, keys: list[str]) -> tuple[ast.Assign, set[str]]:
+        # Operations of the segment are emitted into a separate function which
+        # returns the results used outside of the segment. The function is
+        # called through the checkpoint function of the backend, so that its
+        # intermediate results are recomputed in backward.
+        flat_graph = self.pm.flat_graph
+        ignored_keys = (
+            flat_graph.cached_data.keys()
+            | flat_graph.unused_keys
+            | self.pm.discarded_keys
+        )
+        output_keys = set(flat_graph.output_dict.values())
+        fused_groups = {
+            key: group for group in self.fusion_groups for key in group.keys
+        }
+        body: list[ast.stmt] = []
+        used_keys: set[str] = set()
+        target_names: set[str] = set()
+        for key in keys:
+            group = fused_groups.get(key)
+            if group is None:
+                primitive_call, _used_keys = self.call_op(key)
+                body.append(primitive_call)
+                used_keys |= _used_keys
+            elif key == group.output_key:
+                primitive_call, _used_keys = self.call_fused(group)
+                body.append(primitive_call)
+                used_keys |= _used_keys
+            target_names.add(self._var_ref_ast(key, ast.Store()).id)
+
+        results = [
+            key
+            for key in keys
+            if key in output_keys
+            or any(
+                target_key not in keys and target_key not in ignored_keys
+                for target_key in flat_graph.get_target_keys(key)
+            )
+        ]
+        body.append(
+            ast.Return(
+                ast.Tuple(
+                    [self._var_ref_ast(key, ast.Load()) for key in results], ast.Load()
+                )
+            )
+        )
+
+        arg_names: list[str] = sorted(
+            {
+                self._var_ref_ast(key, ast.Load()).id
+                for key in used_keys
+                if not self.is_static_scalar(key)
+            }
+            - target_names
+        )
+        fn_name = self.checkpoint_fn_name(keys[-1])
+        self.globals.append(
+            ast.FunctionDef(
+                name=fn_name,
+                args=ast.arguments(
+                    posonlyargs=[],
+                    args=[ast.arg(name) for name in arg_names],
+                    defaults=[],
+                    kwonlyargs=[],
+                    kw_defaults=[],
+                    vararg=None,
+                    kwarg=None,
+                ),
+                body=body,
+                decorator_list=[],
+                returns=None,
+                type_comment=None,
+                type_params=[],
+                lineno=1,
+                col_offset=0,
+            )
+        )
+        targets: list[ast.expr] = [
+            ast.Tuple(
+                [self._var_ref_ast(key, ast.Store()) for key in results], ast.Store()
+            )
+        ]
+        generated_fn = ast.Call(
+            func=ast.Name(id="checkpoint", ctx=ast.Load()),
+            args=[
+                ast.Name(id=fn_name, ctx=ast.Load()),
+                *(ast.Name(id=name, ctx=ast.Load()) for name in arg_names),
+            ],
+            keywords=[],
+        )
+        return ast.Assign(targets, generated_fn), used_keys
+
+    def scan_body_name(self, output_key: str) -> str:
+        return f"{output_key}_scan_body"
+
+    def call_scan(
+        self,
+        op: ScanOp,
+        l_input_keys: list[str],
+        g_input_keys: list[str],
+        output_key: str,
+    ) -> tuple[ast.Assign, set[str]]:
+        # Compiled body of the scan is not a part of the generated code, it is
+        # injected into the module globals with scan_body_name.
+        inputs = dict(zip(l_input_keys, g_input_keys, strict=False))
+        args: list[ast.expr] = [
+            ast.Name(id=self.scan_body_name(output_key), ctx=ast.Load()),
+            self._scan_inputs_ast(inputs, list(op.carries)),
+            self._scan_inputs_ast(inputs, op.sequences),
+            self._scan_inputs_ast(inputs, op.shared_keys),
+            *self._scan_attributes_ast(op),
+        ]
+        keywords: list[ast.keyword] = []
+        # Manual gradient backends have their cache as an additional input.
+        if (cache_key := inputs.get("cache")) is not None:
+            keywords.append(
+                ast.keyword(arg="cache", value=self._var_ref_ast(cache_key, ast.Load()))
+            )
+        generated_fn = ast.Call(
+            func=ast.Name(id=op.formula_key, ctx=ast.Load()),
+            args=args,
+            keywords=keywords,
+        )
+        targets, used_keys = self.create_primitive_call_targets(
+            output_key, op, self.pm.inference
+        )
+        return ast.Assign(targets, generated_fn), used_keys | set(inputs.values())
+
+    def _scan_inputs_ast(self, inputs: dict[str, str], keys: list[str]) -> ast.Dict:
+        # Scan inputs are grouped by their roles and passed as dicts
+        # keyed with the input names of the body.
+        return ast.Dict(
+            keys=[ast.Constant(key) for key in keys],
+            values=[self._var_ref_ast(inputs[key], ast.Load()) for key in keys],
+        )
+
+    def _scan_attributes_ast(self, op: ScanOp) -> list[ast.expr]:
+        carries = ast.Dict(
+            keys=[ast.Constant(key) for key in op.carries],
+            values=[ast.Constant(value) for value in op.carries.values()],
+        )
+        return [carries, ast.Constant(op.body_output)]
+
+    def runtime_globals(self) -> dict[str, Any]:
+        # Objects referenced by generated code which are bound into its globals
+        # after compilation, i.e. compiled bodies of scan operations.
+        return dict(self.compile_scan_bodies())
+
+    def compile_scan_bodies(self) -> dict[str, PhysicalModel[DataType]]:
+        """Compiles body of each scan operation with the shapes inferred in
+        the model. Returns compiled bodies with their names in generated code.
+        """
+        bodies: dict[str, PhysicalModel[DataType]] = {}
+        shapes = None
+        for output_key in self.pm.flat_graph.topological_order:
+            op = self.pm.flat_graph.get_op(output_key)
+            if not isinstance(op, ScanOp):
+                continue
+            assert isinstance(op.body, Model)
+            if shapes is None:
+                shapes = self.pm.shapes
+
+            body_shapes: dict[str, list[int]] = {}
+            g_input_keys = self.pm.flat_graph.get_source_keys(output_key)
+            for key, g_key in zip(op.input_keys, g_input_keys, strict=False):
+                shape = shapes.get(g_key)
+                if not isinstance(shape, list):
+                    continue
+                if key in op.sequences:
+                    shape = shape[1:]
+                if all(isinstance(dim, int) for dim in shape):
+                    body_shapes[key] = shape  # type: ignore
+
+            body_pm = PhysicalModel[DataType](
+                model=op.body,
+                backend=self.pm.backend,
+                data_keys=set(),
+                constant_keys={},
+                # All inputs are trainable in order to get gradients of carries
+                # and sequences in manual gradient backends.
+                trainable_keys=set(op.input_keys),
+                discard_keys=set(),
+                shapes=body_shapes,
+                inference=self.pm.inference,
+                safe_shapes=True,
+                safe_names=True,
+                use_short_namings=True,
+                jit=False,
+            )
+            codegen = type(self)(body_pm)
+            codegen.generate_code()
+            body_pm.generate_functions(*codegen.compile_code(jit=False))
+            bodies[self.scan_body_name(output_key)] = body_pm
+        return bodies
+
     def generate_evaluate(self) -> ast.FunctionDef:
         input_body: list[ast.stmt] = []
         function_body: list[ast.stmt] = []
@@ -329,39 +766,51 @@ class PythonCodeGen(CodeGen[Any], Generic[DataType]):
 
         determined_keys = cached_data_keys | unused_keys | discarded_keys
 
-        # Iterate over ops in topological order to add their formula.
-        for output_key in self.pm.flat_graph.topological_order:
-            # Get operator details
-            op, g_input_keys, l_input_keys = self.get_op_details(output_key)
-            formula_key = op.formula_key
-
-            if formula_key in self.pm.backend.op_function_dict:
-                primitive_function = self.pm.backend.op_function_dict[formula_key]
-            elif formula_key in self.pm.backend.registered_primitives:
-                primitive_function = self.pm.backend.registered_primitives[formula_key]
-            else:
-                raise ValueError(
-                    f"Formula key {formula_key} not found in primitive function dict or"
-                    " registered primitives"
-                )
-
-            # Create primitive call
-            primitive_call, _used_keys = self.call_primitive(
-                op,
-                primitive_function,
-                l_input_keys,
-                g_input_keys,
-                output_key,
-                formula_key,
-            )
+        fused_groups = {
+            key: group for group in self.fusion_groups for key in group.keys
+        }
+        checkpointed = {
+            key: segment for segment in self.checkpoint_segments for key in segment
+        }
 
-            used_keys |= _used_keys
-            used_keys.add(output_key)
-            assigned_output_keys.add(output_key)
-            function_body.append(primitive_call)
+        # Iterate over levels of ops to add their formula, ops of a level do not
+        # depend on each other.
+        for level in self.evaluation_levels():
+            calls: list[tuple[str, ast.stmt]] = []
+            level_input_keys: list[str] = []
+            for output_key in level:
+                # Create primitive call
+                if (segment := checkpointed.get(output_key)) is not None:
+                    if output_key != segment[-1]:
+                        # Operation is evaluated in the function of its segment.
+                        continue
+                    primitive_call, _used_keys = self.call_checkpointed(segment)
+                    members = segment
+                elif (group := fused_groups.get(output_key)) is not None:
+                    if output_key != group.output_key:
+                        # Operation is evaluated in the fused function of its group.
+                        continue
+                    primitive_call, _used_keys = self.call_fused(group)
+                    members = group.keys
+                else:
+                    primitive_call, _used_keys = self.call_op(output_key)
+                    members = [output_key]
+
+                level_input_keys += [
+                    key
+                    for member in members
+                    for key in self.pm.flat_graph.get_source_keys(member)
+                    if key not in members
+                ]
+                assigned_output_keys.update(members)
+                used_keys |= _used_keys
+                used_keys.add(output_key)
+                assigned_output_keys.add(output_key)
+                calls.append((output_key, primitive_call))
+            function_body += self.schedule_calls(calls)
 
             # Add deletion logic for intermediate variables
-            for used_key in g_input_keys:
+            for used_key in level_input_keys:
                 if not self._check_deletable(
                     used_key,
                     deleted_vars,
@@ -374,6 +823,7 @@ class PythonCodeGen(CodeGen[Any], Generic[DataType]):
                     targets=[self._var_ref_ast(used_key, ast.Del())]
                 )
                 function_body.append(delete_stmt)
+                function_body += self.release_statements(used_key)
                 deleted_vars.add(used_key)
 
         for key in sorted(used_keys):
@@ -440,6 +890,44 @@ class PythonCodeGen(CodeGen[Any], Generic[DataType]):
         )
         return ast.fix_missing_locations(func_def)
 
+    def call_op(self, output_key: str) -> tuple[ast.Assign, set[str]]:
+        # Get operator details
+        op, g_input_keys, l_input_keys = self.get_op_details(output_key)
+        formula_key = op.formula_key
+
+        if formula_key in self.pm.backend.op_function_dict:
+            primitive_function = self.pm.backend.op_function_dict[formula_key]
+        elif formula_key in self.pm.backend.registered_primitives:
+            primitive_function = self.pm.backend.registered_primitives[formula_key]
+        else:
+            raise ValueError(
+                f"Formula key {formula_key} not found in primitive function dict or"
+                " registered primitives"
+            )
+
+        if isinstance(op, ScanOp):
+            return self.call_scan(op, l_input_keys, g_input_keys, output_key)
+        return self.call_primitive(
+            op,
+            primitive_function,
+            l_input_keys,
+            g_input_keys,
+            output_key,
+            formula_key,
+        )
+
+    def evaluation_levels(self) -> list[list[str]]:
+        # Ops are evaluated one by one in topological order by default.
+        return [[key] for key in self.pm.flat_graph.topological_order]
+
+    def schedule_calls(self, calls: list[tuple[str, ast.stmt]]) -> list[ast.stmt]:
+        # Statements evaluating the ops of a level with their output keys.
+        return [call for _, call in calls]
+
+    def release_statements(self, key: str) -> list[ast.stmt]:
+        # Statements emitted after the variable of key is deleted in evaluate.
+        return []
+
     def add_partial_function(self, formula_key: str) -> None:
         # Simply creates partial functions for array creation fns
         # To avoid redundant argument passing for array creation fns
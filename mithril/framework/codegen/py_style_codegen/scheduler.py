@@ -0,0 +1,58 @@
+# Copyright 2022 Synnada, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from collections.abc import Mapping, Sequence
+
+# Supported strategies for evaluating operations of generated functions.
+EXECUTORS = ("serial", "threads")
+
+
+def levelize(
+    order: Sequence[str], inputs: Mapping[str, Sequence[str]]
+) -> list[list[str]]:
+    """Groups operations into levels where each operation only depends on the
+    operations of previous levels, so that operations of a level could be
+    evaluated in any order or at the same time.
+
+    Level of an operation is one more than the deepest level of the operations
+    producing its inputs, i.e. operations are scheduled as soon as possible.
+
+    Parameters
+    ----------
+    order : Sequence[str]
+        Output keys of all operations in (topological) execution order.
+    inputs : Mapping[str, Sequence[str]]
+        Input keys of the operation of each output key.
+
+    Returns
+    -------
+    list[list[str]]
+        Output keys of the operations of each level in execution order.
+    """
+    depths: dict[str, int] = {}
+    levels: list[list[str]] = []
+    for key in order:
+        depth = max(
+            (
+                depths[input_key] + 1
+                for input_key in inputs.get(key, ())
+                if input_key in depths
+            ),
+            default=0,
+        )
+        depths[key] = depth
+        if depth == len(levels):
+            levels.append([])
+        levels[depth].append(key)
+    return levels
@@ -14,13 +14,30 @@
 
 from __future__ import annotations
 
-from collections.abc import Callable, Iterator, KeysView, Mapping, Sequence
+import heapq
+import time
+from collections import Counter
+from collections.abc import (
+    Callable,
+    Iterable,
+    Iterator,
+    KeysView,
+    Mapping,
+    Sequence,
+)
 from copy import copy, deepcopy
 from dataclasses import dataclass, field
 from enum import Enum
 from functools import partial, reduce
-from itertools import chain, combinations, cycle, product, zip_longest
-from types import EllipsisType, GenericAlias, UnionType
+from itertools import chain, combinations, count, cycle, product, zip_longest
+from types import (
+    BuiltinFunctionType,
+    EllipsisType,
+    FunctionType,
+    GenericAlias,
+    MethodType,
+    UnionType,
+)
 from typing import (
     Any,
     Generic,
@@ -44,6 +61,7 @@ from ..types import (
     constant_type_table,
 )
 from ..utils.type_utils import is_union_type
+from .profiler import get_active_profiler, profile_phase
 from .utils import (
     align_shapes,
     sort_type,
@@ -64,7 +82,9 @@ __all__ = [
     "get_summary_shapes",
     "get_summary_types",
     "ConstraintSolver",
+    "SolverStats",
     "Constant",
+    "structural_clone",
 ]
 
 
@@ -115,6 +135,101 @@ class ToBeDetermined(SingletonObject):
 NOT_GIVEN = NullConnection()
 TBD = ToBeDetermined()
 
+# Types of objects which are never mutated during compilation, so they are
+# shared between logical and physical data instead of being copied.
+_ATOMIC_TYPES: set[type] = {
+    int,
+    float,
+    bool,
+    complex,
+    str,
+    bytes,
+    type(None),
+    EllipsisType,
+    type,
+    UnionType,
+    GenericAlias,
+    FunctionType,
+    BuiltinFunctionType,
+    MethodType,
+    NullConnection,
+    ToBeDetermined,
+}
+_SHARED_TYPES = (type, Enum, SingletonObject)
+
+_T = TypeVar("_T")
+
+
+def structural_clone(obj: _T, memo: dict[int, Any]) -> _T:
+    """Clones given logical data structure as a drop-in replacement of deepcopy.
+
+    Immutable objects (scalars, types, functions, enums, singletons) are shared,
+    builtin containers are rebuilt element-wise and objects implementing
+    __deepcopy__ are dispatched directly, skipping the generic reduce based
+    machinery of deepcopy. Any other object falls back to deepcopy with the same
+    memo, so both can be used together on the same object graph.
+    """
+    cls = type(obj)
+    if cls in _ATOMIC_TYPES:
+        return obj
+    if (copied := memo.get(id(obj))) is not None:
+        return copied
+    source: Any = obj
+    result: Any
+    if cls is list:
+        result = []
+        memo[id(obj)] = result
+        result.extend([structural_clone(item, memo) for item in source])
+    elif cls is dict:
+        result = {}
+        memo[id(obj)] = result
+        for key, value in source.items():
+            result[structural_clone(key, memo)] = structural_clone(value, memo)
+    elif cls is set:
+        result = {structural_clone(item, memo) for item in source}
+        memo[id(obj)] = result
+    elif cls is tuple:
+        items = [structural_clone(item, memo) for item in source]
+        # Tuples only holding shared objects are shared as well.
+        if all(a is b for a, b in zip(items, source, strict=True)):
+            result = obj
+        else:
+            result = tuple(items)
+        memo[id(obj)] = result
+    elif (copier := getattr(cls, "__deepcopy__", None)) is not None:
+        result = copier(obj, memo)
+    elif isinstance(obj, _SHARED_TYPES) or get_origin(obj) is not None:
+        result = obj
+    else:
+        result = deepcopy(obj, memo)
+    return result
+
+
+def _clone_instance(
+    obj: _T, memo: dict[int, Any], first: str | None = None, shared: str | None = None
+) -> _T:
+    # Field-wise clone used by __deepcopy__ methods of logical data classes.
+    # "first" attribute is cloned before others and "shared" attribute is kept
+    # by reference since it is never mutated in place.
+    if (copied := memo.get(id(obj))) is not None:
+        return copied
+    cls = obj.__class__
+    new_instance = cls.__new__(cls)
+    memo[id(obj)] = new_instance
+    if first is not None:
+        structural_clone(getattr(obj, first), memo)
+    if (slots := getattr(cls, "__slots__", None)) is not None:
+        for key in slots:
+            setattr(new_instance, key, structural_clone(getattr(obj, key), memo))
+    else:
+        new_instance.__dict__.update(
+            {
+                key: value if key == shared else structural_clone(value, memo)
+                for key, value in obj.__dict__.items()
+            }
+        )
+    return new_instance
+
 
 class UpdateType(Enum):
     SHAPE = 1
@@ -279,6 +394,24 @@ class EvaluateAllType(Protocol, Generic[DataType]):
     ) -> tuple[DataEvalType[DataType], ParamsEvalType[DataType]]: ...
 
 
+class OptimizerType(Protocol, Generic[DataType]):
+    def update_params(
+        self,
+        parameters: ParamsEvalType[DataType],
+        gradients: ParamsEvalType[DataType],
+        state: Any,
+    ) -> tuple[ParamsEvalType[DataType], Any]: ...
+
+
+class TrainStepType(Protocol, Generic[DataType]):
+    def __call__(
+        self,
+        params: ParamsEvalType[DataType],
+        data: DataEvalType[DataType] | None,
+        opt_state: Any,
+    ) -> tuple[DataEvalType[DataType], ParamsEvalType[DataType], Any]: ...
+
+
 class AssignedConstraintType(TypedDict):
     fn: str
     keys: list[str]
@@ -310,6 +443,17 @@ def update_equivalence_table(
             lookup_table[_item] = item_set1
 
 
+@dataclass
+class SolverStats:
+    # Number of evaluations per constraint function name.
+    evaluations: Counter[str] = field(default_factory=lambda: Counter())
+    enqueued: int = 0
+    # Number of re-enqueues of constraints which were already in the worklist.
+    deduplicated: int = 0
+    # Number of constraints whose inputs did not change since their last run.
+    skipped: int = 0
+
+
 @dataclass
 class ConstraintSolver:
     symbol_store: dict[int, Uniadic] = field(
@@ -321,20 +465,45 @@ class ConstraintSolver:
     constraint_map: dict[Constraint, list[IOHyperEdge]] = field(
         default_factory=lambda: {}
     )
+    stats: SolverStats = field(default_factory=lambda: SolverStats())
+
+    def __deepcopy__(self, memo: dict[int, Any]) -> ConstraintSolver:
+        return _clone_instance(self, memo)
 
     def __call__(self, updates: Updates) -> None:
-        self.update_shapes(updates)
-        # Here we are updating Updates object because we are
-        # using it in DataStore's `update_cached_data`.
-        updates |= self.solver_loop(updates.constraints)
+        with profile_phase("constraint_solver"):
+            self.update_shapes(updates)
+            # Here we are updating Updates object because we are
+            # using it in DataStore's `update_cached_data`.
+            updates |= self.solver_loop(updates.constraints)
 
     def solver_loop(self, constraints: set[Constraint]) -> Updates:
         updates = Updates()
-        while constraints:
-            constr = constraints.pop()
+        profiler = get_active_profiler()
+        # Worklist is ordered by cost of constraints and then by their creation
+        # order which follows the order models are extended, so that cheap and
+        # upstream constraints settle before the ones depending on them.
+        worklist: list[tuple[int, int, int, Constraint]] = []
+        queued: set[Constraint] = set()
+        self._enqueue(worklist, queued, constraints)
+        while worklist:
+            *_, constr = heapq.heappop(worklist)
+            queued.remove(constr)
             if (not constr.parents) and (constr in self.constraint_map):
+                if constr.evaluated > constr.changed:
+                    # Constraint has already seen all changes of its inputs.
+                    self.stats.skipped += 1
+                    continue
                 hyper_edges = self.constraint_map[constr]
-                status, newly_added_symbols = constr(hyper_edges)
+                if profiler is None:
+                    status, newly_added_symbols = constr(hyper_edges)
+                else:
+                    start = time.perf_counter()
+                    status, newly_added_symbols = constr(hyper_edges)
+                    profiler.record_constraint(constr.name, time.perf_counter() - start)
+                self.stats.evaluations[constr.name] += 1
+                # Stamped after the call, so its own updates do not re-trigger it.
+                constr.evaluated = next(_change_stamps)
                 if UpdateType.SHAPE in constr.types:
                     self.update_shapes(newly_added_symbols)
                 updates |= newly_added_symbols
@@ -346,10 +515,28 @@ class ConstraintSolver:
                     for hyper_edge in hyper_edges:
                         hyper_edge.remove_constraint(constr)
 
-                constraints |= new_constraints
-                constraints.discard(constr)
+                # Updates of a constraint do not re-trigger itself.
+                new_constraints.discard(constr)
+                self._enqueue(worklist, queued, new_constraints)
         return updates
 
+    def _enqueue(
+        self,
+        worklist: list[tuple[int, int, int, Constraint]],
+        queued: set[Constraint],
+        constraints: set[Constraint],
+    ) -> None:
+        for constr in constraints:
+            if constr in queued:
+                self.stats.deduplicated += 1
+            else:
+                queued.add(constr)
+                # Number of enqueues breaks ties between copies of a constraint
+                # (e.g. in deepcopied models) which share the same order.
+                priority = (constr.cost, constr.order, self.stats.enqueued)
+                heapq.heappush(worklist, (*priority, constr))
+                self.stats.enqueued += 1
+
     @staticmethod
     def _combine_nodes(updates: Updates) -> None:
         # Check if any node could be reduced after variadic updates add into
@@ -530,19 +717,23 @@ class Updates:
             case Variadic():
                 self._add_variadic(symbol)
             case IOHyperEdge():
-                self.constraints |= symbol.constraints[update_type]
+                self.add_constraints(symbol.constraints[update_type])
 
-    def _add_uniadic(self, symbol: Uniadic) -> None:
+    def _add_uniadic(self, symbol: Uniadic, add_constraints: bool = True) -> None:
         self.uniadic_updates.add(symbol)
-        all_tensors = {
-            tensor for repr in symbol.metadata.reprs for tensor in repr.node.referees
-        }
-        self.shape_updates.update(all_tensors)
-        self.constraints |= set().union(
-            *(
-                edge.constraints[UpdateType.SHAPE]
-                for tensor in all_tensors
-                for edge in tensor.referees
+        self.shape_updates.update(_uniadic_tensors(symbol))
+        if add_constraints:
+            self._add_uniadic_constraints(symbol)
+
+    def _add_uniadic_constraints(self, symbol: Uniadic) -> None:
+        all_tensors = _uniadic_tensors(symbol)
+        self.add_constraints(
+            set().union(
+                *(
+                    edge.constraints[UpdateType.SHAPE]
+                    for tensor in all_tensors
+                    for edge in tensor.referees
+                )
             )
         )
 
@@ -552,7 +743,15 @@ class Updates:
             for tensor in repr.node.referees:
                 self.shape_updates.add(tensor)
                 for edge in tensor.referees:
-                    self.constraints |= edge.constraints[UpdateType.SHAPE]
+                    self.add_constraints(edge.constraints[UpdateType.SHAPE])
+
+    def add_constraints(self, constraints: Iterable[Constraint]) -> None:
+        # Constraints are stamped with the change triggering them, so that the
+        # solver could skip the ones which already run after this change.
+        stamp = next(_change_stamps)
+        for constr in constraints:
+            constr.changed = stamp
+            self.constraints.add(constr)
 
     def __ior__(self, other: Updates) -> Updates:
         self.constraints |= other.constraints
@@ -1144,6 +1343,10 @@ class Tensor(Generic[TypeVarTensorType]):
             self.set_value(value)
         self.is_used = False
 
+    def __deepcopy__(self, memo: dict[int, Any]) -> Tensor[TypeVarTensorType]:
+        # Tensor values are never mutated in place, so they are shared.
+        return _clone_instance(self, memo, shared="value")
+
     def set_type(self, typ: _TensorTypes) -> Updates:
         updates = Updates()
         if self.type != (new_type := find_intersection_type(typ, self.type)):
@@ -1275,6 +1478,9 @@ class IOHyperEdge:
         if value is not TBD:
             self.set_value(value)
 
+    def __deepcopy__(self, memo: dict[int, Any]) -> IOHyperEdge:
+        return _clone_instance(self, memo)
+
     @property
     def _temp_shape(self) -> ShapeRepr | None:
         if isinstance(self._value, Tensor):
@@ -1620,6 +1826,15 @@ class IOHyperEdge:
         return Updates()
 
 
+def _uniadic_tensors(uni: Uniadic) -> set[Tensor[int | float | bool]]:
+    return {tensor for repr in uni.metadata.reprs for tensor in repr.node.referees}
+
+
+def _num_referees(reprs: Iterable[ShapeRepr]) -> int:
+    # Number of tensors referring to given shape representations.
+    return sum(len(repr.node.referees) for repr in reprs)
+
+
 class Uniadic:
     def __init__(self, value: int | set[int] | None = None) -> None:
         # TODO: we could accept *value as input to initialize Uniadic.
@@ -1642,6 +1857,9 @@ class Uniadic:
     def __hash__(self) -> int:
         return hash(id(self))
 
+    def __deepcopy__(self, memo: dict[int, Any]) -> Uniadic:
+        return _clone_instance(self, memo)
+
     def __eq__(self, other: Uniadic) -> bool:  # type: ignore
         return id(self.metadata) == id(other.metadata)
 
@@ -1664,7 +1882,12 @@ class Uniadic:
             if self.value == other.value and (
                 len(self.metadata.reprs_dict) > 0 and len(other.metadata.reprs_dict) > 0
             ):
-                updates.add(self)
+                # Constraints of the shapes already referring to the larger
+                # record see no change, only the smaller side is re-triggered.
+                updates._add_uniadic(self, add_constraints=False)
+                updates._add_uniadic_constraints(
+                    min(self, other, key=lambda uni: _num_referees(uni.reprs))
+                )
             else:
                 main_pos_val = copy(self.possible_values)
                 updates |= self.update_possible_values(other.possible_values)
@@ -1708,15 +1931,7 @@ class UniadicRecord:
             return None
 
     def __deepcopy__(self, memo: dict[int, Any]) -> UniadicRecord:
-        if id(self) in memo:
-            return memo[id(self)]
-        new_instance = self.__class__.__new__(self.__class__)
-        memo[id(self)] = new_instance
-        # First copy referee Uniadics.
-        deepcopy(self.referees, memo)
-        for k, v in self.__dict__.items():
-            setattr(new_instance, k, deepcopy(v, memo))
-        return new_instance
+        return _clone_instance(self, memo, first="referees")
 
     def update_possible_values(self, values: int | set[int] | None) -> set[int] | None:
         # TODO: Check if all elements of set are int!
@@ -1777,6 +1992,9 @@ class Equivalences:
     uniadics: set[Uniadic] = field(default_factory=lambda: set())
     values: set[int] | None = None
 
+    def __deepcopy__(self, memo: dict[int, Any]) -> Equivalences:
+        return _clone_instance(self, memo)
+
     def __contains__(self, other: Equivalences) -> bool:
         for uni in other.uniadics:
             # TODO: list makes this comparison N2 complexity.
@@ -1814,6 +2032,9 @@ class PossibleValues:
         self.dnf_lookup_table: dict[Uniadic, Equivalences] = {}
         self.update_dnf()
 
+    def __deepcopy__(self, memo: dict[int, Any]) -> PossibleValues:
+        return _clone_instance(self, memo)
+
     @property
     def is_applicable(self) -> bool:
         return self._is_applicable
@@ -1901,6 +2122,9 @@ class PossibleValues:
 class AND:
     uni_table: dict[Uniadic, Uniadic | int]
 
+    def __deepcopy__(self, memo: dict[int, Any]) -> AND:
+        return _clone_instance(self, memo)
+
     def check(self, lookup_table: dict[Uniadic, Equivalences]) -> bool:
         result = True
         local_lookup: dict[Uniadic, set[int] | None] = {}
@@ -1944,6 +2168,9 @@ class AND:
 class DNF:
     item_list: list[AND]
 
+    def __deepcopy__(self, memo: dict[int, Any]) -> DNF:
+        return _clone_instance(self, memo)
+
     def update(
         self, lookup_table: dict[Uniadic, Equivalences]
     ) -> tuple[bool, bool, list[DNF]]:
@@ -2014,15 +2241,7 @@ class Variadic:
     uni_metadata_set: set[UniadicRecord] = field(default_factory=lambda: set())
 
     def __deepcopy__(self, memo: dict[int, Any]) -> Variadic:
-        if id(self) in memo:
-            return memo[id(self)]
-        new_instance = self.__class__.__new__(self.__class__)
-        memo[id(self)] = new_instance
-        # First copy shape reprs.
-        deepcopy(self.reprs, memo)
-        for k, v in self.__dict__.items():
-            setattr(new_instance, k, deepcopy(v, memo))
-        return new_instance
+        return _clone_instance(self, memo, first="reprs")
 
     def _match(
         self,
@@ -2440,15 +2659,7 @@ class ShapeNode:
         self.referees: set[Tensor[int | float | bool]] = set()
 
     def __deepcopy__(self, memo: dict[int, Any]) -> ShapeNode:
-        if id(self) in memo:
-            return memo[id(self)]
-        new_instance = self.__class__.__new__(self.__class__)
-        memo[id(self)] = new_instance
-        # First copy shape reprs.
-        deepcopy(self.reprs, memo)
-        for k in self.__slots__:
-            setattr(new_instance, k, deepcopy(getattr(self, k), memo))
-        return new_instance
+        return _clone_instance(self, memo, first="reprs")
 
     def add_repr(self, repr: ShapeRepr) -> None:
         self.reprs.append(repr)
@@ -2484,7 +2695,7 @@ class ShapeNode:
             if add_constraint:
                 for tensor in self.referees:
                     for edge in tensor.referees:
-                        updates.constraints |= edge.constraints[UpdateType.SHAPE]
+                        updates.add_constraints(edge.constraints[UpdateType.SHAPE])
 
             for repr in resolved_reprs:
                 # remove_repr_from_symbols(repr)
@@ -2628,15 +2839,7 @@ class ShapeRepr:
             self.root.reprs.add(self)
 
     def __deepcopy__(self, memo: dict[int, Any]) -> ShapeRepr:
-        if id(self) in memo:
-            return memo[id(self)]
-        new_instance = self.__class__.__new__(self.__class__)
-        memo[id(self)] = new_instance
-        # First copy shape node.
-        deepcopy(self.node, memo)
-        for k in self.__slots__:
-            setattr(new_instance, k, deepcopy(getattr(self, k), memo))
-        return new_instance
+        return _clone_instance(self, memo, first="node")
 
     @property
     def reverse(self) -> list[Uniadic]:
@@ -2838,8 +3041,12 @@ class ShapeRepr:
                 # Find all leftover prefixes and suffixes
                 remaining_prefix = self.get_remainings(self.prefix, prefix)
                 remaining_suffix = self.get_remainings(self.reverse, suffix[::-1])[::-1]
-                # Find which root will be updated.
-                if len(self) >= other_len:
+                # Find which root will be updated. Among equal length reprs,
+                # root with less referees is updated to trigger less constraints.
+                if len(self) > other_len or (
+                    len(self) == other_len
+                    and _num_referees(self.root.reprs) >= _num_referees(root.reprs)
+                ):
                     removed_root = root
                     new_root = self.root
                 else:
@@ -2932,6 +3139,14 @@ class ShapeRepr:
 # isinstance(b, int) else b.value)
 # is_repr_known = lambda repr: repr.root is None and repr.prefix and
 # all([uni.value is not None for uni in repr.prefix])
+_constraint_order = count()
+# Stamps of the changes which trigger constraints and of constraint evaluations.
+_change_stamps = count()
+# Relative evaluation costs of constraint types, shape constraints are
+# evaluated for every combination of shape representations.
+_update_type_costs = {UpdateType.TYPE: 0, UpdateType.VALUE: 1, UpdateType.SHAPE: 2}
+
+
 @dataclass
 class Constraint:
     fn: ConstraintFunctionType
@@ -2939,6 +3154,14 @@ class Constraint:
     call_counter: int = 0
     parents: set[Constraint] = field(default_factory=lambda: set())
     children: set[Constraint] = field(default_factory=lambda: set())
+    # Creation order of the constraint, used as a topological position.
+    order: int = field(default_factory=lambda: next(_constraint_order))
+    # Stamps of the last change of its inputs and of its last evaluation.
+    changed: int = 0
+    evaluated: int = -1
+
+    def __deepcopy__(self, memo: dict[int, Any]) -> Constraint:
+        return _clone_instance(self, memo)
 
     def __call__(self, keys: list[IOHyperEdge]) -> ConstrainResultType:
         status = False
@@ -2960,11 +3183,19 @@ class Constraint:
             status, newly_added_symbols = self.fn(*keys)
             updates |= newly_added_symbols
         if status:
-            updates.constraints |= self.children
+            updates.add_constraints(self.children)
             self.clear()
         self.call_counter += 1
         return status, updates
 
+    @property
+    def name(self) -> str:
+        return getattr(self.fn, "__name__", type(self.fn).__name__)
+
+    @property
+    def cost(self) -> int:
+        return max(_update_type_costs[update_type] for update_type in self.types)
+
     def add_dependencies(self, *args: Constraint) -> None:
         self.parents.update(args)
         for constr in args:
@@ -14,6 +14,7 @@
 
 import operator
 from collections.abc import Callable, Mapping, Sequence
+from copy import deepcopy
 from functools import partial
 from types import EllipsisType, NoneType, UnionType
 from typing import Any
@@ -56,7 +57,7 @@ from ..constraints import (
     to_tensor_constraints,
     to_tuple_constraints,
 )
-from .base import BaseKey
+from .base import BaseKey, BaseModel
 from .operator import Operator
 
 __all__ = [
@@ -115,6 +116,7 @@ __all__ = [
     "ConstantType",
     "FloorOp",
     "ClampOp",
+    "ScanOp",
 ]
 
 ConstantType = float | int | types.Constant
@@ -1909,3 +1911,115 @@ class ClampOp(Operator):
             min_val=BaseKey(type=int | float, value=min_val),
             max_val=BaseKey(type=int | float, value=max_val),
         )
+
+
+class ScanOp(Operator):
+    """Applies the `body` model iteratively along the first axis of sequence
+    inputs while threading carries from one step to the next.
+
+    At each step, carry inputs of the body (keys of `carries`) are fed with the
+    corresponding carry outputs (values of `carries`) of the previous step, where
+    operator inputs with the same names are used as initial carries. Sequence
+    inputs of the body are fed with the corresponding slices of the operator
+    inputs and all remaining inputs are shared by all steps. Output of the
+    operator is the stacked values of the `output` key of the body.
+
+    The body is held once, so graph size and compile time does not depend on
+    the sequence length.
+    """
+
+    _model_name: str = "Scan"
+    seq_length_key: str = "seq_len"
+
+    def __init__(
+        self,
+        body: BaseModel,
+        carries: Mapping[str, str],
+        sequences: Sequence[str],
+        output: str,
+        *,
+        name: str | None = None,
+    ) -> None:
+        # Valued inputs of the body are static, so they are not operator inputs.
+        ordered_input_keys = [
+            key for key in body.input_keys if not body.conns.all[key].metadata.is_valued
+        ]
+        input_keys = set(ordered_input_keys)
+        output_keys = set(body.conns.output_keys)
+        if unnamed_keys := {key for key in input_keys if key.startswith("$")}:
+            raise KeyError(
+                f"Inputs of scan body must be named, got unnamed keys: {unnamed_keys}"
+            )
+        if not carries.keys() <= input_keys:
+            raise KeyError(
+                f"Carries {set(carries.keys()) - input_keys} are not inputs of body!"
+            )
+        if not set(carries.values()) <= output_keys:
+            raise KeyError(
+                f"Carries {set(carries.values()) - output_keys} are not outputs of "
+                "body!"
+            )
+        if not set(sequences) <= input_keys - carries.keys():
+            raise KeyError(
+                f"Sequences {set(sequences) - input_keys} are not inputs of body or "
+                "used as carries!"
+            )
+        if output not in output_keys:
+            raise KeyError(f"Output '{output}' is not an output of body!")
+
+        # Body is copied in order not to affect given model while
+        # its carry shapes are matched.
+        body = deepcopy(body)
+        carry_shapes: dict[str, ShapeTemplateType] = {}
+        for idx, (in_key, out_key) in enumerate(carries.items()):
+            carry_shapes[in_key] = carry_shapes[out_key] = [(f"Carry{idx}", ...)]
+        body.set_shapes(**carry_shapes)
+
+        body_shapes = body.get_shapes(symbolic=True)
+        key_definitions: dict[str, BaseKey] = {}
+        for key in ordered_input_keys:
+            edge = body.conns.all[key].metadata
+            if not edge.is_tensor:
+                raise TypeError(f"Input '{key}' of scan body must be a tensor!")
+            shape = _shape_template(body_shapes[key])
+            if key in sequences:
+                shape = [self.seq_length_key, *shape]
+            key_definitions[key] = BaseKey(
+                shape=shape,
+                type=Tensor[int | float | bool],
+                differentiable=edge.differentiable,
+            )
+        key_definitions["output"] = BaseKey(
+            shape=[self.seq_length_key, *_shape_template(body_shapes[output])],
+            type=body.conns.all[output].metadata.edge_type,
+        )
+
+        self.body = body
+        self.carries = dict(carries)
+        self.sequences = list(sequences)
+        self.body_output = output
+        super().__init__(formula_key="scan", name=name, **key_definitions)
+
+    @property
+    def shared_keys(self) -> list[str]:
+        return [
+            key
+            for key in self.input_keys
+            if key not in self.carries and key not in self.sequences
+        ]
+
+
+def _shape_template(
+    shape: ShapeTemplateType | list[ShapeTemplateType] | None,
+) -> list[int | str | tuple[str, EllipsisType]]:
+    # Converts symbolic shape representation (i.e. ["u1", "(V1, ...)", 3])
+    # into shape template (i.e. ["u1", ("V1", ...), 3]).
+    assert isinstance(shape, Sequence)
+    template: list[int | str | tuple[str, EllipsisType]] = []
+    for item in shape:
+        if isinstance(item, str) and item.endswith(", ...)"):
+            template.append((item[1 : -len(", ...)")], ...))
+        else:
+            assert isinstance(item, int | str)
+            template.append(item)
+    return template
@@ -17,7 +17,7 @@ from typing import Any, Generic, TypeGuard
 
 from ...backends.backend import Backend
 from ...common import BiMap
-from ...types import Constant, DataType, Dtype, data_types, epsilon_table
+from ...types import Constant, DataType, Dtype, epsilon_table, get_data_types
 from ...utils.type_utils import is_list_int
 from ..common import (
     TBD,
@@ -71,7 +71,7 @@ class StaticDataStore(Generic[DataType]):
 
     @staticmethod
     def is_scalar_type(t: Any) -> TypeGuard[MainValueType]:
-        if isinstance(t, tuple(data_types)):
+        if isinstance(t, get_data_types()):
             return False
         elif isinstance(t, list | tuple):
             return all(StaticDataStore.is_scalar_type(value) for value in t)
@@ -81,7 +81,7 @@ class StaticDataStore(Generic[DataType]):
 
     @staticmethod
     def is_tensor_type(t: Any) -> TypeGuard[DataType]:
-        return isinstance(t, tuple(data_types))
+        return isinstance(t, get_data_types())
 
     def remove_key_from_store(
         self, key: str, label_as_unused: bool = True, hard_remove: bool = False
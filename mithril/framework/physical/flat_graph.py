@@ -14,14 +14,13 @@
 
 from __future__ import annotations
 
+import sys
 from collections.abc import Callable, Mapping, Sequence
-from copy import deepcopy
 from typing import Any
 
 import mithril as ml
 
 from ...common import BiMap, PythonGenConfig
-from ...cores.c.array import PyArray
 from ...types import DataType, GenericDataType
 from ...utils.func_utils import is_make_array_required, prepare_function_args
 from ...utils.utils import OrderedSet
@@ -38,12 +37,14 @@ from ..common import (
     UpdateType,
     ValueType,
     any_differentiable,
+    create_shape_repr,
     is_type_adjustment_required,
     is_valued,
+    structural_clone,
 )
 from ..logical.model import Connection
 from ..logical.operator import Operator
-from ..logical.operators import BufferOp
+from ..logical.operators import BufferOp, ScanOp
 from .data_store import StaticDataStore
 
 
@@ -117,8 +118,31 @@ class FlatGraph(GenericDataType[DataType]):
         self.value_table: dict[str, DataType | ValueType] = {}
 
         self.data_store: StaticDataStore[DataType] = StaticDataStore(backend)
-        self.constraint_solver: ConstraintSolver = deepcopy(solver, memo=memo)
+        self.constraint_solver: ConstraintSolver = structural_clone(solver, memo)
         self.multi_node_keys: dict[str, list[str]] = {}
+        self._topological_order: OrderedSet[str] | None = None
+
+    def __getstate__(self) -> dict[str, Any]:
+        # data_memo is keyed by ids of logical edges which change after pickling.
+        # Store logical edges of operators together with their physical edges
+        # so that data_memo can be rebuilt with the new ids.
+        state = self.__dict__.copy()
+        data_memo = self.data_store.data_memo
+        state["_data_memo_edges"] = [
+            (edge, data_memo[id(edge)])
+            for op in self.model_table
+            for key in op.conns.all
+            if id(edge := op.conns.get_data(key)) in data_memo
+        ]
+        return state
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        data_memo_edges = state.pop("_data_memo_edges", [])
+        self.__dict__.update(state)
+        self.data_store.data_memo = {
+            id(logical_edge): physical_edge
+            for logical_edge, physical_edge in data_memo_edges
+        }
 
     @property
     def hanging_keys(self) -> set[str]:
@@ -174,7 +198,38 @@ class FlatGraph(GenericDataType[DataType]):
 
     @property
     def topological_order(self) -> OrderedSet[str]:
-        # Traverse the model table in topological order
+        # Topological order is computed once and cached until the graph is
+        # modified (see _invalidate_topological_order).
+        if self._topological_order is None:
+            self._topological_order = self._compute_topological_order()
+        return self._topological_order
+
+    def _invalidate_topological_order(self) -> None:
+        self._topological_order = None
+
+    def _compute_topological_order(self) -> OrderedSet[str]:
+        # Kahn's algorithm, a key is added to the order once all of its source
+        # keys are visited. Number of not yet visited source keys of each key
+        # is tracked with a counter.
+        num_sources: dict[str, int] = {}
+        dependents: dict[str, list[str]] = {}
+        # Numpy backend uses cache keys for internal operations.
+        # So, we need to exclude the cache keys from the source keys.
+        exclude_cache = self.backend.is_manualgrad
+        for key, conn in self.connections.items():
+            source_keys = conn.source_keys
+            if exclude_cache and source_keys and source_keys[-1].endswith("_cache"):
+                source_keys = source_keys[:-1]
+            unique_source_keys = dict.fromkeys(source_keys)
+            num_sources[key] = len(unique_source_keys)
+            for source_key in unique_source_keys:
+                if (keys := dependents.get(source_key)) is None:
+                    dependents[source_key] = [key]
+                else:
+                    keys.append(key)
+
+        # Traverse the graph starting from the keys that are not target of
+        # any connection.
         topological_order: OrderedSet[str] = OrderedSet()
         keys_to_visit = list(sorted(self.all_source_keys - self.all_target_keys))
         visited: set[str] = set()
@@ -185,21 +240,17 @@ class FlatGraph(GenericDataType[DataType]):
                 continue
 
             visited.add(key)
+            for dependent_key in dependents.get(key, ()):
+                num_sources[dependent_key] -= 1
 
-            # Visit all target keys of the current key
-            for target_key in self.get_target_keys(key):
-                if target_key in visited:
-                    continue
-
-                # Numpy backend uses cache keys for internal operations.
-                # So, we need to exclude the cache keys from the source keys.
-                source_keys = self.get_source_keys(target_key)
-                if self.backend.is_manualgrad and source_keys[-1].endswith("_cache"):
-                    source_keys = source_keys[:-1]
+            if (key_conn := self.connections.get(key)) is None:
+                continue
 
+            # Visit all target keys of the current key
+            for target_key in key_conn.target_keys:
                 # If all source keys of the target key are visited,
                 # then add the target key to the topological order.
-                if set(source_keys).issubset(visited):
+                if target_key not in visited and num_sources.get(target_key, 0) == 0:
                     keys_to_visit.append(target_key)
                     topological_order.add(target_key)
 
@@ -231,6 +282,7 @@ class FlatGraph(GenericDataType[DataType]):
         return self.data_store.update_cached_data(updates)
 
     def add_value(self, model: Operator, keys: dict[str, str]) -> None:
+        self._invalidate_topological_order()
         output_key = keys[Operator.output_key]
         # If output/input is of list, tuple or dict type, find indexes of
         # corresponding inputs/outputs when it is flattened to a list.
@@ -311,6 +363,8 @@ class FlatGraph(GenericDataType[DataType]):
         if output_key in self.all_keys:
             raise ValueError(f"Output key `{output_key}` must not be in the graph")
 
+        self._invalidate_topological_order()
+
         # Add the new operator to the graph
         self.add_value(new_op, keys)
 
@@ -352,6 +406,8 @@ class FlatGraph(GenericDataType[DataType]):
                 f"Source key `{new_source_key}` must be in the keys dictionary"
             )
 
+        self._invalidate_topological_order()
+
         # Rename the base operator output key to the source key
         base_op_out_conn = self.model_table[base_op]
         base_op_out_conn.key = new_source_key
@@ -438,6 +494,7 @@ class FlatGraph(GenericDataType[DataType]):
 
         # The connection is already calculated
         if key in self.data_store.data_values:
+            self._invalidate_topological_order()
             # Unlink source connections
             for source_key in list(conn.source_keys):
                 src_conn = self.connections[source_key]
@@ -531,8 +588,7 @@ class FlatGraph(GenericDataType[DataType]):
                     # Check tensors are equal
                     elif self.is_tensor_type(ref_value) and self.is_tensor_type(value):
                         is_equal = (
-                            not isinstance(ref_value, PyArray)
-                            and not isinstance(value, PyArray)
+                            not _is_py_array(ref_value) and not _is_py_array(value)
                         ) and (
                             id(ref_value) == id(value)
                             or ref_value.shape == value.shape  # type: ignore
@@ -572,6 +628,11 @@ class FlatGraph(GenericDataType[DataType]):
         if conn.op is None:
             raise RuntimeError(f"Connection {conn.key} must have an operator")
 
+        if isinstance(conn.op, ScanOp):
+            # Scans with same inputs are different operations unless their
+            # bodies are the same.
+            model_id.append(str(id(conn.op.body)))
+
         final_model_id = "-".join(model_id) + f"-{conn.op.formula_key}"
 
         if final_model_id in self.unique_model_table:
@@ -581,6 +642,7 @@ class FlatGraph(GenericDataType[DataType]):
         return None
 
     def _prune_connection(self, conn: GConnection, source_conn: GConnection) -> None:
+        self._invalidate_topological_order()
         self._collapse_model_keys(conn.key, source_conn.key)
 
         # Update target keys of connections
@@ -607,6 +669,7 @@ class FlatGraph(GenericDataType[DataType]):
             self._all_target_keys.remove(conn.key)
 
     def _remove_conn(self, conn: GConnection) -> None:
+        self._invalidate_topological_order()
         if conn.key in self.connections and conn.key not in self.output_dict.values():
             self.remove_key_from_store(conn.key, hard_remove=True)
 
@@ -702,6 +765,9 @@ class FlatGraph(GenericDataType[DataType]):
                     continue
 
                 op = self.get_op(value)
+                # Scan bodies are compiled after static inference.
+                if isinstance(op, ScanOp):
+                    continue
 
                 # TODO: Move this outside of while loop
                 # after CBackend is completely implemented.
@@ -938,11 +1004,13 @@ class FlatGraph(GenericDataType[DataType]):
 
     def set_shapes(
         self,
-        shapes: Mapping[str, Sequence[int | None]]
-        | Mapping[Connection, Sequence[int | None]]
-        | Mapping[str | Connection, Sequence[int | None]],
+        shapes: Mapping[str, Sequence[int | str | None]]
+        | Mapping[Connection, Sequence[int | str | None]]
+        | Mapping[str | Connection, Sequence[int | str | None]],
     ) -> None:
         updates = Updates()
+        # Named dimensions are shared among all given shapes.
+        used_keys: dict[str | int, Any] = {}
         for key, value in shapes.items():
             if isinstance(key, Connection):
                 key = key.key
@@ -950,7 +1018,11 @@ class FlatGraph(GenericDataType[DataType]):
             if not (data := self.data_store._all_data[key]).is_tensor:
                 raise ValueError("Non-tensor data can not have shape!")
             assert data.shape is not None
-            updates |= data.shape.set_values(value)
+            if any(isinstance(dim, str) for dim in value):
+                given_repr = create_shape_repr(value, self.constraint_solver, used_keys)
+                updates |= data.shape.merge(given_repr.node)
+            else:
+                updates |= data.shape.set_values(value)  # type: ignore
         self.constraint_solver(updates)
         # Some intermediate values may be calculated, update cached data.
         self.data_store.update_cached_data(updates)
@@ -1082,3 +1154,10 @@ class FlatGraph(GenericDataType[DataType]):
                 self.all_data[source_key].constraints[UpdateType.VALUE] -= (
                     value_constraints
                 )
+
+
+def _is_py_array(value: Any) -> bool:
+    # PyArrays only exist once the C core is imported, so the type is resolved
+    # from imported modules without loading the raw C library.
+    module = sys.modules.get("mithril.cores.c.array")
+    return module is not None and isinstance(value, module.PyArray)
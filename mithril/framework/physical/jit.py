@@ -0,0 +1,190 @@
+# Copyright 2022 Synnada, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import annotations
+
+import warnings
+from collections import Counter
+from collections.abc import Callable, Iterable, Mapping, Sequence
+from dataclasses import dataclass, field
+from typing import Any
+
+from ...backends.backend import Backend
+
+__all__ = [
+    "JitOptions",
+    "JitTrace",
+    "TraceLog",
+    "JitFunction",
+    "enable_compilation_cache",
+]
+
+
+@dataclass(frozen=True)
+class JitOptions:
+    """Options of jitted functions of compiled models, only applied by JAX
+    backend.
+
+    Attributes:
+        donate_state: If True, buffers of the given state are donated to
+            evaluate, so that returned state could reuse their memory. Given
+            state must not be used after evaluate.
+        donate_params: If True, params and optimizer state given to train steps
+            of compile_train_step are donated, since they are replaced by the
+            returned ones.
+        static_keys: Data keys whose values are passed as static arguments
+            (e.g. Python scalars determining shapes). Functions are traced again
+            for each new value of these keys, so values must be hashable.
+        compilation_cache_dir: Directory of the persistent compilation cache of
+            JAX. Compiled executables are stored in and loaded from this
+            directory, so that they are reused by other processes.
+        max_traces: If given, a warning is raised each time a function of the
+            model is traced more than max_traces times.
+    """
+
+    donate_state: bool = False
+    donate_params: bool = True
+    static_keys: frozenset[str] = field(default_factory=frozenset)
+    compilation_cache_dir: str | None = None
+    max_traces: int | None = None
+
+    def __post_init__(self) -> None:
+        # Static keys could be given as any iterable of keys.
+        object.__setattr__(self, "static_keys", frozenset(self.static_keys))
+        if self.max_traces is not None and self.max_traces < 1:
+            raise ValueError("Maximum number of traces must be positive!")
+
+
+@dataclass(frozen=True)
+class JitTrace:
+    # Name of the traced function (e.g. "evaluate").
+    name: str
+    # Shapes and dtypes of traced inputs or values of static inputs.
+    inputs: dict[str, str]
+
+    def __str__(self) -> str:
+        inputs = ", ".join(f"{key}: {value}" for key, value in self.inputs.items())
+        return f"{self.name}({inputs})"
+
+
+class TraceLog:
+    """Log of the traces of jitted functions of a model. Each trace corresponds
+    to a compilation, so frequent traces of the same function point out inputs
+    whose structure, shape or static values change between calls.
+    """
+
+    def __init__(self, max_traces: int | None = None) -> None:
+        self.max_traces = max_traces
+        self.traces: list[JitTrace] = []
+        self.counts: Counter[str] = Counter()
+
+    def record(self, name: str, inputs: Mapping[str, Any]) -> None:
+        trace = JitTrace(name, {key: _describe(inputs[key]) for key in sorted(inputs)})
+        self.traces.append(trace)
+        self.counts[name] += 1
+        if self.max_traces is not None and self.counts[name] > self.max_traces:
+            warnings.warn(
+                f"Function '{name}' of the model is traced {self.counts[name]} "
+                f"times, last trace: {trace}. Consider fixing shapes of inputs "
+                "or declaring static keys in jit_options.",
+                stacklevel=2,
+            )
+
+    def clear(self) -> None:
+        self.traces.clear()
+        self.counts.clear()
+
+    def __len__(self) -> int:
+        return len(self.traces)
+
+
+def enable_compilation_cache(cache_dir: str) -> None:
+    """Enables the persistent compilation cache of JAX in the given directory.
+    All compiled executables are cached regardless of their compile times.
+    """
+    import jax
+
+    config: Any = jax.config
+    config.update("jax_compilation_cache_dir", cache_dir)
+    config.update("jax_persistent_cache_min_compile_time_secs", 0.0)
+
+
+def _describe(value: Any) -> str:
+    if hasattr(value, "shape") and hasattr(value, "dtype"):
+        return f"{value.dtype}{list(value.shape)}"
+    return repr(value)
+
+
+class JitFunction:
+    """Jits fn(params, data, *args) of a compiled model with the given options.
+
+    State and static keys are separated from data before calling the jitted
+    function, so that state could be donated and static keys could be passed
+    as static arguments. donate_argnums are indices of donated arguments of fn.
+    Each trace of the function is recorded in trace_log.
+    """
+
+    def __init__(
+        self,
+        backend: Backend[Any],
+        fn: Callable[..., Any],
+        name: str,
+        trace_log: TraceLog,
+        options: JitOptions | None = None,
+        state_keys: Iterable[str] = (),
+        donate_argnums: Sequence[int] = (),
+    ) -> None:
+        options = options if options is not None else JitOptions()
+        self.fn = fn
+        self.name = name
+        self.trace_log = trace_log
+        self.static_keys = sorted(options.static_keys)
+        self.state_keys = sorted(state_keys) if options.donate_state else []
+        self._split = bool(self.static_keys or self.state_keys)
+
+        # State and static values are given after params and data.
+        donated = [idx if idx < 2 else idx + 2 for idx in donate_argnums]
+        if self.state_keys:
+            donated.append(2)
+        kwargs: dict[str, Any] = {}
+        if self._split:
+            kwargs["static_argnums"] = (3,)
+        if donated:
+            kwargs["donate_argnums"] = tuple(sorted(donated))
+        self._jitted = backend.jit(self._traced, **kwargs)
+
+    def __call__(
+        self, params: Any = None, data: Any = None, *args: Any, **kwargs: Any
+    ) -> Any:
+        if not self._split:
+            return self._jitted(params, data, {}, (), *args, **kwargs)
+        data = dict(data) if data is not None else {}
+        state = {key: data.pop(key) for key in self.state_keys if key in data}
+        static = tuple((key, data.pop(key)) for key in self.static_keys if key in data)
+        return self._jitted(params, data, state, static, *args, **kwargs)
+
+    def _traced(
+        self,
+        params: Any,
+        data: Any,
+        state: dict[str, Any],
+        static: tuple[tuple[str, Any], ...],
+        *args: Any,
+        **kwargs: Any,
+    ) -> Any:
+        # Executed only while tracing, so this is a no-op for compiled calls.
+        if data is not None or state or static:
+            data = {**(data or {}), **state, **dict(static)}
+        self.trace_log.record(self.name, {**(params or {}), **(data or {})})
+        return self.fn(params, data, *args, **kwargs)
@@ -0,0 +1,206 @@
+# Copyright 2022 Synnada, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import annotations
+
+from collections.abc import Callable, Mapping, Sequence
+from typing import Any
+
+from ...backends.backend import Backend
+from ..common import FinalCost
+
+__all__ = [
+    "micro_batch_size",
+    "split_micro_batches",
+    "accumulate_gradients",
+    "scan_gradients",
+]
+
+# Evaluates outputs and gradients of params for the given params and data.
+GradientFn = Callable[[Any, Any], tuple[Any, Any]]
+
+
+def micro_batch_size(
+    data: Mapping[str, Any],
+    batch_keys: Sequence[str],
+    micro_batches: int,
+    batch_axis: int,
+) -> int:
+    """Returns the size of micro-batches which batch keys of data are split
+    into along the batch axis.
+    """
+    if micro_batches < 1:
+        raise ValueError("Number of micro-batches must be positive!")
+    if not batch_keys:
+        raise ValueError("Micro-batches require tensor data to be split!")
+    sizes = {data[key].shape[batch_axis] for key in batch_keys}
+    if len(sizes) > 1:
+        raise ValueError(
+            f"Batch keys must have the same size along batch axis {batch_axis}, "
+            "data without a batch axis must be excluded from batch keys!"
+        )
+    (size,) = sizes
+    if size % micro_batches != 0:
+        raise ValueError(
+            f"Batch size {size} is not divisible by {micro_batches} micro-batches!"
+        )
+    return size // micro_batches
+
+
+def split_micro_batches(
+    data: Mapping[str, Any],
+    batch_keys: Sequence[str],
+    micro_batches: int,
+    batch_axis: int,
+) -> list[dict[str, Any]]:
+    """Splits batch keys of data into micro-batches along the batch axis, other
+    keys are shared by all micro-batches. Micro-batches are slices, so they are
+    views of the given data if the backend supports it.
+    """
+    size = micro_batch_size(data, batch_keys, micro_batches, batch_axis)
+    split_data: list[dict[str, Any]] = []
+    for idx in range(micro_batches):
+        micro_data = dict(data)
+        for key in batch_keys:
+            value = data[key]
+            index = [slice(None)] * value.ndim
+            index[batch_axis] = slice(idx * size, (idx + 1) * size)
+            micro_data[key] = value[tuple(index)]
+        split_data.append(micro_data)
+    return split_data
+
+
+def accumulate_gradients(
+    backend: Backend[Any],
+    fn: GradientFn,
+    params: Mapping[str, Any],
+    micro_data: Sequence[Mapping[str, Any]],
+    batch_axis: int,
+    reduction: str,
+) -> tuple[dict[str, Any], dict[str, Any]]:
+    """Evaluates fn for each micro-batch and accumulates gradients in place into
+    buffers allocated once. Gradients and the final cost are averaged if the
+    reduction is "mean" and summed if it is "sum", other outputs are
+    concatenated along the batch axis.
+    """
+    gradients: dict[str, Any] = {}
+    outputs: dict[str, list[Any]] = {}
+    for idx, data in enumerate(micro_data):
+        micro_outputs, micro_gradients = fn(params, data)
+        if idx == 0:
+            # Returned gradients may share memory (e.g. gradients of the inputs
+            # of an addition), so separate buffers are allocated.
+            gradients = {
+                key: backend.zeros_like(value) for key, value in micro_gradients.items()
+            }
+        for key, value in micro_gradients.items():
+            gradients[key] += value
+        for key, value in micro_outputs.items():
+            _check_output(key, value)
+            outputs.setdefault(key, []).append(value)
+
+    scale = 1 / len(micro_data) if reduction == "mean" else None
+    if scale is not None:
+        for key in gradients:
+            gradients[key] *= scale
+
+    all_outputs: dict[str, Any] = {}
+    for key, values in outputs.items():
+        if key == FinalCost:
+            total = values[0]
+            for value in values[1:]:
+                total = total + value
+            all_outputs[key] = total if scale is None else total * scale
+        else:
+            all_outputs[key] = backend.concat(values, axis=batch_axis)
+    return all_outputs, gradients
+
+
+def scan_gradients(
+    backend: Backend[Any],
+    fn: GradientFn,
+    micro_batches: int,
+    batch_keys: Sequence[str],
+    batch_axis: int,
+    reduction: str,
+) -> Callable[[Any, Any], tuple[dict[str, Any], dict[str, Any]]]:
+    """Returns a function of params and data which accumulates gradients of
+    micro-batches with the scan of the backend, so that a single loop is
+    compiled once it is jitted. Results are the same with accumulate_gradients.
+    """
+
+    def scanned_fn(
+        params: dict[str, Any], data: dict[str, Any]
+    ) -> tuple[dict[str, Any], dict[str, Any]]:
+        # Micro-batches are stacked along a new leading axis.
+        xs = {
+            key: _split_axis(backend, data[key], micro_batches, batch_axis)
+            for key in batch_keys
+        }
+        shared_data = {key: value for key, value in data.items() if key not in xs}
+
+        def body(
+            carry: dict[str, Any], micro_data: dict[str, Any]
+        ) -> tuple[dict[str, Any], dict[str, Any]]:
+            outputs, gradients = fn(params, shared_data | micro_data)
+            for key, value in outputs.items():
+                _check_output(key, value)
+            return {key: carry[key] + gradients[key] for key in carry}, outputs
+
+        init = {key: backend.zeros_like(value) for key, value in params.items()}
+        gradients, stacked_outputs = backend.scan(body, init, xs)
+
+        scale = 1 / micro_batches if reduction == "mean" else None
+        if scale is not None:
+            gradients = {key: value * scale for key, value in gradients.items()}
+        outputs: dict[str, Any] = {}
+        for key, value in stacked_outputs.items():
+            if key == FinalCost:
+                total = value.sum(0)
+                outputs[key] = total if scale is None else total * scale
+            else:
+                outputs[key] = _merge_axis(backend, value, batch_axis)
+        return outputs, gradients
+
+    return scanned_fn
+
+
+def _check_output(key: str, value: Any) -> None:
+    # Only the final cost is known to be reduced over samples, other scalar
+    # outputs (e.g. maximum or accuracy) can not be combined from micro-batches.
+    if key != FinalCost and getattr(value, "ndim", 0) == 0:
+        raise ValueError(
+            f"Scalar output '{key}' can not be combined from micro-batches, only "
+            f"'{FinalCost}' is reduced!"
+        )
+
+
+def _split_axis(backend: Backend[Any], value: Any, parts: int, axis: int) -> Any:
+    # (..., parts * size, ...) -> (parts, ..., size, ...)
+    shape = tuple(value.shape)
+    axis %= len(shape)
+    split_shape = shape[:axis] + (parts, shape[axis] // parts) + shape[axis + 1 :]
+    axes = [axis] + [idx for idx in range(len(split_shape)) if idx != axis]
+    return backend.transpose(backend.reshape(value, split_shape), axes)
+
+
+def _merge_axis(backend: Backend[Any], value: Any, axis: int) -> Any:
+    # (parts, ..., size, ...) -> (..., parts * size, ...)
+    shape = tuple(value.shape)
+    axis %= len(shape) - 1
+    axes = list(range(1, axis + 1)) + [0] + list(range(axis + 1, len(shape)))
+    merged_shape = (
+        shape[1 : axis + 1] + (shape[0] * shape[axis + 1],) + shape[axis + 2 :]
+    )
+    return backend.reshape(backend.transpose(value, axes), merged_shape)
@@ -15,12 +15,13 @@
 from __future__ import annotations
 
 import math
+import time
 import warnings
-from collections.abc import Callable, Mapping, Sequence
+from collections.abc import Callable, Iterable, Mapping, Sequence
 from copy import deepcopy
 from dataclasses import dataclass
 from functools import cached_property
-from typing import Any, Literal, get_args, overload
+from typing import TYPE_CHECKING, Any, Literal, get_args, overload
 
 from ...backends.backend import Backend, ParallelBackend
 from ...types import DataType, GenericDataType
@@ -34,12 +35,14 @@ from ..common import (
     IOHyperEdge,
     MainValueInstance,
     MainValueType,
+    OptimizerType,
     ParamsEvalType,
     ShapeResultType,
     StateKey,
     Table,
     Tensor,
     ToBeDetermined,
+    TrainStepType,
     UniadicRecord,
     Updates,
     Variadic,
@@ -49,6 +52,7 @@ from ..common import (
     get_summary,
     get_summary_shapes,
     get_summary_types,
+    structural_clone,
 )
 from ..logical.base import BaseModel, ConnectionData
 from ..logical.model import (
@@ -57,12 +61,27 @@ from ..logical.model import (
     define_unique_names,
 )
 from ..logical.operator import Operator
+from ..profiler import CompileProfiler, profile_phase
 from .flat_graph import FlatGraph
+from .jit import JitFunction, JitOptions, TraceLog
+from .micro_batch import (
+    accumulate_gradients,
+    micro_batch_size,
+    scan_gradients,
+    split_micro_batches,
+)
+from .specialization import DEFAULT_MAX_SPECIALIZATIONS, SpecializationCache
+from .vectorize import broadcast_evaluate, find_broadcast_outputs, loop_evaluate
+
+if TYPE_CHECKING:
+    from ..codegen.py_style_codegen.checkpoint import CheckpointPlan
+    from ..codegen.py_style_codegen.fusion import FusionGroup
+    from ..codegen.py_style_codegen.memory_planner import MemoryPlan
 
 __all__ = ["PhysicalModel"]
 
 
-PhysicalShapeValueType = Sequence[int | None]
+PhysicalShapeValueType = Sequence[int | str | None]
 PhysicalConstantType = (
     Mapping[
         str | Connection, DataType | int | float | bool | Sequence[Any] | dict[str, Any]
@@ -97,6 +116,7 @@ class PhysicalModel(GenericDataType[DataType]):
         safe_names: bool,
         use_short_namings: bool,
         jit: bool,
+        checkpoint_models: Sequence[BaseModel] = (),
     ) -> None:
         if len(model.conns.output_keys) == 0 and len(model.conns.couts) == 0:
             raise KeyError("Models with no output keys can not be compiled.")
@@ -105,12 +125,50 @@ class PhysicalModel(GenericDataType[DataType]):
 
         self.jit: bool = jit
         self.backend: Backend[DataType] = backend
+        # Compile time statistics, set by compile when profiling is enabled.
+        self.compile_profile: CompileProfiler | None = None
+        # Shape specialized copies of the model, only used if some dimensions
+        # of given shapes are named (dynamic).
+        self.specializations: SpecializationCache | None = None
+        self._specializer: Callable[[PhysicalModel[DataType]], None] | None = None
+        # If set, code generators plan reusable buffers for intermediate values
+        # and store the resulting plan in memory_plan.
+        self.memory_planning: bool = False
+        self.memory_plan: MemoryPlan | None = None
+        # If set, code generators evaluate chains of elementwise operations in
+        # fused functions and store the fused groups in fusion_groups.
+        self.elementwise_fusion: bool = False
+        self.fusion_groups: list[FusionGroup] = []
+        # Output keys of the operations of each submodel marked for activation
+        # checkpointing. If checkpoint_budget (in bytes) is set instead, code
+        # generators choose the segments. Chosen plan is stored in
+        # checkpoint_plan.
+        self.checkpoint_keys: list[set[str]] = [set() for _ in checkpoint_models]
+        self.checkpoint_budget: int | None = None
+        self.checkpoint_plan: CheckpointPlan | None = None
+        # Strategy of code generators for evaluating operations, independent
+        # operations are evaluated at the same time by num_workers threads with
+        # "threads" executor.
+        self.executor: str = "serial"
+        self.num_workers: int | None = None
+        # Options of jitted functions and log of their traces, which is shared
+        # by all specializations of the model.
+        self.jit_options: JitOptions | None = None
+        self.trace_log: TraceLog = TraceLog()
+        # Reduction of the final cost over samples ("mean" or "sum"), required
+        # for accumulating gradients of micro-batches. Set for TrainModels
+        # whose final cost is a linear reduction of per-sample losses.
+        self.sample_reduction: str | None = None
+        # Jitted functions accumulating gradients of micro-batches, keyed by
+        # number of micro-batches, batch axis and keys split into micro-batches.
+        self._micro_batch_fns: dict[tuple[Any, ...], Callable[..., Any]] = {}
         self._output_keys: set[str] = set(model.conns.output_keys)
-        flat_model = FlatModel(
-            model,
-            backend.op_function_dict,
-            short_namings=use_short_namings,
-        )
+        with profile_phase("flatten"):
+            flat_model = FlatModel(
+                model,
+                backend.op_function_dict,
+                short_namings=use_short_namings,
+            )
         self.external_key_mapping: dict[str, str] = flat_model.external_mapping
 
         # NOTE: Reconsider updating logical dag in order.
@@ -173,19 +231,30 @@ class PhysicalModel(GenericDataType[DataType]):
 
         # Initialize flat graph and data store.
         memo: dict[int, IOHyperEdge] = {}
-        self.flat_graph: FlatGraph[DataType] = FlatGraph(
-            self._input_keys,
-            self._output_keys,
-            self.backend,
-            model.constraint_solver,
-            self.state_keys,
-            memo,
-        )
+        with profile_phase("flat_graph_init"):
+            self.flat_graph: FlatGraph[DataType] = FlatGraph(
+                self._input_keys,
+                self._output_keys,
+                self.backend,
+                model.constraint_solver,
+                self.state_keys,
+                memo,
+            )
 
         # Initialize an Updates object to store updates and pass it to the
         # _pre_compile.
         updates = Updates()
+        checkpoint_ids = {id(m): idx for idx, m in enumerate(checkpoint_models)}
         for p_model, mappings in flat_model:
+            # Operation belongs to the outermost marked submodel containing it.
+            segment_idx: int | None = None
+            parent: BaseModel | None = p_model
+            while parent is not None:
+                segment_idx = checkpoint_ids.get(id(parent), segment_idx)
+                parent = parent.parent
+            if segment_idx is not None:
+                self.checkpoint_keys[segment_idx].add(mappings[Operator.output_key])
+
             model_shapes = {}
             if safe_shapes and p_model.safe_shapes:
                 model_shapes = create_shape_map(
@@ -196,7 +265,8 @@ class PhysicalModel(GenericDataType[DataType]):
             for key in p_model.conns.all:
                 global_key = mappings[key]
                 logical_data = p_model.conns.get_data(key)
-                physical_data: IOHyperEdge = deepcopy(logical_data, memo=memo)
+                with profile_phase("clone_data"):
+                    physical_data: IOHyperEdge = structural_clone(logical_data, memo)
 
                 if global_key in self._non_differentiable_keys:
                     # TODO: Create an API for setting differentiability of a tensor.
@@ -251,14 +321,29 @@ class PhysicalModel(GenericDataType[DataType]):
 
                 self.flat_graph.update_data({cache_name: cache_scalar})
 
-            self.flat_graph.add_value(p_model, mappings)
+            with profile_phase("add_value"):
+                self.flat_graph.add_value(p_model, mappings)
 
         # First part of the pm with all the inferences.
-        self._pre_compile(
-            constant_keys=_constant_keys,
-            data_keys=_data_keys,
-            shapes=_shapes,
-        )
+        with profile_phase("pre_compile"):
+            self._pre_compile(
+                constant_keys=_constant_keys,
+                data_keys=_data_keys,
+                shapes=_shapes,
+            )
+
+        # Runtime inputs with unknown dimensions are dynamic if any dimension
+        # is given with a name. Such models are specialized for each concrete
+        # shape of these inputs.
+        self.dynamic_keys: list[str] = []
+        if any(isinstance(dim, str) for shp in _shapes.values() for dim in shp):
+            self.dynamic_keys = sorted(
+                key
+                for key in self._input_keys - self.flat_graph.cached_data.keys()
+                if key not in self.flat_graph.unused_keys
+                and self.data[key].is_tensor
+                and not is_list_int(self.shapes[key])
+            )
 
         # If shape_names is True, all data (not params) provided in
         # runtime must be manually named in logical model.
@@ -668,19 +753,24 @@ class PhysicalModel(GenericDataType[DataType]):
         shapes: PhysicalShapeType,
     ) -> None:
         # Set given shapes.
-        self.flat_graph.set_shapes(shapes)
+        with profile_phase("set_shapes"):
+            self.flat_graph.set_shapes(shapes)
 
         # Set given static keys
-        self.flat_graph.set_static_keys(constant_keys)
+        with profile_phase("set_static_keys"):
+            self.flat_graph.set_static_keys(constant_keys)
 
         # Post process the graph
-        self.flat_graph.graph_update()
+        with profile_phase("graph_update"):
+            self.flat_graph.graph_update()
 
-        self.traverse_graph()
+        with profile_phase("traverse_graph"):
+            self.traverse_graph()
 
         # Infer and store all static keys using user provided constant keys and
         # the non-tensor constants defined in logical model.
-        self.flat_graph.infer_static_keys()
+        with profile_phase("infer_static_keys"):
+            self.flat_graph.infer_static_keys()
 
         # Check if there exists any unused keys in the provided data_keys.
         # TODO: Consider to remove this check. Same check is done in
@@ -696,9 +786,10 @@ class PhysicalModel(GenericDataType[DataType]):
             key for key in self.flat_graph.hanging_keys if key not in self.output_keys
         }
 
-        self.discarded_keys, self._output_keys = self.flat_graph.infer_ignore(
-            self.discarded_keys, self._output_keys
-        )
+        with profile_phase("infer_ignore"):
+            self.discarded_keys, self._output_keys = self.flat_graph.infer_ignore(
+                self.discarded_keys, self._output_keys
+            )
         if (
             not self.inference
             and len({key for key in self._output_keys if self.has_grad(key)}) == 0
@@ -713,6 +804,73 @@ class PhysicalModel(GenericDataType[DataType]):
         self._generated_eval_fn: EvaluateType[DataType] = eval_fn
         self._generated_evaluate_all_fn: EvaluateAllType[DataType] | None = eval_all_fn
 
+    def __getstate__(self) -> dict[str, Any]:
+        # Generated functions and specializations are not stored, they are
+        # generated again for the copied model.
+        state = self.__dict__.copy()
+        state.pop("_generated_eval_fn", None)
+        state.pop("_generated_evaluate_all_fn", None)
+        state["_micro_batch_fns"] = {}
+        state["compile_profile"] = None
+        state["specializations"] = None
+        state["_specializer"] = None
+        return state
+
+    def enable_specialization(
+        self,
+        specializer: Callable[[PhysicalModel[DataType]], None],
+        max_specializations: int = DEFAULT_MAX_SPECIALIZATIONS,
+    ) -> None:
+        """Enables lazy shape specialization of the model. specializer is called
+        with each specialized copy of the model to generate its functions.
+        """
+        if not self.dynamic_keys:
+            raise ValueError("Model has no dynamic keys to be specialized!")
+        self._specializer = specializer
+        self.specializations = SpecializationCache(max_specializations)
+
+    def specialize(
+        self, shapes: Mapping[str, Sequence[int]]
+    ) -> PhysicalModel[DataType]:
+        """Returns a copy of the model in which dynamic keys have the given
+        concrete shapes. Already solved graph is reused, only shape updates are
+        propagated and static keys are inferred again before code generation.
+        """
+        if self._specializer is None:
+            raise ValueError("Specialization is not enabled for the model!")
+        if missing_keys := set(self.dynamic_keys) - shapes.keys():
+            raise KeyError(
+                "Shapes of all dynamic keys are required for specialization. "
+                f"Missing keys: {', '.join(sorted(missing_keys))}."
+            )
+        with profile_phase("specialize"):
+            # Backend is shared among all specializations.
+            memo: dict[int, Any] = {
+                id(self.backend): self.backend,
+                id(self.trace_log): self.trace_log,
+            }
+            pm = deepcopy(self, memo)
+            pm.flat_graph.set_shapes(shapes)
+            pm.flat_graph.infer_static_keys()
+            pm.dynamic_keys = []
+            self._specializer(pm)
+        return pm
+
+    def _get_specialization(self, inputs: Mapping[str, Any]) -> PhysicalModel[DataType]:
+        assert self.specializations is not None
+        shapes: dict[str, tuple[int, ...]] = {}
+        for key in self.dynamic_keys:
+            if key not in inputs:
+                raise KeyError(f"Dynamic key '{key}' is not provided!")
+            shapes[key] = tuple(inputs[key].shape)
+
+        shape_key = tuple(shapes.values())
+        if (pm := self.specializations.get(shape_key)) is None:
+            start = time.perf_counter()
+            pm = self.specialize(shapes)
+            self.specializations.put(shape_key, pm, time.perf_counter() - start)
+        return pm
+
     def _calculate_parameters(
         self,
         name_mappings: dict[BaseModel, str],
@@ -837,6 +995,22 @@ class PhysicalModel(GenericDataType[DataType]):
             "Trainable keys": sorted(trainable_keys),
             "Total Parameters": [total_params],
         }
+        if self.memory_plan is not None and model is None:
+            pm_info["Intermediate memory"] = [
+                f"{self.memory_plan.planned_bytes} bytes planned, "
+                f"{self.memory_plan.naive_bytes} bytes naive"
+            ]
+        if self.fusion_groups and model is None:
+            pm_info["Fused operators"] = [str(group) for group in self.fusion_groups]
+        if self.checkpoint_plan is not None and model is None:
+            pm_info["Activation checkpointing"] = [str(self.checkpoint_plan)]
+        if self.executor != "serial" and model is None:
+            workers = "default" if self.num_workers is None else self.num_workers
+            pm_info["Executor"] = [f"{self.executor} ({workers} workers)"]
+        if self.trace_log.counts and model is None:
+            pm_info["Jit traces"] = [
+                f"{name}: {count}" for name, count in self.trace_log.counts.items()
+            ]
 
         info_table = Table(name="Model Info")
         info = info_table.dict_to_table(
@@ -1074,6 +1248,9 @@ class PhysicalModel(GenericDataType[DataType]):
         data: DataEvalType[DataType] | None = None,
         *,
         output_gradients: Literal[True] | ParamsEvalType[DataType] = True,
+        micro_batches: int = 1,
+        batch_axis: int = 0,
+        batch_keys: Iterable[str] | None = None,
     ) -> tuple[DataEvalType[DataType], ParamsEvalType[DataType]]: ...
 
     @overload
@@ -1088,6 +1265,26 @@ class PhysicalModel(GenericDataType[DataType]):
         ParamsEvalType[DataType], DataEvalType[DataType], DataEvalType[DataType]
     ]: ...
 
+    @overload
+    def evaluate(
+        self,
+        params: ParamsEvalType[DataType] | None = None,
+        data: DataEvalType[DataType] | None = None,
+        *,
+        output_gradients: ParamsEvalType[DataType] | bool = False,
+        state: DataEvalType[DataType] | None = None,
+        micro_batches: int = 1,
+        batch_axis: int = 0,
+        batch_keys: Iterable[str] | None = None,
+    ) -> (
+        DataEvalType[DataType]
+        | tuple[DataEvalType[DataType], DataEvalType[DataType]]
+        | tuple[DataEvalType[DataType], ParamsEvalType[DataType]]
+        | tuple[
+            ParamsEvalType[DataType], DataEvalType[DataType], DataEvalType[DataType]
+        ]
+    ): ...
+
     def evaluate(
         self,
         params: ParamsEvalType[DataType] | None = None,
@@ -1095,6 +1292,9 @@ class PhysicalModel(GenericDataType[DataType]):
         *,
         output_gradients: ParamsEvalType[DataType] | bool = False,
         state: DataEvalType[DataType] | None = None,
+        micro_batches: int = 1,
+        batch_axis: int = 0,
+        batch_keys: Iterable[str] | None = None,
     ) -> (
         DataEvalType[DataType]
         | tuple[DataEvalType[DataType], DataEvalType[DataType]]
@@ -1103,6 +1303,38 @@ class PhysicalModel(GenericDataType[DataType]):
             ParamsEvalType[DataType], DataEvalType[DataType], DataEvalType[DataType]
         ]
     ):
+        """Evaluates outputs of the model, and gradients of params if
+        output_gradients is given. With micro_batches > 1, batch_keys of data
+        (all tensor data by default) are split into micro_batches equal parts
+        along batch_axis and gradients of the parts are accumulated, so that
+        memory of intermediate values scales with the size of a micro-batch.
+        Other data are shared by all micro-batches. Gradients and the final
+        cost are reduced with sample_reduction of the model, other outputs are
+        concatenated along batch_axis.
+        """
+        if micro_batches != 1:
+            if output_gradients is not True:
+                raise ValueError(
+                    "Micro-batches are only supported while evaluating gradients "
+                    "of the final cost (i.e. output_gradients=True)!"
+                )
+            if state is not None:
+                raise NotImplementedError(
+                    "Micro-batches are not supported for models with state keys yet!"
+                )
+            return self._evaluate_micro_batches(
+                params, data, micro_batches, batch_axis, batch_keys
+            )
+
+        if self.specializations is not None:
+            # Dispatch to the model specialized for shapes of dynamic inputs.
+            inputs: dict[str, Any] = {**(params or {}), **(data or {}), **(state or {})}
+            specialized_pm = self._get_specialization(inputs)
+            gradients: Any = output_gradients
+            return specialized_pm.evaluate(
+                params, data, output_gradients=gradients, state=state
+            )
+
         # Inject seed values.
         if state is None:
             if len(self.state_keys) > 0:
@@ -1162,6 +1394,259 @@ class PhysicalModel(GenericDataType[DataType]):
                 return outputs, gradients
             return outputs, gradients, state_outputs
 
+    def _evaluate_micro_batches(
+        self,
+        params: ParamsEvalType[DataType] | None,
+        data: DataEvalType[DataType] | None,
+        micro_batches: int,
+        batch_axis: int,
+        batch_keys: Iterable[str] | None,
+    ) -> tuple[DataEvalType[DataType], ParamsEvalType[DataType]]:
+        if self.inference:
+            raise NotImplementedError(
+                "Inference mode does not support gradients calculation"
+            )
+        if self.sample_reduction is None:
+            raise ValueError(
+                "Micro-batches require a final cost reduced over samples with "
+                "Mean or Sum (i.e. TrainModel losses without regularizations)!"
+            )
+        if len(self.state_keys) > 0:
+            raise NotImplementedError(
+                "Micro-batches are not supported for models with state keys yet!"
+            )
+        params = params if params is not None else {}
+        data = data if data is not None else {}
+        if batch_keys is None:
+            batch_keys = [
+                key for key in data if key in self.data and self.data[key].is_tensor
+            ]
+        elif unknown_keys := set(batch_keys) - data.keys():
+            raise KeyError(
+                "Batch keys must be given in data. "
+                f"Unknown keys: {', '.join(sorted(unknown_keys))}."
+            )
+        batch_keys = list(batch_keys)
+        reduction = self.sample_reduction
+
+        if (
+            not self.jit
+            or self.backend.backend_type != "jax"
+            or (
+                isinstance(self.backend, ParallelBackend)
+                and self.backend.get_parallel_manager() is not None
+            )
+        ):
+
+            def evaluate_all(params: Any, data: Any) -> Any:
+                return self.evaluate(params, data, output_gradients=True)
+
+            micro_data = split_micro_batches(
+                data, batch_keys, micro_batches, batch_axis
+            )
+            return accumulate_gradients(
+                self.backend, evaluate_all, params, micro_data, batch_axis, reduction
+            )
+
+        # On JAX, micro-batches are looped in a single jitted scan.
+        micro_batch_size(data, batch_keys, micro_batches, batch_axis)
+        pm = self
+        if self.specializations is not None:
+            # Specialized for shapes of a single micro-batch.
+            (first_data, *_) = split_micro_batches(
+                data, batch_keys, micro_batches, batch_axis
+            )
+            pm = self._get_specialization({**params, **first_data})
+        cache_key = (micro_batches, batch_axis, tuple(batch_keys))
+        if (fn := pm._micro_batch_fns.get(cache_key)) is None:
+            evaluate_all_fn = pm._generated_evaluate_all_fn
+            assert evaluate_all_fn is not None, "Evaluate all function is not defined!"
+            fn = pm._micro_batch_fns[cache_key] = JitFunction(
+                self.backend,
+                scan_gradients(
+                    self.backend,
+                    lambda params, data: evaluate_all_fn(params, data, None),
+                    micro_batches,
+                    batch_keys,
+                    batch_axis,
+                    reduction,
+                ),
+                "accumulate_gradients",
+                self.trace_log,
+                self.jit_options,
+            )
+        return fn(params, data)
+
+    def compile_train_step(
+        self, optimizer: OptimizerType[DataType]
+    ) -> TrainStepType[DataType]:
+        """Returns a function which evaluates gradients of the model and updates
+        its parameters with the given optimizer in a single call:
+
+        >>> step = pm.compile_train_step(optimizer)
+        >>> outputs, params, opt_state = step(params, data, opt_state)
+
+        If the model is compiled with jit, the whole step is jitted so that the
+        optimizer update is fused with the gradient computation. On JAX, buffers
+        of the given params and optimizer state are donated to their updated
+        values (unless donate_params of jit_options is False), so they must not
+        be used after the call. Optimizers may also update the given params and
+        optimizer state in place (e.g. Optimizer on NumPy and torch backends),
+        so only the returned ones must be used afterwards on any backend.
+        """
+        if self.inference:
+            raise NotImplementedError(
+                "Inference mode does not support gradients calculation"
+            )
+        if self.specializations is not None or len(self.state_keys) > 0:
+            raise NotImplementedError(
+                "Train steps of models with dynamic or state keys are not "
+                "supported yet!"
+            )
+        if (
+            isinstance(self.backend, ParallelBackend)
+            and self.backend.get_parallel_manager() is not None
+        ):
+            raise NotImplementedError(
+                "Train steps are not supported for parallel backends yet!"
+            )
+        evaluate_all = self._generated_evaluate_all_fn
+        assert evaluate_all is not None, "Evaluate all function is not defined!"
+
+        def train_step(
+            params: ParamsEvalType[DataType],
+            data: DataEvalType[DataType] | None,
+            opt_state: Any,
+        ) -> tuple[DataEvalType[DataType], ParamsEvalType[DataType], Any]:
+            outputs, gradients = evaluate_all(params, data, None)
+            # Given mapping is copied, yet its arrays may be updated in place.
+            params, opt_state = optimizer.update_params(
+                dict(params), gradients, opt_state
+            )
+            return outputs, params, opt_state
+
+        if not self.jit or self.backend.is_manualgrad:
+            return train_step
+        if self.backend.backend_type == "jax":
+            options = self.jit_options if self.jit_options is not None else JitOptions()
+            return JitFunction(
+                self.backend,
+                train_step,
+                "train_step",
+                self.trace_log,
+                options,
+                donate_argnums=(0, 2) if options.donate_params else (),
+            )
+        return self.backend.jit(train_step)
+
+    def vmap_evaluate(
+        self, in_axes: Mapping[str, int | None], *, output_gradients: bool = False
+    ) -> Callable[..., Any]:
+        """Returns a function which evaluates the model for each index of the
+        mapped axes of its inputs in a single call:
+
+        >>> fn = pm.vmap_evaluate({"weight": 0, "bias": 0})
+        >>> outputs = fn(params, data)
+
+        in_axes maps params and data keys to their mapped axes, other inputs are
+        shared by all evaluations. Outputs (and gradients of params if
+        output_gradients is True) are stacked along a new leading axis. Mapping
+        data keys with output_gradients gives per-example gradients.
+
+        The generated function is vectorized with vmap of the backend, and also
+        jitted if the model is compiled with jit. Backends without vmap (e.g.
+        NumPy) evaluate all inputs at once with mapped axes moved to the front
+        if all operations on mapped values broadcast over leading axes.
+        Otherwise the model is evaluated for each index and results are
+        stacked.
+        """
+        if output_gradients and self.inference:
+            raise NotImplementedError(
+                "Inference mode does not support gradients calculation"
+            )
+        if self.specializations is not None or len(self.state_keys) > 0:
+            raise NotImplementedError(
+                "Vectorized evaluation of models with dynamic or state keys is "
+                "not supported yet!"
+            )
+        if (
+            isinstance(self.backend, ParallelBackend)
+            and self.backend.get_parallel_manager() is not None
+        ):
+            raise NotImplementedError(
+                "Vectorized evaluation is not supported for parallel backends yet!"
+            )
+        if unknown_keys := in_axes.keys() - self.input_keys:
+            raise KeyError(
+                "Mapped keys must be inputs of the model. "
+                f"Unknown keys: {', '.join(sorted(unknown_keys))}."
+            )
+        axes = {key: axis for key, axis in in_axes.items() if axis is not None}
+
+        if output_gradients:
+            evaluate_all = self._generated_evaluate_all_fn
+            assert evaluate_all is not None, "Evaluate all function is not defined!"
+
+            def evaluate(params: Any, data: Any) -> Any:
+                return evaluate_all(params, data, None)
+
+        else:
+            eval_fn = self._generated_eval_fn
+            cache: Mapping[str, Any] | None = self.flat_graph.cached_data
+            if not cache or self.contains_invalid_cache_value(cache):
+                cache = None
+
+            def evaluate(params: Any, data: Any) -> Any:
+                if cache is not None:
+                    return eval_fn(params, data, cache=cache)
+                return eval_fn(params, data)
+
+        if self.backend.is_manualgrad:
+            broadcast_outputs = None
+            if not output_gradients:
+                ranks = {
+                    key: None
+                    if (shape := self.shapes[key]) is None or "..." in shape
+                    else len(shape)
+                    for key, edge in self.data.items()
+                    if edge.is_tensor
+                }
+                broadcast_outputs = find_broadcast_outputs(
+                    self.flat_graph, axes.keys(), ranks
+                )
+
+            def vectorized_fn(params: Any = None, data: Any = None) -> Any:
+                params = params if params is not None else {}
+                data = data if data is not None else {}
+                if broadcast_outputs is not None:
+                    return broadcast_evaluate(
+                        self.backend, evaluate, params, data, axes, broadcast_outputs
+                    )
+                return loop_evaluate(self.backend, evaluate, params, data, axes)
+
+            return vectorized_fn
+
+        def vmapped_fn(params: Any = None, data: Any = None) -> Any:
+            params = params if params is not None else {}
+            data = data if data is not None else {}
+            in_axes = (
+                {key: axes.get(key) for key in params},
+                {key: axes.get(key) for key in data},
+            )
+            return self.backend.vmap(evaluate, in_axes=in_axes)(params, data)
+
+        if not self.jit:
+            return vmapped_fn
+        if self.backend.backend_type == "jax":
+            return JitFunction(
+                self.backend,
+                vmapped_fn,
+                "vmap_evaluate",
+                self.trace_log,
+                self.jit_options,
+            )
+        return self.backend.jit(vmapped_fn)
+
     def traverse_graph(self) -> None:
         for op in self.flat_graph.all_models:
             # Prune the operation if it is not needed
@@ -0,0 +1,72 @@
+# Copyright 2022 Synnada, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import annotations
+
+from collections import OrderedDict
+from collections.abc import Hashable
+from dataclasses import dataclass
+from typing import Any
+
+__all__ = ["SpecializationCache", "SpecializationStats"]
+
+DEFAULT_MAX_SPECIALIZATIONS = 16
+
+
+@dataclass
+class SpecializationStats:
+    specializations: int = 0
+    hits: int = 0
+    evictions: int = 0
+    # Total time spent for specializing (in seconds).
+    time: float = 0.0
+
+
+class SpecializationCache:
+    """Bounded LRU cache of shape specialized models.
+
+    Entries are keyed by concrete shapes of dynamic input keys. Once the number
+    of entries exceeds `max_size`, least recently used entry is evicted.
+    """
+
+    def __init__(self, max_size: int = DEFAULT_MAX_SPECIALIZATIONS) -> None:
+        if max_size < 1:
+            raise ValueError("Maximum number of specializations must be positive!")
+        self.max_size = max_size
+        self.stats = SpecializationStats()
+        self._entries: OrderedDict[Hashable, Any] = OrderedDict()
+
+    def get(self, key: Hashable) -> Any | None:
+        if (entry := self._entries.get(key)) is not None:
+            self._entries.move_to_end(key)
+            self.stats.hits += 1
+        return entry
+
+    def put(self, key: Hashable, entry: Any, elapsed: float) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        self.stats.specializations += 1
+        self.stats.time += elapsed
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.stats.evictions += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,176 @@
+# Copyright 2022 Synnada, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import annotations
+
+from collections.abc import Callable, Iterable, Mapping
+from typing import Any
+
+from ...backends.backend import Backend
+from ...utils.type_utils import is_list_int
+from .flat_graph import FlatGraph
+
+__all__ = [
+    "mapped_size",
+    "find_broadcast_outputs",
+    "broadcast_evaluate",
+    "loop_evaluate",
+]
+
+# Evaluates outputs (and gradients) of the model for the given params and data.
+EvaluateFn = Callable[[Any, Any], Any]
+
+
+def mapped_size(
+    params: Mapping[str, Any], data: Mapping[str, Any], in_axes: Mapping[str, int]
+) -> int:
+    """Returns the common size of mapped axes of the given inputs."""
+    inputs = {**params, **data}
+    if missing_keys := in_axes.keys() - inputs.keys():
+        raise KeyError(
+            "Mapped keys must be given to the vectorized function. "
+            f"Missing keys: {', '.join(sorted(missing_keys))}."
+        )
+    sizes = {inputs[key].shape[axis] for key, axis in in_axes.items()}
+    if len(sizes) != 1:
+        raise ValueError("Mapped axes of all inputs must have the same size!")
+    (size,) = sizes
+    return size
+
+
+def find_broadcast_outputs(
+    flat_graph: FlatGraph[Any],
+    mapped_keys: Iterable[str],
+    ranks: Mapping[str, int | None],
+) -> set[str] | None:
+    """Returns output keys depending on mapped keys if all operations consuming
+    mapped values are broadcast over a new leading axis of these values, None
+    otherwise. ranks are the number of dimensions of tensor keys, None for the
+    keys with unknown number of dimensions.
+    """
+    # Code generators import physical models, so fusion is imported here.
+    from ..codegen.py_style_codegen.fusion import ELEMENTWISE_FORMULAS
+
+    # Primitives which evaluate inputs having extra leading axes independently
+    # for each index of these axes, given that other inputs have no more axes.
+    broadcast_formulas = ELEMENTWISE_FORMULAS | {"matrix_multiplication", "buffer"}
+    mapped = set(mapped_keys)
+    for key in flat_graph.topological_order:
+        source_keys = [
+            source for source in flat_graph.get_source_keys(key) if source in ranks
+        ]
+        mapped_sources = [source for source in source_keys if source in mapped]
+        if not mapped_sources:
+            continue
+        formula_key = flat_graph.get_op(key).formula_key
+        if formula_key not in broadcast_formulas:
+            return None
+        source_ranks = [ranks[source] for source in source_keys]
+        if not is_list_int(source_ranks):
+            return None
+        min_rank = min(
+            rank
+            for source, rank in zip(source_keys, source_ranks, strict=True)
+            if source in mapped
+        )
+        # Other inputs must be aligned with the trailing axes of mapped inputs.
+        if max(source_ranks) > min_rank:
+            return None
+        if formula_key == "matrix_multiplication" and min_rank < 2:
+            return None
+        mapped.add(key)
+    return {out_key for out_key, key in flat_graph.output_dict.items() if key in mapped}
+
+
+def broadcast_evaluate(
+    backend: Backend[Any],
+    fn: EvaluateFn,
+    params: Mapping[str, Any],
+    data: Mapping[str, Any],
+    in_axes: Mapping[str, int],
+    broadcast_outputs: set[str],
+) -> Any:
+    """Evaluates fn once with mapped axes moved to the front of the inputs.
+    Outputs not depending on mapped inputs are repeated along the leading axis.
+    """
+    size = mapped_size(params, data, in_axes)
+    params = {
+        key: _move_to_front(backend, value, in_axes.get(key))
+        for key, value in params.items()
+    }
+    data = {
+        key: _move_to_front(backend, value, in_axes.get(key))
+        for key, value in data.items()
+    }
+    outputs = fn(params, data)
+    return {
+        key: value if key in broadcast_outputs else backend.stack([value] * size)
+        for key, value in outputs.items()
+    }
+
+
+def loop_evaluate(
+    backend: Backend[Any],
+    fn: EvaluateFn,
+    params: Mapping[str, Any],
+    data: Mapping[str, Any],
+    in_axes: Mapping[str, int],
+) -> Any:
+    """Evaluates fn for each index of the mapped axes and stacks the results
+    along a new leading axis.
+    """
+    size = mapped_size(params, data, in_axes)
+    results: list[Any] = []
+    for idx in range(size):
+        results.append(
+            fn(
+                {
+                    key: _take(value, in_axes.get(key), idx)
+                    for key, value in params.items()
+                },
+                {
+                    key: _take(value, in_axes.get(key), idx)
+                    for key, value in data.items()
+                },
+            )
+        )
+    if isinstance(results[0], tuple):
+        # Outputs and gradients.
+        return tuple(
+            _stack_dicts(backend, [result[idx] for result in results])
+            for idx in range(len(results[0]))
+        )
+    return _stack_dicts(backend, results)
+
+
+def _stack_dicts(
+    backend: Backend[Any], values: list[Mapping[str, Any]]
+) -> dict[str, Any]:
+    return {key: backend.stack([value[key] for value in values]) for key in values[0]}
+
+
+def _take(value: Any, axis: int | None, idx: int) -> Any:
+    if axis is None:
+        return value
+    index: list[Any] = [slice(None)] * value.ndim
+    index[axis] = idx
+    return value[tuple(index)]
+
+
+def _move_to_front(backend: Backend[Any], value: Any, axis: int | None) -> Any:
+    if axis is None or axis % value.ndim == 0:
+        return value
+    axis %= value.ndim
+    axes = [axis] + [idx for idx in range(value.ndim) if idx != axis]
+    return backend.transpose(value, axes)
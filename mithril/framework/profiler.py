@@ -0,0 +1,168 @@
+# Copyright 2022 Synnada, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import annotations
+
+import json
+import time
+import tracemalloc
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from typing import Any
+
+__all__ = [
+    "CompileProfiler",
+    "PhaseStats",
+    "ConstraintStats",
+    "compile_profiler",
+    "profile_phase",
+    "get_active_profiler",
+]
+
+
+@dataclass
+class PhaseStats:
+    calls: int = 0
+    # Wall time including nested phases.
+    time: float = 0.0
+    # Wall time excluding nested phases.
+    self_time: float = 0.0
+    # Net traced memory allocated during the phase (in bytes).
+    allocated_bytes: int = 0
+
+
+@dataclass
+class ConstraintStats:
+    calls: int = 0
+    time: float = 0.0
+
+
+@dataclass
+class CompileProfiler:
+    """Collects compile time statistics of PhysicalModel construction.
+
+    Statistics are collected per phase (wall time, call counts and net allocated
+    memory) and per constraint function (solver evaluation counts and time).
+    Phases can be nested, in that case `time` of a phase includes time spent in
+    its nested phases while `self_time` excludes them.
+    """
+
+    trace_memory: bool = True
+    phases: dict[str, PhaseStats] = field(default_factory=dict)
+    constraints: dict[str, ConstraintStats] = field(default_factory=dict)
+    total_time: float = 0.0
+    peak_memory: int = 0
+    _stack: list[list[float]] = field(default_factory=list, repr=False)
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        stats = self.phases.setdefault(name, PhaseStats())
+        memory_start = self._traced_memory()
+        # Second item accumulates time spent in nested phases.
+        frame = [time.perf_counter(), 0.0]
+        self._stack.append(frame)
+        try:
+            yield
+        finally:
+            self._stack.pop()
+            elapsed = time.perf_counter() - frame[0]
+            stats.calls += 1
+            stats.time += elapsed
+            stats.self_time += elapsed - frame[1]
+            stats.allocated_bytes += self._traced_memory() - memory_start
+            if self._stack:
+                self._stack[-1][1] += elapsed
+
+    def record_constraint(self, name: str, elapsed: float) -> None:
+        stats = self.constraints.setdefault(name, ConstraintStats())
+        stats.calls += 1
+        stats.time += elapsed
+
+    def _traced_memory(self) -> int:
+        if not self.trace_memory or not tracemalloc.is_tracing():
+            return 0
+        return tracemalloc.get_traced_memory()[0]
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "total_time": self.total_time,
+            "peak_memory": self.peak_memory,
+            "phases": {name: asdict(stats) for name, stats in self.phases.items()},
+            "constraints": {
+                name: asdict(stats)
+                for name, stats in sorted(
+                    self.constraints.items(), key=lambda item: -item[1].calls
+                )
+            },
+        }
+
+    def to_json(self, file_path: str | None = None, indent: int = 2) -> str:
+        """Dumps collected statistics as JSON. If file_path is given, also writes
+        the JSON string into the file.
+        """
+        report = json.dumps(self.to_dict(), indent=indent)
+        if file_path is not None:
+            with open(file_path, "w") as file:
+                file.write(report)
+        return report
+
+
+_active_profiler: ContextVar[CompileProfiler | None] = ContextVar(
+    "_active_profiler", default=None
+)
+
+
+def get_active_profiler() -> CompileProfiler | None:
+    return _active_profiler.get()
+
+
+@contextmanager
+def compile_profiler(trace_memory: bool = True) -> Iterator[CompileProfiler]:
+    """Activates a CompileProfiler for all compilations in the context.
+
+    Examples:
+
+    >>> with compile_profiler() as profiler:
+    ...     pm = ml.compile(model, backend)
+    >>> profiler.to_json("compile_profile.json")
+    """
+    profiler = CompileProfiler(trace_memory=trace_memory)
+    token = _active_profiler.set(profiler)
+    start_tracing = trace_memory and not tracemalloc.is_tracing()
+    if start_tracing:
+        tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        yield profiler
+    finally:
+        profiler.total_time += time.perf_counter() - start
+        if trace_memory and tracemalloc.is_tracing():
+            profiler.peak_memory = max(
+                profiler.peak_memory, tracemalloc.get_traced_memory()[1]
+            )
+        if start_tracing:
+            tracemalloc.stop()
+        _active_profiler.reset(token)
+
+
+@contextmanager
+def profile_phase(name: str) -> Iterator[None]:
+    """Records given phase into the active profiler, no-op if there is none."""
+    if (profiler := _active_profiler.get()) is None:
+        yield
+        return
+    with profiler.phase(name):
+        yield
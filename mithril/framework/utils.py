@@ -98,24 +98,38 @@ class GeneratedFunction:
     serialization and deserialization methods.
     """
 
-    def __init__(self, func: FunctionType, metadata: dict[str, str]):
+    def __init__(
+        self,
+        func: FunctionType,
+        metadata: dict[str, str],
+        namespace: dict[str, Any] | None = None,
+    ):
         self.func = func
         self.metadata: dict[str, str] = metadata
+        # Objects injected into globals of the generated code (e.g. compiled
+        # scan bodies) which are not a part of the source code.
+        self.namespace: dict[str, Any] = namespace if namespace is not None else {}
 
-    def __reduce__(self) -> tuple[Callable[[str, str], Any], tuple[str, str]]:
+    def __reduce__(
+        self,
+    ) -> tuple[
+        Callable[[str, str, dict[str, Any]], Any], tuple[str, str, dict[str, Any]]
+    ]:
         # Serialize the function code and metadata
         fn_name = self.metadata["fn_name"]
         source_code = self.metadata["source"]
-        return (self._unpickle, (source_code, fn_name))
+        return (self._unpickle, (source_code, fn_name, self.namespace))
 
     def __call__(self, *args: Any, **kwargs: Any) -> Any:
         return self.func(*args, **kwargs)
 
     @staticmethod
-    def _unpickle(source_code: str, fn_name: str) -> FunctionType:
+    def _unpickle(
+        source_code: str, fn_name: str, namespace: dict[str, Any] | None = None
+    ) -> FunctionType:
         # Compile the code string back to a code object
         code = compile(source_code, "<string>", "exec")
-        namespace: dict[str, Any] = {}
+        namespace = dict(namespace) if namespace is not None else {}
         exec(code, namespace)
         func = namespace[fn_name]
         return func
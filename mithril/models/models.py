@@ -85,6 +85,7 @@ from .primitives import (
     PrimitiveRandInt,
     PrimitiveRandn,
     Reshape,
+    Scan,
     Shape,
     Sigmoid,
     Sign,
@@ -1948,24 +1949,73 @@ class LSTMCellBody(Model):
 
 
 class RNN(Model):
+    """Applies `cell_type` along the first (sequence) axis of `input` with Scan,
+    feeding the states of the cell at each step to the next one. Initial states
+    are given by `initial_<state>` keys and outputs of the cell at all steps are
+    stacked into `output`. The model holds a single cell, so its size does not
+    depend on the sequence length.
+    """
+
+    input: Connection
+    output: Connection
+
+    # Batch of each step shrinks in unrolled subclasses, which a scan with fixed
+    # shapes can not express, so they connect a cell for each step instead.
+    unrolled: bool = False
+
     def __init__(
         self,
         cell_type: Cell,
+        input: Tensor[int | float | bool] | ToBeDetermined = TBD,
         *,
         name: str | None = None,
-        # **kwargs: Tensor[int | float | bool] | MainValueType,
+        **kwargs: Tensor[int | float | bool] | ToBeDetermined,
     ) -> None:
         self.cell_type = cell_type
         super().__init__(name=name)
-        # self.set_values(**kwargs)
+        if self.unrolled:
+            return
 
-    def connect(self, **kwargs: ConnectionType) -> ExtendInfo:  # type: ignore[override]
-        raise NotImplementedError("connect method not implemented!")
+        self.factory_args = {"cell_type": cell_type}
+        scan = Scan(
+            cell_type,
+            carries={f"prev_{key}": key for key in sorted(cell_type.state_keys)},
+            sequences=["input"],
+            output=cell_type.out_key,
+        )
+        shared_keys_kwargs = {
+            key: IOKey(key, value=kwargs.get(key, TBD)) for key in cell_type.shared_keys
+        }
+        initial_state_kwargs = {
+            f"prev_{key}": IOKey(
+                f"initial_{key}", value=kwargs.get(f"initial_{key}", TBD)
+            )
+            for key in cell_type.state_keys
+        }
+        self |= scan.connect(
+            input=IOKey("input", value=input),
+            output="output",
+            **(shared_keys_kwargs | initial_state_kwargs),
+        )
+        self.expose_keys("output")
+        self._set_cin("input")
+        self._set_cout("output")
+        self._freeze()
+
+    def connect(  # type: ignore[override]
+        self,
+        input: ConnectionType | Tensor[int | float | bool] = NOT_GIVEN,
+        output: ConnectionType = NOT_GIVEN,
+        **model_keys: ConnectionType | Tensor[int | float | bool],
+    ) -> ExtendInfo:
+        return super().connect(input=input, output=output, **model_keys)
 
 
 class OneToMany(RNN):
     input: Connection
 
+    unrolled = True
+
     def __init__(
         self,
         cell_type: Cell,
@@ -2059,6 +2109,8 @@ class OneToMany(RNN):
 class OneToManyInference(RNN):
     input: Connection
 
+    unrolled = True
+
     def __init__(
         self,
         cell_type: Cell,
@@ -2115,6 +2167,8 @@ class OneToManyInference(RNN):
 class ManyToOne(RNN):
     hidden_concat: Connection
 
+    unrolled = True
+
     def __init__(
         self,
         cell_type: Cell,
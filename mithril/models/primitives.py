@@ -15,7 +15,7 @@
 from __future__ import annotations
 
 import operator
-from collections.abc import Sequence
+from collections.abc import Mapping, Sequence
 from functools import partial
 from types import EllipsisType, NoneType
 from typing import Any
@@ -101,6 +101,7 @@ from ..framework.logical.operators import (
     PowerOp,
     ProdOp,
     ReshapeOp,
+    ScanOp,
     ShapeOp,
     ShiftLeftOp,
     ShiftRightOp,
@@ -238,6 +239,7 @@ __all__ = [
     "Maximum",
     "AtLeast1D",
     "Floor",
+    "Scan",
 ]
 
 
@@ -4000,3 +4002,56 @@ class Clamp(OperatorModel):
         super().__init__(
             name=name, model=ClampOp(input=input, min_val=min_val, max_val=max_val)
         )
+
+
+class Scan(OperatorModel):
+    """Applies the `body` model along the first axis of `sequences` without
+    unrolling it, see ScanOp for details.
+
+    Examples:
+
+    >>> cell = Model()
+    >>> cell |= Linear(8).connect(input="input", output="input_proj")
+    >>> cell |= Linear(8).connect(input="prev_hidden", output="hidden_proj")
+    >>> cell |= Add().connect(left="input_proj", right="hidden_proj", output="sum")
+    >>> cell |= Tanh().connect(input="sum", output="hidden")
+    >>> cell.expose_keys("hidden")
+    >>> rnn = Scan(cell, carries={"prev_hidden": "hidden"}, sequences=["input"])
+    """
+
+    output: Connection
+
+    def __init__(
+        self,
+        body: Model,
+        carries: Mapping[str, str] | Sequence[tuple[str, str]],
+        sequences: Sequence[str],
+        output: str | None = None,
+        *,
+        name: str | None = None,
+    ) -> None:
+        carries = dict(carries)
+        if output is None:
+            # Stack carry output by default.
+            if len(carries) != 1:
+                raise ValueError("Output must be specified for multiple carries!")
+            (output,) = carries.values()
+        self.factory_args = {
+            "body": body,
+            # Carries are stored as pairs since dict valued args are
+            # interpreted as IOKeys while loading models from dicts.
+            "carries": list(carries.items()),
+            "sequences": list(sequences),
+            "output": output,
+        }
+        super().__init__(
+            name=name,
+            model=ScanOp(body, carries, sequences, output),
+        )
+
+    def connect(  # type: ignore[override]
+        self,
+        output: ConnectionType = NOT_GIVEN,
+        **kwargs: ConnectionType | Tensor[int | float | bool],
+    ) -> ExtendInfo:
+        return super().connect(output=output, **kwargs)
@@ -546,6 +546,26 @@ class TrainModel(Model):
 
         self.dependency_map.update_all_keys()
 
+    @property
+    def sample_reduction(self) -> str | None:
+        """Reduction of the final cost over samples: "mean" if all losses are
+        reduced with Mean and "sum" if all losses are reduced with Sum. None if
+        the final cost is not a linear reduction of per-sample losses (i.e.
+        mixed or other reductions, custom loss combiners or regularizations,
+        which are added once regardless of the number of samples).
+        """
+        if self._regularizations or not isinstance(self.loss_combiner, Sum):
+            return None
+        reductions: set[type[BaseModel]] = set()
+        for loss_dict in self._losses:
+            reduce_steps = loss_dict["reduce_steps"] or [Mean()]
+            reductions |= {type(reduce_step) for reduce_step in reduce_steps}
+        if reductions == {Mean}:
+            return "mean"
+        elif reductions == {Sum}:
+            return "sum"
+        return None
+
     def _freeze(self) -> None:
         self._is_finalized = True
         return super()._freeze()
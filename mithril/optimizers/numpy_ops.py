@@ -0,0 +1,126 @@
+# Copyright 2022 Synnada, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import annotations
+
+from collections.abc import Sequence
+from typing import Any
+
+import numpy as np
+
+from .optimizer import VectorOps
+
+__all__ = ["NumpyOps"]
+
+
+class NumpyOps(VectorOps):
+    def __init__(self) -> None:
+        # Buckets of each (name, dtype) with the views given out for them.
+        self.buckets: dict[tuple[str, Any], tuple[Any, list[Any]]] = {}
+        self.scratch: dict[tuple[Any, Any], np.ndarray[Any, Any]] = {}
+
+    def bucket(
+        self, name: tuple[str, Any], keys: Sequence[str], arrays: dict[str, Any]
+    ) -> np.ndarray[Any, Any]:
+        """Returns the flat bucket of given arrays. If they are not the views of
+        the current bucket, a new one is created and arrays are replaced with
+        its views.
+        """
+        values = [arrays[key] for key in keys]
+        if (entry := self.buckets.get(name)) is not None:
+            flat, views = entry
+            if len(views) == len(values) and all(
+                value is view for value, view in zip(values, views, strict=True)
+            ):
+                return flat
+        flat = np.concatenate([np.ravel(value) for value in values])
+        views = []
+        offset = 0
+        for key, value in zip(keys, values, strict=True):
+            view = flat[offset : offset + value.size].reshape(value.shape)
+            arrays[key] = view
+            views.append(view)
+            offset += value.size
+        self.buckets[name] = (flat, views)
+        return flat
+
+    def gather(self, dtype: Any, values: list[Any]) -> np.ndarray[Any, Any]:
+        size = sum(value.size for value in values)
+        out = self._scratch(("grads", size), size, dtype)
+        return np.concatenate([np.ravel(value) for value in values], out=out)
+
+    def _scratch(self, name: Any, size: int, dtype: Any) -> np.ndarray[Any, Any]:
+        key = (name, dtype)
+        if (buffer := self.scratch.get(key)) is None:
+            buffer = self.scratch[key] = np.empty(size, dtype=dtype)
+        return buffer
+
+    def _tmp(self, x: np.ndarray[Any, Any], name: str = "tmp") -> np.ndarray[Any, Any]:
+        return self._scratch((name, x.size), x.size, x.dtype)
+
+    def mul(self, x: np.ndarray[Any, Any], scalar: Any) -> np.ndarray[Any, Any]:
+        return np.multiply(x, scalar, out=x)
+
+    def add(
+        self, x: np.ndarray[Any, Any], y: np.ndarray[Any, Any], alpha: Any = 1.0
+    ) -> np.ndarray[Any, Any]:
+        if alpha != 1.0:
+            y = np.multiply(y, alpha, out=self._tmp(x))
+        return np.add(x, y, out=x)
+
+    def add_scalar(self, x: np.ndarray[Any, Any], scalar: Any) -> np.ndarray[Any, Any]:
+        return np.add(x, scalar, out=x)
+
+    def addcmul(
+        self,
+        x: np.ndarray[Any, Any],
+        y: np.ndarray[Any, Any],
+        z: np.ndarray[Any, Any],
+        value: Any,
+    ) -> np.ndarray[Any, Any]:
+        tmp = np.multiply(y, z, out=self._tmp(x))
+        np.multiply(tmp, value, out=tmp)
+        return np.add(x, tmp, out=x)
+
+    def addcdiv(
+        self,
+        x: np.ndarray[Any, Any],
+        y: np.ndarray[Any, Any],
+        z: np.ndarray[Any, Any],
+        value: Any,
+    ) -> np.ndarray[Any, Any]:
+        tmp = np.divide(y, z, out=self._tmp(x))
+        np.multiply(tmp, value, out=tmp)
+        return np.add(x, tmp, out=x)
+
+    def lerp(
+        self, x: np.ndarray[Any, Any], y: np.ndarray[Any, Any], weight: Any
+    ) -> np.ndarray[Any, Any]:
+        tmp = np.subtract(y, x, out=self._tmp(x))
+        np.multiply(tmp, weight, out=tmp)
+        return np.add(x, tmp, out=x)
+
+    # Results of the operations below are written into a scratch buffer of each
+    # operation, so that no arrays are allocated in steps.
+
+    def sqrt(self, x: np.ndarray[Any, Any]) -> np.ndarray[Any, Any]:
+        return np.sqrt(x, out=self._tmp(x, "sqrt"))
+
+    def sign(self, x: np.ndarray[Any, Any]) -> np.ndarray[Any, Any]:
+        return np.sign(x, out=self._tmp(x, "sign"))
+
+    def clone(self, x: np.ndarray[Any, Any]) -> np.ndarray[Any, Any]:
+        out = self._tmp(x, "clone")
+        np.copyto(out, x)
+        return out
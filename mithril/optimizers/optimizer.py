@@ -0,0 +1,292 @@
+# Copyright 2022 Synnada, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from collections.abc import Callable, Mapping
+from typing import TYPE_CHECKING, Any
+
+from ..backends.backend import Backend
+
+if TYPE_CHECKING:
+    from .numpy_ops import NumpyOps
+
+__all__ = ["Optimizer"]
+
+# Vectors of update rules: a flat buffer (NumPy) or a list of arrays.
+Vector = Any
+
+
+class Optimizer(ABC):
+    """Base class of optimizers working with all backends.
+
+    Update rules are written once in terms of the multi-tensor operations of
+    VectorOps. Parameters and their gradients are updated with a handful of
+    vector operations instead of per-parameter expressions:
+
+    * NumPy: parameters and optimizer state are kept in contiguous buckets (one
+      per dtype) and returned as views of them, buckets are updated in place
+      with ufuncs.
+    * Torch: parameters and optimizer state are updated in place with
+      `torch._foreach_*` operations.
+    * Other backends: the update is applied functionally and jitted with the
+      backend jit on JAX.
+
+    Optimizer state is a plain dict of step count and arrays, so it could be
+    pickled and given to update_params of another optimizer once init() of
+    that optimizer is called with the same backend.
+
+    Examples:
+
+    >>> optimizer = Adam(lr=1e-3)
+    >>> state = optimizer.init(backend, params)
+    >>> outputs, gradients = pm.evaluate(params, data, output_gradients=True)
+    >>> params, state = optimizer.update_params(params, gradients, state)
+    """
+
+    # Names of per-parameter state entries (e.g. moments).
+    slot_names: tuple[str, ...] = ()
+
+    def __init__(self, lr: float) -> None:
+        self.lr = lr
+        self.backend: Backend[Any] | None = None
+        self._numpy_ops: NumpyOps | None = None
+        self._jitted_update: Callable[..., Any] | None = None
+
+    def hyperparams(self) -> dict[str, float]:
+        return {"lr": self.lr}
+
+    def init(self, backend: Backend[Any], params: Mapping[str, Any]) -> dict[str, Any]:
+        self.backend = backend
+        state: dict[str, Any] = {"step": 0}
+        for name in self.slot_names:
+            state[name] = {
+                key: backend.zeros_like(value) for key, value in params.items()
+            }
+        return state
+
+    @abstractmethod
+    def update(
+        self,
+        ops: VectorOps,
+        hparams: Mapping[str, Any],
+        step: Any,
+        params: Vector,
+        grads: Vector,
+        slots: dict[str, Vector],
+    ) -> tuple[Vector, dict[str, Vector]]:
+        """Update rule of the optimizer. Operations of ops may update their
+        first argument in place, so gradients must not be given as first
+        argument. step is the number of the current step starting from 1.
+        """
+        raise NotImplementedError()
+
+    def update_params(
+        self,
+        params: Mapping[str, Any],
+        gradients: Mapping[str, Any],
+        state: dict[str, Any],
+    ) -> tuple[dict[str, Any], dict[str, Any]]:
+        """Returns updated parameters and optimizer state. Parameters without
+        gradients are not updated. Given parameters and state may be updated in
+        place, only returned ones must be used afterwards.
+        """
+        if self.backend is None:
+            raise ValueError("Optimizer must be initialized with init() first!")
+        keys = [key for key in gradients if key in params]
+        backend_type = self.backend.backend_type
+        if backend_type == "numpy":
+            return self._update_numpy(keys, params, gradients, state)
+        elif backend_type == "torch":
+            return self._update_torch(keys, params, gradients, state)
+        return self._update_functional(keys, params, gradients, state)
+
+    def _update_numpy(
+        self,
+        keys: list[str],
+        params: Mapping[str, Any],
+        gradients: Mapping[str, Any],
+        state: dict[str, Any],
+    ) -> tuple[dict[str, Any], dict[str, Any]]:
+        if self._numpy_ops is None:
+            from .numpy_ops import NumpyOps
+
+            self._numpy_ops = NumpyOps()
+        ops = self._numpy_ops
+        new_params = dict(params)
+        new_state = dict(state)
+        step = state["step"] + 1
+        # One bucket for each dtype of parameters.
+        groups: dict[Any, list[str]] = {}
+        for key in keys:
+            groups.setdefault(params[key].dtype, []).append(key)
+
+        for dtype, group in groups.items():
+            flat_params = ops.bucket(("params", dtype), group, new_params)
+            flat_slots = {}
+            for name in self.slot_names:
+                new_state[name] = dict(state[name])
+                flat_slots[name] = ops.bucket((name, dtype), group, new_state[name])
+            flat_grads = ops.gather(dtype, [gradients[key] for key in group])
+            self.update(
+                ops, self.hyperparams(), step, flat_params, flat_grads, flat_slots
+            )
+        new_state["step"] = step
+        return new_params, new_state
+
+    def _update_torch(
+        self,
+        keys: list[str],
+        params: Mapping[str, Any],
+        gradients: Mapping[str, Any],
+        state: dict[str, Any],
+    ) -> tuple[dict[str, Any], dict[str, Any]]:
+        import torch
+
+        from .torch_ops import TorchOps
+
+        step = state["step"] + 1
+        slots = {name: [state[name][key] for key in keys] for name in self.slot_names}
+        with torch.no_grad():
+            self.update(
+                TorchOps(),
+                self.hyperparams(),
+                step,
+                [params[key] for key in keys],
+                [gradients[key] for key in keys],
+                slots,
+            )
+        return dict(params), state | {"step": step}
+
+    def _update_functional(
+        self,
+        keys: list[str],
+        params: Mapping[str, Any],
+        gradients: Mapping[str, Any],
+        state: dict[str, Any],
+    ) -> tuple[dict[str, Any], dict[str, Any]]:
+        assert self.backend is not None
+        if self._jitted_update is None:
+            self._jitted_update = self._functional_update
+            if self.backend.backend_type == "jax":
+                self._jitted_update = self.backend.jit(self._functional_update)
+        slots = {name: [state[name][key] for key in keys] for name in self.slot_names}
+        step, flat_params, slots = self._jitted_update(
+            self.hyperparams(),
+            state["step"],
+            [params[key] for key in keys],
+            [gradients[key] for key in keys],
+            slots,
+        )
+        new_state = state | {"step": step}
+        for name in self.slot_names:
+            new_state[name] = state[name] | dict(zip(keys, slots[name], strict=True))
+        return dict(params) | dict(zip(keys, flat_params, strict=True)), new_state
+
+    def _functional_update(
+        self,
+        hparams: Mapping[str, Any],
+        step: Any,
+        params: list[Any],
+        grads: list[Any],
+        slots: dict[str, list[Any]],
+    ) -> tuple[Any, list[Any], dict[str, list[Any]]]:
+        assert self.backend is not None
+        step = step + 1
+        params, slots = self.update(
+            FunctionalOps(self.backend), hparams, step, params, grads, slots
+        )
+        return step, params, slots
+
+
+class VectorOps(ABC):
+    """Multi-tensor operations used by update rules. Each operation returns its
+    result, which is its first argument updated in place for in-place backends.
+    """
+
+    @abstractmethod
+    def mul(self, x: Vector, scalar: Any) -> Vector:
+        """x * scalar"""
+
+    @abstractmethod
+    def add(self, x: Vector, y: Vector, alpha: Any = 1.0) -> Vector:
+        """x + alpha * y"""
+
+    @abstractmethod
+    def add_scalar(self, x: Vector, scalar: Any) -> Vector:
+        """x + scalar"""
+
+    @abstractmethod
+    def addcmul(self, x: Vector, y: Vector, z: Vector, value: Any) -> Vector:
+        """x + value * y * z"""
+
+    @abstractmethod
+    def addcdiv(self, x: Vector, y: Vector, z: Vector, value: Any) -> Vector:
+        """x + value * y / z"""
+
+    @abstractmethod
+    def lerp(self, x: Vector, y: Vector, weight: Any) -> Vector:
+        """x + weight * (y - x)"""
+
+    # Operations below do not update x, their results may be written into a
+    # scratch buffer reused by the next call of the same operation.
+
+    @abstractmethod
+    def sqrt(self, x: Vector) -> Vector:
+        """sqrt(x)"""
+
+    @abstractmethod
+    def sign(self, x: Vector) -> Vector:
+        """sign(x)"""
+
+    @abstractmethod
+    def clone(self, x: Vector) -> Vector:
+        """Copy of x"""
+
+
+class FunctionalOps(VectorOps):
+    def __init__(self, backend: Backend[Any]) -> None:
+        self.backend = backend
+
+    def mul(self, x: list[Any], scalar: Any) -> list[Any]:
+        return [item * scalar for item in x]
+
+    def add(self, x: list[Any], y: list[Any], alpha: Any = 1.0) -> list[Any]:
+        return [a + alpha * b for a, b in zip(x, y, strict=True)]
+
+    def add_scalar(self, x: list[Any], scalar: Any) -> list[Any]:
+        return [item + scalar for item in x]
+
+    def addcmul(
+        self, x: list[Any], y: list[Any], z: list[Any], value: Any
+    ) -> list[Any]:
+        return [a + value * b * c for a, b, c in zip(x, y, z, strict=True)]
+
+    def addcdiv(
+        self, x: list[Any], y: list[Any], z: list[Any], value: Any
+    ) -> list[Any]:
+        return [a + value * b / c for a, b, c in zip(x, y, z, strict=True)]
+
+    def lerp(self, x: list[Any], y: list[Any], weight: Any) -> list[Any]:
+        return [a + weight * (b - a) for a, b in zip(x, y, strict=True)]
+
+    def sqrt(self, x: list[Any]) -> list[Any]:
+        return [item**0.5 for item in x]
+
+    def sign(self, x: list[Any]) -> list[Any]:
+        return [self.backend.sign(item) for item in x]
+
+    def clone(self, x: list[Any]) -> list[Any]:
+        return list(x)
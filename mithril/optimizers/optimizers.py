@@ -0,0 +1,242 @@
+# Copyright 2022 Synnada, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import annotations
+
+from collections.abc import Mapping
+from typing import Any
+
+from .optimizer import Optimizer, Vector, VectorOps
+
+__all__ = ["SGD", "Adam", "AdamW", "RMSProp", "Lion"]
+
+
+class SGD(Optimizer):
+    """Stochastic gradient descent with optional (Nesterov) momentum and L2
+    weight decay.
+    """
+
+    def __init__(
+        self,
+        lr: float = 0.01,
+        momentum: float = 0.0,
+        weight_decay: float = 0.0,
+        nesterov: bool = False,
+    ) -> None:
+        super().__init__(lr)
+        if nesterov and momentum == 0.0:
+            raise ValueError("Nesterov momentum requires a non-zero momentum!")
+        self.momentum = momentum
+        self.weight_decay = weight_decay
+        self.nesterov = nesterov
+        self.slot_names = ("momentum_buffer",) if momentum != 0.0 else ()
+
+    def hyperparams(self) -> dict[str, float]:
+        return {
+            "lr": self.lr,
+            "momentum": self.momentum,
+            "weight_decay": self.weight_decay,
+        }
+
+    def update(
+        self,
+        ops: VectorOps,
+        hparams: Mapping[str, Any],
+        step: Any,
+        params: Vector,
+        grads: Vector,
+        slots: dict[str, Vector],
+    ) -> tuple[Vector, dict[str, Vector]]:
+        lr, weight_decay = hparams["lr"], hparams["weight_decay"]
+        if self.momentum == 0.0:
+            # p - lr * (g + weight_decay * p)
+            if self.weight_decay != 0.0:
+                params = ops.mul(params, 1 - lr * weight_decay)
+            return ops.add(params, grads, -lr), slots
+
+        momentum = hparams["momentum"]
+        # momentum * buffer + g + weight_decay * p
+        buffer = ops.mul(slots["momentum_buffer"], momentum)
+        buffer = ops.add(buffer, grads)
+        if self.weight_decay != 0.0:
+            buffer = ops.add(buffer, params, weight_decay)
+        if self.nesterov:
+            # p - lr * (g + weight_decay * p + momentum * buffer)
+            if self.weight_decay != 0.0:
+                params = ops.mul(params, 1 - lr * weight_decay)
+            params = ops.add(params, grads, -lr)
+            params = ops.add(params, buffer, -lr * momentum)
+        else:
+            params = ops.add(params, buffer, -lr)
+        return params, {"momentum_buffer": buffer}
+
+
+class Adam(Optimizer):
+    """Adam optimizer with bias corrected moment estimates."""
+
+    slot_names = ("m", "v")
+
+    def __init__(
+        self,
+        lr: float = 0.001,
+        beta1: float = 0.9,
+        beta2: float = 0.999,
+        eps: float = 1e-8,
+    ) -> None:
+        super().__init__(lr)
+        self.beta1 = beta1
+        self.beta2 = beta2
+        self.eps = eps
+        self.weight_decay = 0.0
+
+    def hyperparams(self) -> dict[str, float]:
+        return {
+            "lr": self.lr,
+            "beta1": self.beta1,
+            "beta2": self.beta2,
+            "eps": self.eps,
+            "weight_decay": self.weight_decay,
+        }
+
+    def update(
+        self,
+        ops: VectorOps,
+        hparams: Mapping[str, Any],
+        step: Any,
+        params: Vector,
+        grads: Vector,
+        slots: dict[str, Vector],
+    ) -> tuple[Vector, dict[str, Vector]]:
+        lr, beta1, beta2 = hparams["lr"], hparams["beta1"], hparams["beta2"]
+        m = ops.lerp(slots["m"], grads, 1 - beta1)
+        v = ops.mul(slots["v"], beta2)
+        v = ops.addcmul(v, grads, grads, 1 - beta2)
+        # sqrt(v / (1 - beta2^t)) + eps
+        denom = ops.sqrt(v)
+        denom = ops.mul(denom, (1 - beta2**step) ** -0.5)
+        denom = ops.add_scalar(denom, hparams["eps"])
+        if self.weight_decay != 0.0:
+            # Decoupled weight decay.
+            params = ops.mul(params, 1 - lr * hparams["weight_decay"])
+        params = ops.addcdiv(params, m, denom, -lr / (1 - beta1**step))
+        return params, {"m": m, "v": v}
+
+
+class AdamW(Adam):
+    """Adam optimizer with decoupled weight decay."""
+
+    def __init__(
+        self,
+        lr: float = 0.001,
+        beta1: float = 0.9,
+        beta2: float = 0.999,
+        eps: float = 1e-8,
+        weight_decay: float = 0.01,
+    ) -> None:
+        super().__init__(lr, beta1, beta2, eps)
+        self.weight_decay = weight_decay
+
+
+class RMSProp(Optimizer):
+    """RMSProp optimizer with optional momentum."""
+
+    def __init__(
+        self,
+        lr: float = 0.01,
+        alpha: float = 0.99,
+        eps: float = 1e-8,
+        momentum: float = 0.0,
+    ) -> None:
+        super().__init__(lr)
+        self.alpha = alpha
+        self.eps = eps
+        self.momentum = momentum
+        self.slot_names = ("square_avg",)
+        if momentum != 0.0:
+            self.slot_names += ("momentum_buffer",)
+
+    def hyperparams(self) -> dict[str, float]:
+        return {
+            "lr": self.lr,
+            "alpha": self.alpha,
+            "eps": self.eps,
+            "momentum": self.momentum,
+        }
+
+    def update(
+        self,
+        ops: VectorOps,
+        hparams: Mapping[str, Any],
+        step: Any,
+        params: Vector,
+        grads: Vector,
+        slots: dict[str, Vector],
+    ) -> tuple[Vector, dict[str, Vector]]:
+        alpha = hparams["alpha"]
+        square_avg = ops.mul(slots["square_avg"], alpha)
+        square_avg = ops.addcmul(square_avg, grads, grads, 1 - alpha)
+        avg = ops.add_scalar(ops.sqrt(square_avg), hparams["eps"])
+        if self.momentum == 0.0:
+            params = ops.addcdiv(params, grads, avg, -hparams["lr"])
+            return params, {"square_avg": square_avg}
+
+        buffer = ops.mul(slots["momentum_buffer"], hparams["momentum"])
+        buffer = ops.addcdiv(buffer, grads, avg, 1.0)
+        params = ops.add(params, buffer, -hparams["lr"])
+        return params, {"square_avg": square_avg, "momentum_buffer": buffer}
+
+
+class Lion(Optimizer):
+    """Lion optimizer (evolved sign momentum) with decoupled weight decay."""
+
+    slot_names = ("m",)
+
+    def __init__(
+        self,
+        lr: float = 1e-4,
+        beta1: float = 0.9,
+        beta2: float = 0.99,
+        weight_decay: float = 0.0,
+    ) -> None:
+        super().__init__(lr)
+        self.beta1 = beta1
+        self.beta2 = beta2
+        self.weight_decay = weight_decay
+
+    def hyperparams(self) -> dict[str, float]:
+        return {
+            "lr": self.lr,
+            "beta1": self.beta1,
+            "beta2": self.beta2,
+            "weight_decay": self.weight_decay,
+        }
+
+    def update(
+        self,
+        ops: VectorOps,
+        hparams: Mapping[str, Any],
+        step: Any,
+        params: Vector,
+        grads: Vector,
+        slots: dict[str, Vector],
+    ) -> tuple[Vector, dict[str, Vector]]:
+        lr = hparams["lr"]
+        direction = ops.sign(
+            ops.lerp(ops.clone(slots["m"]), grads, 1 - hparams["beta1"])
+        )
+        if self.weight_decay != 0.0:
+            params = ops.mul(params, 1 - lr * hparams["weight_decay"])
+        params = ops.add(params, direction, -lr)
+        m = ops.lerp(slots["m"], grads, 1 - hparams["beta2"])
+        return params, {"m": m}
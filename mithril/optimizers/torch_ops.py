@@ -0,0 +1,74 @@
+# Copyright 2022 Synnada, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import annotations
+
+from typing import Any
+
+import torch
+
+from .optimizer import VectorOps
+
+__all__ = ["TorchOps"]
+
+
+class TorchOps(VectorOps):
+    def mul(self, x: list[torch.Tensor], scalar: Any) -> list[torch.Tensor]:
+        torch._foreach_mul_(x, scalar)
+        return x
+
+    def add(
+        self, x: list[torch.Tensor], y: list[torch.Tensor], alpha: Any = 1.0
+    ) -> list[torch.Tensor]:
+        torch._foreach_add_(x, y, alpha=alpha)
+        return x
+
+    def add_scalar(self, x: list[torch.Tensor], scalar: Any) -> list[torch.Tensor]:
+        torch._foreach_add_(x, scalar)
+        return x
+
+    def addcmul(
+        self,
+        x: list[torch.Tensor],
+        y: list[torch.Tensor],
+        z: list[torch.Tensor],
+        value: Any,
+    ) -> list[torch.Tensor]:
+        torch._foreach_addcmul_(x, y, z, value=value)
+        return x
+
+    def addcdiv(
+        self,
+        x: list[torch.Tensor],
+        y: list[torch.Tensor],
+        z: list[torch.Tensor],
+        value: Any,
+    ) -> list[torch.Tensor]:
+        torch._foreach_addcdiv_(x, y, z, value=value)
+        return x
+
+    def lerp(
+        self, x: list[torch.Tensor], y: list[torch.Tensor], weight: Any
+    ) -> list[torch.Tensor]:
+        torch._foreach_lerp_(x, y, weight)
+        return x
+
+    def sqrt(self, x: list[torch.Tensor]) -> list[torch.Tensor]:
+        return list(torch._foreach_sqrt(x))
+
+    def sign(self, x: list[torch.Tensor]) -> list[torch.Tensor]:
+        return list(torch._foreach_sign(x))
+
+    def clone(self, x: list[torch.Tensor]) -> list[torch.Tensor]:
+        return list(torch._foreach_mul(x, 1.0))
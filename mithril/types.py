@@ -19,7 +19,7 @@ import builtins as py_builtins
 import enum
 from enum import Enum
 
-from .cores.core import DataType, GenericDataType, data_types
+from .cores.core import DataType, GenericDataType, get_data_types
 
 __all__ = [
     "DataType",
@@ -44,7 +44,7 @@ __all__ = [
     "constant_type_table",
     "constant_shp_table",
     "epsilon_table",
-    "data_types",
+    "get_data_types",
 ]
 
 
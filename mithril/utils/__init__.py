@@ -21,4 +21,6 @@ model_conversion_lut: dict[str, list[str]] = {
     "onetomany": ["cell_type"],
     "encoderdecoder": ["cell_type"],
     "trainmodel": ["model"],
+    "scan": ["body"],
+    "rnn": ["cell_type"],
 }
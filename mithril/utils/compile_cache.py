@@ -0,0 +1,276 @@
+# Copyright 2022 Synnada, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import annotations
+
+import contextlib
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+import warnings
+from collections.abc import Iterable, Mapping
+from dataclasses import dataclass
+from enum import Enum
+from importlib import metadata
+from typing import Any
+
+from ..backends.backend import Backend
+from ..framework.logical.model import Connection
+from ..framework.physical.model import PhysicalModel
+from ..models import BaseModel
+from .dict_conversions import model_to_dict
+from .shared_object_cache import SharedObjectCache, get_shared_object_cache
+
+__all__ = ["CompileCache", "CompileCacheStats", "get_compile_cache"]
+
+CACHE_FILE_SUFFIX = ".mithril"
+DEFAULT_MAX_CACHE_SIZE = 1 << 30  # 1 GiB
+SHARED_OBJECT_DIR = "shared_objects"
+
+
+def _mithril_version() -> str:
+    try:
+        return metadata.version("mithril")
+    except metadata.PackageNotFoundError:
+        return "dev"
+
+
+def _key_name(key: str | Connection) -> str:
+    return key.key if isinstance(key, Connection) else key
+
+
+def _encode_value(value: Any) -> Any:
+    # Fallback encoder for values json can not serialize. Arrays are represented
+    # with a digest of their pickled content instead of their full content.
+    if isinstance(value, Enum):
+        return repr(value)
+    if isinstance(value, set | frozenset):
+        return sorted(str(item) for item in value)
+    if hasattr(value, "shape") and hasattr(value, "dtype"):
+        return {
+            "shape": [int(dim) for dim in value.shape],
+            "dtype": str(value.dtype),
+            "digest": hashlib.sha256(pickle.dumps(value)).hexdigest(),
+        }
+    return repr(value)
+
+
+@dataclass
+class CompileCacheStats:
+    hits: int = 0
+    misses: int = 0
+    stores: int = 0
+    evictions: int = 0
+
+
+class CompileCache:
+    """On-disk cache of compiled PhysicalModels.
+
+    Every entry holds the pickled state of a PhysicalModel (flat graph, inferred
+    shapes/types and static data) right after code generation together with the
+    generated source code. Entries are keyed by a fingerprint of the logical model,
+    the backend and all compile arguments, so a hit skips flattening, constraint
+    solving, static inference and (for Python backends) code generation.
+
+    Entries are evicted in least recently used order once the total size of the
+    cache directory exceeds `max_size` bytes. Shared objects built for C backends
+    are cached separately in the `shared_objects` sub directory.
+
+    Note:
+        Cache entries are loaded with pickle, only use cache directories
+        whose content is trusted.
+    """
+
+    def __init__(self, cache_dir: str, max_size: int = DEFAULT_MAX_CACHE_SIZE):
+        self.cache_dir = os.path.abspath(os.path.expanduser(cache_dir))
+        self.max_size = max_size
+        self.stats = CompileCacheStats()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def fingerprint(
+        self,
+        model: BaseModel,
+        backend: Backend[Any],
+        *,
+        constant_keys: Mapping[Any, Any],
+        data_keys: Iterable[str | Connection],
+        discard_keys: Iterable[str | Connection],
+        trainable_keys: Iterable[str | Connection],
+        shapes: Mapping[Any, Any],
+        **compile_flags: Any,
+    ) -> str | None:
+        """Returns canonical fingerprint of a compilation request. Returns None
+        if the model can not be serialized, which means it can not be cached.
+        """
+        try:
+            model_dict = model_to_dict(model)
+        except Exception as e:
+            warnings.warn(
+                f"Model could not be fingerprinted, compile cache is skipped: {e}",
+                stacklevel=2,
+            )
+            return None
+
+        info = {
+            "version": _mithril_version(),
+            "model": model_dict,
+            "backend": backend.backend_type,
+            "dtype": backend.default_dtype.name,
+            "device": str(backend.device),
+            "registered_primitives": sorted(backend.registered_primitives),
+            "constant_keys": {
+                _key_name(key): value for key, value in constant_keys.items()
+            },
+            "data_keys": sorted(_key_name(key) for key in data_keys),
+            "discard_keys": sorted(_key_name(key) for key in discard_keys),
+            "trainable_keys": sorted(_key_name(key) for key in trainable_keys),
+            "shapes": {_key_name(key): list(value) for key, value in shapes.items()},
+            "flags": compile_flags,
+        }
+        serialized = json.dumps(info, sort_keys=True, default=_encode_value)
+        return hashlib.sha256(serialized.encode()).hexdigest()
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + CACHE_FILE_SUFFIX)
+
+    def load(
+        self, key: str, backend: Backend[Any]
+    ) -> tuple[PhysicalModel[Any], str | None] | None:
+        """Loads the cached PhysicalModel and its generated code for the given
+        fingerprint. Loaded model is bound to the given backend.
+        """
+        path = self._entry_path(key)
+        try:
+            with open(path, "rb") as file:
+                entry = _BackendUnpickler(file, backend).load()
+        except FileNotFoundError:
+            self.stats.misses += 1
+            return None
+        except Exception as e:
+            # Corrupted or incompatible entry, drop it.
+            warnings.warn(f"Invalid compile cache entry is removed: {e}", stacklevel=2)
+            self._remove(path)
+            self.stats.misses += 1
+            return None
+
+        # Refresh access time for LRU eviction.
+        os.utime(path)
+        self.stats.hits += 1
+        return entry["model"], entry["code"]
+
+    def store(self, key: str, pm: PhysicalModel[Any], code: str | None) -> None:
+        """Atomically writes the given PhysicalModel and its generated code
+        into the cache and evicts least recently used entries if necessary.
+        """
+        entry = {"model": pm, "code": code}
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                _BackendPickler(file, pm.backend).dump(entry)
+            os.replace(tmp_path, self._entry_path(key))
+        except Exception as e:
+            self._remove(tmp_path)
+            warnings.warn(
+                f"Compiled model could not be stored in compile cache: {e}",
+                stacklevel=2,
+            )
+            return
+        self.stats.stores += 1
+        self.evict()
+
+    def evict(self) -> None:
+        entries: list[tuple[float, int, str]] = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(CACHE_FILE_SUFFIX):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total_size = sum(size for _, size, _ in entries)
+        # Remove oldest entries first.
+        for _, size, path in sorted(entries):
+            if total_size <= self.max_size:
+                break
+            self._remove(path)
+            total_size -= size
+            self.stats.evictions += 1
+
+    def clear(self) -> None:
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(CACHE_FILE_SUFFIX):
+                self._remove(os.path.join(self.cache_dir, name))
+
+    @property
+    def shared_objects(self) -> SharedObjectCache:
+        return get_shared_object_cache(
+            os.path.join(self.cache_dir, SHARED_OBJECT_DIR), self.max_size
+        )
+
+    @property
+    def size(self) -> int:
+        return sum(
+            os.path.getsize(os.path.join(self.cache_dir, name))
+            for name in os.listdir(self.cache_dir)
+            if name.endswith(CACHE_FILE_SUFFIX)
+        )
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(path)
+
+
+class _BackendPickler(pickle.Pickler):
+    # Backends hold framework specific device and RNG objects. They are not
+    # stored in the cache, the backend given to compile is injected while loading.
+    def __init__(self, file: Any, backend: Backend[Any]) -> None:
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.backend = backend
+
+    def persistent_id(self, obj: Any) -> str | None:
+        if obj is self.backend:
+            return "backend"
+        return None
+
+
+class _BackendUnpickler(pickle.Unpickler):
+    def __init__(self, file: Any, backend: Backend[Any]) -> None:
+        super().__init__(file)
+        self.backend = backend
+
+    def persistent_load(self, pid: Any) -> Backend[Any]:
+        if pid != "backend":
+            raise pickle.UnpicklingError(f"Unknown persistent id: {pid}")
+        return self.backend
+
+
+_compile_caches: dict[str, CompileCache] = {}
+
+
+def get_compile_cache(cache: str | CompileCache) -> CompileCache:
+    """Returns a CompileCache for the given directory. The same object is returned
+    for the same directory so that hit/miss statistics accumulate across calls.
+    """
+    if isinstance(cache, CompileCache):
+        return cache
+    path = os.path.abspath(os.path.expanduser(cache))
+    if (compile_cache := _compile_caches.get(path)) is None:
+        compile_cache = _compile_caches[path] = CompileCache(path)
+    return compile_cache
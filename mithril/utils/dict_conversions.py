@@ -900,9 +900,10 @@ def handle_model_to_dict_args(
     """
     for key in model_conversion_lut.get(model_name.lower(), []):
         info = source[key]
+        # Models are replaced in place, skip the ones converted by a previous call.
         if isinstance(info, list):
-            source[key] = [model_to_dict(k) for k in info]
-        else:
+            source[key] = [k if isinstance(k, dict) else model_to_dict(k) for k in info]
+        elif not isinstance(info, dict):
             source[key] = model_to_dict(info)
 
     for key in source:
@@ -0,0 +1,201 @@
+# Copyright 2022 Synnada, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import annotations
+
+import contextlib
+import hashlib
+import json
+import os
+import platform
+import re
+import shutil
+import tempfile
+from collections.abc import Sequence
+from dataclasses import dataclass
+
+__all__ = [
+    "SharedObjectCache",
+    "SharedObjectCacheStats",
+    "find_included_headers",
+    "get_shared_object_cache",
+]
+
+SHARED_OBJECT_SUFFIX = ".so"
+DEFAULT_MAX_CACHE_SIZE = 1 << 30  # 1 GiB
+
+_INCLUDE_PATTERN = re.compile(r'^\s*#\s*include\s*"([^"]+)"', re.MULTILINE)
+
+
+def find_included_headers(source: str, source_dir: str) -> list[str]:
+    """Returns paths of all local headers (i.e. `#include "..."`) the given
+    source depends on, following the includes of found headers recursively.
+    Headers which do not exist relative to their includer are skipped.
+    """
+    headers: list[str] = []
+    pending = [(source, source_dir)]
+    while pending:
+        code, directory = pending.pop()
+        for name in _INCLUDE_PATTERN.findall(code):
+            path = os.path.normpath(os.path.join(directory, name))
+            if path in headers or not os.path.isfile(path):
+                continue
+            headers.append(path)
+            with open(path) as file:
+                pending.append((file.read(), os.path.dirname(path)))
+    return sorted(headers)
+
+
+@dataclass
+class SharedObjectCacheStats:
+    hits: int = 0
+    misses: int = 0
+    stores: int = 0
+    evictions: int = 0
+
+
+class SharedObjectCache:
+    """Content addressed on-disk cache of shared objects built from generated C
+    code.
+
+    Entries are keyed by a digest of the generated source, the compiler command
+    and the content of all headers the source includes, so byte identical
+    sources compiled with the same flags are built only once. Hits are copied to
+    the requested path instead of compiling the source again.
+
+    Entries are written to a temporary file and atomically renamed, so the
+    cache could be shared by concurrent processes. Least recently used entries
+    are evicted once the total size of the cache directory exceeds `max_size`
+    bytes.
+
+    Note:
+        Builds with host specific flags (e.g. -march=native) should not be
+        shared between hosts with different CPUs.
+    """
+
+    def __init__(self, cache_dir: str, max_size: int = DEFAULT_MAX_CACHE_SIZE):
+        self.cache_dir = os.path.abspath(os.path.expanduser(cache_dir))
+        self.max_size = max_size
+        self.stats = SharedObjectCacheStats()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def fingerprint(
+        self, source: str, command: Sequence[str], headers: Sequence[str]
+    ) -> str:
+        """Returns the digest of a build. Command must not contain paths which
+        differ between builds of the same source (e.g. source or output files).
+        """
+        header_digests = {}
+        for path in headers:
+            with open(path, "rb") as file:
+                header_digests[path] = hashlib.sha256(file.read()).hexdigest()
+        info = {
+            "platform": [platform.system(), platform.machine()],
+            "source": source,
+            "command": list(command),
+            "headers": header_digests,
+        }
+        serialized = json.dumps(info, sort_keys=True)
+        return hashlib.sha256(serialized.encode()).hexdigest()
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + SHARED_OBJECT_SUFFIX)
+
+    def load(self, key: str, path: str) -> bool:
+        """Copies the cached shared object of the given fingerprint to path.
+        Returns False if there is no such entry.
+        """
+        entry_path = self._entry_path(key)
+        try:
+            shutil.copyfile(entry_path, path)
+            # Refresh access time for LRU eviction.
+            os.utime(entry_path)
+        except FileNotFoundError:
+            # Entry could also be evicted by another process while copying.
+            self.stats.misses += 1
+            return False
+        self.stats.hits += 1
+        return True
+
+    def store(self, key: str, path: str) -> None:
+        """Atomically copies the shared object built at path into the cache and
+        evicts least recently used entries if necessary.
+        """
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        os.close(fd)
+        try:
+            shutil.copyfile(path, tmp_path)
+            os.replace(tmp_path, self._entry_path(key))
+        except BaseException:
+            self._remove(tmp_path)
+            raise
+        self.stats.stores += 1
+        self.evict()
+
+    def evict(self) -> None:
+        entries: list[tuple[float, int, str]] = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(SHARED_OBJECT_SUFFIX):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total_size = sum(size for _, size, _ in entries)
+        # Remove oldest entries first.
+        for _, size, path in sorted(entries):
+            if total_size <= self.max_size:
+                break
+            self._remove(path)
+            total_size -= size
+            self.stats.evictions += 1
+
+    def clear(self) -> None:
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(SHARED_OBJECT_SUFFIX):
+                self._remove(os.path.join(self.cache_dir, name))
+
+    @property
+    def size(self) -> int:
+        return sum(
+            os.path.getsize(os.path.join(self.cache_dir, name))
+            for name in os.listdir(self.cache_dir)
+            if name.endswith(SHARED_OBJECT_SUFFIX)
+        )
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(path)
+
+
+_shared_object_caches: dict[str, SharedObjectCache] = {}
+
+
+def get_shared_object_cache(
+    cache: str | SharedObjectCache, max_size: int = DEFAULT_MAX_CACHE_SIZE
+) -> SharedObjectCache:
+    """Returns a SharedObjectCache for the given directory. The same object is
+    returned for the same directory so that hit/miss statistics accumulate
+    across calls.
+    """
+    if isinstance(cache, SharedObjectCache):
+        return cache
+    path = os.path.abspath(os.path.expanduser(cache))
+    if (so_cache := _shared_object_caches.get(path)) is None:
+        so_cache = _shared_object_caches[path] = SharedObjectCache(path, max_size)
+    return so_cache
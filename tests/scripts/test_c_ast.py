@@ -79,3 +79,15 @@ def test_binary_op_with_variable():
 def test_binary_op_with_constant_and_variable():
     binary_op = c_ast.BinaryOp("+", c_ast.Constant(1), c_ast.Variable("x"))
     assert c_ast.CStyleCodeGenerator().visit(binary_op) == "1 + x"
+
+
+def test_for_loop():
+    loop = c_ast.For(
+        c_ast.BinaryOp("=", c_ast.Variable("int t"), c_ast.Constant(0)),
+        c_ast.BinaryOp("<", c_ast.Variable("t"), c_ast.Constant(3)),
+        c_ast.Variable("t++"),
+        [c_ast.MakeStmt(c_ast.Call("step", [c_ast.Variable("t")]))],
+    )
+    assert c_ast.CStyleCodeGenerator().visit(loop) == (
+        "for (int t = 0; t < 3; t++) {\n    step(t);\n}"
+    )
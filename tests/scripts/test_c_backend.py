@@ -13,16 +13,28 @@
 # limitations under the License.
 
 import os
+import resource
+import sys
 from collections.abc import Callable
 from copy import deepcopy
 from itertools import product
 
 import numpy as np
+import pytest
 
 from mithril import Backend, CBackend, GGMLBackend, NumpyBackend, compile
 from mithril.cores.c.array import PyArray
 from mithril.framework.common import Tensor
-from mithril.models import Add, BroadcastTo, IOKey, Mean, Model, Multiply
+from mithril.models import (
+    Add,
+    BroadcastTo,
+    IOKey,
+    MatrixMultiply,
+    Mean,
+    Model,
+    Multiply,
+    Relu,
+)
 
 from ..utils import with_temp_file
 
@@ -363,3 +375,163 @@ def test_implicit_broadcast_ops():
 
         assert out.shape == (5, 5)
         np.testing.assert_allclose(backend.to_numpy(out), op[1](left, right))
+
+
+def test_cbackend_release_build():
+    model = Model()
+    model |= MatrixMultiply().connect(left="left", right="right", output="mult")
+    model |= Add().connect(left="mult", right="bias", output="add")
+    model |= Relu().connect(input="add", output=IOKey("output"))
+    model.set_types(left=Tensor, right=Tensor, bias=Tensor)
+    model.set_differentiability(left=True, right=True, bias=True)
+    shapes = {"left": [70, 129], "right": [129, 65], "bias": [65]}
+
+    np_backend = NumpyBackend()
+    params = {key: np_backend.randn(*shape) for key, shape in shapes.items()}
+    output_grad = np_backend.randn(70, 65)
+    np_pm = compile(model, np_backend, shapes=shapes, jit=False)
+    np_outputs, np_grads = np_pm.evaluate(
+        params, {}, output_gradients={"output": output_grad}
+    )
+
+    for build in ("debug", "release", "native"):
+        c_backend = CBackend(build=build)
+        c_pm = compile(model, c_backend, shapes=shapes, jit=False)
+        c_outputs, c_grads = c_pm.evaluate(
+            {key: c_backend.array(value) for key, value in params.items()},
+            {},
+            output_gradients={"output": c_backend.array(output_grad)},
+        )
+        np.testing.assert_allclose(
+            c_backend.to_numpy(c_outputs["output"]),
+            np_outputs["output"],
+            rtol=1e-4,
+            atol=1e-4,
+        )
+        for key in np_grads:
+            np.testing.assert_allclose(
+                c_backend.to_numpy(c_grads[key]), np_grads[key], rtol=1e-3, atol=1e-3
+            )
+
+
+def test_cbackend_unknown_build():
+    with pytest.raises(ValueError) as err_info:
+        CBackend(build="fast")
+    assert str(err_info.value) == (
+        "Unknown build profile: 'fast'! Available profiles: ['debug', 'release', "
+        "'native']"
+    )
+
+
+def test_cbackend_memory_arena():
+    model = Model()
+    model |= MatrixMultiply().connect(left="left", right="right", output="mult")
+    model |= Add().connect(left="mult", right="bias", output="add")
+    model |= Relu().connect(input="add", output="relu")
+    model |= Multiply().connect(left="relu", right="relu", output="square")
+    model |= MatrixMultiply().connect(left="square", right="w", output=IOKey("output"))
+    model.set_types(left=Tensor, right=Tensor, bias=Tensor, w=Tensor)
+    model.set_differentiability(left=True, right=True, bias=True, w=True)
+    shapes = {"left": [4, 3], "right": [3, 5], "bias": [5], "w": [5, 6]}
+
+    np_backend = NumpyBackend()
+    c_backend = CBackend()
+    np_pm = compile(model, np_backend, shapes=shapes, jit=False)
+    c_pm = compile(model, c_backend, shapes=shapes, jit=False, memory_planning=True)
+
+    # Intermediate tensors and their gradients share a single static arena.
+    assert c_pm.memory_plan is not None
+    assert c_pm.memory_plan.planned_bytes < c_pm.memory_plan.naive_bytes
+
+    def no_allocation(*args, **kwargs):
+        raise AssertionError("Arrays must not be allocated in each call!")
+
+    c_backend.empty = no_allocation  # type: ignore
+    c_backend.zeros = no_allocation  # type: ignore
+
+    for _ in range(2):
+        params = {key: np_backend.randn(*shape) for key, shape in shapes.items()}
+        output_grad = np_backend.randn(4, 6)
+        np_outputs, np_grads = np_pm.evaluate(
+            params, {}, output_gradients={"output": output_grad}
+        )
+        c_outputs, c_grads = c_pm.evaluate(
+            {key: c_backend.array(value) for key, value in params.items()},
+            {},
+            output_gradients={"output": c_backend.array(output_grad)},
+        )
+        np.testing.assert_allclose(
+            c_backend.to_numpy(c_outputs["output"]), np_outputs["output"], rtol=1e-5
+        )
+        for key in np_grads:
+            np.testing.assert_allclose(
+                c_backend.to_numpy(c_grads[key]), np_grads[key], rtol=1e-4, atol=1e-5
+            )
+
+
+def test_cbackend_numpy_views():
+    c_backend = CBackend()
+    value = np.arange(6, dtype=np.float32).reshape(2, 3)
+
+    # Arrays are copied by default, NumPy views share memory with PyArrays.
+    array = c_backend.array(value)
+    view = np.asarray(array)
+    assert not np.shares_memory(view, value)
+    assert np.shares_memory(view, np.asarray(array))
+    del array
+    np.testing.assert_array_equal(view, value)
+    np.testing.assert_array_equal(np.asarray(memoryview(c_backend.ones(2, 3))), 1.0)
+
+    # Contiguous float32 arrays could be used without copying.
+    alias = c_backend.array(value, copy=False)
+    value[0, 0] = 10.0
+    assert np.asarray(alias)[0, 0] == 10.0
+    assert c_backend.to_numpy(alias + alias)[0, 0] == 20.0
+
+
+def test_cbackend_numpy_views_copy_error():
+    c_backend = CBackend()
+    with pytest.raises(ValueError) as err_info:
+        c_backend.array(np.ones((2, 3)), copy=False)
+    assert str(err_info.value) == (
+        "Only C-contiguous float32 arrays could be used without copying!"
+    )
+
+
+@pytest.mark.parametrize("memory_planning", [False, True])
+def test_cbackend_repeated_evaluate_memory(memory_planning: bool):
+    model = Model()
+    model |= MatrixMultiply().connect(left="left", right="right", output="mult")
+    model |= Add().connect(left="mult", right="bias", output="add")
+    model |= Relu().connect(input="add", output=IOKey("output"))
+    model.set_types(left=Tensor, right=Tensor, bias=Tensor)
+    shapes = {"left": [16, 16], "right": [16, 16], "bias": [16]}
+
+    c_backend = CBackend()
+    c_pm = compile(
+        model,
+        c_backend,
+        shapes=shapes,
+        inference=True,
+        jit=False,
+        memory_planning=memory_planning,
+    )
+    params = {
+        key: c_backend.array(np.random.randn(*shape).astype(np.float32))
+        for key, shape in shapes.items()
+    }
+    for _ in range(100):
+        c_pm.evaluate(params)
+
+    # Arrays allocated in each call are freed once released, so memory stays
+    # flat. Leaked outputs of three 16x16 arrays would add up to ~30 MB here.
+    max_rss = max_rss_kib()
+    for _ in range(10_000):
+        c_pm.evaluate(params)
+    assert max_rss_kib() - max_rss < 10_000
+
+
+def max_rss_kib() -> float:
+    # Max RSS is reported in bytes on macOS and in KiB on Linux.
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return max_rss / 1024 if sys.platform == "darwin" else max_rss
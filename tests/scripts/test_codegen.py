@@ -14,20 +14,37 @@
 import os
 import platform
 import typing
+from concurrent.futures import ThreadPoolExecutor
 from importlib import import_module
 
+import numpy as np
+import pytest
+
 import mithril
 from mithril import JaxBackend, MlxBackend, NumpyBackend, TorchBackend
+from mithril.cores.python.numpy import ops as numpy_ops
+from mithril.framework.codegen.py_style_codegen.checkpoint import plan_checkpoints
+from mithril.framework.codegen.py_style_codegen.memory_planner import plan_buffers
+from mithril.framework.codegen.py_style_codegen.numpy_gen import (
+    NumpyCodeGen,
+    ParallelExecutor,
+)
+from mithril.framework.codegen.py_style_codegen.scheduler import levelize
+from mithril.framework.common import Tensor
 from mithril.framework.logical.model import IOKey
 from mithril.models import (
+    Add,
     Arange,
     Concat,
     Convolution1D,
     Linear,
     Mean,
     Model,
+    Multiply,
     Relu,
     Shape,
+    Sigmoid,
+    Tanh,
     ToTensor,
 )
 from tests.scripts.test_utils import compare_callables
@@ -492,3 +509,429 @@ def test_inline_caching_2(file_path: str):
         return {"output": (2, 3, 4, 5, 1, 2)}
 
     compare_callables(evaluate, eval_func)
+
+
+def test_numpy_gradient_buffers_reused_among_calls():
+    model = Model()
+    model |= Linear(4).connect(input="input", weight="w0", bias="b0", output="h0")
+    model |= Relu().connect(input="h0", output="h1")
+    model |= Linear(2).connect(input="h1", weight="w1", bias="b1", output="h2")
+    model |= Mean().connect(input="h2", output=IOKey("output"))
+    backend = NumpyBackend()
+    pm = mithril.compile(
+        model, backend, data_keys={"input"}, shapes={"input": [8, 3]}, jit=False
+    )
+    params = pm.randomize_params()
+
+    input = backend.randn(8, 3)
+    _, first_grads = pm.evaluate(params, {"input": input}, output_gradients=True)
+    expected_grads = {key: value.copy() for key, value in first_grads.items()}
+    pm.evaluate(params, {"input": backend.randn(8, 3)}, output_gradients=True)
+    _, second_grads = pm.evaluate(params, {"input": input}, output_gradients=True)
+    for key, value in expected_grads.items():
+        assert (value == second_grads[key]).all()
+        # Returned gradients are not overwritten by the following calls.
+        assert (value == first_grads[key]).all()
+
+
+def test_numpy_concurrent_evaluate_gradients():
+    model = Model()
+    model |= Linear(16).connect(input="input", weight="w0", bias="b0", output="h0")
+    model |= Relu().connect(input="h0", output="h1")
+    model |= Linear(4).connect(input="h1", weight="w1", bias="b1", output="h2")
+    model |= Mean().connect(input="h2", output=IOKey("output"))
+    backend = NumpyBackend()
+    pm = mithril.compile(
+        model, backend, data_keys={"input"}, shapes={"input": [32, 8]}, jit=False
+    )
+    params = pm.randomize_params()
+    inputs = [backend.randn(32, 8) for _ in range(16)]
+    expected = [
+        pm.evaluate(params, {"input": input}, output_gradients=True) for input in inputs
+    ]
+
+    def evaluate(input: np.ndarray) -> tuple[typing.Any, typing.Any]:
+        # Each thread evaluates the model several times to interleave calls.
+        for _ in range(10):
+            result = pm.evaluate(params, {"input": input}, output_gradients=True)
+        return result
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(evaluate, inputs))
+
+    for (outputs, grads), (ref_outputs, ref_grads) in zip(
+        results, expected, strict=True
+    ):
+        assert np.allclose(outputs["output"], ref_outputs["output"])
+        for key, value in ref_grads.items():
+            assert np.allclose(grads[key], value)
+
+
+def _memory_planning_model() -> Model:
+    model = Model()
+    model |= Linear(16).connect(input="input", weight="w0", bias="b0", output="h0")
+    model |= Relu().connect(input="h0", output="h1")
+    model |= Linear(16).connect(input="h1", weight="w1", bias="b1", output="h2")
+    model |= Relu().connect(input="h2", output="h3")
+    model |= Linear(4).connect(input="h3", weight="w2", bias="b2", output="h4")
+    model |= Mean().connect(input="h4", output=IOKey("output"))
+    return model
+
+
+def test_plan_buffers_reuses_released_buffers():
+    order = ["a", "b", "c", "d"]
+    inputs = {"b": ["a"], "c": ["b"], "d": ["c"]}
+    plan = plan_buffers(order, inputs, {"a": 16, "b": 16, "c": 8, "d": 32})
+    # Outputs never share buffers with inputs of the same operation.
+    assert plan.buffer_ids == {"a": 0, "b": 1, "c": 0, "d": 1}
+    assert plan.buffer_sizes == [16, 32]
+    assert plan.planned_bytes == 48
+    assert plan.naive_bytes == 72
+
+    plan = plan_buffers(order, inputs, {"a": 16, "b": 16, "c": 8}, {"a"})
+    assert plan.buffer_ids == {"a": 0, "b": 1, "c": 2}
+
+
+def test_numpy_memory_planning_inference():
+    backend = NumpyBackend()
+    kwargs: dict[str, typing.Any] = {
+        "data_keys": {"input"},
+        "shapes": {"input": [8, 3]},
+        "inference": True,
+        "jit": False,
+    }
+    ref_pm = mithril.compile(_memory_planning_model(), backend, **kwargs)
+    pm = mithril.compile(
+        _memory_planning_model(), backend, memory_planning=True, **kwargs
+    )
+    assert pm.memory_plan is not None
+    assert pm.memory_plan.planned_bytes < pm.memory_plan.naive_bytes
+    assert {"h0", "h1", "h2", "h3"} <= pm.memory_plan.buffer_ids.keys()
+
+    params = ref_pm.randomize_params()
+    first_input, second_input = backend.randn(8, 3), backend.randn(8, 3)
+    first = pm.evaluate(params, {"input": first_input})
+    expected = first["output"].copy()
+    second = pm.evaluate(params, {"input": second_input})
+    ref_first = ref_pm.evaluate(params, {"input": first_input})
+    ref_second = ref_pm.evaluate(params, {"input": second_input})
+    assert np.allclose(first["output"], ref_first["output"])
+    assert np.allclose(second["output"], ref_second["output"])
+    # Outputs are never computed into planned buffers.
+    assert (first["output"] == expected).all()
+
+
+def test_numpy_memory_planning_manualgrad():
+    backend = NumpyBackend()
+    kwargs: dict[str, typing.Any] = {
+        "data_keys": {"input"},
+        "shapes": {"input": [8, 3]},
+        "jit": False,
+    }
+    ref_pm = mithril.compile(_memory_planning_model(), backend, **kwargs)
+    pm = mithril.compile(
+        _memory_planning_model(), backend, memory_planning=True, **kwargs
+    )
+    # All planned keys are kept in caches for gradients, so nothing is shared.
+    assert pm.memory_plan is not None
+    assert pm.memory_plan.planned_bytes == pm.memory_plan.naive_bytes
+
+    params = ref_pm.randomize_params()
+    for _ in range(2):
+        input = backend.randn(8, 3)
+        outputs, grads = pm.evaluate(params, {"input": input}, output_gradients=True)
+        ref_outputs, ref_grads = ref_pm.evaluate(
+            params, {"input": input}, output_gradients=True
+        )
+        assert np.allclose(outputs["output"], ref_outputs["output"])
+        for key, value in ref_grads.items():
+            assert np.allclose(grads[key], value)
+
+
+def _fusion_model() -> Model:
+    # Bias addition of Linear -> Add -> Sigmoid -> Multiply -> Tanh chain where
+    # only the output of the last operation is used outside.
+    model = Model()
+    model |= Linear(16).connect(input="input", weight="w", bias="b", output="h0")
+    model |= Add().connect(left="h0", right=IOKey("shift", type=Tensor), output="h1")
+    model |= Sigmoid().connect(input="h1", output="h2")
+    model |= Multiply().connect(left="h2", right="h0", output="h3")
+    model |= Tanh().connect(input="h3", output="h4")
+    model |= Mean().connect(input="h4", output=IOKey("output"))
+    return model
+
+
+def test_numpy_fuse_elementwise_inference(monkeypatch):
+    # Small blocks in order to evaluate the fused function in several blocks.
+    monkeypatch.setattr(numpy_ops, "FUSED_CHUNK_BYTES", 1024)
+    backend = NumpyBackend()
+    kwargs: dict[str, typing.Any] = {
+        "data_keys": {"input"},
+        "shapes": {"input": [100, 3], "shift": [16]},
+        "inference": True,
+        "jit": False,
+    }
+    ref_pm = mithril.compile(_fusion_model(), backend, **kwargs)
+    pm = mithril.compile(_fusion_model(), backend, fuse_elementwise=True, **kwargs)
+    assert [(group.keys, group.formula_keys) for group in pm.fusion_groups] == [
+        (
+            ["h0", "h1", "h2", "h3", "h4"],
+            ["add", "add", "sigmoid", "multiplication", "tanh"],
+        )
+    ]
+    assert str(pm.fusion_groups[0]) == (
+        "h4: add -> add -> sigmoid -> multiplication -> tanh"
+    )
+    assert ref_pm.fusion_groups == []
+
+    params = ref_pm.randomize_params()
+    data = {"input": backend.randn(100, 3), "shift": backend.randn(16)}
+    outputs = pm.evaluate(params, data)
+    ref_outputs = ref_pm.evaluate(params, data)
+    assert np.allclose(outputs["output"], ref_outputs["output"])
+
+
+def test_fused_chunks_broadcasts_inputs():
+    left = np.random.randn(50, 1, 8)
+    right = np.random.randn(4, 8)
+    scale = np.random.randn(50, 4, 1)
+
+    def fn(left, right, scale, factor):
+        return np.tanh(left + right) * scale * factor
+
+    expected = fn(left, right, scale, 2.0)
+    result = numpy_ops.fused_chunks(fn, left, right, scale, 2.0)
+    assert np.allclose(result, expected)
+    # Inputs are sliced into blocks when the output is large.
+    numpy_ops.FUSED_CHUNK_BYTES, default = 256, numpy_ops.FUSED_CHUNK_BYTES
+    try:
+        result = numpy_ops.fused_chunks(fn, left, right, scale, 2.0)
+    finally:
+        numpy_ops.FUSED_CHUNK_BYTES = default
+    assert np.allclose(result, expected)
+
+
+def test_numpy_fuse_elementwise_manualgrad():
+    backend = NumpyBackend()
+    kwargs: dict[str, typing.Any] = {
+        "data_keys": {"input"},
+        "shapes": {"input": [8, 3], "shift": [16]},
+        "jit": False,
+    }
+    ref_pm = mithril.compile(_fusion_model(), backend, **kwargs)
+    pm = mithril.compile(_fusion_model(), backend, fuse_elementwise=True, **kwargs)
+    assert [group.output_key for group in pm.fusion_groups] == ["h4"]
+
+    params = ref_pm.randomize_params()
+    data = {"input": backend.randn(8, 3), "shift": backend.randn(16)}
+    outputs, grads = pm.evaluate(params, data, output_gradients=True)
+    ref_outputs, ref_grads = ref_pm.evaluate(params, data, output_gradients=True)
+    assert np.allclose(outputs["output"], ref_outputs["output"])
+    for key, value in ref_grads.items():
+        assert np.allclose(grads[key], value)
+
+
+def test_jax_fuse_elementwise():
+    # Fused function is traced as a part of the jitted evaluate.
+    backend = JaxBackend()
+    kwargs: dict[str, typing.Any] = {
+        "data_keys": {"input"},
+        "shapes": {"input": [8, 3], "shift": [16]},
+    }
+    ref_pm = mithril.compile(_fusion_model(), backend, **kwargs)
+    pm = mithril.compile(_fusion_model(), backend, fuse_elementwise=True, **kwargs)
+    assert [group.output_key for group in pm.fusion_groups] == ["h4"]
+
+    params = ref_pm.randomize_params()
+    data = {"input": backend.randn(8, 3), "shift": backend.randn(16)}
+    outputs, grads = pm.evaluate(params, data, output_gradients=True)
+    ref_outputs, ref_grads = ref_pm.evaluate(params, data, output_gradients=True)
+    assert np.allclose(outputs["output"], ref_outputs["output"])
+    for key, value in ref_grads.items():
+        assert np.allclose(grads[key], value)
+
+
+def _checkpoint_model() -> tuple[Model, list[Model]]:
+    # Two Linear -> Relu -> Linear -> Tanh blocks, outputs of the blocks are
+    # the only keys used outside of them.
+    model = Model()
+    blocks = []
+    for idx in range(2):
+        block = Model()
+        block |= Linear(16).connect(input="input", output="a")
+        block |= Relu().connect(input="a", output="b")
+        block |= Linear(16).connect(input="b", output="c")
+        block |= Tanh().connect(input="c", output=IOKey("output"))
+        model |= block.connect(input="input" if idx == 0 else "x0", output=f"x{idx}")
+        blocks.append(block)
+    model |= Mean().connect(input="x1", output=IOKey("output"))
+    return model, blocks
+
+
+def test_plan_checkpoints():
+    order = ["a", "b", "c", "d", "e"]
+    consumers = {"a": ["b"], "b": ["c", "e"], "c": ["d"], "d": ["e"], "e": []}
+    key_sizes = {"a": 8, "b": 8, "c": 8, "d": 8}
+    plan = plan_checkpoints(order, consumers, key_sizes, [["c", "a", "b"], ["d"]])
+    # Keys consumed outside of their segments are kept.
+    assert plan.segments == [["a", "b", "c"], ["d"]]
+    assert plan.recomputed_keys == [["a"], []]
+    assert plan.recompute_ops == 1
+    assert plan.recompute_bytes == 8
+    assert plan.naive_bytes == 32
+    assert plan.peak_bytes == 32
+
+    # Without checkpointing if everything fits in the budget.
+    plan = plan_checkpoints(order, consumers, key_sizes, budget=32)
+    assert plan.segments == []
+    assert plan.peak_bytes == 32
+    plan = plan_checkpoints(order, consumers, key_sizes, budget=24)
+    assert plan.recomputed_keys == [["a"], [], ["d"]]
+    assert plan.peak_bytes == 24
+    # Lowest peak is chosen if nothing fits in the budget.
+    plan = plan_checkpoints(order, consumers, key_sizes, budget=0)
+    assert plan.peak_bytes == min(
+        plan_checkpoints(order, consumers, key_sizes, budget=budget).peak_bytes
+        for budget in range(33)
+    )
+
+
+@pytest.mark.parametrize("mode", ["submodels", "budget"])
+def test_numpy_checkpoint(mode):
+    backend = NumpyBackend()
+    kwargs: dict[str, typing.Any] = {
+        "data_keys": {"input"},
+        "shapes": {"input": [8, 3]},
+        "jit": False,
+    }
+    ref_model, _ = _checkpoint_model()
+    ref_pm = mithril.compile(ref_model, backend, **kwargs)
+    model, blocks = _checkpoint_model()
+    if mode == "submodels":
+        kwargs["checkpoint"] = blocks
+    else:
+        kwargs["checkpoint_budget"] = 7000
+    pm = mithril.compile(model, backend, **kwargs)
+    plan = pm.checkpoint_plan
+    assert plan is not None
+    assert plan.recompute_ops > 0
+    assert plan.peak_bytes < plan.naive_bytes
+    if mode == "submodels":
+        assert len(plan.segments) == 2
+        assert all(f"x{idx}" not in plan.recomputed_keys[idx] for idx in range(2))
+    else:
+        assert plan.peak_bytes <= 7000
+
+    params = ref_pm.randomize_params()
+    for _ in range(2):
+        data = {"input": backend.randn(8, 3)}
+        outputs, grads = pm.evaluate(params, data, output_gradients=True)
+        ref_outputs, ref_grads = ref_pm.evaluate(params, data, output_gradients=True)
+        assert np.allclose(outputs["output"], ref_outputs["output"])
+        for key, value in ref_grads.items():
+            assert np.allclose(grads[key], value)
+
+
+@pytest.mark.parametrize("backend_type", [JaxBackend, TorchBackend])
+def test_autograd_checkpoint_submodels(backend_type):
+    backend = backend_type()
+    kwargs: dict[str, typing.Any] = {
+        "data_keys": {"input"},
+        "shapes": {"input": [8, 3]},
+    }
+    ref_model, _ = _checkpoint_model()
+    ref_pm = mithril.compile(ref_model, backend, **kwargs)
+    model, blocks = _checkpoint_model()
+    pm = mithril.compile(model, backend, checkpoint=blocks, **kwargs)
+    assert pm.checkpoint_plan is not None
+    assert len(pm.checkpoint_plan.segments) == 2
+
+    params = ref_pm.randomize_params()
+    data = {"input": backend.randn(8, 3)}
+    outputs, grads = pm.evaluate(params, data, output_gradients=True)
+    ref_outputs, ref_grads = ref_pm.evaluate(params, data, output_gradients=True)
+    assert np.allclose(np.asarray(outputs["output"]), np.asarray(ref_outputs["output"]))
+    for key, value in ref_grads.items():
+        assert np.allclose(np.asarray(grads[key]), np.asarray(value), atol=1e-6)
+
+
+def test_checkpoint_requires_submodels():
+    model, _ = _checkpoint_model()
+    _, other_blocks = _checkpoint_model()
+    with pytest.raises(ValueError):
+        mithril.compile(model, NumpyBackend(), checkpoint=other_blocks)
+    with pytest.raises(ValueError):
+        mithril.compile(
+            model,
+            NumpyBackend(),
+            checkpoint=list(model.dag),
+            checkpoint_budget=1024,
+        )
+
+
+def _branch_model() -> Model:
+    # Two Linear -> Relu branches of the same input joined with Add.
+    model = Model()
+    for idx in range(2):
+        model |= Linear(16).connect(input="input", output=f"h{idx}")
+        model |= Relu().connect(input=f"h{idx}", output=f"r{idx}")
+    model |= Add().connect(left="r0", right="r1", output="s")
+    model |= Mean().connect(input="s", output=IOKey("output"))
+    return model
+
+
+def test_levelize():
+    order = ["a", "b", "c", "d", "e"]
+    inputs = {"a": ["x"], "b": ["x"], "c": ["a"], "d": ["b", "c"], "e": ["a"]}
+    assert levelize(order, inputs) == [["a", "b"], ["c", "e"], ["d"]]
+
+
+@pytest.mark.parametrize("inference", [True, False])
+@pytest.mark.parametrize("memory_planning", [True, False])
+def test_numpy_threads_executor(monkeypatch, inference, memory_planning):
+    # Every operation is dispatched to threads regardless of its size.
+    monkeypatch.setattr(NumpyCodeGen, "PARALLEL_MIN_SIZE", 0)
+    dispatched: list[int] = []
+    run = ParallelExecutor.run
+
+    def counting_run(self, fns):
+        dispatched.append(len(fns))
+        return run(self, fns)
+
+    monkeypatch.setattr(ParallelExecutor, "run", counting_run)
+    backend = NumpyBackend()
+    kwargs: dict[str, typing.Any] = {
+        "data_keys": {"input"},
+        "shapes": {"input": [8, 3]},
+        "inference": inference,
+        "memory_planning": memory_planning,
+        "jit": False,
+    }
+    ref_pm = mithril.compile(_branch_model(), backend, **kwargs)
+    pm = mithril.compile(
+        _branch_model(), backend, executor="threads", num_workers=2, **kwargs
+    )
+
+    params = ref_pm.randomize_params()
+    data = {"input": backend.randn(8, 3)}
+    if inference:
+        outputs = pm.evaluate(params, data)
+        ref_outputs = ref_pm.evaluate(params, data)
+    else:
+        outputs, grads = pm.evaluate(params, data, output_gradients=True)
+        ref_outputs, ref_grads = ref_pm.evaluate(params, data, output_gradients=True)
+        for key, value in ref_grads.items():
+            assert np.allclose(grads[key], value)
+    assert np.allclose(outputs["output"], ref_outputs["output"])
+    # Transposed weights, matmuls, bias additions and activations of both
+    # branches are evaluated in pairs.
+    assert dispatched == [2, 2, 2, 2]
+
+
+def test_threads_executor_errors():
+    with pytest.raises(ValueError):
+        mithril.compile(_branch_model(), NumpyBackend(), executor="processes")
+    with pytest.raises(ValueError):
+        mithril.compile(_branch_model(), NumpyBackend(), num_workers=2)
+    with pytest.raises(ValueError):
+        mithril.compile(_branch_model(), JaxBackend(), executor="threads")
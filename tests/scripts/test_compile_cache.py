@@ -0,0 +1,245 @@
+# Copyright 2022 Synnada, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+
+import numpy as np
+import pytest
+
+import mithril as ml
+from mithril.framework.common import Tensor
+from mithril.models import (
+    Add,
+    IOKey,
+    Linear,
+    Mean,
+    Model,
+    Relu,
+    SquaredError,
+    TrainModel,
+)
+from mithril.utils.compile_cache import CompileCache, get_compile_cache
+from mithril.utils.shared_object_cache import (
+    SharedObjectCache,
+    find_included_headers,
+)
+
+backends = [ml.NumpyBackend, ml.TorchBackend, ml.JaxBackend]
+
+
+def build_model() -> Model:
+    model = Model()
+    model |= Linear(8).connect(input="input", output="hidden")
+    model |= Relu().connect(input="hidden", output="relu_out")
+    model |= Linear(2).connect(input="relu_out", output=IOKey("output"))
+    return model
+
+
+@pytest.mark.parametrize("backend_type", backends)
+def test_compile_cache_hit_same_results(tmp_path, backend_type):
+    backend = backend_type()
+    cache = CompileCache(str(tmp_path))
+
+    pm_1 = ml.compile(
+        build_model(), backend, shapes={"input": [4, 3]}, compile_cache=cache
+    )
+    pm_2 = ml.compile(
+        build_model(), backend, shapes={"input": [4, 3]}, compile_cache=cache
+    )
+    assert (cache.stats.hits, cache.stats.misses, cache.stats.stores) == (1, 1, 1)
+    assert pm_1.shapes == pm_2.shapes
+
+    params = pm_1.randomize_params()
+    data = {"input": backend.ones(4, 3)}
+    out_grad = {"output": backend.ones(4, 2)}
+    outputs_1, grads_1 = pm_1.evaluate(params, data, output_gradients=out_grad)
+    outputs_2, grads_2 = pm_2.evaluate(params, data, output_gradients=out_grad)
+    np.testing.assert_allclose(outputs_1["output"], outputs_2["output"])  # type: ignore
+    for key in grads_1:
+        np.testing.assert_allclose(grads_1[key], grads_2[key])  # type: ignore
+
+
+def test_compile_cache_miss_on_different_arguments(tmp_path):
+    backend = ml.NumpyBackend()
+    cache = CompileCache(str(tmp_path))
+
+    ml.compile(build_model(), backend, shapes={"input": [4, 3]}, compile_cache=cache)
+    ml.compile(build_model(), backend, shapes={"input": [5, 3]}, compile_cache=cache)
+    ml.compile(
+        build_model(),
+        backend,
+        shapes={"input": [4, 3]},
+        inference=True,
+        compile_cache=cache,
+    )
+    ml.compile(
+        build_model(),
+        ml.NumpyBackend(dtype=ml.float64),
+        shapes={"input": [4, 3]},
+        compile_cache=cache,
+    )
+    assert cache.stats.hits == 0
+    assert cache.stats.misses == 4
+    assert len(os.listdir(tmp_path)) == 4
+
+
+def test_compile_cache_train_model(tmp_path):
+    backend = ml.NumpyBackend()
+    cache_dir = str(tmp_path)
+
+    pms = []
+    for _ in range(2):
+        model = build_model()
+        train_model = TrainModel(model)
+        train_model.add_loss(
+            SquaredError(),
+            input=model.output,
+            target="target",
+            reduce_steps=[Mean()],  # type: ignore
+        )
+        pms.append(
+            ml.compile(
+                train_model,
+                backend,
+                shapes={"input": [4, 3], "target": [4, 2]},
+                compile_cache=cache_dir,
+            )
+        )
+
+    assert get_compile_cache(cache_dir).stats.hits == 1
+    params = pms[0].randomize_params()
+    data = {"input": backend.ones(4, 3), "target": backend.zeros(4, 2)}
+    _, grads_1 = pms[0].evaluate(params, data, output_gradients=True)
+    _, grads_2 = pms[1].evaluate(params, data, output_gradients=True)
+    for key in grads_1:
+        np.testing.assert_allclose(grads_1[key], grads_2[key])
+
+
+def test_compile_cache_lru_eviction(tmp_path):
+    backend = ml.NumpyBackend()
+    cache = CompileCache(str(tmp_path))
+
+    ml.compile(build_model(), backend, shapes={"input": [1, 3]}, compile_cache=cache)
+    entry_size = cache.size
+    # Only two entries fit into the cache.
+    cache.max_size = 2 * entry_size + entry_size // 2
+
+    ml.compile(build_model(), backend, shapes={"input": [2, 3]}, compile_cache=cache)
+    # Touch first entry so that the second one becomes least recently used.
+    ml.compile(build_model(), backend, shapes={"input": [1, 3]}, compile_cache=cache)
+    ml.compile(build_model(), backend, shapes={"input": [3, 3]}, compile_cache=cache)
+
+    assert cache.stats.evictions == 1
+    assert len(os.listdir(tmp_path)) == 2
+
+    ml.compile(build_model(), backend, shapes={"input": [1, 3]}, compile_cache=cache)
+    ml.compile(build_model(), backend, shapes={"input": [2, 3]}, compile_cache=cache)
+    assert cache.stats.hits == 2
+
+
+def test_compile_cache_corrupted_entry(tmp_path):
+    backend = ml.NumpyBackend()
+    cache = CompileCache(str(tmp_path))
+    ml.compile(build_model(), backend, shapes={"input": [4, 3]}, compile_cache=cache)
+    (entry,) = os.listdir(tmp_path)
+    with open(os.path.join(tmp_path, entry), "wb") as file:
+        file.write(b"corrupted")
+
+    with pytest.warns(UserWarning, match="Invalid compile cache entry"):
+        pm = ml.compile(
+            build_model(), backend, shapes={"input": [4, 3]}, compile_cache=cache
+        )
+    assert cache.stats.misses == 2
+    assert pm.shapes["output"] == [4, 2]
+
+
+def test_compile_cache_hit_summary(tmp_path, capsys):
+    backend = ml.NumpyBackend()
+    cache = CompileCache(str(tmp_path))
+    summaries = []
+    for _ in range(2):
+        pm = ml.compile(
+            build_model(), backend, shapes={"input": [4, 3]}, compile_cache=cache
+        )
+        capsys.readouterr()
+        pm.summary(verbose=True, types=True)
+        summaries.append(capsys.readouterr().out)
+    assert cache.stats.hits == 1
+    assert summaries[0] == summaries[1]
+
+
+def test_compile_cache_c_shared_objects(tmp_path, monkeypatch):
+    model = Model()
+    model |= Add().connect(left="left", right="right", output="add")
+    model |= Relu().connect(input="add", output=IOKey("output"))
+    model.set_types(left=Tensor, right=Tensor)
+    model.set_differentiability(left=True, right=True)
+    shapes = {"left": [3, 4], "right": [3, 4]}
+
+    backend = ml.CBackend()
+    cache = CompileCache(str(tmp_path))
+    params = {
+        key: backend.array(np.random.randn(*shape).astype(np.float32))
+        for key, shape in shapes.items()
+    }
+    pm = ml.compile(model, backend, shapes=shapes, jit=False, compile_cache=cache)
+    expected = backend.to_numpy(pm.evaluate(params)["output"])
+    assert cache.shared_objects.stats.stores == 1
+
+    # Identical source is not compiled again.
+    def no_compile(*args, **kwargs):
+        raise AssertionError("Cached shared object must be used!")
+
+    monkeypatch.setattr("subprocess.check_output", no_compile)
+    pm = ml.compile(model, backend, shapes=shapes, jit=False, compile_cache=cache)
+    np.testing.assert_allclose(
+        backend.to_numpy(pm.evaluate(params)["output"]), expected
+    )
+    stats = cache.shared_objects.stats
+    assert (stats.hits, stats.misses, stats.stores) == (1, 1, 1)
+
+
+def test_shared_object_cache_headers(tmp_path):
+    include_dir = tmp_path / "include"
+    include_dir.mkdir()
+    (include_dir / "ops.h").write_text('#include "array.h"\n#include <stdlib.h>\n')
+    (include_dir / "array.h").write_text("typedef float real;\n")
+    source = '#include "include/ops.h"\n#include "missing.h"\n'
+
+    headers = find_included_headers(source, str(tmp_path))
+    assert headers == [str(include_dir / "array.h"), str(include_dir / "ops.h")]
+
+    cache = SharedObjectCache(str(tmp_path / "cache"))
+    key = cache.fingerprint(source, ["cc", "-O3"], headers)
+    assert key == cache.fingerprint(source, ["cc", "-O3"], headers)
+    assert key != cache.fingerprint(source, ["cc", "-O0"], headers)
+    # Changing a transitively included header invalidates the entry.
+    (include_dir / "array.h").write_text("typedef double real;\n")
+    assert key != cache.fingerprint(source, ["cc", "-O3"], headers)
+
+
+def test_shared_object_cache_eviction(tmp_path):
+    cache = SharedObjectCache(str(tmp_path / "cache"), max_size=250)
+    built = tmp_path / "lib.so"
+    for idx, key in enumerate(["a", "b", "c"]):
+        built.write_bytes(bytes(100))
+        cache.store(key, str(built))
+        os.utime(os.path.join(cache.cache_dir, f"{key}.so"), (idx, idx))
+
+    # Only two entries fit into the cache, oldest one is evicted.
+    assert cache.stats.evictions == 1
+    assert not cache.load("a", str(tmp_path / "a.so"))
+    assert cache.load("c", str(tmp_path / "c.so"))
+    assert (tmp_path / "c.so").read_bytes() == bytes(100)
+    assert sorted(os.listdir(cache.cache_dir)) == ["b.so", "c.so"]
@@ -0,0 +1,87 @@
+# Copyright 2022 Synnada, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+
+import mithril as ml
+from mithril.framework.profiler import get_active_profiler
+from mithril.models import IOKey, Linear, Model, Relu
+
+
+def build_model() -> Model:
+    model = Model()
+    model |= Linear(8).connect(input="input", output="hidden")
+    model |= Relu().connect(input="hidden", output="relu_out")
+    model |= Linear(2).connect(input="relu_out", output=IOKey("output"))
+    return model
+
+
+expected_phases = {
+    "flatten",
+    "flat_graph_init",
+    "clone_data",
+    "add_value",
+    "constraint_solver",
+    "pre_compile",
+    "set_shapes",
+    "graph_update",
+    "traverse_graph",
+    "infer_static_keys",
+    "generate_code",
+    "compile_code",
+}
+
+
+def test_compile_profile_flag():
+    pm = ml.compile(
+        build_model(), ml.NumpyBackend(), shapes={"input": [4, 3]}, profile=True
+    )
+    profile = pm.compile_profile
+    assert profile is not None
+    assert expected_phases.issubset(profile.phases.keys())
+    assert profile.phases["flatten"].calls == 1
+    # Every primitive of the flat graph is added once.
+    assert profile.phases["add_value"].calls == len(pm.flat_graph.all_models)
+    assert profile.constraints["bcast_matrix_mult"].calls >= 2
+    assert profile.constraints["bcast"].calls >= 2
+
+    pre_compile = profile.phases["pre_compile"]
+    assert pre_compile.self_time <= pre_compile.time
+    assert sum(stats.self_time for stats in profile.phases.values()) <= (
+        profile.total_time
+    )
+    assert get_active_profiler() is None
+
+
+def test_compile_profile_disabled_by_default():
+    pm = ml.compile(build_model(), ml.NumpyBackend(), shapes={"input": [4, 3]})
+    assert pm.compile_profile is None
+
+
+def test_compile_profiler_context_manager(tmp_path):
+    with ml.compile_profiler(trace_memory=False) as profiler:
+        pm_1 = ml.compile(build_model(), ml.NumpyBackend(), shapes={"input": [4, 3]})
+        pm_2 = ml.compile(build_model(), ml.TorchBackend(), shapes={"input": [4, 3]})
+
+    assert pm_1.compile_profile is profiler
+    assert pm_2.compile_profile is profiler
+    assert profiler.phases["flatten"].calls == 2
+    assert profiler.phases["flatten"].allocated_bytes == 0
+
+    file_path = str(tmp_path / "profile.json")
+    profiler.to_json(file_path)
+    with open(file_path) as file:
+        report = json.load(file)
+    assert report["phases"]["flatten"]["calls"] == 2
+    assert set(report["constraints"]) == set(profiler.constraints)
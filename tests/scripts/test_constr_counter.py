@@ -1339,3 +1339,48 @@ def test_error_check_counter_3():
         "Shape mismatch for broadcast. Dimensionalities for the corresponding "
         "shape index are left: 9, right: 5, output: 9"
     )
+
+
+def test_solver_stats():
+    model = Model()
+    model |= Relu().connect(input="input", output="relu_out")
+    model |= Add().connect(left="relu_out", right="input", output="output")
+    stats = model.constraint_solver.stats
+    evaluations = stats.evaluations.copy()
+
+    model.set_shapes(input=[3, 4])
+    assert stats.evaluations["bcast"] > evaluations["bcast"]
+    # Every evaluation is preceded by exactly one enqueue.
+    assert stats.evaluations.total() <= stats.enqueued
+
+
+def test_symbolic_dim_match_does_not_retrigger_upstream():
+    # Linking a new block to a deep chain should only evaluate constraints
+    # close to the link, independent of the depth of the chain.
+    def extend_block(model: Model, idx: int) -> int:
+        stats = model.constraint_solver.stats
+        num_evaluations = stats.evaluations.total()
+        model |= Relu().connect(input=f"x{idx}", output=f"relu{idx}")
+        model |= Add().connect(left=f"relu{idx}", right=f"x{idx}", output=f"x{idx + 1}")
+        return stats.evaluations.total() - num_evaluations
+
+    model = Model()
+    model |= Relu().connect(input="input", output="x0")
+    evaluations = [extend_block(model, idx) for idx in range(20)]
+    assert evaluations[5] == evaluations[-1]
+
+
+def test_solver_skips_constraints_with_unchanged_inputs():
+    model = Model()
+    model |= Add().connect(
+        left=IOKey("left", type=Tensor), right=IOKey("right", type=Tensor), output="x0"
+    )
+    model |= Add().connect(left="x0", right=IOKey("bias", type=Tensor), output="x1")
+    model |= Add().connect(left="x1", right="left", output=IOKey("output"))
+    stats = model.constraint_solver.stats
+    # Constraints already evaluated after the last change of their inputs are
+    # not evaluated again when they are given to the solver by older updates.
+    assert stats.skipped > 0
+
+    model.set_shapes(left=[2, 3], right=[2, 1], bias=[3])
+    assert model.shapes["output"] == [2, 3]
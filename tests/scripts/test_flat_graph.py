@@ -632,3 +632,43 @@ def test_insert_to_output_key_not_in_keys_err():
         )
 
     assert str(e.value) == ("Inserted key `not_in_keys` must be in the keys dictionary")
+
+
+def test_topological_order_cache():
+    sine_op = SineOp()
+    cosine_op = CosineOp()
+    transpose_op = TransposeOp()
+    fg = FlatGraph({"input"}, {"output"}, ml.TorchBackend(), ConstraintSolver(), [])
+    fg.add_value(sine_op, {"input": "input", "output": "sin_out"})
+    fg.add_value(cosine_op, {"input": "sin_out", "output": "output"})
+    order = fg.topological_order
+    assert list(order) == ["sin_out", "output"]
+    # Order is cached until the graph is modified.
+    assert fg.topological_order is order
+
+    fg.insert_operator_before(
+        transpose_op,
+        {"input": "sin_out", "output": "transpose_out"},
+        cosine_op,
+        "sin_out",
+    )
+    assert list(fg.topological_order) == ["sin_out", "transpose_out", "output"]
+
+    fg.remove_key("output")
+    assert list(fg.topological_order) == ["sin_out", "transpose_out"]
+
+
+def test_topological_order_multiple_sources():
+    # An operator is ordered only after all of its distinct sources.
+    fg = FlatGraph(
+        {"input1", "input2"}, {"output"}, ml.TorchBackend(), ConstraintSolver(), []
+    )
+    sine_op = SineOp()
+    mult_op_1 = MultiplyOp()
+    mult_op_2 = MultiplyOp()
+    fg.add_value(sine_op, {"input": "input1", "output": "sin_out"})
+    fg.add_value(
+        mult_op_1, {"left": "sin_out", "right": "sin_out", "output": "mult_out"}
+    )
+    fg.add_value(mult_op_2, {"left": "mult_out", "right": "input2", "output": "output"})
+    assert list(fg.topological_order) == ["sin_out", "mult_out", "output"]
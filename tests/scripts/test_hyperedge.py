@@ -26,6 +26,7 @@ from mithril.framework.common import (
     ToBeDetermined,
     UpdateType,
     Variadic,
+    structural_clone,
 )
 from mithril.framework.constraints import reduce_constraints, reduce_type_constraint
 
@@ -1356,3 +1357,28 @@ def test_hyperedge_set_same_type():
     assert edge1.constraints[UpdateType.SHAPE] == set()
     assert edge1.constraints[UpdateType.TYPE] == {constr1}
     assert edge1.constraints[UpdateType.VALUE] == set()
+
+
+def test_structural_clone_preserves_structure():
+    constr = Constraint(fn=reduce_constraints, types=[UpdateType.SHAPE])
+    edge1 = IOHyperEdge(Tensor[float], value=Tensor([[1.0, 2.0], [3.0, 4.0]]))
+    edge2 = IOHyperEdge(Tensor[int | float])
+    edge1.add_constraint(constr)
+    edge2.add_constraint(constr)
+
+    memo: dict[int, object] = {}
+    cloned1, cloned2 = structural_clone((edge1, edge2), memo)
+    assert isinstance(cloned1._value, Tensor)
+    assert isinstance(edge1._value, Tensor)
+    assert cloned1 is not edge1 and cloned1._value is not edge1._value
+    # Values and types are shared, mutable structures are copied.
+    assert cloned1._value.value is edge1._value.value
+    assert cloned1._value.type is edge1._value.type
+    assert cloned1._value.shape is not edge1._value.shape
+    assert cloned1._value.referees == {cloned1}
+    (cloned_constr,) = cloned1.constraints[UpdateType.SHAPE]
+    assert cloned_constr is not constr
+    assert cloned2.constraints[UpdateType.SHAPE] == {cloned_constr}
+    assert cloned_constr.fn is reduce_constraints
+    # Already cloned objects are reused from memo.
+    assert structural_clone(edge1, memo) is cloned1
@@ -0,0 +1,194 @@
+# Copyright 2022 Synnada, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+
+import jax
+import numpy as np
+import pytest
+
+import mithril as ml
+from mithril.models import Add, Buffer, IOKey, Linear, Model, Reshape
+
+from .test_train_step import MomentumSGD, build_train_model
+
+
+def build_state_model() -> Model:
+    model = Model()
+    model |= Add().connect(
+        IOKey("input", type=ml.Tensor), "running_input", output="add_output"
+    )
+    model |= Buffer().connect("add_output", output=IOKey("output"))
+    model.bind_state_keys("running_input", "add_output", ml.Constant.ZEROS)
+    return model
+
+
+def compile_train_model(**kwargs):
+    return ml.compile(
+        build_train_model(),
+        ml.JaxBackend(),
+        data_keys={"input", "target"},
+        shapes={"input": [16, 4], "target": [16, 1]},
+        **kwargs,
+    )
+
+
+def test_trace_log_records_traces():
+    backend = ml.JaxBackend()
+    pm = compile_train_model()
+    params = pm.randomize_params()
+    data = {"input": backend.randn(16, 4), "target": backend.randn(16, 1)}
+    for _ in range(3):
+        pm.evaluate(params, data)
+        pm.evaluate(params, data, output_gradients=True)
+    assert pm.trace_log.counts == {"evaluate": 1, "evaluate_all": 1}
+    assert str(pm.trace_log.traces[0]) == (
+        "evaluate(bias_0: float32[8], bias_1: float32[1], input: float32[16, 4], "
+        "target: float32[16, 1], weight_0: float32[8, 4], weight_1: float32[1, 8])"
+    )
+
+
+def test_trace_log_shared_by_specializations():
+    backend = ml.JaxBackend()
+    model = Model()
+    model |= Linear(2).connect(input="input", output=IOKey("output"))
+    pm = ml.compile(model, backend, shapes={"input": ["B", 3]}, inference=True)
+    params = pm.randomize_params()
+    for batch in (1, 2, 1, 3):
+        pm.evaluate(params, {"input": backend.ones(batch, 3)})
+    assert pm.trace_log.counts == {"evaluate": 3}
+    inputs = [trace.inputs["input"] for trace in pm.trace_log.traces]
+    assert inputs == ["float32[1, 3]", "float32[2, 3]", "float32[3, 3]"]
+
+
+def test_static_keys():
+    backend = ml.JaxBackend()
+    model = Model()
+    model |= Reshape().connect(input="input", shape="shape", output=IOKey("output"))
+    pm = ml.compile(
+        model,
+        backend,
+        data_keys={"input", "shape"},
+        shapes={"input": [4, 6]},
+        inference=True,
+        jit_options={"static_keys": {"shape"}, "max_traces": 2},
+    )
+    input = backend.randn(4, 6)
+    for shape in [(6, 4), (6, 4), (3, 8)]:
+        output = pm.evaluate(data={"input": input, "shape": shape})["output"]
+        np.testing.assert_allclose(np.array(output), np.array(input).reshape(shape))
+    assert pm.trace_log.counts == {"evaluate": 2}
+
+    with pytest.warns(UserWarning) as record:
+        pm.evaluate(data={"input": input, "shape": (2, 12)})
+    assert str(record[0].message) == (
+        "Function 'evaluate' of the model is traced 3 times, last trace: "
+        "evaluate(input: float32[4, 6], shape: (2, 12)). Consider fixing shapes "
+        "of inputs or declaring static keys in jit_options."
+    )
+
+
+@pytest.mark.parametrize("donate_state", [False, True])
+def test_donate_state(donate_state):
+    backend = ml.JaxBackend()
+    pm = ml.compile(
+        build_state_model(),
+        backend,
+        shapes={"input": [8], "running_input": [8]},
+        inference=True,
+        jit_options=ml.JitOptions(donate_state=donate_state),
+    )
+    state = pm.initial_state_dict
+    input = backend.ones(8)
+    for idx in range(3):
+        given_state = state
+        outputs, state = pm.evaluate(data={"input": input}, state=state)
+        np.testing.assert_allclose(np.array(outputs["output"]), idx + 1)
+        assert all(value.is_deleted() == donate_state for value in given_state.values())
+    assert not input.is_deleted()
+
+
+def test_jit_options_of_cached_models(tmp_path):
+    backend = ml.JaxBackend()
+    kwargs = {
+        "shapes": {"input": [8], "running_input": [8]},
+        "inference": True,
+        "compile_cache": str(tmp_path),
+    }
+    jit_options = ml.JitOptions(donate_state=True, max_traces=1)
+    for options in (jit_options, None, jit_options, None):
+        pm = ml.compile(build_state_model(), backend, jit_options=options, **kwargs)
+        assert pm.jit_options == options
+        assert pm.trace_log.max_traces == (options and options.max_traces)
+        state = pm.initial_state_dict
+        pm.evaluate(data={"input": backend.ones(8)}, state=state)
+        donated = options is not None
+        assert all(value.is_deleted() == donated for value in state.values())
+
+
+def test_train_step_without_donation():
+    backend = ml.JaxBackend()
+    pm = compile_train_model(jit_options={"donate_params": False})
+    optimizer = MomentumSGD()
+    params = pm.randomize_params()
+    opt_state = optimizer.init(backend, params)
+    data = {"input": backend.randn(16, 4), "target": backend.randn(16, 1)}
+    _, new_params, _ = pm.compile_train_step(optimizer)(params, data, opt_state)
+    assert not any(value.is_deleted() for value in params.values())
+    assert not any(value.is_deleted() for value in opt_state.values())
+    assert pm.trace_log.counts["train_step"] == 1
+
+
+def test_compilation_cache_dir(tmp_path):
+    cache_dir = str(tmp_path / "jax_cache")
+    min_compile_time = jax.config.jax_persistent_cache_min_compile_time_secs
+    try:
+        pm = compile_train_model(jit_options={"compilation_cache_dir": cache_dir})
+        backend = pm.backend
+        data = {"input": backend.randn(16, 4), "target": backend.randn(16, 1)}
+        pm.evaluate(pm.randomize_params(), data)
+        assert len(os.listdir(cache_dir)) > 0
+    finally:
+        jax.config.update("jax_compilation_cache_dir", None)
+        jax.config.update(
+            "jax_persistent_cache_min_compile_time_secs", min_compile_time
+        )
+
+
+def test_jit_options_backend_error():
+    with pytest.raises(ValueError) as err_info:
+        ml.compile(
+            build_train_model(),
+            ml.TorchBackend(),
+            data_keys={"input", "target"},
+            jit_options=ml.JitOptions(donate_state=True),
+        )
+    assert str(err_info.value) == (
+        "jit_options are only supported by JAX backend with jit!"
+    )
+
+
+def test_jit_options_unknown_static_key_error():
+    with pytest.raises(KeyError) as err_info:
+        compile_train_model(jit_options={"static_keys": {"weight_0", "input"}})
+    assert str(err_info.value) == (
+        "'Static keys of jit_options must be data keys of the model. "
+        "Unknown keys: weight_0.'"
+    )
+
+
+def test_jit_options_max_traces_error():
+    with pytest.raises(ValueError) as err_info:
+        ml.JitOptions(max_traces=0)
+    assert str(err_info.value) == "Maximum number of traces must be positive!"
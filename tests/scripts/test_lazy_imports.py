@@ -0,0 +1,79 @@
+# Copyright 2022 Synnada, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import subprocess
+import sys
+
+import pytest
+
+import mithril as ml
+from mithril.framework.codegen import code_gen_map
+from mithril.framework.codegen.py_style_codegen.numpy_gen import NumpyCodeGen
+from mithril.framework.codegen.py_style_codegen.python_gen import PythonCodeGen
+from mithril.framework.codegen.py_style_codegen.torch_gen import TorchCodeGen
+
+
+def imported_modules(code: str, modules: list[str]) -> list[str]:
+    code += (
+        f"\nimport json, sys\n"
+        f"print(json.dumps([name for name in {modules!r} if name in sys.modules]))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout)
+
+
+def test_import_does_not_import_frameworks():
+    modules = ["torch", "jax", "mlx", "numpy", "mithril.cores.c.raw_c.definitions"]
+    assert imported_modules("import mithril", modules) == []
+
+
+def test_backend_access_imports_only_its_framework():
+    code = "import mithril as ml\nml.NumpyBackend()"
+    assert imported_modules(code, ["torch", "jax", "mlx", "numpy"]) == ["numpy"]
+
+
+def test_backend_attributes():
+    assert ml.NumpyBackend.__name__ == "NumpyBackend"
+    assert ml.TorchBackend.__name__ == "TorchBackend"
+    assert ml.JaxBackend.__name__ == "JaxBackend"
+    with pytest.raises(AttributeError):
+        ml.UnknownBackend  # type: ignore # noqa: B018
+
+
+def test_code_gen_map_lookup():
+    assert code_gen_map[ml.NumpyBackend] is NumpyCodeGen
+    assert code_gen_map[ml.TorchBackend] is TorchCodeGen
+    assert code_gen_map[ml.JaxBackend] is PythonCodeGen
+    assert ml.NumpyBackend in code_gen_map
+    assert ml.Backend not in code_gen_map
+    with pytest.raises(KeyError):
+        code_gen_map[ml.Backend]
+
+
+def test_code_gen_attributes():
+    from mithril.framework import codegen
+
+    assert codegen.NumpyCodeGen is NumpyCodeGen
+    assert codegen.TorchCodeGen is TorchCodeGen
+    assert codegen.PythonCodeGen is PythonCodeGen
+    with pytest.raises(AttributeError):
+        codegen.UnknownCodeGen  # type: ignore # noqa: B018
+
+
+def test_code_gen_import_imports_only_its_framework():
+    code = "from mithril.framework.codegen import NumpyCodeGen"
+    assert imported_modules(code, ["torch", "jax", "mlx"]) == []
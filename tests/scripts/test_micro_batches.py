@@ -0,0 +1,264 @@
+# Copyright 2022 Synnada, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import numpy as np
+import pytest
+
+import mithril as ml
+from mithril.models import (
+    L2,
+    IOKey,
+    Linear,
+    Max,
+    Mean,
+    Model,
+    Multiply,
+    SquaredError,
+    Sum,
+    TrainModel,
+)
+
+from .test_train_step import build_train_model
+
+
+def build_sum_train_model() -> TrainModel:
+    model = Model()
+    model |= Linear(3).connect(input="input", output=IOKey("output"))
+    model.expose_keys("output")
+    train_model = TrainModel(model)
+    train_model.add_loss(
+        SquaredError(), input="output", target="target", reduce_steps=[Sum()]
+    )
+    return train_model
+
+
+def compile_model(backend, model=None, out_dim=1, **kwargs):
+    # Batch dimension is left unknown, so that micro-batches could be evaluated.
+    kwargs.setdefault("shapes", {"input": [None, 4], "target": [None, out_dim]})
+    return ml.compile(
+        build_train_model() if model is None else model,
+        backend,
+        data_keys={"input", "target"},
+        **kwargs,
+    )
+
+
+@pytest.mark.parametrize(
+    "backend_type, jit",
+    [
+        (ml.NumpyBackend, False),
+        (ml.TorchBackend, False),
+        (ml.JaxBackend, False),
+        (ml.JaxBackend, True),
+    ],
+)
+@pytest.mark.parametrize("model_fn", [build_train_model, build_sum_train_model])
+def test_micro_batches_same_results(backend_type, jit, model_fn):
+    backend = backend_type(dtype=ml.float64)
+    model = model_fn()
+    out_dim = 1 if model_fn is build_train_model else 3
+    pm = compile_model(backend, model, out_dim, jit=jit)
+    params = pm.randomize_params()
+    data = {"input": backend.randn(16, 4), "target": backend.randn(16, out_dim)}
+
+    ref_outputs, ref_gradients = pm.evaluate(params, data, output_gradients=True)
+    outputs, gradients = pm.evaluate(
+        params, data, output_gradients=True, micro_batches=4
+    )
+    assert outputs.keys() == ref_outputs.keys()
+    assert gradients.keys() == ref_gradients.keys()
+    for key, value in ref_outputs.items():
+        np.testing.assert_allclose(np.array(outputs[key]), np.array(value), rtol=1e-10)
+    for key, value in ref_gradients.items():
+        np.testing.assert_allclose(
+            np.array(gradients[key]), np.array(value), rtol=1e-10
+        )
+
+
+def test_micro_batches_batch_axis():
+    backend = ml.JaxBackend(dtype=ml.float64)
+    model = Model()
+    model |= Linear(2).connect(input="input", output=IOKey("output"))
+    model.expose_keys("output")
+    train_model = TrainModel(model)
+    train_model.add_loss(
+        SquaredError(), input="output", target="target", reduce_steps=[Mean()]
+    )
+    pm = compile_model(
+        backend, train_model, shapes={"input": [3, None, 5], "target": [3, None, 2]}
+    )
+    params = pm.randomize_params()
+    data = {"input": backend.randn(3, 8, 5), "target": backend.randn(3, 8, 2)}
+
+    ref_outputs, ref_gradients = pm.evaluate(params, data, output_gradients=True)
+    outputs, gradients = pm.evaluate(
+        params, data, output_gradients=True, micro_batches=2, batch_axis=1
+    )
+    np.testing.assert_allclose(
+        np.array(outputs["output"]), np.array(ref_outputs["output"]), rtol=1e-10
+    )
+    for key, value in ref_gradients.items():
+        np.testing.assert_allclose(
+            np.array(gradients[key]), np.array(value), rtol=1e-10
+        )
+    assert pm.trace_log.counts["accumulate_gradients"] == 1
+
+
+def test_micro_batches_jax_single_trace():
+    backend = ml.JaxBackend()
+    pm = compile_model(backend)
+    params = pm.randomize_params()
+    data = {"input": backend.randn(16, 4), "target": backend.randn(16, 1)}
+    for _ in range(3):
+        pm.evaluate(params, data, output_gradients=True, micro_batches=4)
+    assert pm.trace_log.counts["accumulate_gradients"] == 1
+    # Gradient function of a micro-batch is traced once inside the scan.
+    (trace,) = (trace for trace in pm.trace_log.traces if trace.name == "evaluate_all")
+    assert trace.inputs["input"] == "float32[4, 4]"
+
+
+def test_micro_batches_numpy_gradients_not_aliased():
+    backend = ml.NumpyBackend()
+    pm = compile_model(backend)
+    params = pm.randomize_params()
+    data = {"input": backend.randn(8, 4), "target": backend.randn(8, 1)}
+    _, gradients = pm.evaluate(params, data, output_gradients=True, micro_batches=2)
+    _, other_gradients = pm.evaluate(
+        params, data, output_gradients=True, micro_batches=2
+    )
+    assert all(
+        not np.shares_memory(gradients[key], other_gradients[key]) for key in gradients
+    )
+
+
+def test_micro_batches_regularization_error():
+    backend = ml.NumpyBackend()
+    model = Model()
+    model |= Linear(1).connect(input="input", weight="weight", output=IOKey("output"))
+    train_model = TrainModel(model)
+    train_model.add_loss(SquaredError(), input=model.cout, target="target")
+    train_model.add_regularization(L2(), coef=0.1, input="weight")
+    pm = compile_model(backend, train_model)
+    data = {"input": backend.randn(8, 4), "target": backend.randn(8, 1)}
+    with pytest.raises(ValueError) as err_info:
+        pm.evaluate(pm.randomize_params(), data, output_gradients=True, micro_batches=2)
+    assert str(err_info.value) == (
+        "Micro-batches require a final cost reduced over samples with Mean or Sum "
+        "(i.e. TrainModel losses without regularizations)!"
+    )
+
+
+def test_micro_batches_not_divisible_error():
+    backend = ml.NumpyBackend()
+    pm = compile_model(backend)
+    data = {"input": backend.randn(10, 4), "target": backend.randn(10, 1)}
+    with pytest.raises(ValueError) as err_info:
+        pm.evaluate(pm.randomize_params(), data, output_gradients=True, micro_batches=4)
+    assert str(err_info.value) == "Batch size 10 is not divisible by 4 micro-batches!"
+
+
+def test_micro_batches_without_gradients_error():
+    backend = ml.NumpyBackend()
+    pm = compile_model(backend)
+    data = {"input": backend.randn(8, 4), "target": backend.randn(8, 1)}
+    with pytest.raises(ValueError) as err_info:
+        pm.evaluate(pm.randomize_params(), data, micro_batches=2)
+    assert str(err_info.value) == (
+        "Micro-batches are only supported while evaluating gradients of the final "
+        "cost (i.e. output_gradients=True)!"
+    )
+
+
+@pytest.mark.parametrize(
+    "backend_type, jit",
+    [(ml.NumpyBackend, False), (ml.JaxBackend, False), (ml.JaxBackend, True)],
+)
+def test_micro_batches_batch_keys(backend_type, jit):
+    backend = backend_type(dtype=ml.float64)
+    model = Model()
+    model |= Linear(3).connect(input="input", output="linear_out")
+    # Mask has no batch axis, so it is shared by all micro-batches.
+    model |= Multiply().connect(
+        left="linear_out", right=IOKey("mask", type=ml.Tensor), output=IOKey("output")
+    )
+    model.expose_keys("output")
+    train_model = TrainModel(model)
+    train_model.add_loss(
+        SquaredError(), input="output", target="target", reduce_steps=[Mean()]
+    )
+    shapes: dict[str, list[int | None]] = {
+        "input": [None, 4],
+        "target": [None, 3],
+        "mask": [3],
+    }
+    pm = ml.compile(
+        train_model,
+        backend,
+        data_keys={"input", "target", "mask"},
+        shapes=shapes,
+        jit=jit,
+    )
+    params = pm.randomize_params()
+    data = {
+        "input": backend.randn(8, 4),
+        "target": backend.randn(8, 3),
+        "mask": backend.array([1.0, 0.0, 1.0]),
+    }
+
+    ref_outputs, ref_gradients = pm.evaluate(params, data, output_gradients=True)
+    outputs, gradients = pm.evaluate(
+        params,
+        data,
+        output_gradients=True,
+        micro_batches=2,
+        batch_keys=["input", "target"],
+    )
+    for key, value in ref_outputs.items():
+        np.testing.assert_allclose(np.array(outputs[key]), np.array(value), rtol=1e-10)
+    for key, value in ref_gradients.items():
+        np.testing.assert_allclose(
+            np.array(gradients[key]), np.array(value), rtol=1e-10
+        )
+
+    with pytest.raises(ValueError) as err_info:
+        pm.evaluate(params, data, output_gradients=True, micro_batches=2)
+    assert str(err_info.value) == (
+        "Batch keys must have the same size along batch axis 0, data without a "
+        "batch axis must be excluded from batch keys!"
+    )
+
+
+@pytest.mark.parametrize(
+    "backend_type, jit",
+    [(ml.NumpyBackend, False), (ml.JaxBackend, False), (ml.JaxBackend, True)],
+)
+def test_micro_batches_scalar_output_error(backend_type, jit):
+    backend = backend_type()
+    model = Model()
+    model |= Linear(1).connect(input="input", output=IOKey("output"))
+    model |= Max().connect(input="output", output=IOKey("max"))
+    model.expose_keys("output", "max")
+    train_model = TrainModel(model)
+    train_model.add_loss(
+        SquaredError(), input="output", target="target", reduce_steps=[Mean()]
+    )
+    pm = compile_model(backend, train_model, jit=jit)
+    params = pm.randomize_params()
+    data = {"input": backend.randn(8, 4), "target": backend.randn(8, 1)}
+    with pytest.raises(ValueError) as err_info:
+        pm.evaluate(params, data, output_gradients=True, micro_batches=2)
+    assert str(err_info.value) == (
+        "Scalar output 'max' can not be combined from micro-batches, only "
+        "'final_cost' is reduced!"
+    )
@@ -24,6 +24,7 @@ from mithril.framework.logical.base import BaseKey
 from mithril.models import (
     L2,
     MLP,
+    RNN,
     Add,
     Buffer,
     Convolution2D,
@@ -35,6 +36,7 @@ from mithril.models import (
     Model,
     Operator,
     Relu,
+    RNNCell,
     Sigmoid,
     Sqrt,
     SquaredError,
@@ -1335,3 +1337,25 @@ def test_assigned_int_value():
     )
 
     assert_models_equal(model, model_recreated)
+
+
+def test_rnn():
+    model = RNN(RNNCell())
+    model.set_shapes(w_ho=[3, 5])
+    model_dict_created = dict_conversions.model_to_dict(model)
+    model_recreated = dict_conversions.dict_to_model(model_dict_created)
+    model_dict_recreated = dict_conversions.model_to_dict(model_recreated)
+
+    assert model_dict_created == model_dict_recreated
+    assert_models_equal(model, model_recreated)
+
+    backend = JaxBackend(dtype=mithril.float64)
+    assert_evaluations_equal(
+        model,
+        model_recreated,
+        backend,
+        static_keys={
+            "input": backend.ones([4, 2, 1, 3]),
+            "initial_hidden": backend.zeros([2, 1, 5]),
+        },
+    )
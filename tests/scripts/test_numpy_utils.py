@@ -17,7 +17,13 @@ import json
 import numpy as np
 import pytest
 
-from mithril.cores.python.numpy.utils import accumulate_grads
+from mithril.cores.python.numpy.utils import (
+    accumulate_grads,
+    blockwise_attention,
+    blockwise_attention_grad,
+    convolve,
+    convolve_grad,
+)
 
 
 def convert_to_tuple(current_case, key_list):
@@ -76,3 +82,148 @@ def test_numpy_utils(
         results, reference_results, absolute_tolerance, relative_tolerance
     )
     ...
+
+
+def reference_convolve(input, weight, stride, padding, dilation):
+    input = np.pad(input, ((0, 0), (0, 0), *padding))
+    n, _, *spatial = input.shape
+    o, _, *kernel_size = weight.shape
+    output_size = [
+        (size - d * (k - 1) - 1) // s + 1
+        for size, k, s, d in zip(spatial, kernel_size, stride, dilation, strict=True)
+    ]
+    output = np.zeros((n, o, *output_size))
+    for out_idx in np.ndindex(*output_size):
+        for kernel_idx in np.ndindex(*kernel_size):
+            in_idx = tuple(
+                i * s + k * d
+                for i, k, s, d in zip(
+                    out_idx, kernel_idx, stride, dilation, strict=True
+                )
+            )
+            output[(slice(None), slice(None), *out_idx)] += (
+                input[(slice(None), slice(None), *in_idx)]
+                @ weight[(slice(None), slice(None), *kernel_idx)].T
+            )
+    return output
+
+
+@pytest.mark.parametrize(
+    "input_shape, weight_shape, stride, padding, dilation",
+    [
+        ((2, 3, 11), (4, 3, 3), (1,), ((1, 1),), (1,)),
+        ((2, 3, 11), (4, 3, 3), (3,), ((0, 2),), (2,)),
+        ((2, 3, 9, 8), (4, 3, 3, 3), (1, 1), ((1, 1), (1, 1)), (1, 1)),
+        ((2, 3, 9, 8), (4, 3, 3, 2), (2, 1), ((1, 0), (2, 2)), (1, 1)),
+        ((2, 3, 10, 9), (5, 3, 3, 2), (1, 3), ((0, 0), (1, 2)), (2, 3)),
+    ],
+)
+def test_convolve(input_shape, weight_shape, stride, padding, dilation):
+    rng = np.random.default_rng(0)
+    input = rng.standard_normal(input_shape)
+    weight = rng.standard_normal(weight_shape)
+    cache: dict = {}
+    output = convolve(input, weight, stride, padding, dilation, cache)
+    reference = reference_convolve(input, weight, stride, padding, dilation)
+    np.testing.assert_allclose(output, reference, rtol=1e-12, atol=1e-12)
+
+    # Convolution is bilinear, so <conv(x, w), g> = <x, dx> = <w, dw>.
+    output_gradient = rng.standard_normal(output.shape)
+    input_grad = convolve_grad(
+        output_gradient, cache, 0, input, weight, stride, padding, dilation
+    )
+    weight_grad = convolve_grad(
+        output_gradient, cache, 1, input, weight, stride, padding, dilation
+    )
+    assert input_grad.shape == input.shape
+    assert weight_grad.shape == weight.shape
+    inner = np.sum(output * output_gradient)
+    np.testing.assert_allclose(np.sum(input * input_grad), inner, rtol=1e-10)
+    np.testing.assert_allclose(np.sum(weight * weight_grad), inner, rtol=1e-10)
+
+
+def test_convolve_reuses_workspace():
+    rng = np.random.default_rng(0)
+    weight = rng.standard_normal((4, 3, 3, 3))
+    cache: dict = {}
+    padding = ((1, 1), (1, 1))
+    convolve(rng.standard_normal((2, 3, 8, 8)), weight, (1, 1), padding, (1, 1), cache)
+    workspace = cache["cols"]
+    input = rng.standard_normal((2, 3, 8, 8))
+    output = convolve(input, weight, (1, 1), padding, (1, 1), cache)
+    assert cache["cols"] is workspace
+    reference = reference_convolve(input, weight, (1, 1), padding, (1, 1))
+    np.testing.assert_allclose(output, reference, rtol=1e-12, atol=1e-12)
+
+
+def reference_attention(query, key, value, bias, scale_factor, output_gradient):
+    # Dense attention and its gradients with full (L, S) attention weights.
+    scores = query @ np.swapaxes(key, -2, -1) * scale_factor + bias
+    weights = np.exp(scores - scores.max(axis=-1, keepdims=True))
+    weights /= weights.sum(axis=-1, keepdims=True)
+    weights_grad = output_gradient @ np.swapaxes(value, -2, -1)
+    scores_grad = weights * (
+        weights_grad - np.sum(weights_grad * weights, axis=-1, keepdims=True)
+    )
+    query_grad = scores_grad @ key * scale_factor
+    key_grad = np.swapaxes(scores_grad, -2, -1) @ query * scale_factor
+    value_grad = np.swapaxes(weights, -2, -1) @ output_gradient
+    return weights @ value, (query_grad, key_grad, value_grad)
+
+
+@pytest.mark.parametrize("block_size", [1, 3, 8, 64])
+@pytest.mark.parametrize(
+    "query_length, key_length, mask_type",
+    [(13, 13, None), (13, 13, "causal"), (7, 19, "bool"), (19, 7, "float")],
+)
+def test_blockwise_attention(query_length, key_length, mask_type, block_size):
+    rng = np.random.default_rng(0)
+    query = rng.standard_normal((2, 3, query_length, 5))
+    key = rng.standard_normal((2, 3, key_length, 5))
+    value = rng.standard_normal((2, 3, key_length, 4))
+    attn_mask = None
+    bias = np.zeros((query_length, key_length))
+    if mask_type == "causal":
+        bias[np.triu_indices(query_length, 1, key_length)] = -np.inf
+    elif mask_type == "bool":
+        attn_mask = rng.random((query_length, key_length)) > 0.3
+        attn_mask[:, 0] = True
+        bias[~attn_mask] = -np.inf
+    elif mask_type == "float":
+        attn_mask = bias = rng.standard_normal((query_length, key_length))
+    is_causal = mask_type == "causal"
+    output_gradient = rng.standard_normal((2, 3, query_length, 4))
+
+    output, logsumexp = blockwise_attention(
+        query, key, value, attn_mask, is_causal, 0.5, block_size
+    )
+    reference, reference_grads = reference_attention(
+        query, key, value, bias, 0.5, output_gradient
+    )
+    np.testing.assert_allclose(output, reference, rtol=1e-10, atol=1e-12)
+    assert logsumexp.shape == (2, 3, query_length)
+
+    grads = blockwise_attention_grad(
+        output_gradient,
+        output,
+        logsumexp,
+        query,
+        key,
+        value,
+        attn_mask,
+        is_causal,
+        0.5,
+        block_size,
+    )
+    for grad, reference_grad in zip(grads, reference_grads, strict=True):
+        np.testing.assert_allclose(grad, reference_grad, rtol=1e-10, atol=1e-12)
+
+
+def test_blockwise_attention_keeps_input_precision():
+    rng = np.random.default_rng(0)
+    query, key, value = (
+        rng.standard_normal((2, 16, 8)).astype(np.float32) for _ in range(3)
+    )
+    output, logsumexp = blockwise_attention(query, key, value, None, True, 0.25, 4)
+    assert output.dtype == np.float32
+    assert logsumexp.dtype == np.float32
@@ -0,0 +1,196 @@
+# Copyright 2022 Synnada, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pickle
+
+import numpy as np
+import pytest
+import torch
+
+import mithril as ml
+from mithril.optimizers import SGD, Adam, AdamW, Lion, RMSProp
+
+from .test_train_step import compile_train_model
+
+backend_types = [ml.NumpyBackend, ml.TorchBackend, ml.JaxBackend]
+shapes = {"w": (3, 4), "b": (4,), "s": ()}
+
+rng = np.random.default_rng(0)
+initial_params = {key: rng.standard_normal(shape) for key, shape in shapes.items()}
+gradient_steps = [
+    {key: rng.standard_normal(shape) for key, shape in shapes.items()} for _ in range(4)
+]
+
+optimizer_cases = [
+    (lambda: SGD(lr=0.1), lambda p: torch.optim.SGD(p, lr=0.1)),
+    (
+        lambda: SGD(lr=0.1, momentum=0.9, weight_decay=0.01),
+        lambda p: torch.optim.SGD(p, lr=0.1, momentum=0.9, weight_decay=0.01),
+    ),
+    (
+        lambda: SGD(lr=0.1, momentum=0.9, weight_decay=0.01, nesterov=True),
+        lambda p: torch.optim.SGD(
+            p, lr=0.1, momentum=0.9, weight_decay=0.01, nesterov=True
+        ),
+    ),
+    (lambda: Adam(lr=0.01), lambda p: torch.optim.Adam(p, lr=0.01)),
+    (
+        lambda: AdamW(lr=0.01, weight_decay=0.1),
+        lambda p: torch.optim.AdamW(p, lr=0.01, weight_decay=0.1),
+    ),
+    (lambda: RMSProp(lr=0.01), lambda p: torch.optim.RMSprop(p, lr=0.01)),
+    (
+        lambda: RMSProp(lr=0.01, momentum=0.5),
+        lambda p: torch.optim.RMSprop(p, lr=0.01, momentum=0.5),
+    ),
+]
+
+
+def run_optimizer(optimizer, backend, gradient_steps, params=None, state=None):
+    if params is None:
+        params = {key: backend.array(value) for key, value in initial_params.items()}
+    if state is None:
+        state = optimizer.init(backend, params)
+    for gradients in gradient_steps:
+        gradients = {key: backend.array(value) for key, value in gradients.items()}
+        params, state = optimizer.update_params(params, gradients, state)
+    return params, state
+
+
+@pytest.mark.parametrize("backend_type", backend_types)
+@pytest.mark.parametrize("optimizer_fn, torch_optimizer_fn", optimizer_cases)
+def test_optimizer_same_as_torch_optim(backend_type, optimizer_fn, torch_optimizer_fn):
+    torch_params = {
+        key: torch.tensor(value, requires_grad=True)
+        for key, value in initial_params.items()
+    }
+    torch_optimizer = torch_optimizer_fn(list(torch_params.values()))
+    for gradients in gradient_steps:
+        for key, param in torch_params.items():
+            param.grad = torch.tensor(gradients[key])
+        torch_optimizer.step()
+
+    backend = backend_type(dtype=ml.float64)
+    params, _ = run_optimizer(optimizer_fn(), backend, gradient_steps)
+    for key, param in torch_params.items():
+        np.testing.assert_allclose(
+            np.array(params[key]), param.detach().numpy(), rtol=1e-9, atol=1e-12
+        )
+
+
+@pytest.mark.parametrize("backend_type", backend_types)
+def test_lion(backend_type):
+    lr, beta1, beta2, weight_decay = 1e-2, 0.9, 0.99, 0.1
+    ref_params = {key: value.copy() for key, value in initial_params.items()}
+    m = {key: np.zeros_like(value) for key, value in ref_params.items()}
+    for gradients in gradient_steps:
+        for key, grad in gradients.items():
+            direction = np.sign(beta1 * m[key] + (1 - beta1) * grad)
+            ref_params[key] = ref_params[key] * (1 - lr * weight_decay)
+            ref_params[key] -= lr * direction
+            m[key] = beta2 * m[key] + (1 - beta2) * grad
+
+    backend = backend_type(dtype=ml.float64)
+    optimizer = Lion(lr=lr, beta1=beta1, beta2=beta2, weight_decay=weight_decay)
+    params, _ = run_optimizer(optimizer, backend, gradient_steps)
+    for key, value in ref_params.items():
+        np.testing.assert_allclose(np.array(params[key]), value, rtol=1e-9)
+
+
+@pytest.mark.parametrize("backend_type", backend_types)
+def test_optimizer_state_pickle(backend_type):
+    backend = backend_type(dtype=ml.float64)
+    ref_params, _ = run_optimizer(Adam(lr=0.01), backend, gradient_steps)
+
+    params, state = run_optimizer(Adam(lr=0.01), backend, gradient_steps[:2])
+    params, state = pickle.loads(pickle.dumps((params, state)))
+    assert state["step"] == 2
+    # Training continues with a new optimizer from the unpickled state.
+    optimizer = Adam(lr=0.01)
+    optimizer.init(backend, params)
+    params, _ = run_optimizer(optimizer, backend, gradient_steps[2:], params, state)
+    for key, value in ref_params.items():
+        np.testing.assert_allclose(np.array(params[key]), np.array(value), rtol=1e-12)
+
+
+def test_numpy_params_share_bucket():
+    backend = ml.NumpyBackend(dtype=ml.float64)
+    optimizer = Adam(lr=0.01)
+    params, state = run_optimizer(optimizer, backend, gradient_steps[:1])
+    bucket = params["w"].base
+    assert bucket is not None
+    assert all(value.base is bucket for value in params.values())
+    # Buckets are updated in place in the following steps.
+    params, state = run_optimizer(optimizer, backend, gradient_steps[1:], params, state)
+    assert all(value.base is bucket for value in params.values())
+
+
+@pytest.mark.parametrize("optimizer_fn", [lambda: Adam(lr=0.01), lambda: Lion(lr=0.01)])
+def test_numpy_steps_reuse_scratch_buffers(optimizer_fn):
+    backend = ml.NumpyBackend(dtype=ml.float64)
+    optimizer = optimizer_fn()
+    params, state = run_optimizer(optimizer, backend, gradient_steps[:1])
+    scratch = dict(optimizer._numpy_ops.scratch)
+    assert {"sqrt", "sign"} & {name for (name, _), _ in scratch}
+    # Results of sqrt, sign and clone are written into scratch buffers of the
+    # first step, so no new arrays are allocated in the following steps.
+    run_optimizer(optimizer, backend, gradient_steps[1:], params, state)
+    assert optimizer._numpy_ops.scratch.keys() == scratch.keys()
+    assert all(
+        optimizer._numpy_ops.scratch[key] is value for key, value in scratch.items()
+    )
+
+
+def test_optimizer_not_initialized_error():
+    backend = ml.NumpyBackend()
+    params = {"w": backend.ones(3)}
+    with pytest.raises(ValueError) as err_info:
+        Adam().update_params(params, {"w": backend.ones(3)}, {"step": 0})
+    assert str(err_info.value) == "Optimizer must be initialized with init() first!"
+
+
+def test_sgd_nesterov_without_momentum_error():
+    with pytest.raises(ValueError) as err_info:
+        SGD(nesterov=True)
+    assert str(err_info.value) == "Nesterov momentum requires a non-zero momentum!"
+
+
+@pytest.mark.parametrize(
+    "backend_type, jit",
+    [
+        (ml.NumpyBackend, False),
+        (ml.TorchBackend, False),
+        (ml.JaxBackend, True),
+    ],
+)
+def test_optimizer_train_step(backend_type, jit):
+    backend = backend_type(dtype=ml.float64)
+    pm = compile_train_model(backend, jit)
+    data = {"input": backend.randn(16, 4), "target": backend.randn(16, 1)}
+    params = pm.randomize_params()
+    ref_params = {key: backend.array(np.array(value)) for key, value in params.items()}
+
+    ref_optimizer = Adam(lr=0.01)
+    ref_state = ref_optimizer.init(backend, ref_params)
+    optimizer = Adam(lr=0.01)
+    state = optimizer.init(backend, params)
+    step = pm.compile_train_step(optimizer)
+    for _ in range(3):
+        _, gradients = pm.evaluate(ref_params, data, output_gradients=True)
+        ref_params, ref_state = ref_optimizer.update_params(
+            ref_params, gradients, ref_state
+        )
+        _, params, state = step(params, data, state)
+    for key, value in ref_params.items():
+        np.testing.assert_allclose(np.array(params[key]), np.array(value), rtol=1e-10)
@@ -22,6 +22,7 @@ import mithril
 from mithril import TorchBackend
 from mithril.framework.common import NOT_GIVEN, Tensor
 from mithril.models import (
+    RNN,
     AbsoluteError,
     Add,
     Buffer,
@@ -35,6 +36,7 @@ from mithril.models import (
     ManyToOne,
     MatrixMultiply,
     OneToMany,
+    RNNCell,
     Shape,
     Slice,
     Sum,
@@ -1013,3 +1015,63 @@ def test_lstm_many_to_one():
                 continue
             grad_mithril = grad_dict[name]
             torch.testing.assert_close(param.grad, grad_mithril)
+
+
+@pytest.mark.parametrize("cell_type", [RNNCell, LSTMCell])
+def test_rnn_scan_matches_unrolled(cell_type):
+    # RNN scans a single cell over the sequence, which is equivalent to
+    # unrolled ManyToOne when batch sizes of all steps are equal.
+    seq_len, batch, input_dim, hidden_dim, output_dim = 4, 3, 2, 5, 3
+    backend = mithril.NumpyBackend(dtype=mithril.float64)
+    cell = cell_type()
+    shapes = {"initial_hidden": [batch, 1, hidden_dim]}
+    if cell_type is LSTMCell:
+        shapes |= {
+            "initial_cell": [batch, 1, hidden_dim],
+            "w_out": [output_dim, hidden_dim],
+        }
+        shapes |= {
+            key: [hidden_dim, input_dim + hidden_dim]
+            for key in ["w_i", "w_f", "w_c", "w_o"]
+        }
+    else:
+        shapes["w_ho"] = [output_dim, hidden_dim]
+    trainables = set(shapes)
+    input_keys = [f"input{idx}" for idx in range(seq_len)]
+
+    pm = mithril.compile(
+        RNN(cell),
+        backend,
+        shapes=shapes | {"input": [seq_len, batch, 1, input_dim]},
+        trainable_keys=trainables | {"input"},
+        jit=False,
+    )
+    unrolled_pm = mithril.compile(
+        ManyToOne(cell, seq_len),
+        backend,
+        shapes=shapes | {key: [batch, 1, input_dim] for key in input_keys},
+        trainable_keys=trainables | set(input_keys),
+        jit=False,
+    )
+    # Flat graph of RNN holds a single scan regardless of the sequence length.
+    assert len(pm.flat_graph.all_models) == 1
+
+    params = pm.randomize_params()
+    unrolled_params = {key: value for key, value in params.items() if key != "input"}
+    unrolled_params |= {f"input{idx}": params["input"][idx] for idx in range(seq_len)}
+    output_grad = backend.randn(seq_len, batch, 1, output_dim)
+    outputs, grads = pm.evaluate(params, output_gradients={"output": output_grad})
+    unrolled_outputs, unrolled_grads = unrolled_pm.evaluate(
+        unrolled_params,
+        output_gradients={f"output{idx}": output_grad[idx] for idx in range(seq_len)},
+    )
+
+    for idx in range(seq_len):
+        np.testing.assert_allclose(
+            outputs["output"][idx], unrolled_outputs[f"output{idx}"], rtol=1e-10
+        )
+        np.testing.assert_allclose(
+            grads["input"][idx], unrolled_grads[f"input{idx}"], rtol=1e-10
+        )
+    for key in trainables:
+        np.testing.assert_allclose(grads[key], unrolled_grads[key], rtol=1e-10)
@@ -0,0 +1,317 @@
+# Copyright 2022 Synnada, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import numpy as np
+import pytest
+import torch
+
+import mithril as ml
+from mithril.models import (
+    Add,
+    Linear,
+    Mean,
+    Model,
+    Multiply,
+    Relu,
+    Scan,
+    Sum,
+    Tanh,
+)
+from mithril.utils.dict_conversions import dict_to_model, model_to_dict
+
+backends = [ml.NumpyBackend, ml.TorchBackend, ml.JaxBackend]
+
+seq_len, batch, input_dim, hidden_dim = 6, 4, 3, 5
+
+
+def rnn_cell() -> Model:
+    # Same formula with torch.nn.RNN cell.
+    cell = Model()
+    cell |= Linear(hidden_dim).connect(
+        input="input", weight="w_ih", bias="bias_ih", output="input_proj"
+    )
+    cell |= Linear(hidden_dim).connect(
+        input="prev_hidden", weight="w_hh", bias="bias_hh", output="hidden_proj"
+    )
+    cell |= Add().connect(left="input_proj", right="hidden_proj", output="sum")
+    cell |= Tanh().connect(input="sum", output="hidden")
+    cell.expose_keys("hidden")
+    return cell
+
+
+def rnn_model() -> Model:
+    model = Model()
+    model |= Scan(
+        rnn_cell(), carries={"prev_hidden": "hidden"}, sequences=["input"]
+    ).connect(
+        input="input",
+        prev_hidden="initial_hidden",
+        w_ih="w_ih",
+        w_hh="w_hh",
+        bias_ih="bias_ih",
+        bias_hh="bias_hh",
+        output="output",
+    )
+    model |= Sum().connect(input="output", output="loss")
+    model.expose_keys("output", "loss")
+    return model
+
+
+def torch_rnn_reference() -> tuple[dict[str, np.ndarray], dict[str, np.ndarray]]:
+    torch.manual_seed(42)
+    rnn = torch.nn.RNN(input_dim, hidden_dim, nonlinearity="tanh")
+    input = torch.randn(seq_len, batch, input_dim, requires_grad=True)
+    initial_hidden = torch.randn(batch, hidden_dim, requires_grad=True)
+    output, _ = rnn(input, initial_hidden[None])
+    output.sum().backward()
+
+    inputs = {
+        "input": input,
+        "initial_hidden": initial_hidden,
+        "w_ih": rnn.weight_ih_l0,
+        "w_hh": rnn.weight_hh_l0,
+        "bias_ih": rnn.bias_ih_l0,
+        "bias_hh": rnn.bias_hh_l0,
+    }
+    values = {key: value.detach().numpy() for key, value in inputs.items()}
+    values["output"] = output.detach().numpy()
+    grads = {key: value.grad.numpy() for key, value in inputs.items()}  # type: ignore
+    return values, grads
+
+
+@pytest.mark.parametrize("backend_type", backends)
+def test_scan_matches_torch_rnn(backend_type):
+    backend = backend_type()
+    values, ref_grads = torch_rnn_reference()
+    pm = ml.compile(
+        rnn_model(),
+        backend,
+        shapes={"input": [seq_len, batch, input_dim]},
+        trainable_keys={"input", "initial_hidden"},
+        jit=False,
+    )
+    params = {
+        key: backend.array(value) for key, value in values.items() if key != "output"
+    }
+    outputs, grads = pm.evaluate(params, output_gradients={"loss": backend.array(1.0)})
+
+    np.testing.assert_allclose(
+        np.array(outputs["output"]), values["output"], rtol=1e-5, atol=1e-5
+    )
+    for key, ref_grad in ref_grads.items():
+        np.testing.assert_allclose(np.array(grads[key]), ref_grad, rtol=1e-4, atol=1e-5)
+
+
+def test_scan_multiple_carries():
+    # Body has two carries, only one of them is stacked as output.
+    cell = Model()
+    cell |= Linear(hidden_dim).connect(
+        input="input", weight="w", bias="b", output="proj"
+    )
+    cell |= Add().connect(left="proj", right="prev_state", output="sum")
+    cell |= Tanh().connect(input="sum", output="hidden")
+    cell |= Multiply().connect(left="hidden", right="prev_hidden", output="state")
+    cell.expose_keys("hidden", "state")
+
+    model = Model()
+    model |= Scan(
+        cell,
+        carries={"prev_hidden": "hidden", "prev_state": "state"},
+        sequences=["input"],
+        output="hidden",
+    ).connect(
+        input="input",
+        prev_hidden="prev_hidden",
+        prev_state="prev_state",
+        w="w",
+        b="b",
+        output="output",
+    )
+    model |= Sum().connect(input="output", output="loss")
+    model.expose_keys("loss")
+
+    shapes = {
+        "input": [seq_len, batch, input_dim],
+        "prev_hidden": [batch, hidden_dim],
+        "prev_state": [batch, hidden_dim],
+    }
+    trainables = {"input", "prev_hidden", "prev_state"}
+    results = []
+    for backend in [ml.NumpyBackend(dtype=ml.float64), ml.JaxBackend(dtype=ml.float64)]:
+        pm = ml.compile(
+            model, backend, shapes=shapes, trainable_keys=trainables, jit=False
+        )
+        rng = np.random.default_rng(0)
+        params = {
+            key: backend.array(rng.standard_normal(shape))
+            for key, shape in pm.shapes.items()
+            if key in pm.input_keys and isinstance(shape, list)
+        }
+        outputs, grads = pm.evaluate(params, output_gradients={"loss": backend.ones()})
+        results.append((outputs, grads))
+
+    (np_outputs, np_grads), (jax_outputs, jax_grads) = results
+    np.testing.assert_allclose(np_outputs["loss"], np.array(jax_outputs["loss"]))
+    assert np_grads.keys() == jax_grads.keys()
+    for key in np_grads:
+        np.testing.assert_allclose(np_grads[key], np.array(jax_grads[key]), rtol=1e-7)
+
+
+def test_scan_graph_size_independent_of_sequence_length():
+    for length in [10, 1000]:
+        pm = ml.compile(
+            rnn_model(),
+            ml.NumpyBackend(),
+            shapes={
+                "input": [length, batch, input_dim],
+                "initial_hidden": [batch, hidden_dim],
+            },
+            data_keys={"input", "initial_hidden"},
+            jit=False,
+        )
+        assert pm.shapes["output"] == [length, batch, hidden_dim]
+        assert len(pm.flat_graph.all_models) == 2
+
+        params = pm.randomize_params()
+        data = {
+            "input": np.ones((length, batch, input_dim), dtype=np.float32),
+            "initial_hidden": np.zeros((batch, hidden_dim), dtype=np.float32),
+        }
+        outputs, grads = pm.evaluate(
+            params, data, output_gradients={"loss": np.array(1.0, dtype=np.float32)}
+        )
+        assert outputs["output"].shape == (length, batch, hidden_dim)  # type: ignore
+        assert grads.keys() == params.keys()
+
+
+def relu_rnn_model() -> Model:
+    # Raw C backend has no tanh kernel, so the cell is activated with relu.
+    cell = Model()
+    cell |= Linear(hidden_dim).connect(
+        input="input", weight="w_ih", bias="bias", output="input_proj"
+    )
+    cell |= Linear(hidden_dim, use_bias=False).connect(
+        input="prev_hidden", weight="w_hh", output="hidden_proj"
+    )
+    cell |= Add().connect(left="input_proj", right="hidden_proj", output="sum")
+    cell |= Relu().connect(input="sum", output="hidden")
+    cell.expose_keys("hidden")
+
+    model = Model()
+    model |= Scan(cell, carries={"prev_hidden": "hidden"}, sequences=["input"]).connect(
+        input="input",
+        prev_hidden="initial_hidden",
+        w_ih="w_ih",
+        w_hh="w_hh",
+        bias="bias",
+        output="output",
+    )
+    model |= Mean().connect(input="output", output="loss")
+    model.expose_keys("output", "loss")
+    return model
+
+
+@pytest.mark.parametrize("memory_planning", [False, True])
+def test_scan_c_backend(memory_planning):
+    shapes = {
+        "input": [seq_len, batch, input_dim],
+        "initial_hidden": [batch, hidden_dim],
+    }
+    trainables = {"input", "initial_hidden"}
+    rng = np.random.default_rng(0)
+    results = []
+    for backend in [ml.NumpyBackend(), ml.CBackend()]:
+        pm = ml.compile(
+            relu_rnn_model(),
+            backend,
+            shapes=shapes,
+            trainable_keys=trainables,
+            jit=False,
+            memory_planning=memory_planning,
+        )
+        if not results:
+            values = {
+                key: rng.standard_normal(shape).astype(np.float32)  # type: ignore
+                for key, shape in pm.shapes.items()
+                if key in pm.input_keys and isinstance(shape, list)
+            }
+        params = {key: backend.array(value) for key, value in values.items()}
+        outputs, grads = pm.evaluate(params, output_gradients={"loss": backend.ones(1)})
+        results.append((outputs, grads))
+
+    (ref_outputs, ref_grads), (outputs, grads) = results
+    np.testing.assert_allclose(
+        np.array(outputs["output"]), ref_outputs["output"], rtol=1e-5, atol=1e-6
+    )
+    assert grads.keys() == ref_grads.keys()
+    for key, ref_grad in ref_grads.items():
+        np.testing.assert_allclose(np.array(grads[key]), ref_grad, rtol=1e-4, atol=1e-6)
+
+
+def test_scan_c_code_size_independent_of_sequence_length(tmp_path):
+    codes = []
+    for length in [10, 1000]:
+        file_path = str(tmp_path / f"scan_{length}.c")
+        ml.compile(
+            relu_rnn_model(),
+            ml.CBackend(),
+            shapes={
+                "input": [length, batch, input_dim],
+                "initial_hidden": [batch, hidden_dim],
+            },
+            jit=False,
+            file_path=file_path,
+        )
+        with open(file_path) as f:
+            codes.append(f.read())
+    assert "for (int t = 0; t < 1000; t++)" in codes[1]
+    assert len(codes[0].splitlines()) == len(codes[1].splitlines())
+
+
+def test_scan_model_dict_conversion():
+    model = rnn_model()
+    model_dict = model_to_dict(model)
+    assert model_dict == model_to_dict(model)
+
+    backend = ml.NumpyBackend()
+    kwargs = {
+        "shapes": {
+            "input": [seq_len, batch, input_dim],
+            "initial_hidden": [batch, hidden_dim],
+        },
+        "trainable_keys": {"input", "initial_hidden"},
+        "jit": False,
+    }
+    pm_1 = ml.compile(model, backend, **kwargs)  # type: ignore
+    pm_2 = ml.compile(dict_to_model(model_dict), backend, **kwargs)  # type: ignore
+    params = pm_1.randomize_params()
+    np.testing.assert_allclose(
+        pm_1.evaluate(params)["output"],  # type: ignore
+        pm_2.evaluate(params)["output"],  # type: ignore
+    )
+
+
+def test_scan_invalid_keys():
+    with pytest.raises(KeyError):
+        Scan(rnn_cell(), carries={"hidden": "hidden"}, sequences=["input"])
+    with pytest.raises(KeyError):
+        Scan(rnn_cell(), carries={"prev_hidden": "sum"}, sequences=["input"])
+    with pytest.raises(KeyError):
+        Scan(rnn_cell(), carries={"prev_hidden": "hidden"}, sequences=["prev_hidden"])
+    with pytest.raises(ValueError):
+        Scan(
+            rnn_cell(),
+            carries={"prev_hidden": "hidden", "w_ih": "hidden"},
+            sequences=[],
+        )
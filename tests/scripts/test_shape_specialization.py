@@ -0,0 +1,117 @@
+# Copyright 2022 Synnada, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import numpy as np
+import pytest
+
+import mithril as ml
+from mithril.models import Add, IOKey, Linear, Model, Relu
+
+backends = [ml.NumpyBackend, ml.TorchBackend, ml.JaxBackend]
+
+
+def build_model() -> Model:
+    model = Model()
+    model |= Linear(8).connect(input="input", output="hidden")
+    model |= Relu().connect(input="hidden", output="relu_out")
+    model |= Linear(2).connect(input="relu_out", output=IOKey("output"))
+    return model
+
+
+@pytest.mark.parametrize("backend_type", backends)
+def test_specialization_same_results_with_static_shapes(backend_type):
+    backend = backend_type()
+    pm = ml.compile(build_model(), backend, shapes={"input": ["B", 3]})
+    assert pm.dynamic_keys == ["input"]
+    assert pm.shapes["output"] == [None, 2]
+
+    params = pm.randomize_params()
+    for batch in [1, 4, 9]:
+        static_pm = ml.compile(build_model(), backend, shapes={"input": [batch, 3]})
+        data = {"input": backend.randn(batch, 3)}
+        out_grad = {"output": backend.ones(batch, 2)}
+        outputs, grads = pm.evaluate(params, data, output_gradients=out_grad)
+        ref_outputs, ref_grads = static_pm.evaluate(
+            params, data, output_gradients=out_grad
+        )
+        np.testing.assert_allclose(
+            np.array(outputs["output"]),
+            np.array(ref_outputs["output"]),
+            rtol=1e-6,
+        )
+        for key in ref_grads:
+            np.testing.assert_allclose(
+                np.array(grads[key]), np.array(ref_grads[key]), rtol=1e-6
+            )
+
+
+def test_specialization_lru_cache():
+    backend = ml.NumpyBackend()
+    pm = ml.compile(
+        build_model(), backend, shapes={"input": ["B", 3]}, max_specializations=2
+    )
+    params = pm.randomize_params()
+    for batch in [2, 5, 2, 7, 2, 5]:
+        outputs = pm.evaluate(params, {"input": backend.ones(batch, 3)})
+        assert outputs["output"].shape == (batch, 2)  # type: ignore
+
+    assert pm.specializations is not None
+    stats = pm.specializations.stats
+    # 5 is evicted by 7 and specialized again.
+    assert (stats.specializations, stats.hits, stats.evictions) == (4, 2, 2)
+    assert stats.time > 0.0
+    assert len(pm.specializations) == 2
+    assert ((2, 3),) in pm.specializations
+    assert ((5, 3),) in pm.specializations
+
+
+def test_named_dims_are_shared():
+    model = Model()
+    model |= Linear(4).connect(input="left", output="left_out")
+    model |= Linear(4).connect(input="right", output="right_out")
+    model |= Add().connect(left="left_out", right="right_out", output="output")
+    model.expose_keys("output")
+
+    backend = ml.NumpyBackend()
+    pm = ml.compile(model, backend, shapes={"left": ["B", 3], "right": ["B", 5]})
+    shapes = pm.get_shapes(symbolic=True)
+    assert shapes["left"][0] == shapes["right"][0] == shapes["output"][0]  # type: ignore
+    assert pm.dynamic_keys == ["left", "right"]
+
+    params = pm.randomize_params()
+    outputs = pm.evaluate(
+        params, {"left": backend.ones(6, 3), "right": backend.ones(6, 5)}
+    )
+    assert outputs["output"].shape == (6, 4)  # type: ignore
+    with pytest.raises(ValueError):
+        pm.evaluate(params, {"left": backend.ones(2, 3), "right": backend.ones(3, 5)})
+
+
+def test_specialize():
+    pm = ml.compile(build_model(), ml.NumpyBackend(), shapes={"input": ["B", 3]})
+    specialized_pm = pm.specialize({"input": [4, 3]})
+    assert specialized_pm.shapes["output"] == [4, 2]
+    assert specialized_pm.dynamic_keys == []
+    assert specialized_pm.specializations is None
+    # Specialization does not update the symbolic model.
+    assert pm.shapes["output"] == [None, 2]
+
+    with pytest.raises(KeyError):
+        pm.specialize({})
+
+
+def test_static_shapes_not_specialized():
+    pm = ml.compile(build_model(), ml.NumpyBackend(), shapes={"input": [None, 3]})
+    assert pm.dynamic_keys == []
+    assert pm.specializations is None
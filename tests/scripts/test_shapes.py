@@ -99,6 +99,7 @@ from mithril.models import (
     Relu,
     Reshape,
     ScaledDotProduct,
+    Scan,
     Shape,
     Sigmoid,
     Sign,
@@ -6791,6 +6792,7 @@ def test_total_repr_count_1():
         Operator,
         ToList,
         ScaledDotProduct,
+        Scan,
         PrimitiveModel,
         OperatorModel,
     }
@@ -0,0 +1,146 @@
+# Copyright 2022 Synnada, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from typing import Any
+
+import numpy as np
+import pytest
+
+import mithril as ml
+from mithril.models import IOKey, Linear, Mean, Model, Relu, SquaredError, TrainModel
+
+
+class MomentumSGD:
+    def __init__(self, lr: float = 0.1, momentum: float = 0.9) -> None:
+        self.lr = lr
+        self.momentum = momentum
+
+    def init(self, backend: ml.Backend[Any], params: dict[str, Any]) -> Any:
+        return {key: backend.zeros_like(value) for key, value in params.items()}
+
+    def update_params(
+        self, params: dict[str, Any], gradients: dict[str, Any], state: Any
+    ) -> tuple[dict[str, Any], Any]:
+        state = {
+            key: self.momentum * state[key] + grad for key, grad in gradients.items()
+        }
+        params |= {key: value - self.lr * state[key] for key, value in params.items()}
+        return params, state
+
+
+def build_train_model() -> TrainModel:
+    model = Model()
+    model |= Linear(8).connect(input="input", output="hidden")
+    model |= Relu().connect(input="hidden", output="relu_out")
+    model |= Linear(1).connect(input="relu_out", output=IOKey("output"))
+    train_model = TrainModel(model)
+    train_model.add_loss(
+        SquaredError(), input=model.output, target="target", reduce_steps=[Mean()]
+    )
+    return train_model
+
+
+def compile_train_model(backend: ml.Backend[Any], jit: bool) -> Any:
+    return ml.compile(
+        build_train_model(),
+        backend,
+        data_keys={"input", "target"},
+        shapes={"input": [16, 4], "target": [16, 1]},
+        jit=jit,
+    )
+
+
+@pytest.mark.parametrize(
+    "backend_type, jit",
+    [
+        (ml.NumpyBackend, False),
+        (ml.TorchBackend, False),
+        (ml.TorchBackend, True),
+        (ml.JaxBackend, True),
+    ],
+)
+def test_train_step_same_results(backend_type, jit):
+    backend = backend_type(dtype=ml.float64)
+    pm = compile_train_model(backend, jit)
+    optimizer = MomentumSGD()
+    data = {"input": backend.randn(16, 4), "target": backend.randn(16, 1)}
+    params = pm.randomize_params()
+    # Separate copies, since JAX donates buffers of given params.
+    ref_params = {key: backend.array(np.array(value)) for key, value in params.items()}
+    ref_state = optimizer.init(backend, params)
+
+    step = pm.compile_train_step(optimizer)
+    opt_state = optimizer.init(backend, params)
+    for _ in range(3):
+        ref_outputs, gradients = pm.evaluate(ref_params, data, output_gradients=True)
+        ref_params, ref_state = optimizer.update_params(
+            dict(ref_params), gradients, ref_state
+        )
+        outputs, params, opt_state = step(params, data, opt_state)
+        np.testing.assert_allclose(
+            np.array(outputs["final_cost"]),
+            np.array(ref_outputs["final_cost"]),
+            rtol=1e-10,
+        )
+    for key, value in ref_params.items():
+        np.testing.assert_allclose(np.array(params[key]), np.array(value), rtol=1e-10)
+
+
+def test_train_step_jax_donates_buffers():
+    backend = ml.JaxBackend()
+    pm = compile_train_model(backend, jit=True)
+    optimizer = MomentumSGD()
+    data = {"input": backend.randn(16, 4), "target": backend.randn(16, 1)}
+    params = pm.randomize_params()
+    opt_state = optimizer.init(backend, params)
+
+    step = pm.compile_train_step(optimizer)
+    _, new_params, new_state = step(params, data, opt_state)
+    # Given params and optimizer state are reused for updated values.
+    assert all(value.is_deleted() for value in params.values())
+    assert all(value.is_deleted() for value in opt_state.values())
+    assert not any(value.is_deleted() for value in new_params.values())
+    assert not data["input"].is_deleted()
+    step(new_params, data, new_state)
+
+
+def test_train_step_inference_error():
+    backend = ml.NumpyBackend()
+    pm = ml.compile(
+        build_train_model(),
+        backend,
+        data_keys={"input", "target"},
+        shapes={"input": [16, 4], "target": [16, 1]},
+        inference=True,
+    )
+    with pytest.raises(NotImplementedError) as err_info:
+        pm.compile_train_step(MomentumSGD())
+    assert str(err_info.value) == (
+        "Inference mode does not support gradients calculation"
+    )
+
+
+def test_train_step_dynamic_keys_error():
+    backend = ml.NumpyBackend()
+    pm = ml.compile(
+        build_train_model(),
+        backend,
+        data_keys={"input", "target"},
+        shapes={"input": ["B", 4], "target": ["B", 1]},
+    )
+    with pytest.raises(NotImplementedError) as err_info:
+        pm.compile_train_step(MomentumSGD())
+    assert str(err_info.value) == (
+        "Train steps of models with dynamic or state keys are not supported yet!"
+    )
@@ -0,0 +1,166 @@
+# Copyright 2022 Synnada, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import numpy as np
+import pytest
+
+import mithril as ml
+from mithril.framework.physical.vectorize import find_broadcast_outputs
+from mithril.models import IOKey, Linear, Model, Relu, Sum
+
+from .test_train_step import build_train_model
+
+backends_with_jit = [
+    (ml.NumpyBackend, False),
+    (ml.TorchBackend, False),
+    (ml.TorchBackend, True),
+    (ml.JaxBackend, True),
+]
+
+
+def build_model() -> Model:
+    model = Model()
+    model |= Linear(3).connect(input="input", output="hidden")
+    model |= Relu().connect(input="hidden", output=IOKey("output"))
+    return model
+
+
+def compile_model(backend, jit, **kwargs):
+    return ml.compile(
+        build_model(), backend, shapes={"input": [2, 4]}, jit=jit, **kwargs
+    )
+
+
+def tensor_ranks(pm):
+    return {
+        key: len(shape)
+        for key, edge in pm.data.items()
+        if edge.is_tensor and (shape := pm.shapes[key]) is not None
+    }
+
+
+def stack(backend, values):
+    return backend.array(np.stack([np.array(value) for value in values]))
+
+
+@pytest.mark.parametrize("backend_type, jit", backends_with_jit)
+def test_vmap_evaluate_params(backend_type, jit):
+    backend = backend_type(dtype=ml.float64)
+    pm = compile_model(backend, jit, inference=True)
+    ensemble = [pm.randomize_params() for _ in range(5)]
+    params = {key: stack(backend, [p[key] for p in ensemble]) for key in ensemble[0]}
+    data = {"input": backend.randn(2, 4)}
+
+    outputs = pm.vmap_evaluate({"weight": 0, "bias": 0})(params, data)
+    ref_output = np.stack([np.array(pm.evaluate(p, data)["output"]) for p in ensemble])
+    np.testing.assert_allclose(np.array(outputs["output"]), ref_output, rtol=1e-10)
+
+
+@pytest.mark.parametrize("backend_type, jit", backends_with_jit)
+def test_vmap_evaluate_data_axis(backend_type, jit):
+    backend = backend_type(dtype=ml.float64)
+    pm = compile_model(backend, jit, inference=True)
+    params = pm.randomize_params()
+    input = backend.randn(2, 6, 4)
+
+    outputs = pm.vmap_evaluate({"input": 1})(params, {"input": input})
+    ref_output = np.stack(
+        [
+            np.array(pm.evaluate(params, {"input": input[:, idx]})["output"])
+            for idx in range(6)
+        ]
+    )
+    np.testing.assert_allclose(np.array(outputs["output"]), ref_output, rtol=1e-10)
+
+
+@pytest.mark.parametrize("backend_type, jit", backends_with_jit)
+def test_per_example_gradients(backend_type, jit):
+    backend = backend_type(dtype=ml.float64)
+    pm = ml.compile(
+        build_train_model(),
+        backend,
+        data_keys={"input", "target"},
+        shapes={"input": [1, 4], "target": [1, 1]},
+        jit=jit,
+    )
+    params = pm.randomize_params()
+    data = {"input": backend.randn(8, 1, 4), "target": backend.randn(8, 1, 1)}
+
+    fn = pm.vmap_evaluate({"input": 0, "target": 0}, output_gradients=True)
+    outputs, gradients = fn(params, data)
+    for idx in range(8):
+        example = {key: value[idx] for key, value in data.items()}
+        ref_outputs, ref_gradients = pm.evaluate(params, example, output_gradients=True)
+        np.testing.assert_allclose(
+            np.array(outputs["final_cost"][idx]),
+            np.array(ref_outputs["final_cost"]),
+            rtol=1e-10,
+        )
+        for key, value in ref_gradients.items():
+            np.testing.assert_allclose(
+                np.array(gradients[key][idx]), np.array(value), rtol=1e-10
+            )
+
+
+def test_find_broadcast_outputs():
+    backend = ml.NumpyBackend()
+    model = Model()
+    model |= Linear(3).connect(input="input", output=IOKey("hidden"))
+    model |= Sum().connect(input="hidden", output=IOKey("total"))
+    pm = ml.compile(model, backend, shapes={"input": [2, 4]}, inference=True)
+    ranks = tensor_ranks(pm)
+    # Reduction over all axes also reduces the mapped axis.
+    assert find_broadcast_outputs(pm.flat_graph, ["input"], ranks) is None
+    # Weights are transposed over all of their axes.
+    assert find_broadcast_outputs(pm.flat_graph, ["weight"], ranks) is None
+
+    pm = compile_model(backend, jit=False, inference=True)
+    ranks = tensor_ranks(pm)
+    assert find_broadcast_outputs(pm.flat_graph, ["input"], ranks) == {"output"}
+    assert find_broadcast_outputs(pm.flat_graph, ["bias"], ranks) is None
+
+
+def test_vmap_evaluate_numpy_shared_outputs():
+    backend = ml.NumpyBackend()
+    model = Model()
+    model |= Linear(3).connect(input="input", bias="bias", output=IOKey("output"))
+    model |= Relu().connect(input="bias", output=IOKey("bias_relu"))
+    pm = ml.compile(model, backend, shapes={"input": [2, 4]}, inference=True)
+    params = pm.randomize_params()
+    outputs = pm.vmap_evaluate({"input": 0})(params, {"input": backend.randn(5, 2, 4)})
+    assert outputs["output"].shape == (5, 2, 3)
+    np.testing.assert_allclose(
+        outputs["bias_relu"], np.stack([np.maximum(params["bias"], 0)] * 5)
+    )
+
+
+def test_vmap_evaluate_unknown_key_error():
+    pm = compile_model(ml.NumpyBackend(), jit=False, inference=True)
+    with pytest.raises(KeyError) as err_info:
+        pm.vmap_evaluate({"input": 0, "output": 0})
+    assert str(err_info.value) == (
+        "'Mapped keys must be inputs of the model. Unknown keys: output.'"
+    )
+
+
+def test_vmap_evaluate_dynamic_keys_error():
+    pm = ml.compile(
+        build_model(), ml.NumpyBackend(), shapes={"input": ["B", 4]}, inference=True
+    )
+    with pytest.raises(NotImplementedError) as err_info:
+        pm.vmap_evaluate({"input": 0})
+    assert str(err_info.value) == (
+        "Vectorized evaluation of models with dynamic or state keys is not "
+        "supported yet!"
+    )